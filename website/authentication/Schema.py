@@ -1,9 +1,10 @@
 from .models import Employee, JobRole, Permission, LoginLog
 from django.db import transaction
-from website.event_bus import event_bus
+from website.event_bus import EMPLOYEE_EVENTS, event_bus
 from typing import Optional, Annotated, List
 import strawberry
 from strawberry.exceptions import GraphQLError
+from strawberry.scalars import JSON
 import uuid
 import asyncio
 from typing import AsyncGenerator
@@ -462,8 +463,17 @@ from asgiref.sync import sync_to_async
 @strawberry.type
 class EmployeeSubscription:
 
-    @strawberry.subscription
+    @strawberry.subscription(deprecation_reason="Placeholder, use employeeEvents")
     async def employee(self) -> AsyncGenerator[str, None]:
         for x in range(10):
             yield f"Not Implemented yet #{x}"
-            asyncio.sleep(1)
+            await asyncio.sleep(1)
+
+    @strawberry.subscription(description='Employee changes as {"action": "created" | "updated" | "deleted", "id": ...}. Superusers only.')
+    async def employee_events(self, auth_token: str) -> AsyncGenerator[JSON, None]:
+        emp = await SchemaMixin.aget_employee(auth_token)
+        if not emp or not emp.is_superuser:
+            raise GraphQLError("Not permitted")
+
+        async for event in event_bus.subscribe(EMPLOYEE_EVENTS):
+            yield event
@@ -1,5 +1,8 @@
 import uuid
-from authentication.models import Employee
+
+from asgiref.sync import sync_to_async
+
+from website.token_cache import resolve_employee
 
 
 class SchemaMixin:
@@ -10,8 +13,13 @@ class SchemaMixin:
                 uuid.UUID(authkey)
             except ValueError:
                 return False
-            emp = Employee.objects.get(authToken=authkey)
+            emp = resolve_employee(authkey)
         except Exception as e:
             print(e)
             return False
-        return emp
+        return emp or False
+
+    @classmethod
+    async def aget_employee(cls, authkey: str):
+        """get_employee() for async resolvers (subscriptions)."""
+        return await sync_to_async(cls.get_employee)(authkey)
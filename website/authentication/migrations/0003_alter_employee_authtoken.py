@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-18 17:00
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0002_employee_is_superuser'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='employee',
+            name='authToken',
+            field=models.UUIDField(db_index=True, default=uuid.uuid4, editable=False),
+        ),
+    ]
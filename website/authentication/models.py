@@ -24,7 +24,7 @@ class Employee(models.Model):
     job_roles = models.ManyToManyField(JobRole, verbose_name="Job Roles", blank=True)
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Created At")
     modified_at = models.DateTimeField(auto_now=True, verbose_name="Last Modified At")
-    authToken = models.UUIDField(default=uuid.uuid4, editable=False)
+    authToken = models.UUIDField(default=uuid.uuid4, editable=False, db_index=True)
     is_superuser = models.BooleanField(default=False)
 
     class Meta:
@@ -0,0 +1,77 @@
+import threading
+
+from cachetools import TTLCache
+from django.conf import settings
+
+from .models import Employee, Permission
+
+
+class PermissionResolver:
+    """
+    Computes an employee's effective permission names once, as a frozenset.
+
+    The set is memoized on the Employee instance for the rest of the request
+    and in a process-wide TTL cache across requests. authentication.signals
+    invalidates it when JobRole.permissions / Employee.job_roles change.
+    """
+
+    _instance_attr = "_effective_permissions"
+
+    def __init__(self, maxsize: int, ttl: int):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        # Bumped on every invalidation so a lookup that raced with it
+        # doesn't write a stale set back into the cache
+        self._generation = 0
+
+    def permissions_for(self, employee: Employee | int) -> frozenset[str]:
+        if isinstance(employee, Employee):
+            memo = getattr(employee, self._instance_attr, None)
+            if memo is not None:
+                return memo
+            perms = self._load(employee.id)
+            setattr(employee, self._instance_attr, perms)
+            return perms
+        return self._load(employee)
+
+    def has_perms(self, employee: Employee | int, perms_list) -> bool:
+        """True if the employee holds every permission in perms_list."""
+        return self.permissions_for(employee).issuperset(perms_list)
+
+    def has_any_perm(self, employee: Employee | int, perms_list) -> bool:
+        """True if the employee holds at least one permission in perms_list."""
+        return not self.permissions_for(employee).isdisjoint(perms_list)
+
+    def invalidate(self, employee_ids=None):
+        """Drop cached sets for the given employee ids, or all of them."""
+        with self._lock:
+            self._generation += 1
+            if employee_ids is None:
+                self._cache.clear()
+                return
+            for employee_id in employee_ids:
+                self._cache.pop(employee_id, None)
+
+    def _load(self, employee_id: int) -> frozenset[str]:
+        with self._lock:
+            perms = self._cache.get(employee_id)
+            generation = self._generation
+        if perms is not None:
+            return perms
+
+        perms = frozenset(
+            Permission.objects.filter(job_roles__employee__id=employee_id)
+            .values_list("name", flat=True)
+            .distinct()
+        )
+
+        with self._lock:
+            if generation == self._generation:
+                self._cache[employee_id] = perms
+        return perms
+
+
+permission_resolver = PermissionResolver(
+    maxsize=getattr(settings, "PERMISSION_CACHE_SIZE", 10_000),
+    ttl=getattr(settings, "PERMISSION_CACHE_TTL", 60),
+)
@@ -1,8 +1,18 @@
 from django.db import transaction
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import m2m_changed, post_save, post_delete
 from django.dispatch import receiver
-from .models import Employee
-from website.event_bus import event_bus
+from .models import Employee, JobRole, Permission
+from .permissions import permission_resolver
+from student.models import Student
+from website.event_bus import EMPLOYEE_EVENTS, event_bus
+from website.token_cache import employee_tokens, student_tokens
+
+
+def _invalidate_permissions(employee_ids=None):
+    # Once now for this thread, and again after commit so a concurrent
+    # request can't re-cache the pre-commit permission set
+    permission_resolver.invalidate(employee_ids)
+    transaction.on_commit(lambda: permission_resolver.invalidate(employee_ids))
 
 
 @receiver(post_save, sender=Employee)
@@ -10,11 +20,53 @@ def employee_saved(sender, instance, created, **kwargs):
     action = "created" if created else "updated"
     # Capture ID now because instance might change
     emp_id = instance.id
+    # Token may have been rotated, drop whatever we cached for this employee
+    employee_tokens.invalidate(emp_id)
     # Wait for DB to finish saving before notifying subscription
-    transaction.on_commit(lambda: event_bus.emit("employee.events", {"action": action, "id": emp_id}))
+    transaction.on_commit(lambda: event_bus.emit(EMPLOYEE_EVENTS, {"action": action, "id": emp_id}))
 
 
 @receiver(post_delete, sender=Employee)
 def employee_deleted(sender, instance, **kwargs):
+    employee_tokens.invalidate(instance.id)
+    _invalidate_permissions([instance.id])
     # For delete, we send it immediately
-    event_bus.emit("employee.events", {"action": "deleted", "id": instance.id})
+    event_bus.emit(EMPLOYEE_EVENTS, {"action": "deleted", "id": instance.id})
+
+
+@receiver(m2m_changed, sender=Employee.job_roles.through)
+def employee_job_roles_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        _invalidate_permissions([instance.pk])
+    elif pk_set:
+        # jobrole.employee_set.add(...) / remove(...)
+        _invalidate_permissions(set(pk_set))
+    else:
+        _invalidate_permissions()
+
+
+@receiver(m2m_changed, sender=JobRole.permissions.through)
+def job_role_permissions_changed(sender, action, **kwargs):
+    # A role can be shared by any number of employees, just start over
+    if action.startswith("post_"):
+        _invalidate_permissions()
+
+
+@receiver(post_delete, sender=JobRole)
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+def permission_graph_changed(sender, **kwargs):
+    # Cascading deletes of through rows don't send m2m_changed
+    _invalidate_permissions()
+
+
+@receiver(post_save, sender=Student)
+def student_saved(sender, instance, **kwargs):
+    student_tokens.invalidate(instance.id)
+
+
+@receiver(post_delete, sender=Student)
+def student_deleted(sender, instance, **kwargs):
+    student_tokens.invalidate(instance.id)
@@ -1,3 +1,10 @@
-from django.test import TestCase
+from django.test import SimpleTestCase
 
-# Create your tests here.
+from website.GlobalSchema import schema
+
+
+class EmployeeSubscriptionSchemaTests(SimpleTestCase):
+    def test_placeholder_field_is_kept(self):
+        sdl = schema.as_str()
+        self.assertIn('employee: String! @deprecated(reason: "Placeholder, use employeeEvents")', sdl)
+        self.assertIn("employeeEvents(authToken: String!): JSON!", sdl)
@@ -6,6 +6,7 @@ from django.core.exceptions import ObjectDoesNotExist
 from authentication.models import Employee
 from .models import Post
 from datetime import datetime
+from django.conf import settings
 from django.db import connection
 from strawberry.scalars import JSON
 from strawberry.exceptions import GraphQLError
@@ -15,8 +16,11 @@ from website.utils import EmployeeAuthorization
 from slugify import slugify
 from django.db.models import Q
 from strawberry.file_uploads import Upload
-from website.utils import upload_file_to_drive_public
+from website.storage import drive_file_id, save_asset
 from django.db import transaction
+from website.pagination import decode_cursor, encode_cursor
+from .search import search_posts
+from .utils import post_image_path
 
 @strawberry.type
 class PostSchema(EmployeeAuthorization):
@@ -32,10 +36,14 @@ class PostSchema(EmployeeAuthorization):
     meta_description: Optional[str] = None
     slug: Optional[str] = None
     view_count: int
+    # Set on list results; pass the last one back as `after` for the next page
+    cursor: Optional[str] = None
+    # Search results only: matching content passages, terms wrapped in <mark>
+    snippet: Optional[str] = None
 
     @classmethod
     # @strawberry.field(permission_classes=[EmployeeAuthentication])
-    def get_all_blogs(cls, auth_token: str, page: int, limit: Optional[int] = 20) -> List["PostSchema"]:
+    def get_all_blogs(cls, auth_token: str, page: Optional[int] = 1, limit: Optional[int] = 20, after: Optional[str] = None) -> List["PostSchema"]:
         try:
             auth_token = uuid.UUID(auth_token)
             employee = EmployeeAuthorization.check_employee_token(auth_token)
@@ -49,7 +57,23 @@ class PostSchema(EmployeeAuthorization):
         if not employee.is_superuser and not has_permission:
             raise GraphQLError("You do not have permission to do this")
 
-        offset = (page - 1) * limit
+        limit = limit or 20
+        page = page or 1
+
+        # `after` switches to keyset pagination over (created_at, id);
+        # pass "" for the first page, then the last post's cursor
+        keyset_sql = ""
+        if after is None:
+            page_sql, params = "LIMIT %s OFFSET %s", [limit, (page - 1) * limit]
+        else:
+            page_sql, params = "LIMIT %s", [limit]
+            if after:
+                try:
+                    last_created_at, last_id = decode_cursor(after, datetime.fromisoformat, int)
+                except ValueError:
+                    raise GraphQLError("Invalid cursor")
+                keyset_sql = "WHERE (b.created_at, b.id) < (%s, %s)"
+                params = [last_created_at, last_id, limit]
 
         blog_table = Post._meta.db_table
         employee_table = Employee._meta.db_table
@@ -61,11 +85,12 @@ class PostSchema(EmployeeAuthorization):
             e.id as author_id, e.name as author_name
             FROM {blog_table} b
             JOIN {employee_table} e on b.author_id = e.id 
-            ORDER BY b.created_at DESC
-            LIMIT %s OFFSET %s
+            {keyset_sql}
+            ORDER BY b.created_at DESC, b.id DESC
+            {page_sql}
             """
 
-            cursor.execute(blog_sql, [limit, offset])
+            cursor.execute(blog_sql, params)
 
             columns = [col[0] for col in cursor.description]
             rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
@@ -87,6 +112,7 @@ class PostSchema(EmployeeAuthorization):
                     meta_description=None,
                     slug=blog["slug"],
                     view_count=blog["view_count"],
+                    cursor=encode_cursor(blog["created_at"], blog["id"]),
                 ))
 
         return blog_lst
@@ -207,7 +233,9 @@ class PostSchema(EmployeeAuthorization):
     @classmethod
     def search_blog(cls,
                     query:Annotated[str, strawberry.argument(description="Enter search query")],
-                    auth_token:str
+                    auth_token:str,
+                    limit: Optional[int] = 20,
+                    after: Optional[str] = None,
                     ) -> List["PostSchema"]:
         try:
             auth_token=uuid.UUID(auth_token)
@@ -222,63 +250,38 @@ class PostSchema(EmployeeAuthorization):
         if not employee.is_superuser and not has_permission:
             raise GraphQLError("You do not have permission to do this")
 
-        blog_table = Post._meta.db_table
-        employee_table = Employee._meta.db_table
+        limit = max(1, min(limit or 20, 100))
+        query = (query or "").strip()
+        if not query:
+            return []
 
-        with connection.cursor() as cursor:
-            search_sql=f"""
-                SELECT 
-                    b.id,
-                    b.title,
-                    SUBSTR(b.content, 1, 1000) AS content,
-                    b.featured_image,
-                    b.created_at,
-                    b.modified_at,
-                    b.status,
-                    b.meta_keyword,
-                    b.meta_description,
-                    b.slug,
-                    b.view_count,
-                    e.id AS author_id,
-                    e.name AS author_name
-                FROM {blog_table} b
-                JOIN {employee_table} e
-                    ON b.author_id = e.id
-                WHERE
-                    CONCAT_WS(
-                        ' ',
-                        b.title,
-                        b.meta_keyword,
-                        b.meta_description,
-                        e.name
-                    ) ILIKE %s
-                ORDER BY b.created_at DESC;
-                """
-
-            search_term = f"%{query}%"
-            cursor.execute(search_sql, [search_term])
+        # Best match first; pass the last post's cursor as `after` for the next page
+        try:
+            rows, _ = search_posts(query, limit, after)
+        except ValueError:
+            raise GraphQLError("Invalid cursor")
 
-            columns = [col[0] for col in cursor.description]
-            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
-            blog_lst = []
-            for blog in rows:
-                blog_lst.append(cls(
-                    id=blog["id"],
-                    title=blog["title"],
-                    content=blog["content"],
-                    featured_image=blog["featured_image"],
-                    author={
-                        "id": blog["author_id"],
-                        "name": blog["author_name"],
-                    },
-                    created_at=blog["created_at"],
-                    modified_at=blog["modified_at"],
-                    status=blog["status"],
-                    meta_keyword=None,
-                    meta_description=None,
-                    slug=blog["slug"],
-                    view_count=blog["view_count"],
-                ))
+        blog_lst = []
+        for blog in rows:
+            blog_lst.append(cls(
+                id=blog["id"],
+                title=blog["title"],
+                content=blog["content"],
+                featured_image=blog["featured_image"],
+                author={
+                    "id": blog["author_id"],
+                    "name": blog["author_name"],
+                },
+                created_at=blog["created_at"],
+                modified_at=blog["modified_at"],
+                status=blog["status"],
+                meta_keyword=None,
+                meta_description=None,
+                slug=blog["slug"],
+                view_count=blog["view_count"],
+                snippet=blog["snippet"],
+                cursor=encode_cursor(blog["rank"], blog["id"]),
+            ))
 
         return blog_lst
     
@@ -320,9 +323,9 @@ class PostSchema(EmployeeAuthorization):
         if image_file and image_file.content_type not in ALLOWED_TYPES:
             raise GraphQLError("Unsupported image type")
 
-        MAX_FILE_SIZE_MB = 5
+        MAX_FILE_SIZE_MB = getattr(settings, "BLOG_IMAGE_MAX_UPLOAD_MB", 10)
         if image_file and image_file.size > MAX_FILE_SIZE_MB * 1024 * 1024:
-            raise GraphQLError("Image file should not exceed 5 MB")
+            raise GraphQLError(f"Image file should not exceed {MAX_FILE_SIZE_MB} MB")
 
         if status not in ["DRAFT","PUBLISHED","PRIVATE"]:
             raise GraphQLError("Status should be DRAFT, PUBLISHED or PRIVATE")
@@ -348,23 +351,24 @@ class PostSchema(EmployeeAuthorization):
             blog.full_clean()
             blog.save()
 
-            drive_file_id = None
+            image_ref = None
 
             if image_file:
                 try:
-                    drive_file_id, generated_uuid = upload_file_to_drive_public(image_file)
+                    image_ref, generated_uuid = save_asset("blog", image_file)
                 except Exception:
                     raise GraphQLError("Failed to upload image")
 
                 blog.image_uuid = generated_uuid
-                blog.google_file_id = drive_file_id
-                blog.featured_image = f"https://admin.gradglobe.org/blog/images?id={drive_file_id}"
-                blog.save(update_fields=["image_uuid", "google_file_id", "featured_image"])
+                blog.google_file_id = drive_file_id(image_ref) or ""
+                blog.storage_key = image_ref
+                blog.featured_image = f"https://admin.gradglobe.org{post_image_path(image_ref)}"
+                blog.save(update_fields=["image_uuid", "google_file_id", "storage_key", "featured_image"])
 
             featured_image = (
                 blog.featured_image
-                or f"https://admin.gradglobe.org/blog/images?id={drive_file_id}"
-                if drive_file_id
+                or f"https://admin.gradglobe.org{post_image_path(image_ref)}"
+                if image_ref
                 else None
             )
 
@@ -449,8 +453,9 @@ class PostSchema(EmployeeAuthorization):
         if updated_image_file and updated_image_file.content_type not in ALLOWED_TYPES:
             raise GraphQLError("Unsupported image type")
 
-        if updated_image_file and updated_image_file.size > 5 * 1024 * 1024:
-            raise GraphQLError("Image file should not exceed 5 MB")
+        MAX_FILE_SIZE_MB = getattr(settings, "BLOG_IMAGE_MAX_UPLOAD_MB", 10)
+        if updated_image_file and updated_image_file.size > MAX_FILE_SIZE_MB * 1024 * 1024:
+            raise GraphQLError(f"Image file should not exceed {MAX_FILE_SIZE_MB} MB")
 
         if updated_slug:
             final_slug = slugify(updated_slug)
@@ -459,7 +464,7 @@ class PostSchema(EmployeeAuthorization):
         else:
             final_slug = None
 
-        drive_file_id = None
+        image_ref = None
 
         with transaction.atomic():
 
@@ -488,13 +493,14 @@ class PostSchema(EmployeeAuthorization):
 
             if updated_image_file:
                 try:
-                    drive_file_id, generated_uuid = upload_file_to_drive_public(updated_image_file)
+                    image_ref, generated_uuid = save_asset("blog", updated_image_file)
                 except Exception:
                     raise GraphQLError("Failed to upload image")
 
                 blog.image_uuid = generated_uuid
-                blog.google_file_id = drive_file_id
-                blog.featured_image = f"https://admin.gradglobe.org/blog/images?id={drive_file_id}"
+                blog.google_file_id = drive_file_id(image_ref) or ""
+                blog.storage_key = image_ref
+                blog.featured_image = f"https://admin.gradglobe.org{post_image_path(image_ref)}"
 
             try:
                 blog.full_clean()
@@ -505,8 +511,8 @@ class PostSchema(EmployeeAuthorization):
             featured_image = (
                     blog.featured_image
                     or (
-                        f"https://admin.gradglobe.org/blog/images?id={drive_file_id}"
-                        if drive_file_id else None
+                        f"https://admin.gradglobe.org{post_image_path(image_ref)}"
+                        if image_ref else None
                     )
             )
 
@@ -2,7 +2,8 @@ from django.contrib import admin
 from .models import Post
 from django import forms
 from django.core.files.uploadedfile import InMemoryUploadedFile
-from website.utils import upload_file_to_drive_public
+from website.storage import asset_ref, drive_file_id, save_asset
+from .utils import post_image_path
 from django.core.exceptions import ValidationError
 from django.utils.html import format_html
 from authentication.models import Employee
@@ -57,18 +58,20 @@ class PostAdminForm(forms.ModelForm):
         upload_file = self.cleaned_data.get("featured_image_upload")
 
         if upload_file and isinstance(upload_file, InMemoryUploadedFile):
-            drive_file_id, generated_uuid = upload_file_to_drive_public(upload_file)
+            ref, generated_uuid = save_asset("blog", upload_file)
             obj.image_uuid = generated_uuid
-            obj.google_file_id = drive_file_id
+            obj.google_file_id = drive_file_id(ref) or ""
+            obj.storage_key = ref
             # Just save base URL without w/h
-            obj.featured_image = f"/blog/images?id={drive_file_id}"
+            obj.featured_image = post_image_path(ref)
 
         # If user provided only a link, leave it as-is
-        elif self.cleaned_data.get("featured_image") and obj.google_file_id:
-            obj.featured_image = f"/blog/images?id={obj.google_file_id}"
+        elif self.cleaned_data.get("featured_image") and asset_ref(obj.storage_key, obj.google_file_id):
+            obj.featured_image = post_image_path(asset_ref(obj.storage_key, obj.google_file_id))
         else:
             obj.image_uuid = None
             obj.google_file_id = None
+            obj.storage_key = ""
 
         if commit:
             obj.save()
@@ -0,0 +1,163 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from authentication.models import Employee
+from blogs.models import Post
+from blogs.search import match_sql, search_posts
+
+BENCH_SLUG_PREFIX = "fts-bench-"
+
+_WORDS = (
+    "university admission scholarship visa campus tuition engineering medicine business "
+    "management computer science nursing law finance accounting marketing design research "
+    "ielts toefl gre gmat sat application deadline interview essay recommendation transcript "
+    "canada australia germany ireland japan france netherlands sweden singapore newzealand "
+    "london toronto sydney melbourne berlin dublin tokyo paris amsterdam stockholm "
+    "budget loan accommodation hostel part-time job internship placement salary career "
+    "undergraduate postgraduate masters doctorate diploma certificate foundation pathway "
+    "semester intake january september ranking affordable public private guide tips checklist"
+).split()
+
+_QUERIES = [
+    "scholarship",
+    "canada student visa",
+    "computer science masters germany",
+    '"application deadline"',
+    "ielts or toefl",
+    "nursing -australia",
+    "affordable accommodation london",
+    "internship placement salary",
+]
+
+# What search_blog ran before the tsvector column existed
+_ILIKE_SQL = """
+    SELECT b.id
+    FROM blogs_post b
+    JOIN authentication_employee e ON b.author_id = e.id
+    WHERE CONCAT_WS(' ', b.title, b.meta_keyword, b.meta_description, e.name) ILIKE %s
+    ORDER BY b.created_at DESC
+"""
+
+
+def _ms(samples: list[float]) -> str:
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return f"mean {statistics.mean(samples) * 1000:.2f}ms, p50 {statistics.median(samples) * 1000:.2f}ms, p95 {p95 * 1000:.2f}ms"
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(words))
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark blog full-text search (search_blog and the image gallery) against the "
+        "old ILIKE query, optionally on a synthetic corpus of posts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0, help="Insert this many synthetic posts first (e.g. 100000)")
+        parser.add_argument("--author", type=int, help="Employee id for the synthetic posts (default: the first one)")
+        parser.add_argument("--runs", type=int, default=20, help="Timed runs per query")
+        parser.add_argument("--limit", type=int, default=20, help="Page size")
+        parser.add_argument("--pages", type=int, default=3, help="Keyset pages to walk per query")
+        parser.add_argument("--skip-ilike", action="store_true", help="Don't time the old ILIKE query")
+        parser.add_argument("--explain", action="store_true", help="Print the plan of the first query")
+        parser.add_argument("--cleanup", action="store_true", help="Delete the synthetic posts and exit")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Full-text search needs PostgreSQL")
+
+        synthetic = Post.objects.filter(slug__startswith=BENCH_SLUG_PREFIX)
+        if options["cleanup"]:
+            deleted, _ = synthetic.delete()
+            self.stdout.write(f"Deleted {deleted} synthetic posts")
+            return
+
+        if options["seed"]:
+            self._seed(options["seed"], options["author"])
+
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE blogs_post")
+        self.stdout.write(f"Corpus: {Post.objects.count()} posts ({synthetic.count()} synthetic)")
+
+        if options["explain"]:
+            self._explain(_QUERIES[0], options["limit"])
+
+        limit = options["limit"]
+        for query in _QUERIES:
+            first_page, later_pages, gallery, ilike = [], [], [], []
+            for _ in range(options["runs"]):
+                after = None
+                for page in range(options["pages"]):
+                    start = time.perf_counter()
+                    rows, info = search_posts(query, limit, after)
+                    (first_page if page == 0 else later_pages).append(time.perf_counter() - start)
+                    if not info.has_next_page:
+                        break
+                    after = info.end_cursor
+
+                start = time.perf_counter()
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f"SELECT id, title, featured_image FROM blogs_post WHERE {match_sql()} "
+                        "ORDER BY created_at DESC, id DESC LIMIT %s",
+                        [query, limit + 1],
+                    )
+                    cursor.fetchall()
+                gallery.append(time.perf_counter() - start)
+
+                if not options["skip_ilike"]:
+                    start = time.perf_counter()
+                    with connection.cursor() as cursor:
+                        cursor.execute(_ILIKE_SQL, [f"%{query}%"])
+                        cursor.fetchall()
+                    ilike.append(time.perf_counter() - start)
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{query!r}"))
+            self.stdout.write(f"  search, first page  {_ms(first_page)}")
+            if later_pages:
+                self.stdout.write(f"  search, next pages  {_ms(later_pages)}")
+            self.stdout.write(f"  gallery page        {_ms(gallery)}")
+            if ilike:
+                self.stdout.write(f"  old ILIKE (no LIMIT) {_ms(ilike)}")
+
+    def _seed(self, count: int, author_id: int | None):
+        author = Employee.objects.filter(pk=author_id).first() if author_id else Employee.objects.first()
+        if author is None:
+            raise CommandError("No employee to author the synthetic posts; pass --author")
+
+        rng = random.Random(count)
+        offset = Post.objects.filter(slug__startswith=BENCH_SLUG_PREFIX).count()
+        batch_size = 2000
+        start = time.perf_counter()
+        for batch_start in range(offset, offset + count, batch_size):
+            posts = [
+                Post(
+                    title=_sentence(rng, rng.randint(4, 10)).title(),
+                    content="<p>" + "</p><p>".join(_sentence(rng, 60) for _ in range(rng.randint(3, 8))) + "</p>",
+                    meta_keyword=", ".join(rng.sample(_WORDS, 5)),
+                    meta_description=_sentence(rng, 20),
+                    author=author,
+                    status="PUBLISHED",
+                    slug=f"{BENCH_SLUG_PREFIX}{i}",
+                )
+                for i in range(batch_start, min(batch_start + batch_size, offset + count))
+            ]
+            Post.objects.bulk_create(posts)
+            self.stdout.write(f"  seeded {batch_start - offset + len(posts)}/{count}", ending="\r")
+        self.stdout.write(f"Seeded {count} posts in {time.perf_counter() - start:.1f}s")
+
+    def _explain(self, query: str, limit: int):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"EXPLAIN ANALYZE SELECT id FROM blogs_post WHERE {match_sql()} "
+                "ORDER BY ts_rank(search_vector, websearch_to_tsquery('english', %s), 1) DESC, id DESC LIMIT %s",
+                [query, query, limit + 1],
+            )
+            self.stdout.write("\n".join(row[0] for row in cursor.fetchall()))
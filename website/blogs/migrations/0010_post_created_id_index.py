@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 17:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0003_alter_employee_authtoken'),
+        ('blogs', '0009_alter_post_featured_image'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-created_at', '-id'], name='idx_post_created_id'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Keeps blogs_post.search_vector up to date. The author's name lives on
+# authentication_employee, so renaming an employee re-touches their posts.
+CREATE_TRIGGERS = """
+CREATE OR REPLACE FUNCTION blogs_post_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(NEW.meta_keyword, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(NEW.meta_description, '')), 'B') ||
+        setweight(to_tsvector('english',
+            left(regexp_replace(coalesce(NEW.content, ''), '<[^>]*>', ' ', 'g'), 200000)), 'C') ||
+        setweight(to_tsvector('simple', coalesce(
+            (SELECT name FROM authentication_employee WHERE id = NEW.author_id), '')), 'D');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER blogs_post_search_vector_trg
+    BEFORE INSERT OR UPDATE OF title, meta_keyword, meta_description, content, author_id, search_vector
+    ON blogs_post
+    FOR EACH ROW EXECUTE FUNCTION blogs_post_search_vector();
+
+CREATE OR REPLACE FUNCTION blogs_post_author_renamed() RETURNS trigger AS $$
+BEGIN
+    UPDATE blogs_post SET search_vector = NULL WHERE author_id = NEW.id;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER blogs_post_author_renamed_trg
+    AFTER UPDATE OF name ON authentication_employee
+    FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+    EXECUTE FUNCTION blogs_post_author_renamed();
+
+UPDATE blogs_post SET search_vector = NULL;
+"""
+
+DROP_TRIGGERS = """
+DROP TRIGGER IF EXISTS blogs_post_author_renamed_trg ON authentication_employee;
+DROP FUNCTION IF EXISTS blogs_post_author_renamed();
+DROP TRIGGER IF EXISTS blogs_post_search_vector_trg ON blogs_post;
+DROP FUNCTION IF EXISTS blogs_post_search_vector();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0003_alter_employee_authtoken'),
+        ('blogs', '0010_post_created_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(CREATE_TRIGGERS, DROP_TRIGGERS),
+        migrations.AddIndex(
+            model_name='post',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='idx_post_search_vector'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 17:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogs', '0011_post_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='storage_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+    ]
@@ -1,3 +1,5 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from authentication.models import Employee as EMPLOYEE_MODEL
 from slugify import slugify  # using `python-slugify`
@@ -15,6 +17,7 @@ class Post(models.Model):
     featured_image = models.TextField(default="", null=True, blank=True)
     image_uuid = models.UUIDField(editable=False, unique=True, null=True, blank=True)
     google_file_id = models.CharField(max_length=255, blank=True, default="", null=True)
+    storage_key = models.CharField(max_length=255, blank=True, default="", editable=False)  # website/storage.py reference
     author = models.ForeignKey(EMPLOYEE_MODEL, on_delete=models.PROTECT)
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Created At")
     modified_at = models.DateTimeField(auto_now=True, verbose_name="Last Modified At")
@@ -23,6 +26,9 @@ class Post(models.Model):
     meta_description = models.TextField(blank=True, null=True)
     slug = models.SlugField(max_length=1000, unique=True, blank=True, null=True)
     view_count = models.PositiveIntegerField(default=0)
+    # Weighted title/keywords/description/content/author lexemes, filled in
+    # by a database trigger (migration 0011), see blogs/search.py
+    search_vector = SearchVectorField(null=True, editable=False)
 
     def save(self, *args, **kwargs):
         if not self.slug and self.title:
@@ -34,5 +40,10 @@ class Post(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination over (created_at, id), newest first
+            models.Index(fields=["-created_at", "-id"], name="idx_post_created_id"),
+            GinIndex(fields=["search_vector"], name="idx_post_search_vector"),
+        ]
         verbose_name = "Blog Post"
         verbose_name_plural = "Blog Posts"
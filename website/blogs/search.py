@@ -0,0 +1,96 @@
+"""
+Full-text search over blog posts.
+
+blogs_post.search_vector is maintained by a trigger (migration 0011): title
+is weighted A, keywords and description B, content (tags stripped) C and
+the author's name D. It has a GIN index, so a match is an index lookup
+instead of an ILIKE scan over every post.
+
+Queries use websearch_to_tsquery, so users can type quoted phrases, `or`
+and `-word`. Results are ordered by ts_rank and paged by keyset over
+(rank, id); highlighted snippets are only built for the rows of the page.
+"""
+
+from django.db import connection
+
+from authentication.models import Employee
+from website.pagination import decode_cursor, keyset_page
+
+from .models import Post
+
+SEARCH_CONFIG = "english"
+
+# Rank normalization 1: divide by 1 + log(document length), so long posts
+# don't win just by repeating a word. ts_rank returns real; as float8 the
+# rank survives the round trip through a cursor exactly, so the keyset
+# predicate neither repeats nor skips the rows at a page boundary.
+RANK_SQL = "ts_rank(b.search_vector, q.query, 1)::float8"
+
+HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=30, MinWords=10, FragmentDelimiter= … "
+
+
+def match_sql(alias: str = "") -> str:
+    """WHERE fragment matching the search query parameter (%s) against a post."""
+    column = f"{alias}.search_vector" if alias else "search_vector"
+    return f"{column} @@ websearch_to_tsquery('{SEARCH_CONFIG}', %s)"
+
+
+def search_posts(query: str, limit: int = 20, after: str | None = None):
+    """
+    A page of posts matching `query`, best match first, as
+    (rows, PageInfo). Raises ValueError for a bad `after` cursor.
+    """
+    keyset_sql, params = "", [query]
+    if after:
+        last_rank, last_id = decode_cursor(after, float, int)
+        keyset_sql = f"AND ({RANK_SQL}, b.id) < (%s::float8, %s)"
+        params += [last_rank, last_id]
+    params.append(limit + 1)
+
+    blog_table = Post._meta.db_table
+    employee_table = Employee._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH q AS (
+                SELECT websearch_to_tsquery('{SEARCH_CONFIG}', %s) AS query
+            ),
+            hits AS (
+                SELECT b.id, {RANK_SQL} AS rank
+                FROM {blog_table} b, q
+                WHERE b.search_vector @@ q.query
+                {keyset_sql}
+                ORDER BY rank DESC, b.id DESC
+                LIMIT %s
+            )
+            SELECT
+                b.id,
+                b.title,
+                SUBSTR(b.content, 1, 1000) AS content,
+                b.featured_image,
+                b.created_at,
+                b.modified_at,
+                b.status,
+                b.slug,
+                b.view_count,
+                e.id AS author_id,
+                e.name AS author_name,
+                hits.rank,
+                ts_headline(
+                    '{SEARCH_CONFIG}',
+                    regexp_replace(b.content, '<[^>]*>', ' ', 'g'),
+                    q.query,
+                    '{HEADLINE_OPTIONS}'
+                ) AS snippet
+            FROM hits
+            CROSS JOIN q
+            JOIN {blog_table} b ON b.id = hits.id
+            JOIN {employee_table} e ON e.id = b.author_id
+            ORDER BY hits.rank DESC, b.id DESC
+            """,
+            params,
+        )
+        columns = [col[0] for col in cursor.description]
+        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    return keyset_page(rows, limit, key=lambda row: (row["rank"], row["id"]))
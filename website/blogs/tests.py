@@ -1,3 +1,181 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+
+from authentication.models import Employee
+from website import storage
+from website.image_cache import image_cache
+
+from .models import Post
+from .search import search_posts
+
+
+def _jpeg() -> bytes:
+    out = io.BytesIO()
+    Image.new("RGB", (8, 8), "red").save(out, "JPEG")
+    return out.getvalue()
+
+
+class PostImageAccessTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        settings_override = override_settings(
+            ASSET_STORAGE_BACKEND="local", ASSET_STORAGE_ROOT=os.path.join(self.root, "assets")
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        storage._backends.clear()
+        self.addCleanup(storage._backends.clear)
+        cache_root = mock.patch.object(image_cache, "root", os.path.join(self.root, "cache"))
+        cache_root.start()
+        self.addCleanup(cache_root.stop)
+
+        self.blog_ref, _ = storage.save_asset("blog", io.BytesIO(_jpeg()))
+        self.document_ref, _ = storage.save_asset("documents", io.BytesIO(_jpeg()))
+
+    def test_blog_image_is_public(self):
+        response = self.client.get("/blog/images/", {"id": self.blog_ref})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/jpeg")
+
+    def test_private_areas_are_not_served(self):
+        response = self.client.get("/blog/images/", {"id": self.document_ref})
+        self.assertEqual(response.status_code, 404)
+
+    def test_traversal_out_of_blog_area_is_rejected(self):
+        document_key = self.document_ref.partition(":")[2]
+        for ref in (f"local:blog/../{document_key}", f"local:blog/./../{document_key}", f"local:blog//../{document_key}"):
+            with self.subTest(ref=ref):
+                response = self.client.get("/blog/images/", {"id": ref})
+                self.assertEqual(response.status_code, 404)
+
+    def test_local_keys_must_be_normalised(self):
+        backend = storage.get_backend("local")
+        document_key = self.document_ref.partition(":")[2]
+        self.assertTrue(backend.path(document_key).startswith(backend.root))
+        for key in (f"blog/../{document_key}", "../outside", "/etc/passwd", "blog/./x.jpg"):
+            with self.subTest(key=key), self.assertRaises(storage.AssetNotFound):
+                backend.path(key)
+
+
+class BlogSearchTests(TestCase):
+    def setUp(self):
+        self.author = Employee.objects.create(
+            username="writer", password="x", name="Riya Sen", phone_number="9000000000", email="riya@example.com"
+        )
+
+    def post(self, title, content, **kwargs):
+        return Post.objects.create(title=title, content=content, author=self.author, status="PUBLISHED", **kwargs)
+
+    def all_pages(self, query, limit):
+        ids, after = [], None
+        for _ in range(Post.objects.count() + 1):
+            rows, page_info = search_posts(query, limit=limit, after=after)
+            ids += [row["id"] for row in rows]
+            if not page_info.has_next_page:
+                return ids
+            after = page_info.end_cursor
+        self.fail(f"Paging did not finish: {ids}")
+
+    def test_ranked_by_weight(self):
+        in_body = self.post("Life abroad", "<p>Studying in Germany is affordable.</p>")
+        in_title = self.post("Germany student visa guide", "<p>Documents you need.</p>")
+        self.post("Canada intakes", "<p>Fall and winter intakes.</p>")
+
+        rows, _ = search_posts("germany")
+        self.assertEqual([row["id"] for row in rows], [in_title.id, in_body.id])
+        self.assertIn("<mark>", rows[1]["snippet"])
+
+    def test_pages_split_ties_without_repeating_or_skipping(self):
+        # Same rank for every post: only the id orders them across pages
+        posts = [self.post(f"Post {i}", "<p>Scholarships for masters students in Ireland.</p>") for i in range(7)]
+        posts += [self.post("Ireland", "<p>Ireland scholarships, Ireland masters.</p>")]
+        expected = [row["id"] for row in search_posts("ireland scholarships", limit=100)[0]]
+        self.assertCountEqual(expected, [p.id for p in posts])
+
+        for limit in (1, 2, 3):
+            with self.subTest(limit=limit):
+                self.assertEqual(self.all_pages("ireland scholarships", limit), expected)
+
+    def test_bad_cursor(self):
+        with self.assertRaises(ValueError):
+            search_posts("germany", after="not-a-cursor")
+
+
+@override_settings(ALLOWED_HOSTS=["*"])
+class BlogPostDetailTests(TestCase):
+    API_KEY = "7c1f8a0e-3b9a-4d8e-9a51-0f5b2f0d6c11"
+
+    def setUp(self):
+        author = Employee.objects.create(
+            username="writer", password="x", name="Riya Sen", phone_number="9000000000", email="riya@example.com"
+        )
+        self.post = Post.objects.create(
+            title="Germany student visa guide", content="<p>Documents.</p>", author=author, status="PUBLISHED"
+        )
+        env = mock.patch.dict(os.environ, {"API_KEY": self.API_KEY})
+        env.start()
+        self.addCleanup(env.stop)
+
+    def test_view_count_is_bumped_without_rewriting_the_post(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f"/blog/by_id_or_slug/{self.post.id}/", HTTP_KEY=self.API_KEY)
+        self.assertEqual(response.status_code, 200)
+
+        updates = [q["sql"] for q in queries.captured_queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn('"content"', updates[0])
+        self.assertNotIn('"search_vector"', updates[0])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.view_count, 1)
+
+
+@override_settings(ALLOWED_HOSTS=["*"])
+class BlogGalleryCursorTests(TestCase):
+    API_KEY = "7c1f8a0e-3b9a-4d8e-9a51-0f5b2f0d6c11"
+
+    def setUp(self):
+        self.author = Employee.objects.create(
+            username="writer", password="x", name="Riya Sen", phone_number="9000000000", email="riya@example.com"
+        )
+        posts = [
+            Post.objects.create(title=f"Post {i}", content="<p>Body.</p>", author=self.author) for i in range(7)
+        ]
+        # Same timestamp for most of them: only the id orders those
+        Post.objects.filter(pk__in=[p.pk for p in posts[1:]]).update(created_at=posts[0].created_at)
+        self.expected = [p.id for p in Post.objects.order_by("-created_at", "-id")]
+        env = mock.patch.dict(os.environ, {"API_KEY": self.API_KEY})
+        env.start()
+        self.addCleanup(env.stop)
+
+    def gallery(self, **params):
+        return self.client.get(
+            "/blog/image-gallery/", params, HTTP_KEY=self.API_KEY, HTTP_AUTHORIZATION=str(self.author.authToken)
+        )
+
+    def test_pages_split_ties_without_repeating_or_skipping(self):
+        for limit in (1, 2, 3):
+            with self.subTest(limit=limit):
+                ids, after = [], ""
+                for _ in range(len(self.expected) + 1):
+                    data = self.gallery(after=after, limit=limit).json()
+                    ids += [post["id"] for post in data["results"]]
+                    if not data["has_next"]:
+                        break
+                    after = data["next_cursor"]
+                self.assertEqual(ids, self.expected)
+
+    def test_total_only_on_request(self):
+        self.assertNotIn("count", self.gallery(after="").json())
+        self.assertEqual(self.gallery(after="", with_total=1).json()["count"], len(self.expected))
+
+    def test_bad_cursor(self):
+        self.assertEqual(self.gallery(after="not-a-cursor").status_code, 400)
@@ -1,6 +1,8 @@
 from django.shortcuts import render
 from django.http import JsonResponse, HttpResponseBadRequest
+from django.conf import settings
 from django.db import connection
+from django.db.models import F
 import json
 from website.utils import api_key_required, has_perms, token_required
 from .models import Post
@@ -12,8 +14,14 @@ from slugify import slugify  # using `python-slugify`
 from django.views.decorators.csrf import csrf_exempt
 import uuid
 from django.core.files.uploadedfile import UploadedFile
-from website.utils import upload_file_to_drive_public
+from website.image_cache import image_cache
+from website.storage import asset_area, asset_ref, drive_file_id, save_asset
 import math
+import threading
+from cachetools import TTLCache, cached
+from datetime import datetime
+from website.pagination import cached_count, decode_cursor, keyset_page
+from .search import match_sql
 
 STREAM_IMAGE_URL = "https://admin.gradglobe.org/blog/images"
 
@@ -101,9 +109,10 @@ def blog_post_detail_view(request, identifier):
         else:
             post = get_object_or_404(Post.objects.select_related('author'), slug=identifier)
         
-        # Increment view count
+        # Increment view count. A plain UPDATE of view_count alone, so the
+        # search_vector trigger (migration 0011) doesn't re-tokenise the post
+        Post.objects.filter(pk=post.pk).update(view_count=F("view_count") + 1)
         post.view_count += 1
-        post.save()
         
         data = {
             'id': post.id,
@@ -399,30 +408,56 @@ def posts_by_author_view(request):
 
 from django.http import HttpResponse
 from .models import Post
-from .utils import stream_google_drive_image
+from .utils import post_image_path
+
+# image uuid / bare Drive id -> storage reference, so a page of thumbnails
+# doesn't cost a query per image
+@cached(TTLCache(maxsize=10000, ttl=300), lock=threading.Lock())
+def _resolve_image_ref(image_id, uuid_val):
+    if uuid_val:
+        post = Post.objects.filter(image_uuid=uuid_val).only("storage_key", "google_file_id").first()
+        return asset_ref(post.storage_key, post.google_file_id) if post else None
+    if image_id and ":" not in image_id:
+        # A featured image moved off Drive is served from its new home
+        return (
+            Post.objects.filter(google_file_id=image_id)
+            .exclude(storage_key="")
+            .values_list("storage_key", flat=True)
+            .first()
+        ) or f"drive:{image_id}"
+    return image_id
+
 
 def stream_post_image(request):
-    file_id = request.GET.get("id")
+    # id is a bare Drive file id (older links) or a storage reference
+    image_id = request.GET.get("id")
     uuid_val = request.GET.get("uuid")
 
     width = request.GET.get("w")
     height = request.GET.get("h")
 
-    # resolve uuid → google_file_id
-    if uuid_val:
-        try:
-            post = Post.objects.get(image_uuid=uuid_val)
-            file_id = post.google_file_id
-        except Post.DoesNotExist:
-            return HttpResponse("Image not found", status=404)
+    try:
+        uuid_val = str(uuid.UUID(uuid_val)) if uuid_val else None
+    except ValueError:
+        return HttpResponse("Image not found", status=404)
+
+    ref = _resolve_image_ref(image_id, uuid_val)
+    if not ref and uuid_val:
+        return HttpResponse("Image not found", status=404)
+    if not ref:
+        return HttpResponse("Missing Google file ID", status=400)
+
+    # Only blog images are public
+    if not drive_file_id(ref) and asset_area(ref) != "blog":
+        return HttpResponse("Image not found", status=404)
 
     # convert width/height safely
     width = int(width) if width else None
     height = int(height) if height else None
 
-    return stream_google_drive_image(file_id, width, height)
+    return image_cache.serve(request, ref, width, height)
 
-MAX_FILE_SIZE_MB = 5
+MAX_FILE_SIZE_MB = getattr(settings, "BLOG_IMAGE_MAX_UPLOAD_MB", 10)
 
 @require_http_methods(['POST'])
 @csrf_exempt
@@ -443,16 +478,16 @@ def upload_image_to_drive(request):
         }, status=400)
 
     try:
-        # Upload file to Google Drive (assuming this function handles all)
-        drive_file_id, generated_uuid = upload_file_to_drive_public(upload_file)
+        ref, generated_uuid = save_asset("blog", upload_file)
 
         # Generate the same-style public URL
-        featured_image_url = f"https://admin.gradglobe.org/blog/images?id={drive_file_id}"
+        featured_image_url = f"https://admin.gradglobe.org{post_image_path(ref)}"
 
         return JsonResponse({
             "success": True,
             "featured_image": featured_image_url,
-            "google_file_id": drive_file_id,
+            "google_file_id": drive_file_id(ref),
+            "storage_key": ref,
             "image_uuid": generated_uuid
         })
 
@@ -467,11 +502,16 @@ def blog_gallery(request):
     API Endpoint: /blog/image-gallery/
     Supports ?search, ?limit, ?page
     Example: /blog/image-gallery/?search=django&limit=10&page=2
+
+    Cursor mode: pass ?after= (empty for the first page, then next_cursor).
+    The total is only counted with ?with_total=1 and is cached briefly.
     """
 
-    search = request.GET.get("search")
+    search = (request.GET.get("search") or "").strip() or None
     limit = request.GET.get("limit", 10)
     page = request.GET.get("page", 1)
+    after = request.GET.get("after")
+    with_total = request.GET.get("with_total") in ("1", "true")
 
     # Validate limit
     try:
@@ -489,12 +529,16 @@ def blog_gallery(request):
 
     offset = (page - 1) * limit
 
-    # Base SQL (safe placeholders)
+    # Base SQL (safe placeholders); the search goes through the GIN-indexed
+    # search_vector instead of scanning titles with ILIKE
     base_query = """
         FROM blogs_post
-        WHERE (%s IS NULL OR title ILIKE '%%' || %s || '%%')
+        WHERE (%s IS NULL OR """ + match_sql() + """)
     """
 
+    if after is not None:
+        return _blog_gallery_keyset(base_query, search, limit, after, with_total)
+
     try:
         with connection.cursor() as cursor:
             # Total count
@@ -533,4 +577,55 @@ def blog_gallery(request):
             "status": "error",
             "message": "Something went wrong while fetching images.",
             # "m":str(e)
-        }, status=500)
\ No newline at end of file
+        }, status=500)
+
+
+def _blog_gallery_keyset(base_query, search, limit, after, with_total):
+    keyset_sql = ""
+    params = [search, search]
+    if after:
+        try:
+            last_created_at, last_id = decode_cursor(after, datetime.fromisoformat, int)
+        except ValueError:
+            return JsonResponse({"status": "error", "message": "Invalid cursor"}, status=400)
+        keyset_sql = "AND (created_at, id) < (%s, %s)"
+        params += [last_created_at, last_id]
+
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT id, title, featured_image, created_at
+                """ + base_query + keyset_sql + """
+                ORDER BY created_at DESC, id DESC
+                LIMIT %s
+                """,
+                params + [limit + 1],
+            )
+            columns = [col[0] for col in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+        rows, info = keyset_page(rows, limit, key=lambda row: (row["created_at"], row["id"]))
+        posts = [{k: row[k] for k in ("id", "title", "featured_image")} for row in rows]
+
+        data = {
+            "status": "success",
+            "limit": limit,
+            "has_next": info.has_next_page,
+            "next_cursor": info.end_cursor,
+            "results": posts,
+        }
+        if with_total:
+            def count():
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT COUNT(*) " + base_query, [search, search])
+                    return cursor.fetchone()[0]
+            data["count"] = cached_count(f"blog_gallery:{search}", count)
+
+        return JsonResponse(data, status=200)
+
+    except Exception:
+        return JsonResponse({
+            "status": "error",
+            "message": "Something went wrong while fetching images.",
+        }, status=500)
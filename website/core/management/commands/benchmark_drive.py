@@ -0,0 +1,181 @@
+import io
+import json
+import socket
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import google_auth_httplib2
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from google.auth.transport.requests import Request
+from googleapiclient.discovery import build_from_document
+from googleapiclient.http import MediaIoBaseUpload
+
+from website.drive import discovery_document, drive_pool, new_credentials
+from website.utils import delete_from_google_drive, upload_file_to_drive_public
+
+
+class FakeDrive(ThreadingHTTPServer):
+    """
+    Just enough of the OAuth token endpoint and Drive v3 for our helpers:
+    token refresh, multipart upload, permissions, media download, delete.
+    Every response is delayed by `latency` seconds to stand in for the
+    round-trip to Google.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, latency: float):
+        super().__init__(("127.0.0.1", 0), _FakeDriveHandler)
+        self.latency = latency
+        self.files = {}
+        self.hits = {"token": 0, "upload": 0, "permission": 0, "download": 0, "delete": 0}
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def hit(self, kind: str):
+        with self.lock:
+            self.hits[kind] += 1
+
+
+class _FakeDriveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        # Keep-alive plus Nagle would add ~40ms of delayed-ACK stall per request
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, *args):
+        pass
+
+    def _body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _reply(self, status: int, payload=None, raw: bytes | None = None):
+        time.sleep(self.server.latency)
+        body = raw if raw is not None else json.dumps(payload or {}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/octet-stream" if raw is not None else "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = self._body()
+        path = self.path.split("?")[0]
+        if path == "/token":
+            self.server.hit("token")
+            self._reply(200, {"access_token": uuid.uuid4().hex, "expires_in": 3600, "token_type": "Bearer"})
+        elif path == "/upload/drive/v3/files":
+            self.server.hit("upload")
+            file_id = uuid.uuid4().hex
+            self.server.files[file_id] = body
+            self._reply(200, {"id": file_id})
+        elif path.startswith("/drive/v3/files/") and path.endswith("/permissions"):
+            self.server.hit("permission")
+            self._reply(200, {"id": "anyoneWithLink"})
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_GET(self):
+        file_id = self.path.split("?")[0].rsplit("/", 1)[-1]
+        if file_id not in self.server.files:
+            return self._reply(404, {"error": "not found"})
+        self.server.hit("download")
+        if "alt=media" in self.path:
+            return self._reply(200, raw=self.server.files[file_id])
+        self._reply(200, {"id": file_id, "mimeType": "image/png", "size": str(len(self.server.files[file_id]))})
+
+    def do_DELETE(self):
+        self.server.hit("delete")
+        self.server.files.pop(self.path.split("?")[0].rsplit("/", 1)[-1], None)
+        time.sleep(self.server.latency)
+        self.send_response(204)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+def _upload_unpooled(data: bytes):
+    """What every upload did before website.drive: new credentials, refresh, build."""
+    creds = new_credentials()
+    creds.refresh(Request())
+    # build("drive", "v3") parses the bundled discovery document on every call too
+    service = build_from_document(discovery_document(), http=google_auth_httplib2.AuthorizedHttp(creds))
+    media = MediaIoBaseUpload(io.BytesIO(data), mimetype="image/png", resumable=False)
+    uploaded = service.files().create(body={"name": "bench.png"}, media_body=media, fields="id").execute()
+    service.permissions().create(fileId=uploaded["id"], body={"role": "reader", "type": "anyone"}).execute()
+    return uploaded["id"]
+
+
+def _upload_pooled(data: bytes):
+    file_id, _ = upload_file_to_drive_public(SimpleUploadedFile("bench.png", data), ext="png")
+    return file_id
+
+
+def _ms(samples: list[float]) -> str:
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return f"mean {statistics.mean(samples) * 1000:.1f}ms, p50 {statistics.median(samples) * 1000:.1f}ms, p95 {p95 * 1000:.1f}ms"
+
+
+class Command(BaseCommand):
+    help = (
+        "Time Drive uploads through the shared client pool (website.drive) against building "
+        "a fresh client per upload, using a local fake Drive server."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--uploads", type=int, default=50)
+        parser.add_argument("--size", type=int, default=200, help="Upload size in KB")
+        parser.add_argument("--latency", type=float, default=20, help="Simulated round-trip per request, ms")
+        parser.add_argument("--threads", type=int, default=1, help="Concurrent uploads")
+
+    def handle(self, *args, **options):
+        server = FakeDrive(options["latency"] / 1000)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        data = bytes(options["size"] * 1024)
+
+        fake_settings = override_settings(
+            GOOGLE_TOKEN_URI=f"{server.url}/token",
+            DRIVE_API_ENDPOINT=f"{server.url}/",
+            GOOGLE_CLIENT_ID="fake-client",
+            GOOGLE_CLIENT_SECRET="fake-secret",
+            GOOGLE_REFRESH_TOKEN="fake-refresh",
+            GOOGLE_DRIVE_FOLDER_ID_PUBLIC="fake-folder",
+        )
+        with fake_settings:
+            drive_pool.reset()
+            try:
+                for label, upload in (("fresh client per upload", _upload_unpooled), ("pooled client", _upload_pooled)):
+                    before = dict(server.hits)
+                    samples = self._run(upload, data, options["uploads"], options["threads"])
+                    token_calls = server.hits["token"] - before["token"]
+                    self.stdout.write(f"{label:24} {_ms(samples)}, {token_calls} token refreshes")
+
+                # Round-trip check of the other pooled paths
+                file_id = _upload_pooled(data)
+                if not delete_from_google_drive(file_id) or file_id in server.files:
+                    self.stderr.write("Delete through the pool did not reach the fake server")
+            finally:
+                drive_pool.reset()
+                server.shutdown()
+
+    def _run(self, upload, data, count, threads) -> list[float]:
+        def timed(_):
+            start = time.perf_counter()
+            upload(data)
+            return time.perf_counter() - start
+
+        if threads <= 1:
+            return [timed(i) for i in range(count)]
+        with ThreadPoolExecutor(threads) as executor:
+            return list(executor.map(timed, range(count)))
@@ -0,0 +1,118 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from blogs.models import Post
+from student.models import Document, StudentProfilePicture
+from website.storage import AssetNotFound, asset_ref, get_backend, read_asset
+from website.utils import MIME_TYPES
+
+EXTENSIONS = {content_type: ext for ext, content_type in MIME_TYPES.items() if ext != "jpeg"}
+EXTENSIONS["image/jpg"] = "jpg"  # what public .jpg uploads were sent to Drive as
+
+# area -> (model, legacy Drive id field, uuid field used to name the copy)
+SOURCES = {
+    "blog": (Post, "google_file_id", "image_uuid"),
+    "profile": (StudentProfilePicture, "google_file_id", "image_uuid"),
+    "documents": (Document, "file_id", "file_uuid"),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy blog images, profile pictures and student documents still on Google Drive "
+        "to the configured storage backend (website/storage.py) and repoint their rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--to", default=None, help="Target backend (default ASSET_STORAGE_BACKEND)")
+        parser.add_argument("--only", action="append", choices=sorted(SOURCES), help="Limit to these areas")
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument("--workers", type=int, default=8, help="Concurrent Drive downloads")
+        parser.add_argument("--limit", type=int, default=None, help="Stop after this many assets per area")
+        parser.add_argument("--delete-from-drive", action="store_true", help="Delete each Drive copy once repointed")
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        target_name = options["to"] or getattr(settings, "ASSET_STORAGE_BACKEND", "drive")
+        if target_name == "drive":
+            raise CommandError("Target backend is drive; pass --to local or --to s3")
+        self.target = get_backend(target_name)
+        self.drive = get_backend("drive")
+
+        for area in options["only"] or SOURCES:
+            self._migrate_area(area, options)
+
+    def _migrate_area(self, area: str, options):
+        model, drive_field, uuid_field = SOURCES[area]
+        pending = (
+            model.objects.filter(Q(storage_key="") | Q(storage_key__startswith="drive:"))
+            .exclude(**{f"{drive_field}__isnull": True})
+            .exclude(**{drive_field: ""})
+            .order_by("pk")
+        )
+        if options["dry_run"]:
+            self.stdout.write(f"{area}: {pending.count()} assets on Drive")
+            return
+
+        counts = {"moved": 0, "missing": 0, "failed": 0, "changed": 0}
+        last_pk = 0
+        with ThreadPoolExecutor(options["workers"]) as executor:
+            while True:
+                batch_size = options["batch_size"]
+                if options["limit"] is not None:
+                    batch_size = min(batch_size, options["limit"] - sum(counts.values()))
+                rows = list(pending.filter(pk__gt=last_pk)[:batch_size]) if batch_size > 0 else []
+                if not rows:
+                    break
+                last_pk = rows[-1].pk
+
+                copies = executor.map(lambda row: self._copy(area, row, drive_field, uuid_field), rows)
+                for row, result in zip(rows, copies):
+                    if isinstance(result, AssetNotFound):
+                        counts["missing"] += 1
+                    elif isinstance(result, Exception):
+                        counts["failed"] += 1
+                        self.stderr.write(f"{area} #{row.pk}: {result}")
+                    elif not self._repoint(model, row, drive_field, result):
+                        # Re-uploaded while we were copying; drop the stale copy
+                        counts["changed"] += 1
+                        self.target.delete(result.partition(":")[2])
+                    else:
+                        counts["moved"] += 1
+                        if options["delete_from_drive"]:
+                            try:
+                                self.drive.delete(getattr(row, drive_field))
+                            except Exception as e:
+                                self.stderr.write(f"{area} #{row.pk}: copied, but Drive delete failed: {e}")
+
+                self.stdout.write(f"{area}: " + ", ".join(f"{n} {k}" for k, n in counts.items()))
+
+        self.stdout.write(self.style.SUCCESS(f"{area}: done, " + ", ".join(f"{n} {k}" for k, n in counts.items())))
+
+    def _copy(self, area: str, row, drive_field: str, uuid_field: str):
+        """New storage reference for `row`, or the exception that stopped it."""
+        try:
+            data, content_type = read_asset(asset_ref(row.storage_key, getattr(row, drive_field)))
+            ext = EXTENSIONS.get(content_type.split(";")[0].strip(), "bin")
+            name = f"{getattr(row, uuid_field) or row.pk}.{ext}"
+            key = self.target.save(area, name, io.BytesIO(data), content_type)
+            return f"{self.target.name}:{key}"
+        except Exception as e:
+            return e
+
+    def _repoint(self, model, row, drive_field: str, ref: str) -> bool:
+        updates = {"storage_key": ref}
+        if model is Post and row.featured_image:
+            # Links to the featured image carry the bare Drive id
+            updates["featured_image"] = row.featured_image.replace(
+                f"id={getattr(row, drive_field)}", f"id={ref}"
+            )
+        # Skip rows re-uploaded while we were copying
+        return bool(
+            model.objects.filter(pk=row.pk, storage_key=row.storage_key, **{drive_field: getattr(row, drive_field)})
+            .update(**updates)
+        )
@@ -0,0 +1,236 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, OperationalError
+from django.test import SimpleTestCase, override_settings
+from google.auth.exceptions import RefreshError
+
+from exams import paper
+from website import result_cache
+from website.batching import BackgroundBatcher
+from website.drive import drive_pool, drive_service
+from website.event_bus import RedisEventBus
+from website.shared_cache import TieredCache, get_or_compute
+from website.utils import delete_from_google_drive, upload_file_to_drive_private, upload_file_to_drive_public
+
+from .management.commands.benchmark_drive import FakeDrive
+
+
+class TieredCacheOutageTests(SimpleTestCase):
+    def setUp(self):
+        # Nothing listens on port 1
+        self.cache = TieredCache("redis://127.0.0.1:1/0", {"OPTIONS": {"socket_connect_timeout": 0.5}})
+
+    def test_reads_and_writes_degrade(self):
+        with self.assertLogs("website.shared_cache", "WARNING"):
+            self.cache.set("k", 1)
+            self.assertIsNone(self.cache.get("missing"))
+            self.assertIsNone(self.cache.incr("k"))
+
+    def test_version_bumps_do_not_fail_the_write(self):
+        with self.assertLogs("website.shared_cache", "WARNING"):
+            with mock.patch.object(result_cache, "cache", self.cache):
+                result_cache.catalog_cache.invalidate()
+            with mock.patch.object(paper, "cache", self.cache):
+                paper.invalidate_paper(1)
+
+
+class RedisEventBusTests(SimpleTestCase):
+    def test_emit_does_not_wait_for_redis(self):
+        bus = RedisEventBus("redis://127.0.0.1:1/0", "events", publish_timeout=0.5)
+        start = time.monotonic()
+        for i in range(50):
+            bus.emit("employee.events", {"action": "updated", "id": i})
+        self.assertLess(time.monotonic() - start, 0.1)
+
+        with self.assertLogs("website.batching", "ERROR"):
+            bus._publisher.drain()
+        # Kept for a retry; don't try again at exit
+        bus._publisher._unwritten.clear()
+
+
+class _Recorder(BackgroundBatcher):
+    name = "test-batcher"
+
+    def __init__(self):
+        super().__init__(flush_interval=0.01, queue_size=100, max_batch=10)
+        self.written = []
+        self.down = False
+
+    def write(self, items):
+        if self.down:
+            raise OperationalError("server closed the connection unexpectedly")
+        if "bad" in items:
+            raise IntegrityError("violates foreign key constraint")
+        self.written += items
+
+
+class BackgroundBatcherTests(SimpleTestCase):
+    def setUp(self):
+        self.batcher = _Recorder()
+
+    def test_bad_item_does_not_sink_the_batch(self):
+        with self.assertLogs("website.batching", "WARNING"):
+            self.batcher._flush(["a", "bad", "b"])
+            self.batcher._flush(["c"])
+        self.assertEqual(self.batcher.written, ["a", "b", "c"])
+        self.assertEqual(self.batcher.dropped, 1)
+
+    def test_batch_is_retried_after_an_outage(self):
+        self.batcher.down = True
+        with self.assertLogs("website.batching", "ERROR"):
+            self.batcher._flush(["a", "b"])
+        self.assertEqual(self.batcher.written, [])
+
+        self.batcher.down = False
+        self.batcher._flush(["c"])
+        self.assertEqual(self.batcher.written, ["a", "b", "c"])
+        self.assertEqual(self.batcher.dropped, 0)
+
+
+class GetOrComputeTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = LocMemCache("get-or-compute-tests", {})
+        self.cache.clear()
+
+    def test_one_compute_per_key(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return "page"
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(get_or_compute("k", compute, cache=self.cache)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, ["page"] * 5)
+        self.assertEqual(len(calls), 1)
+
+    def test_slow_key_does_not_hold_up_others(self):
+        release = threading.Event()
+        slow = threading.Thread(
+            target=get_or_compute, args=("slow", lambda: release.wait(10) and "slow"), kwargs={"cache": self.cache}
+        )
+        slow.start()
+        self.addCleanup(slow.join)
+        self.addCleanup(release.set)
+        time.sleep(0.05)
+
+        start = time.monotonic()
+        for i in range(100):
+            self.assertEqual(get_or_compute(f"fast:{i}", lambda: i, cache=self.cache), i)
+        self.assertLess(time.monotonic() - start, 2)
+
+    def test_waiters_compute_when_the_leader_fails(self):
+        started = threading.Event()
+
+        def failing():
+            started.set()
+            time.sleep(0.1)
+            raise RuntimeError("database went away")
+
+        leader = threading.Thread(target=lambda: self.assertRaises(RuntimeError, get_or_compute, "k", failing,
+                                                                   cache=self.cache))
+        leader.start()
+        started.wait(1)
+        self.assertEqual(get_or_compute("k", lambda: "page", cache=self.cache), "page")
+        leader.join()
+
+
+class DriveTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = FakeDrive(latency=0)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.addClassCleanup(cls.server.server_close)
+        cls.addClassCleanup(cls.server.shutdown)
+
+    def setUp(self):
+        self.server.files.clear()
+        for kind in self.server.hits:
+            self.server.hits[kind] = 0
+        settings_override = override_settings(
+            GOOGLE_TOKEN_URI=f"{self.server.url}/token",
+            DRIVE_API_ENDPOINT=f"{self.server.url}/",
+            GOOGLE_CLIENT_ID="fake-client",
+            GOOGLE_CLIENT_SECRET="fake-secret",
+            GOOGLE_REFRESH_TOKEN="fake-refresh",
+            GOOGLE_DRIVE_FOLDER_ID_PUBLIC="public-folder",
+            GOOGLE_DRIVE_FOLDER_ID_PRIVATE="private-folder",
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        drive_pool.reset()
+        self.addCleanup(drive_pool.reset)
+
+    def upload(self, data=b"png bytes", name="photo.png"):
+        file_id, _ = upload_file_to_drive_public(SimpleUploadedFile(name, data))
+        return file_id
+
+    def test_upload(self):
+        file_id = self.upload(b"png bytes")
+        self.assertIn(b"png bytes", self.server.files[file_id])
+        self.assertEqual(self.server.hits["permission"], 1)
+
+        file_id, _ = upload_file_to_drive_private(SimpleUploadedFile("passport.pdf", b"%PDF-1.4"))
+        self.assertIn(b"%PDF-1.4", self.server.files[file_id])
+        self.assertEqual(self.server.hits["permission"], 1)
+
+    def test_services_and_token_are_reused(self):
+        for _ in range(3):
+            self.upload()
+        self.assertEqual(self.server.hits["upload"], 3)
+        self.assertEqual(self.server.hits["token"], 1)
+        self.assertEqual(drive_pool._services.qsize(), 1)
+
+    def test_concurrent_callers_get_their_own_service(self):
+        with drive_service() as first, drive_service() as second:
+            self.assertIsNot(first, second)
+        self.assertEqual(drive_pool._services.qsize(), 2)
+        self.assertEqual(self.server.hits["token"], 1)
+
+    def test_token_is_refreshed_before_it_expires(self):
+        self.upload()
+        # google-auth keeps expiry as naive UTC
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        drive_pool.credentials().expiry = now + timedelta(seconds=60)
+        self.upload()
+        self.assertEqual(self.server.hits["token"], 2)
+
+    def test_delete(self):
+        file_id = self.upload()
+        self.assertTrue(delete_from_google_drive(file_id))
+        self.assertNotIn(file_id, self.server.files)
+
+    def test_delete_failure_returns_false(self):
+        with override_settings(DRIVE_API_ENDPOINT="http://127.0.0.1:1/"):
+            drive_pool.reset()
+            self.assertFalse(delete_from_google_drive("missing"))
+
+    def test_unsupported_extension_is_rejected_before_any_request(self):
+        with self.assertRaises(ValueError):
+            self.upload(name="script.svg")
+        self.assertEqual(self.server.hits, dict.fromkeys(self.server.hits, 0))
+
+    def test_failed_token_refresh_does_not_poison_the_pool(self):
+        with override_settings(GOOGLE_TOKEN_URI=f"{self.server.url}/no-such-endpoint"):
+            drive_pool.reset()
+            with self.assertRaises(RefreshError):
+                self.upload()
+        self.assertEqual(drive_pool._services.qsize(), 0)
+
+        drive_pool.reset()
+        self.assertIn(self.upload(), self.server.files)
@@ -3,4 +3,5 @@ from . import views
 
 urlpatterns = [
     path("robots.txt", views.robots_txt),
+    path("metrics/", views.metrics),
 ]
@@ -1,5 +1,14 @@
 from django.http import HttpResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from website.utils import api_key_required
 
 def robots_txt(request):
     content = "User-agent: *\nDisallow: /"
     return HttpResponse(content, content_type="text/plain")
+
+
+@api_key_required
+def metrics(request):
+    # Prometheus scrape target: cache hit/miss/latency (website/shared_cache.py)
+    return HttpResponse(generate_latest(), content_type=CONTENT_TYPE_LATEST)
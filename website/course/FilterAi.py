@@ -2,37 +2,21 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import PydanticOutputParser
 from pydantic import BaseModel
 from typing import Optional, Annotated
-from enum import Enum
 from pydantic import Field
 from functools import lru_cache
+import asyncio
+import logging
 import os
+import re
+import threading
+from django.conf import settings
 from langchain_openai import ChatOpenAI
-GOOGLE_API_KEY = os.getenv("GEMINI_API_KEY")
-OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 
-class ProgramLevel(str, Enum):
-    bachelors = "bachelors"
-    masters = "masters"
-
-
-class Country(str, Enum):
-    Australia = "Australia"
-    Canada = "Canada"
-    France = "France"
-    Germany = "Germany"
-    Ireland = "Ireland"
-    Italy = "Italy"
-    Netherlands = "Netherlands"
-    Poland = "Poland"
-    Russia = "Russia"
-    Spain = "Spain"
-    Sweden = "Sweden"
-    Switzerland = "Switzerland"
-    Ukraine = "Ukraine"
-    UAE = "United Arab Emirates"
-    UK = "United Kingdom"
-    USA = "United States"
+from .search_vocabulary import (COUNTRY_ALIASES, DEGREE_SUBJECTS, FILLER_WORDS, LEVEL_WORDS,
+                                NON_SUBJECT_WORDS, Country, ProgramLevel)
 
+GOOGLE_API_KEY = os.getenv("GEMINI_API_KEY")
+OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 
 class SearchParams(BaseModel):
     university_name: Optional[str] = Field(None, description="Name of the university")
@@ -229,3 +213,113 @@ def chat_chain():
         ]
     )
     return prompt | llm | chat_parser
+
+
+# ---------------------------------------------------------------------------
+# Calling the chains from async views
+# ---------------------------------------------------------------------------
+
+logger = logging.getLogger(__name__)
+
+LLM_TIMEOUT = getattr(settings, "LLM_TIMEOUT", 8)  # seconds
+
+
+class _LLMSlots:
+    """
+    Caps concurrent LLM calls per process. Deliberately non-blocking and not
+    tied to an event loop: when every slot is taken the caller gets the
+    fallback parse right away instead of queueing behind a slow provider.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_use = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self.in_use >= self.limit:
+                return False
+            self.in_use += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.in_use -= 1
+
+
+llm_slots = _LLMSlots(getattr(settings, "LLM_MAX_CONCURRENCY", 8))
+
+
+async def ainvoke_or_fallback(chain, inputs: dict, fallback):
+    """
+    chain.ainvoke(inputs), or fallback() if the limiter is full, the call
+    takes longer than LLM_TIMEOUT, or the model's output doesn't parse.
+    """
+    if not llm_slots.try_acquire():
+        logger.warning("LLM concurrency limit reached, using fallback parse")
+        return fallback()
+    try:
+        return await asyncio.wait_for(chain.ainvoke(inputs), timeout=LLM_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning("LLM call timed out after %ss, using fallback parse", LLM_TIMEOUT)
+        return fallback()
+    except Exception:
+        logger.warning("LLM call failed, using fallback parse", exc_info=True)
+        return fallback()
+    finally:
+        llm_slots.release()
+
+
+_WORD_RE = re.compile(r"[a-z][a-z'.]*")
+
+
+def fallback_search_params(query: str) -> SearchParams:
+    """
+    Deterministic keyword parse used when the LLM is unavailable: fee,
+    duration and score filters, program level and countries from known
+    words, and whatever is left over (minus filler, comparison and price
+    words) as the program name, or the subject a degree names ("mba").
+    """
+    # RuleParser imports SearchParams from here
+    from .RuleParser import extract_numeric_filters
+
+    fields, text = extract_numeric_filters(query)
+    text = " " + " ".join(_WORD_RE.findall(text)) + " "
+
+    countries = []
+    # Longest aliases first so "united states of america" wins over "america"
+    for alias in sorted(COUNTRY_ALIASES, key=len, reverse=True):
+        if f" {alias} " in text:
+            country = COUNTRY_ALIASES[alias]
+            if country.value not in countries:
+                countries.append(country.value)
+            text = text.replace(f" {alias} ", " ")
+
+    level = degree_subject = None
+    rest = []
+    for word in text.split():
+        word = word.strip(".'")
+        if word in LEVEL_WORDS:
+            level = level or LEVEL_WORDS[word].value
+            degree_subject = degree_subject or DEGREE_SUBJECTS.get(word)
+        elif word and word not in FILLER_WORDS and word not in NON_SUBJECT_WORDS:
+            rest.append(word)
+
+    return SearchParams(
+        program_name=" ".join(rest) or degree_subject,
+        program_level=level,
+        country_names=countries or None,
+        **fields,
+    )
+
+
+def fallback_chat_response(query: str) -> ChatResponseToUser:
+    params = fallback_search_params(query)
+    return ChatResponseToUser(
+        response_text="Here are some programs that match what you asked for.",
+        should_suggest=True,
+        program_name=params.program_name,
+        program_level=params.program_level,
+        country_name=params.country_names[0] if params.country_names else None,
+    )
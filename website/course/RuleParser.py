@@ -0,0 +1,389 @@
+"""
+Local, rule-based SearchParams extraction.
+
+Most smart-search queries are simple ("masters in computer science in
+Germany", "bachelors USA under 20000") and don't need the LLM. rule_parse()
+pulls out what it can with regexes (fees, duration, GPA/IELTS/SAT/ACT),
+the words in search_vocabulary, and a token trie over the
+university and program names in the catalog. It also scores how much of
+the query it understood; only queries below RULE_PARSE_MIN_CONFIDENCE are
+sent to the LLM.
+"""
+
+import re
+import threading
+from typing import NamedTuple
+
+from django.conf import settings
+
+from .FilterAi import SearchParams
+from .search_vocabulary import COUNTRY_ALIASES, DEGREE_SUBJECTS, FILLER_WORDS, LEVEL_WORDS, NON_SUBJECT_WORDS
+
+RULE_PARSE_MIN_CONFIDENCE = getattr(settings, "RULE_PARSE_MIN_CONFIDENCE", 0.8)
+
+
+class RuleParse(NamedTuple):
+    params: SearchParams
+    confidence: float  # 0..1, share of the query that was understood
+
+
+# ---------------------------------------------------------------------------
+# Numeric filters
+# ---------------------------------------------------------------------------
+
+_NUM = r"(\d+(?:[.,]\d+)*)"
+_MONEY = (
+    r"(?:(?:usd|us\$|\$|€|£)\s?)?" + _NUM
+    + r"(?:\s?(k|thousand))?(?:\s?(?:usd|dollars?|\$|per year|/year|a year))?"
+)
+_LESS = r"(?:under|below|less than|lower than|cheaper than|max(?:imum)?|up to|upto|within|at most|<=?)"
+_MORE = r"(?:over|above|more than|greater than|min(?:imum)?|at least|from|>=?)"
+_FEE_WORDS = r"(?:fees?|tuition(?: fees?)?|cost|budget|price)"
+
+_FEE_RANGE_RE = re.compile(
+    rf"(?:{_FEE_WORDS}\s+)?(?:between\s+)?{_MONEY}\s*(?:-|to|and)\s*{_MONEY}(?:\s+{_FEE_WORDS})?"
+)
+_FEE_BOUND_RE = re.compile(rf"(?:{_FEE_WORDS}\s+)?({_LESS}|{_MORE})\s+{_MONEY}(?:\s+{_FEE_WORDS})?")
+_FEE_PLAIN_RE = re.compile(rf"{_FEE_WORDS}\s+(?:of\s+)?{_MONEY}|{_MONEY}\s+{_FEE_WORDS}")
+
+_DURATION_RE = re.compile(rf"(?:({_LESS}|{_MORE})\s+)?(\d+)\s*(?:-|to)?\s*(\d+)?\s*(?:years?|yrs?)\b(?:\s+long)?")
+
+_SCORE_FIELDS = {"gpa": "gpa", "cgpa": "gpa", "ielts": "ielts", "sat": "sat", "act": "act"}
+_SCORE_WORDS = "|".join(_SCORE_FIELDS)
+_SCORE_BEFORE_RE = re.compile(
+    rf"\b({_SCORE_WORDS})\s+(?:score\s+)?(?:of\s+|is\s+)?(?:({_LESS}|{_MORE})\s+)?(\d+(?:\.\d+)?)(\+)?"
+)
+_SCORE_AFTER_RE = re.compile(rf"(?:({_LESS}|{_MORE})\s+)?(\d+(?:\.\d+)?)(\+)?\s+({_SCORE_WORDS})\b")
+_SCORE_RANGES = {"gpa": (0, 4), "ielts": (0, 9), "sat": (400, 1600), "act": (1, 36)}
+
+_LESS_RE = re.compile(_LESS)
+
+
+def _money(number: str, thousands: str | None) -> int | None:
+    value = float(number.replace(",", ""))
+    if thousands:
+        value *= 1000
+    # "top 5 to 10" is not a fee range
+    return int(value) if value >= 100 else None
+
+
+def _is_less(comparator: str | None) -> bool:
+    return bool(comparator) and bool(_LESS_RE.fullmatch(comparator))
+
+
+class _Extracted:
+    def __init__(self):
+        self.fields = {}
+        self.ambiguous = 0
+
+    def set(self, name, value):
+        if name in self.fields and self.fields[name] != value:
+            self.ambiguous += 1
+        self.fields[name] = value
+
+
+def _extract_numbers(text: str, found: _Extracted) -> str:
+    """Pull fee/duration/score filters out of text; returns what is left."""
+
+    def scores(match, comparator, value, plus, field):
+        low, high = _SCORE_RANGES[field]
+        value = float(value)
+        if not low <= value <= high:
+            found.ambiguous += 1
+            return match.group(0)
+        if _is_less(comparator):
+            found.set(f"{field}_max", value)
+        elif comparator or plus:
+            found.set(f"{field}_min", value)
+        else:
+            # "ielts 6.5": the student's own score, so courses asking for
+            # at most that much
+            found.set(f"{field}_max", value)
+        return " "
+
+    text = _SCORE_BEFORE_RE.sub(
+        lambda m: scores(m, m.group(2), m.group(3), m.group(4), _SCORE_FIELDS[m.group(1)]), text
+    )
+    text = _SCORE_AFTER_RE.sub(
+        lambda m: scores(m, m.group(1), m.group(2), m.group(3), _SCORE_FIELDS[m.group(4)]), text
+    )
+
+    def duration(m):
+        comparator, first, second = m.group(1), int(m.group(2)), m.group(3)
+        if second:
+            found.set("duration_min", first)
+            found.set("duration_max", int(second))
+        elif _is_less(comparator):
+            found.set("duration_max", first)
+        elif comparator:
+            found.set("duration_min", first)
+        else:
+            found.set("duration_min", first)
+            found.set("duration_max", first)
+        return " "
+
+    text = _DURATION_RE.sub(duration, text)
+
+    def fee_range(m):
+        low, high = _money(m.group(1), m.group(2)), _money(m.group(3), m.group(4))
+        if low is None or high is None:
+            return m.group(0)
+        found.set("tuition_fees_min", low)
+        found.set("tuition_fees_max", high)
+        return " "
+
+    def fee_bound(m):
+        value = _money(m.group(2), m.group(3))
+        if value is None:
+            return m.group(0)
+        found.set("tuition_fees_max" if _is_less(m.group(1)) else "tuition_fees_min", value)
+        return " "
+
+    def fee_plain(m):
+        number, thousands = (m.group(1), m.group(2)) if m.group(1) else (m.group(3), m.group(4))
+        value = _money(number, thousands)
+        if value is None:
+            return m.group(0)
+        found.set("tuition_fees_max", value)
+        return " "
+
+    text = _FEE_RANGE_RE.sub(fee_range, text)
+    text = _FEE_BOUND_RE.sub(fee_bound, text)
+    text = _FEE_PLAIN_RE.sub(fee_plain, text)
+    return text
+
+
+_BOUNDS = (("tuition_fees_min", "tuition_fees_max"), ("duration_min", "duration_max"),
+           ("gpa_min", "gpa_max"), ("ielts_min", "ielts_max"),
+           ("sat_min", "sat_max"), ("act_min", "act_max"))
+
+
+def _ordered(fields: dict) -> dict:
+    fields = dict(fields)
+    for low, high in _BOUNDS:
+        if low in fields and high in fields and fields[low] > fields[high]:
+            fields[low], fields[high] = fields[high], fields[low]
+    return fields
+
+
+def extract_numeric_filters(query: str) -> tuple[dict, str]:
+    """
+    The fee/duration/score SearchParams fields in query ("under 20000",
+    "ielts 6.5"), and the query with them taken out.
+    """
+    found = _Extracted()
+    text = _extract_numbers(f" {query.lower()} ", found)
+    return _ordered(found.fields), text
+
+
+# ---------------------------------------------------------------------------
+# Catalog names
+# ---------------------------------------------------------------------------
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9'&.+#-]*")
+_END = "\0"
+
+
+def _tokens(text: str) -> list[str]:
+    return [t.strip(".'-") for t in _TOKEN_RE.findall(text.lower()) if t.strip(".'-")]
+
+
+class _Trie:
+    """Token trie: the longest catalog name starting at each position wins."""
+
+    def __init__(self):
+        self.root = {}
+
+    def add(self, tokens: list[str], value: str):
+        if not tokens:
+            return
+        node = self.root
+        for token in tokens:
+            node = node.setdefault(token, {})
+        node.setdefault(_END, value)
+
+    def longest_match(self, tokens: list[str], start: int):
+        node, match = self.root, None
+        for i in range(start, len(tokens)):
+            node = node.get(tokens[i])
+            if node is None:
+                break
+            if _END in node:
+                match = (i + 1, node[_END])
+        return match
+
+
+def _other_level_words() -> frozenset:
+    # Course levels SearchParams can't express (phd, diploma, ...): a query
+    # asking for one has to go to the LLM
+    from .models import Course
+
+    words = set()
+    for key, label in Course.PROGRAM_LEVEL_CHOICES:
+        if key in ("bachelors", "masters"):
+            continue
+        words.update(_tokens(key.replace("_", " ")))
+        words.update(_tokens(label.replace("/", " ")))
+    return frozenset(words - set(LEVEL_WORDS) - FILLER_WORDS - {"graduate", "professional"})
+
+
+class _Vocabulary(NamedTuple):
+    version: int
+    universities: _Trie
+    programs: _Trie
+    other_levels: frozenset
+
+
+_SUBJECT_STOP = set(LEVEL_WORDS) | {"of", "in", "and", "the", "hons", "honours", "degree", "program", "programme"}
+
+
+def _subject_tokens(program_name: str) -> list[str]:
+    # "MSc in Computer Science (Hons)" -> ["computer", "science"]
+    tokens = _tokens(re.sub(r"\(.*?\)", " ", program_name))
+    while tokens and tokens[0] in _SUBJECT_STOP:
+        tokens.pop(0)
+    while tokens and tokens[-1] in _SUBJECT_STOP:
+        tokens.pop()
+    return tokens
+
+
+def _build_vocabulary(version: int) -> _Vocabulary:
+    from university.models import university
+
+    from .models import Course
+
+    universities = _Trie()
+    for name in university.objects.values_list("name", flat=True):
+        tokens = _tokens(name)
+        universities.add(tokens, name)
+        # Students rarely type "The"
+        if tokens and tokens[0] == "the":
+            universities.add(tokens[1:], name)
+
+    programs = _Trie()
+    for name in Course.objects.values_list("program_name", flat=True).distinct():
+        subject = _subject_tokens(name)
+        programs.add(subject, " ".join(subject))
+
+    return _Vocabulary(version, universities, programs, _other_level_words())
+
+
+_vocabulary = None
+_vocabulary_lock = threading.Lock()
+
+
+def get_vocabulary() -> _Vocabulary:
+    """
+    The catalog tries, rebuilt when the catalog version moves (any write to
+    university/course/scholarship bumps it, see university.signals).
+    """
+    global _vocabulary
+    from website.result_cache import catalog_cache
+
+    version = catalog_cache.version()
+    vocabulary = _vocabulary
+    if vocabulary is not None and vocabulary.version == version:
+        return vocabulary
+    with _vocabulary_lock:
+        if _vocabulary is None or _vocabulary.version != version:
+            _vocabulary = _build_vocabulary(version)
+        return _vocabulary
+
+
+# ---------------------------------------------------------------------------
+# Parser
+# ---------------------------------------------------------------------------
+
+_MAX_COUNTRY_WORDS = max(len(alias.split()) for alias in COUNTRY_ALIASES)
+# Confidence lost for each contradiction and for each word nothing explains
+_PENALTY = 0.25
+
+
+def rule_parse(query: str, vocabulary: _Vocabulary | None = None) -> RuleParse:
+    """
+    Deterministic SearchParams for query, plus a confidence score: the share
+    of meaningful words that were matched to a filter, less a penalty for
+    every word left unexplained and anything contradictory, so any query
+    with something the rules didn't understand goes to the LLM.
+    """
+    vocabulary = vocabulary or get_vocabulary()
+    found = _Extracted()
+    text = _extract_numbers(f" {query.lower()} ", found)
+    # Every number that survived extraction is something we didn't understand
+    tokens = _tokens(text)
+
+    explained = len(found.fields)
+    unexplained = 0
+    countries, leftover = [], []
+    university_name = program_name = level = degree_subject = None
+
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+
+        country = None
+        for size in range(min(_MAX_COUNTRY_WORDS, len(tokens) - i), 0, -1):
+            country = COUNTRY_ALIASES.get(" ".join(tokens[i:i + size]))
+            if country:
+                break
+        if country:
+            if country.value not in countries:
+                countries.append(country.value)
+            explained += 1
+            i += size
+            continue
+
+        match = vocabulary.universities.longest_match(tokens, i)
+        if match and (match[0] - i > 1 or university_name is None):
+            end, name = match
+            if university_name and university_name != name:
+                found.ambiguous += 1
+            university_name = name
+            explained += 1
+            i = end
+            continue
+
+        if token in LEVEL_WORDS:
+            value = LEVEL_WORDS[token].value
+            if level and level != value:
+                found.ambiguous += 1
+            level = value
+            degree_subject = degree_subject or DEGREE_SUBJECTS.get(token)
+            explained += 1
+        elif token in vocabulary.other_levels:
+            found.ambiguous += 1
+            unexplained += 1
+        else:
+            match = vocabulary.programs.longest_match(tokens, i)
+            if match and program_name is None:
+                end, program_name = match
+                explained += 1
+                i = end
+                continue
+            if token not in FILLER_WORDS:
+                # "cheap", "scholarship", a stray "10": not understood, and
+                # not a subject either
+                if token not in NON_SUBJECT_WORDS and not any(c.isdigit() for c in token):
+                    leftover.append(token)
+                unexplained += 1
+        i += 1
+
+    if program_name is None:
+        # Same guess the keyword fallback makes, but it doesn't count as
+        # understood: an unknown subject is worth asking the LLM about
+        program_name = " ".join(leftover) or degree_subject
+
+    fields = _ordered(found.fields)
+
+    params = SearchParams(
+        university_name=university_name,
+        program_name=program_name,
+        program_level=level,
+        country_names=countries or None,
+        **fields,
+    )
+
+    total = explained + unexplained
+    confidence = explained / total if total else 0.0
+    confidence = max(0.0, confidence - _PENALTY * (found.ambiguous + unexplained))
+    return RuleParse(params, round(confidence, 3))
@@ -5,10 +5,12 @@ from django.db import connection, transaction, IntegrityError
 from graphql import GraphQLError
 
 from authentication.Utils import SchemaMixin
+from authentication.permissions import permission_resolver
 from course.models import Course
 import datetime
 
 from university.models import university
+from website.fuzzy_search import fuzzy_query
 
 
 @strawberry.type
@@ -36,9 +38,7 @@ class CourseSchema(SchemaMixin):
         emp = cls.get_employee(auth_token)
         if not emp:
             raise GraphQLError("Unauthorized")
-        has_permission = emp.job_roles.filter(
-            permissions__name="course_view"
-        ).exists()
+        has_permission = permission_resolver.has_perms(emp, ["course_view"])
         if not has_permission and not emp.is_superuser:
             raise GraphQLError("You do not have permission to view course")
 
@@ -88,9 +88,7 @@ class CourseSchema(SchemaMixin):
         emp = cls.get_employee(auth_token)
         if not emp:
             raise GraphQLError("Unauthorized")
-        has_permission = emp.job_roles.filter(
-            permissions__name="course_create"
-        ).exists()
+        has_permission = permission_resolver.has_perms(emp, ["course_create"])
         if not has_permission and not emp.is_superuser:
             raise GraphQLError("You do not have permission to add courses")
 
@@ -171,9 +169,7 @@ class CourseSchema(SchemaMixin):
         if not emp:
             raise GraphQLError("Unauthorized")
 
-        has_permission = emp.job_roles.filter(
-            permissions__name="course_update"
-        ).exists()
+        has_permission = permission_resolver.has_perms(emp, ["course_update"])
 
         if not has_permission and not emp.is_superuser:
             raise GraphQLError("You do not have permission to edit course")
@@ -282,9 +278,7 @@ class CourseSchema(SchemaMixin):
         if not emp:
             raise GraphQLError("Unauthorized")
 
-        has_permission = emp.job_roles.filter(
-            permissions__name="course_delete"
-        ).exists()
+        has_permission = permission_resolver.has_perms(emp, ["course_delete"])
 
         if not has_permission and not emp.is_superuser:
             raise GraphQLError("You do not have permission to delete course")
@@ -341,9 +335,7 @@ class CourseListSchema(SchemaMixin):
         if not emp:
             raise GraphQLError("Unauthorized")
 
-        has_permission = emp.job_roles.filter(
-            permissions__name="course_view"
-        ).exists()
+        has_permission = permission_resolver.has_perms(emp, ["course_view"])
 
         if not has_permission and not emp.is_superuser:
             raise GraphQLError("You do not have permission to view course")
@@ -362,9 +354,11 @@ class CourseListSchema(SchemaMixin):
             where_clauses.append("c.university_id = %s")
             params.append(uni_id)
 
-        if programme_name:
-            where_clauses.append("LOWER(c.program_name) LIKE %s")
-            params.append(f"%{programme_name.lower()}%")
+        search = fuzzy_query(programme_name)
+        if search:
+            search_sql, search_params = search.where("c.program_name")
+            where_clauses.append(search_sql)
+            params += search_params
 
         if programme_level:
             valid_levels = {key for key, _ in Course.PROGRAM_LEVEL_CHOICES}
@@ -388,6 +382,12 @@ class CourseListSchema(SchemaMixin):
             {where_sql}
         """
 
+        # Closest programme names first when searching
+        rank_sql, rank_params = "", []
+        if search:
+            rank_sql, rank_params = search.rank("c.program_name")
+            rank_sql += " DESC,"
+
         data_sql = f"""
             SELECT
                 c.id,
@@ -406,7 +406,7 @@ class CourseListSchema(SchemaMixin):
             FROM {course_table} c
             JOIN {university_table} u ON u.id = c.university_id
             {where_sql}
-            ORDER BY c.start_date DESC
+            ORDER BY {rank_sql} c.start_date DESC
             LIMIT %s OFFSET %s
         """
 
@@ -414,7 +414,7 @@ class CourseListSchema(SchemaMixin):
             cursor.execute(count_sql, params)
             total = cursor.fetchone()[0]
 
-            cursor.execute(data_sql, params + [limit, offset])
+            cursor.execute(data_sql, params + rank_params + [limit, offset])
             rows = cursor.fetchall()
 
         courses = [
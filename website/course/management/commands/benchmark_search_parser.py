@@ -0,0 +1,138 @@
+import json
+import statistics
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from course.FilterAi import SearchParams, get_chain, parser
+from course.RuleParser import RULE_PARSE_MIN_CONFIDENCE, get_vocabulary, rule_parse
+from search.models import UnsanitizedSearch
+from search.parse_cache import parse_cache
+
+# Paging isn't something either parser extracts from the query
+_IGNORED_FIELDS = {"limit_val", "offset_val"}
+
+
+def _comparable(params: dict) -> dict:
+    out = {}
+    for field, value in params.items():
+        if field in _IGNORED_FIELDS or value in (None, [], ""):
+            continue
+        if isinstance(value, str):
+            value = value.strip().lower()
+        elif isinstance(value, list):
+            value = sorted(str(v).lower() for v in value)
+        elif isinstance(value, (int, float)):
+            value = float(value)
+        out[field] = value
+    return out
+
+
+def _ms(samples: list[float]) -> str:
+    if not samples:
+        return "-"
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return f"mean {statistics.mean(samples) * 1000:.2f}ms, p50 {statistics.median(samples) * 1000:.2f}ms, p95 {p95 * 1000:.2f}ms"
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the local rule parser with the LLM parse on a recorded query corpus: "
+        "latency, how many queries take the fast path, and how often both agree."
+    )
+
+    def add_arguments(self, parser_):
+        parser_.add_argument(
+            "--corpus",
+            help='JSONL file of {"query": ..., "expected": {SearchParams}} lines. '
+            "Defaults to the most frequent searches with a cached LLM parse.",
+        )
+        parser_.add_argument("--top", type=int, default=500, help="Queries to take when building the corpus")
+        parser_.add_argument("--record", help="Write the corpus used to this JSONL file")
+        parser_.add_argument("--live", action="store_true", help="Also call the LLM for each query and time it")
+        parser_.add_argument("--show-misses", type=int, default=10, help="Print this many disagreements")
+
+    def handle(self, *args, **options):
+        corpus = self._load_corpus(options)
+        if not corpus:
+            raise CommandError("The corpus is empty")
+        if options["record"]:
+            with open(options["record"], "w") as f:
+                for item in corpus:
+                    f.write(json.dumps(item) + "\n")
+
+        vocabulary = get_vocabulary()
+        chain = get_chain() if options["live"] else None
+
+        rule_times, llm_times = [], []
+        fast = fast_agree = all_agree = 0
+        field_misses = Counter()
+        misses = []
+        for item in corpus:
+            query = item["query"]
+
+            start = time.perf_counter()
+            result = rule_parse(query, vocabulary)
+            rule_times.append(time.perf_counter() - start)
+
+            expected = item.get("expected")
+            if chain is not None:
+                start = time.perf_counter()
+                try:
+                    live = chain.invoke({"query": query, "format_instructions": parser.get_format_instructions()})
+                except Exception as e:
+                    self.stderr.write(f"LLM failed on {query!r}: {e}")
+                    live = None
+                llm_times.append(time.perf_counter() - start)
+                if expected is None and live is not None:
+                    expected = live.model_dump(mode="json")
+            if expected is None:
+                continue
+
+            got = _comparable(result.params.model_dump(mode="json"))
+            want = _comparable(SearchParams.model_validate(expected).model_dump(mode="json"))
+            agree = got == want
+            all_agree += agree
+            if result.confidence >= RULE_PARSE_MIN_CONFIDENCE:
+                fast += 1
+                fast_agree += agree
+                if not agree:
+                    for field in set(got) | set(want):
+                        if got.get(field) != want.get(field):
+                            field_misses[field] += 1
+                    if len(misses) < options["show_misses"]:
+                        misses.append((query, result.confidence, got, want))
+
+        total = len(corpus)
+        self.stdout.write(f"Queries: {total}, confidence threshold {RULE_PARSE_MIN_CONFIDENCE}")
+        self.stdout.write(f"Rule parser: {_ms(rule_times)}")
+        if llm_times:
+            self.stdout.write(f"LLM:         {_ms(llm_times)}")
+        self.stdout.write(f"Fast path:   {fast}/{total} ({fast / total:.0%})")
+        if fast:
+            self.stdout.write(f"Agreement on fast-path queries: {fast_agree}/{fast} ({fast_agree / fast:.0%})")
+        self.stdout.write(f"Agreement on all queries:       {all_agree}/{total} ({all_agree / total:.0%})")
+        if field_misses:
+            self.stdout.write("Fast-path disagreements by field: " + ", ".join(
+                f"{field} {count}" for field, count in field_misses.most_common()
+            ))
+        for query, confidence, got, want in misses:
+            self.stdout.write(f"\n{query!r} (confidence {confidence})\n  rules: {got}\n  llm:   {want}")
+
+    def _load_corpus(self, options) -> list[dict]:
+        if options["corpus"]:
+            try:
+                with open(options["corpus"]) as f:
+                    return [json.loads(line) for line in f if line.strip()]
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Could not read corpus: {e}")
+
+        corpus = []
+        queries = UnsanitizedSearch.objects.order_by("-count").values_list("query", flat=True)
+        for query in queries[: options["top"]]:
+            expected = parse_cache.get(query)
+            if expected is not None or options["live"]:
+                corpus.append({"query": query, "expected": expected})
+        return corpus
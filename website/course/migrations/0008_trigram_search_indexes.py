@@ -0,0 +1,21 @@
+# Generated by Django 5.2.1 on 2026-10-18 17:33
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0007_alter_course_program_level'),
+        ('university', '0021_trigram_search_indexes'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='course',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['program_name'], name='idx_course_program_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
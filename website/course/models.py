@@ -1,3 +1,4 @@
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 from university.models import university
 
@@ -60,6 +61,10 @@ class Course(models.Model):
         verbose_name = "Course"
         verbose_name_plural = "Courses"
         ordering = ['university', 'program_level', 'start_date']
+        indexes = [
+            # Fuzzy admin search, see website/fuzzy_search.py
+            GinIndex(fields=["program_name"], name="idx_course_program_name_trgm", opclasses=["gin_trgm_ops"]),
+        ]
 
     def __str__(self):
         return f"{self.university.name} - {self.program_level.title()} Program"
@@ -0,0 +1,121 @@
+"""
+Words smart search understands without the LLM.
+
+Shared by the keyword fallback in FilterAi and by RuleParser, so both read a
+query the same way.
+"""
+
+from enum import Enum
+
+
+class ProgramLevel(str, Enum):
+    bachelors = "bachelors"
+    masters = "masters"
+
+
+class Country(str, Enum):
+    Australia = "Australia"
+    Canada = "Canada"
+    France = "France"
+    Germany = "Germany"
+    Ireland = "Ireland"
+    Italy = "Italy"
+    Netherlands = "Netherlands"
+    Poland = "Poland"
+    Russia = "Russia"
+    Spain = "Spain"
+    Sweden = "Sweden"
+    Switzerland = "Switzerland"
+    Ukraine = "Ukraine"
+    UAE = "United Arab Emirates"
+    UK = "United Kingdom"
+    USA = "United States"
+
+
+# Degrees that name their subject as well as their level ("mba in uk")
+DEGREE_SUBJECTS = {
+    "bba": "business administration",
+    "mba": "business administration",
+    "btech": "engineering",
+    "mtech": "engineering",
+    "beng": "engineering",
+    "meng": "engineering",
+    "bcom": "commerce",
+    "mcom": "commerce",
+    "llb": "law",
+    "llm": "law",
+    "bfa": "fine arts",
+    "mfa": "fine arts",
+    "bpharm": "pharmacy",
+    "mpharm": "pharmacy",
+    "mph": "public health",
+}
+
+LEVEL_WORDS = {
+    "bachelors": ProgramLevel.bachelors,
+    "bachelor": ProgramLevel.bachelors,
+    "bsc": ProgramLevel.bachelors,
+    "ba": ProgramLevel.bachelors,
+    "bba": ProgramLevel.bachelors,
+    "btech": ProgramLevel.bachelors,
+    "beng": ProgramLevel.bachelors,
+    "bcom": ProgramLevel.bachelors,
+    "llb": ProgramLevel.bachelors,
+    "bfa": ProgramLevel.bachelors,
+    "bpharm": ProgramLevel.bachelors,
+    "undergraduate": ProgramLevel.bachelors,
+    "undergrad": ProgramLevel.bachelors,
+    "ug": ProgramLevel.bachelors,
+    "masters": ProgramLevel.masters,
+    "master": ProgramLevel.masters,
+    "msc": ProgramLevel.masters,
+    "ma": ProgramLevel.masters,
+    "mba": ProgramLevel.masters,
+    "mtech": ProgramLevel.masters,
+    "meng": ProgramLevel.masters,
+    "mcom": ProgramLevel.masters,
+    "llm": ProgramLevel.masters,
+    "mfa": ProgramLevel.masters,
+    "mpharm": ProgramLevel.masters,
+    "mph": ProgramLevel.masters,
+    "postgraduate": ProgramLevel.masters,
+    "postgrad": ProgramLevel.masters,
+    "pg": ProgramLevel.masters,
+}
+
+COUNTRY_ALIASES = {
+    **{c.value.lower(): c for c in Country},
+    "usa": Country.USA,
+    "us": Country.USA,
+    "america": Country.USA,
+    "united states of america": Country.USA,
+    "uk": Country.UK,
+    "england": Country.UK,
+    "britain": Country.UK,
+    "great britain": Country.UK,
+    "scotland": Country.UK,
+    "uae": Country.UAE,
+    "dubai": Country.UAE,
+    "holland": Country.Netherlands,
+}
+
+# Words that carry no filter of their own
+FILLER_WORDS = frozenset(
+    """
+    i im i'm want wanna would like to study studying in at of for a an the and or
+    me my show find search looking look program programs programme course courses
+    degree degrees university universities college colleges abroad best top good
+    options option with which that some any please
+    """.split()
+)
+
+# Words that ask for something SearchParams has no filter for, or that only
+# make sense next to a number. Never a subject, but not understood either.
+NON_SUBJECT_WORDS = frozenset(
+    """
+    cheap cheaper cheapest affordable low lowest expensive free budget fee fees
+    tuition cost costs price scholarship scholarships funded funding ranking
+    ranked rank under below less lower than over above more greater max maximum
+    min minimum within upto least most between year years month months
+    """.split()
+)
@@ -1,3 +1,80 @@
-from django.test import TestCase
+from django.test import SimpleTestCase
 
-# Create your tests here.
+from .FilterAi import fallback_search_params
+from .RuleParser import RULE_PARSE_MIN_CONFIDENCE, _Trie, _Vocabulary, rule_parse
+
+
+def _vocabulary() -> _Vocabulary:
+    universities, programs = _Trie(), _Trie()
+    universities.add(["university", "of", "toronto"], "University of Toronto")
+    for subject in ("computer science", "finance", "business administration"):
+        programs.add(subject.split(), subject)
+    return _Vocabulary(0, universities, programs, frozenset({"phd", "diploma"}))
+
+
+class RuleParseTests(SimpleTestCase):
+    def parse(self, query):
+        return rule_parse(query, _vocabulary())
+
+    def test_understood_query(self):
+        parsed = self.parse("masters in computer science in Germany under 20000")
+        self.assertEqual(parsed.confidence, 1.0)
+        self.assertEqual(parsed.params.program_name, "computer science")
+        self.assertEqual(parsed.params.program_level, "masters")
+        self.assertEqual(parsed.params.country_names, ["Germany"])
+        self.assertEqual(parsed.params.tuition_fees_max, 20000)
+
+    def test_degree_names_its_subject(self):
+        parsed = self.parse("mba in uk")
+        self.assertEqual(parsed.params.program_name, "business administration")
+        self.assertEqual(parsed.params.program_level, "masters")
+        self.assertEqual(parsed.params.country_names, ["United Kingdom"])
+        self.assertEqual(parsed.confidence, 1.0)
+
+    def test_named_subject_beats_the_degree(self):
+        parsed = self.parse("mba in finance")
+        self.assertEqual(parsed.params.program_name, "finance")
+        self.assertEqual(parsed.params.program_level, "masters")
+
+    def test_unexplained_words_go_to_the_llm(self):
+        for query in ("cheap masters in germany", "masters in germany with scholarship",
+                      "top 10 masters in germany", "phd in germany"):
+            with self.subTest(query=query):
+                self.assertLess(self.parse(query).confidence, RULE_PARSE_MIN_CONFIDENCE)
+
+    def test_unexplained_words_are_not_a_subject(self):
+        for query in ("cheap masters in germany", "masters in germany with scholarship", "top 10 masters in germany"):
+            with self.subTest(query=query):
+                self.assertIsNone(self.parse(query).params.program_name)
+        self.assertEqual(self.parse("cheap mba in uk").params.program_name, "business administration")
+
+    def test_unknown_subject_is_guessed_but_not_trusted(self):
+        parsed = self.parse("masters in marine biology in canada")
+        self.assertEqual(parsed.params.program_name, "marine biology")
+        self.assertLess(parsed.confidence, RULE_PARSE_MIN_CONFIDENCE)
+
+
+class FallbackSearchParamsTests(SimpleTestCase):
+    def test_degree_names_its_subject(self):
+        params = fallback_search_params("mba in uk")
+        self.assertEqual(params.program_name, "business administration")
+        self.assertEqual(params.program_level, "masters")
+        self.assertEqual(params.country_names, ["United Kingdom"])
+
+    def test_leftover_words_are_the_program(self):
+        params = fallback_search_params("masters in data science in Canada")
+        self.assertEqual(params.program_name, "data science")
+        self.assertEqual(params.program_level, "masters")
+
+    def test_fee_bound_is_a_filter_not_the_program(self):
+        params = fallback_search_params("bachelors USA under 20000")
+        self.assertIsNone(params.program_name)
+        self.assertEqual(params.program_level, "bachelors")
+        self.assertEqual(params.country_names, ["United States"])
+        self.assertEqual(params.tuition_fees_max, 20000)
+
+    def test_comparison_and_price_words_are_dropped(self):
+        params = fallback_search_params("cheap masters in nursing below $15k in Canada")
+        self.assertEqual(params.program_name, "nursing")
+        self.assertEqual(params.tuition_fees_max, 15000)
+        self.assertIsNone(fallback_search_params("masters under budget in Ireland").program_name)
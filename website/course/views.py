@@ -10,9 +10,11 @@ from django.db.models import Q
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from student.utils import create_student_log
+from website.result_cache import cached_json_response, catalog_cache
 from django.views import View
-from search.utils import save_unsanitized_query
-import threading
+from search.parse_cache import parse_cache
+from search.analytics import search_analytics
+from .RuleParser import RULE_PARSE_MIN_CONFIDENCE, rule_parse
 from .FilterAi import (
     parser,
     get_chain,
@@ -20,7 +22,11 @@ from .FilterAi import (
     ChatResponseToUser,
     chat_parser,
     chat_chain,
+    ainvoke_or_fallback,
+    fallback_chat_response,
 )
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
 from pydantic import ValidationError
 from website.utils import user_token_required
 from django.utils.decorators import method_decorator
@@ -91,14 +97,20 @@ def compare_course_search(request):
     query = "SELECT compare_course_search(%s, %s) AS result"
     params = [course_name, program_level]
     create_student_log(request, f"Compared Course '{course_name}'")
-    # Execute the query
-    with connection.cursor() as cursor:
-        register_default_jsonb(connection.connection, loads=json.loads, globally=False)
-        cursor.execute(query, params)
-        result = cursor.fetchone()[0]  # Fetch the JSONB result
 
-    # Return the result directly as JSON
-    return JsonResponse(result, safe=False)
+    def compute():
+        # Execute the query
+        with connection.cursor() as cursor:
+            register_default_jsonb(connection.connection, loads=json.loads, globally=False)
+            cursor.execute(query, params)
+            return cursor.fetchone()[0]  # Fetch the JSONB result
+
+    result = catalog_cache.get_or_compute("compare_course_search", params, compute)
+    if result is None:
+        return JsonResponse(None, safe=False)
+
+    # Return the cached JSON directly
+    return cached_json_response(request, result)
 
 
 def safe_parse(parser, text):
@@ -120,9 +132,97 @@ def safe_parse(parser, text):
         return SearchParams()
 
 
+def _off_loop(fn, *args):
+    """
+    Run a blocking DB call in a worker thread so the event loop keeps
+    serving other requests meanwhile.
+    """
+    def call():
+        # Pool threads never see request_started/finished, so drop
+        # connections past CONN_MAX_AGE or broken ourselves
+        close_old_connections()
+        return fn(*args)
+
+    return sync_to_async(call, thread_sensitive=False)()
+
+
+def _search_courses_v2(p: SearchParams, limit: int, offset: int):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT public.search_courses_v2(
+                %s, %s, %s, %s, %s,
+                %s, %s, %s, %s,
+                %s, %s, %s, %s,
+                %s, %s, %s, %s,
+                %s, %s
+            )
+            """,
+            [
+                None,  # search_query (we use structured filters)
+                p.university_name,
+                p.program_name,
+                p.program_level,
+                p.country_names or [],  # ← ARRAY!
+                p.duration_min,
+                p.duration_max,
+                p.tuition_fees_min,
+                p.tuition_fees_max,
+                p.gpa_min,
+                p.gpa_max,
+                p.sat_min,
+                p.sat_max,
+                p.act_min,
+                p.act_max,
+                p.ielts_min,
+                p.ielts_max,
+                limit,
+                offset,
+            ],
+        )
+        return cursor.fetchone()[0]  # JSON from function
+
+
+async def _parse_search_query(query: str, use_cache: bool = True) -> SearchParams:
+    # Simple queries never need the LLM (course/RuleParser.py)
+    quick = await _off_loop(rule_parse, query)
+    if quick.confidence >= RULE_PARSE_MIN_CONFIDENCE:
+        return quick.params
+
+    if use_cache:
+        cached = parse_cache.get_local(query)
+        if cached is None:
+            cached = await _off_loop(parse_cache.get, query)
+        if cached is not None:
+            try:
+                return SearchParams.model_validate(cached)
+            except ValidationError:
+                pass  # stored before a SearchParams change, parse again
+
+    fell_back = False
+
+    def fallback():
+        nonlocal fell_back
+        fell_back = True
+        return quick.params
+
+    params = await ainvoke_or_fallback(
+        get_chain(),
+        {
+            "query": query,
+            "format_instructions": parser.get_format_instructions(),
+        },
+        fallback,
+    )
+    # Only real LLM parses are worth keeping
+    if use_cache and not fell_back:
+        await _off_loop(parse_cache.set, query, params.model_dump(mode="json"))
+    return params
+
+
 # @method_decorator(api_key_required, name="dispatch")
 class FilterSearchView(View):
-    def get(self, request, *args, **kwargs):
+    async def get(self, request, *args, **kwargs):
         query = request.GET.get("search_query", "").strip()
         if not query:
             return JsonResponse({"error": "Missing query"}, status=400)
@@ -132,57 +232,12 @@ class FilterSearchView(View):
                 status=400,
             )
 
-        threading.Thread(
-            target=save_unsanitized_query, args=(query,), daemon=True
-        ).start()
-        threading.Thread(
-            target=create_student_log,
-            args=(request, f"Smart Searched '{query}'"),
-            daemon=True,
-        ).start()
+        search_analytics.record(query)
+        create_student_log(request, f"Smart Searched '{query}'")
 
         try:
-            params: SearchParams = get_chain().invoke(
-                {
-                    "query": query,
-                    "format_instructions": parser.get_format_instructions(),
-                }
-            )
-
-            with connection.cursor() as cursor:
-                cursor.execute(
-                    """
-                    SELECT public.search_courses_v2(
-                        %s, %s, %s, %s, %s,
-                        %s, %s, %s, %s,
-                        %s, %s, %s, %s,
-                        %s, %s, %s, %s,
-                        %s, %s
-                    )
-                    """,
-                    [
-                        None,  # search_query (we use structured filters)
-                        params.university_name,
-                        params.program_name,
-                        params.program_level,
-                        params.country_names or [],  # ← ARRAY!
-                        params.duration_min,
-                        params.duration_max,
-                        params.tuition_fees_min,
-                        params.tuition_fees_max,
-                        params.gpa_min,
-                        params.gpa_max,
-                        params.sat_min,
-                        params.sat_max,
-                        params.act_min,
-                        params.act_max,
-                        params.ielts_min,
-                        params.ielts_max,
-                        200,
-                        params.offset_val or 0,
-                    ],
-                )
-                result = cursor.fetchone()[0]  # JSON from function
+            params: SearchParams = await _parse_search_query(query)
+            result = await _off_loop(_search_courses_v2, params, 200, params.offset_val or 0)
 
             return JsonResponse({"courses": result}, status=200, safe=False)
 
@@ -190,118 +245,86 @@ class FilterSearchView(View):
             return JsonResponse({"error": str(e)}, status=500)
 
 
+def _recent_logs_text(auth_header: str) -> str:
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT * FROM recent_logs(%s);", [auth_header])
+            rows = cursor.fetchall()
+            if rows:
+                return "\n".join(r[0] for r in rows)
+    except Exception as e:
+        print("Error fetching logs:", str(e))
+    return ""
+
+
+def _search_with_relaxed_filters(params: SearchParams):
+    # First try: full search
+    result = _search_courses_v2(params, 10, params.offset_val)
+
+    # Fallback mode if first search is empty
+    fallback_fields = [
+        "university_name",
+        "program_level",
+        "program_name",
+        "country_name",
+    ]
+    if not result.get("courses"):
+        # Start with all fallback filters
+        fallback_params = SearchParams(
+            university_name=params.university_name,
+            program_name=params.program_name,
+            program_level=params.program_level,
+            country_names=params.country_names,
+            duration_min=None,
+            duration_max=None,
+            tuition_fees_min=None,
+            tuition_fees_max=None,
+            gpa_min=None,
+            gpa_max=None,
+            sat_min=None,
+            sat_max=None,
+            act_min=None,
+            act_max=None,
+            ielts_min=None,
+            ielts_max=None,
+            limit_val=params.limit_val,
+            offset_val=params.offset_val,
+        )
+
+        # Gradually remove fallback fields one by one if results are empty
+        for i in range(len(fallback_fields) + 1):
+            current_params = fallback_params.copy()
+            # Remove the first 'i' filters
+            for field in fallback_fields[:i]:
+                setattr(current_params, field, None)
+
+            print(f"Fallback search removing: {fallback_fields[:i]}")
+            result = _search_courses_v2(current_params, 10, current_params.offset_val)
+
+            if result.get("courses"):
+                break  # stop when we find results
+
+    return result
+
+
 @method_decorator(user_token_required, name="get")
 class UserFilterSearchView(View):
-    def get(self, request):
+    async def get(self, request):
         auth_header = request.headers.get("Authorization")
 
         if not auth_header:
             return JsonResponse({"error": "Missing Authorization header"}, status=401)
 
-        logs_text = ""
-        try:
-            with connection.cursor() as cursor:
-                cursor.execute("SELECT * FROM recent_logs(%s);", [auth_header])
-                rows = cursor.fetchall()
-                if rows:
-                    logs_text = "\n".join(r[0] for r in rows)
-        except Exception as e:
-            print("Error fetching logs:", str(e))
+        logs_text = await _off_loop(_recent_logs_text, auth_header)
 
         print(logs_text)
 
         try:
             # Parse the search params from your chain
-            params: SearchParams = get_chain().invoke(
-                {
-                    "query": logs_text,
-                    "format_instructions": parser.get_format_instructions(),
-                }
-            )
+            params: SearchParams = await _parse_search_query(logs_text, use_cache=False)
             print(params)
 
-            # Helper function to run query
-            def run_query(p: SearchParams):
-                with connection.cursor() as cursor:
-                    cursor.execute(
-                        """
-                        SELECT public.search_courses_v2(
-                            %s, %s, %s, %s, %s,
-                            %s, %s, %s, %s,
-                            %s, %s, %s, %s,
-                            %s, %s, %s, %s,
-                            %s, %s
-                        )
-                        """,
-                        [
-                            None,
-                            p.university_name,
-                            p.program_name,
-                            p.program_level,
-                            p.country_names or [],
-                            p.duration_min,
-                            p.duration_max,
-                            p.tuition_fees_min,
-                            p.tuition_fees_max,
-                            p.gpa_min,
-                            p.gpa_max,
-                            p.sat_min,
-                            p.sat_max,
-                            p.act_min,
-                            p.act_max,
-                            p.ielts_min,
-                            p.ielts_max,
-                            10,
-                            p.offset_val,
-                        ],
-                    )
-                    return cursor.fetchone()[0]
-
-            # First try: full search
-            result = run_query(params)
-
-            # Fallback mode if first search is empty
-            fallback_fields = [
-                "university_name",
-                "program_level",
-                "program_name",
-                "country_name",
-            ]
-            if not result.get("courses"):
-                # Start with all fallback filters
-                fallback_params = SearchParams(
-                    university_name=params.university_name,
-                    program_name=params.program_name,
-                    program_level=params.program_level,
-                    country_names=params.country_names,
-                    duration_min=None,
-                    duration_max=None,
-                    tuition_fees_min=None,
-                    tuition_fees_max=None,
-                    gpa_min=None,
-                    gpa_max=None,
-                    sat_min=None,
-                    sat_max=None,
-                    act_min=None,
-                    act_max=None,
-                    ielts_min=None,
-                    ielts_max=None,
-                    limit_val=params.limit_val,
-                    offset_val=params.offset_val,
-                )
-
-                # Gradually remove fallback fields one by one if results are empty
-                for i in range(len(fallback_fields) + 1):
-                    current_params = fallback_params.copy()
-                    # Remove the first 'i' filters
-                    for field in fallback_fields[:i]:
-                        setattr(current_params, field, None)
-
-                    print(f"Fallback search removing: {fallback_fields[:i]}")
-                    result = run_query(current_params)
-
-                    if result.get("courses"):
-                        break  # stop when we find results
+            result = await _off_loop(_search_with_relaxed_filters, params)
 
             return JsonResponse({"courses": result}, status=200, safe=False)
 
@@ -310,7 +333,7 @@ class UserFilterSearchView(View):
 
 
 class FilterSuggest(View):
-    def get(self, request, *args, **kwargs):
+    async def get(self, request, *args, **kwargs):
         query = request.GET.get("search_query", "").strip()
         if not query:
             return JsonResponse({"error": "Missing query"}, status=400)
@@ -319,54 +342,11 @@ class FilterSuggest(View):
                 {"status": "error", "message": "Query must be at least 3 characters"},
                 status=400,
             )
-        threading.Thread(
-            target=create_student_log,
-            args=(request, f"Smart Suggested with '{query}'"),
-            daemon=True,
-        ).start()
+        create_student_log(request, f"Smart Suggested with '{query}'")
 
         try:
-            params: SearchParams = get_chain().invoke(
-                {
-                    "query": query,
-                    "format_instructions": parser.get_format_instructions(),
-                }
-            )
-
-            with connection.cursor() as cursor:
-                cursor.execute(
-                    """
-                    SELECT public.search_courses_v2(
-                        %s, %s, %s, %s, %s,
-                        %s, %s, %s, %s,
-                        %s, %s, %s, %s,
-                        %s, %s, %s, %s,
-                        %s, %s
-                    )
-                    """,
-                    [
-                        None,  # search_query (we use structured filters)
-                        params.university_name,
-                        params.program_name,
-                        params.program_level,
-                        params.country_names or [],  # ← ARRAY!
-                        params.duration_min,
-                        params.duration_max,
-                        params.tuition_fees_min,
-                        params.tuition_fees_max,
-                        params.gpa_min,
-                        params.gpa_max,
-                        params.sat_min,
-                        params.sat_max,
-                        params.act_min,
-                        params.act_max,
-                        params.ielts_min,
-                        params.ielts_max,
-                        200,
-                        params.offset_val or 0,
-                    ],
-                )
-                result = cursor.fetchone()[0]
+            params: SearchParams = await _parse_search_query(query)
+            result = await _off_loop(_search_courses_v2, params, 200, params.offset_val or 0)
 
             return JsonResponse({"courses": result}, status=200, safe=False)
 
@@ -374,9 +354,46 @@ class FilterSuggest(View):
             return JsonResponse({"error": str(e)}, status=500)
 
 
+def _filter_search_advance(chat: ChatResponseToUser):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT * from public.filter_search_advance(
+                %s,%s,%s,%s,%s,
+                %s,%s,%s,%s,
+                %s,%s,%s,%s,
+                %s,%s,%s,%s,
+                %s,%s
+            )
+        """,
+            [
+                None,
+                chat.university_name,
+                chat.program_name,
+                chat.program_level,
+                chat.country_name,
+                chat.duration_min,
+                chat.duration_max,
+                chat.tuition_fees_min,
+                chat.tuition_fees_max,
+                None,
+                None,
+                None,
+                None,
+                None,
+                None,
+                None,
+                None,
+                5,
+                0,
+            ],
+        )
+        return cursor.fetchone()[0]
+
+
 @method_decorator(csrf_exempt, name="dispatch")
 class ChatSuggest(View):
-    def post(self, request, *args, **kwargs):
+    async def post(self, request, *args, **kwargs):
         try:
             data = json.loads(request.body.decode("utf-8"))
         except json.JSONDecodeError:
@@ -393,47 +410,16 @@ class ChatSuggest(View):
             )
 
         try:
-            chat_parser: ChatResponseToUser = chat_chain().invoke(
+            chat_parser: ChatResponseToUser = await ainvoke_or_fallback(
+                chat_chain(),
                 {
                     "query": query,
                     "format_instructions": parser.get_format_instructions(),
-                }
+                },
+                lambda: fallback_chat_response(query),
             )
             if chat_parser.should_suggest:
-                with connection.cursor() as cursor:
-                    cursor.execute(
-                        """
-                        SELECT * from public.filter_search_advance(
-                            %s,%s,%s,%s,%s,
-                            %s,%s,%s,%s,
-                            %s,%s,%s,%s,
-                            %s,%s,%s,%s,
-                            %s,%s
-                        )
-                    """,
-                        [
-                            None,
-                            chat_parser.university_name,
-                            chat_parser.program_name,
-                            chat_parser.program_level,
-                            chat_parser.country_name,
-                            chat_parser.duration_min,
-                            chat_parser.duration_max,
-                            chat_parser.tuition_fees_min,
-                            chat_parser.tuition_fees_max,
-                            None,
-                            None,
-                            None,
-                            None,
-                            None,
-                            None,
-                            None,
-                            None,
-                            5,
-                            0,
-                        ],
-                    )
-                    result = cursor.fetchone()[0]
+                result = await _off_loop(_filter_search_advance, chat_parser)
             else:
                 result = ""
             return JsonResponse(
@@ -5,7 +5,7 @@ import nested_admin
 from .models import (
     TestRules, Test, TestSection, Question, Option,
     CourseCategories, Course, CourseLinkedStudent, CourseTest,
-    TestStatus, Answer, Evaluation
+    TestStatus, Answer, Evaluation, EvaluationJob
 )
 
 # ----------------------------
@@ -104,6 +104,14 @@ class EvaluationAdmin(admin.ModelAdmin):
     search_fields = ("test_status__student__name", "test_status__test__title")
 
 
+@admin.register(EvaluationJob)
+class EvaluationJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "test_status", "status", "attempts", "run_after", "locked_by", "finished_at")
+    list_filter = ("status",)
+    search_fields = ("test_status__student__name", "test_status__test__title")
+    readonly_fields = ("created_at", "locked_at", "last_error")
+
+
 # ----------------------------
 # Register leftover models directly
 # ----------------------------
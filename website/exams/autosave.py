@@ -0,0 +1,276 @@
+"""
+Write-behind buffer for exam autosaves.
+
+student/autosave_answer/ puts the latest state of an answer into a buffer
+keyed by TestStatus and question, and returns without touching the Answer
+tables. `manage.py flush_answer_buffer` (or any submit) coalesces what is
+buffered into Answer rows and selections with a handful of bulk queries,
+however many times each answer was saved in between.
+
+Backends (EXAM_AUTOSAVE_BACKEND):
+
+- redis: one hash per TestStatus plus a set of TestStatus ids with
+  pending drafts, on REDIS_URL
+- table: the exams_answerdraft staging table, one upsert per save
+
+A buffered entry is only removed once it has been written and only if it
+wasn't overwritten meanwhile, so a save racing a flush is never lost. A
+draft no newer than its Answer's answered_at is dropped rather than
+written, so an explicit save_answer landing while a flush is under way
+wins over the older autosave.
+submit_test and confirm_before_submit flush synchronously first. Flushes
+lock the attempt's TestStatus row and drop drafts of attempts that are no
+longer pending/ongoing, so a save that slips in around a submit (the live
+status is cached) never reaches a completed attempt's answers.
+"""
+
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Answer, AnswerDraft, TestStatus
+
+LIVE_STATUS_TTL = 60  # seconds; submit drops it right away
+LIVE_STATUSES = ("pending", "ongoing")
+
+
+def _draft(selected_option_ids, subjective_answer) -> dict:
+    return {
+        "selected": sorted(selected_option_ids),
+        "subjective": subjective_answer,
+        "at": timezone.now().isoformat(),
+    }
+
+
+class TableAnswerBuffer:
+    def put(self, test_status_id: int, question_id: int, selected_option_ids, subjective_answer):
+        AnswerDraft.objects.bulk_create(
+            [AnswerDraft(
+                test_status_id=test_status_id,
+                question_id=question_id,
+                payload=_draft(selected_option_ids, subjective_answer),
+                updated_at=timezone.now(),
+            )],
+            update_conflicts=True,
+            unique_fields=["test_status", "question"],
+            update_fields=["payload", "updated_at"],
+        )
+
+    def discard(self, test_status_id: int, question_id: int):
+        AnswerDraft.objects.filter(test_status_id=test_status_id, question_id=question_id).delete()
+
+    def pending(self, limit: int) -> list[int]:
+        return list(
+            AnswerDraft.objects.values_list("test_status_id", flat=True).distinct().order_by()[:limit]
+        )
+
+    def read(self, test_status_ids) -> list[tuple]:
+        """[(test_status_id, question_id, raw payload, token)]; token is passed back to ack()."""
+        return [
+            (ts_id, question_id, payload, (draft_id, updated_at))
+            for draft_id, ts_id, question_id, payload, updated_at in AnswerDraft.objects.filter(
+                test_status_id__in=test_status_ids
+            ).values_list("id", "test_status_id", "question_id", "payload", "updated_at")
+        ]
+
+    def ack(self, entries):
+        condition = Q(pk__in=[])
+        for _, _, _, (draft_id, updated_at) in entries:
+            condition |= Q(pk=draft_id, updated_at=updated_at)
+        AnswerDraft.objects.filter(condition).delete()
+
+
+class RedisAnswerBuffer:
+    def __init__(self, url: str, prefix: str = "exam_autosave"):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.pending_key = f"{prefix}:pending"
+
+    def _key(self, test_status_id) -> str:
+        return f"{self.prefix}:{test_status_id}"
+
+    def put(self, test_status_id: int, question_id: int, selected_option_ids, subjective_answer):
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hset(
+            self._key(test_status_id), str(question_id), json.dumps(_draft(selected_option_ids, subjective_answer))
+        )
+        pipe.sadd(self.pending_key, test_status_id)
+        pipe.execute()
+
+    def discard(self, test_status_id: int, question_id: int):
+        self.client.hdel(self._key(test_status_id), str(question_id))
+
+    def pending(self, limit: int) -> list[int]:
+        return [int(ts_id) for ts_id in self.client.srandmember(self.pending_key, limit)]
+
+    def read(self, test_status_ids) -> list[tuple]:
+        pipe = self.client.pipeline(transaction=False)
+        for ts_id in test_status_ids:
+            pipe.hgetall(self._key(ts_id))
+        entries = []
+        for ts_id, fields in zip(test_status_ids, pipe.execute()):
+            for question_id, raw in fields.items():
+                entries.append((ts_id, int(question_id), raw.decode(), raw))
+        return entries
+
+    def ack(self, entries):
+        import redis
+
+        by_status = {}
+        for ts_id, question_id, _, raw in entries:
+            by_status.setdefault(ts_id, {})[str(question_id)] = raw
+
+        for ts_id, written in by_status.items():
+            key = self._key(ts_id)
+            with self.client.pipeline() as pipe:
+                while True:
+                    try:
+                        pipe.watch(key)
+                        current = pipe.hgetall(key)
+                        unchanged = [f for f, raw in written.items() if current.get(f.encode()) == raw]
+                        pipe.multi()
+                        if unchanged:
+                            pipe.hdel(key, *unchanged)
+                        if len(unchanged) == len(current):
+                            pipe.srem(self.pending_key, ts_id)
+                        pipe.execute()
+                        break
+                    except redis.WatchError:
+                        # Saved again while we were acking, look again
+                        continue
+
+
+def _status_key(student_id, test_id) -> str:
+    return f"exam_live_status:{student_id}:{test_id}"
+
+
+def live_test_status(student_id, test_id):
+    """
+    (test_status id, valid_till) of a pending/ongoing attempt, or None.
+    Cached briefly so autosaves don't query TestStatus every time.
+    """
+    key = _status_key(student_id, test_id)
+    status = cache.get(key)
+    if status is None:
+        row = TestStatus.objects.filter(
+            student_id=student_id, test_id=test_id, status__in=LIVE_STATUSES
+        ).values_list("id", "valid_till").first()
+        if row is None:
+            return None
+        status = row
+        cache.set(key, status, LIVE_STATUS_TTL)
+    return status
+
+
+def forget_test_status(student_id, test_id):
+    cache.delete(_status_key(student_id, test_id))
+
+
+def _build_buffer():
+    backend = getattr(settings, "EXAM_AUTOSAVE_BACKEND", "table")
+    if backend == "redis":
+        return RedisAnswerBuffer(settings.REDIS_URL)
+    return TableAnswerBuffer()
+
+
+answer_buffer = _build_buffer()
+
+
+def _apply(entries):
+    """Write buffered entries (latest state per answer) to Answer rows."""
+    drafts = {}
+    for ts_id, question_id, payload, _ in entries:
+        drafts[(ts_id, question_id)] = json.loads(payload) if isinstance(payload, str) else payload
+
+    through = Answer.selected_options.through
+    with transaction.atomic():
+        # submit_test holds this lock while it flushes and closes the attempt
+        live = set(
+            TestStatus.objects.select_for_update()
+            .filter(pk__in={ts_id for ts_id, _ in drafts}, status__in=LIVE_STATUSES)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+        drafts = {key: draft for key, draft in drafts.items() if key[0] in live}
+        if not drafts:
+            return
+
+        condition = Q(pk__in=[])
+        for ts_id, question_id in drafts:
+            condition |= Q(test_status_id=ts_id, question_id=question_id)
+        existing = {(a.test_status_id, a.question_id): a for a in Answer.objects.filter(condition)}
+
+        to_create, to_update = [], []
+        for key, draft in list(drafts.items()):
+            answered_at = datetime.fromisoformat(draft["at"])
+            answer = existing.get(key)
+            if answer is None:
+                to_create.append(Answer(
+                    test_status_id=key[0],
+                    question_id=key[1],
+                    subjective_answer=draft["subjective"],
+                    marks_obtained=0,
+                ))
+            elif answer.answered_at >= answered_at:
+                # Saved explicitly (save_answer) after this draft was made
+                del drafts[key]
+            else:
+                answer.subjective_answer = draft["subjective"]
+                answer.answered_at = answered_at
+                to_update.append(answer)
+
+        for answer in Answer.objects.bulk_create(to_create) if to_create else []:
+            if answer.pk is None:
+                # Backends without RETURNING; fetch the ids back
+                answer.pk = Answer.objects.get(
+                    test_status_id=answer.test_status_id, question_id=answer.question_id
+                ).pk
+            key = (answer.test_status_id, answer.question_id)
+            # answered_at is auto_now_add, so bulk_create stamped the flush time
+            answer.answered_at = datetime.fromisoformat(drafts[key]["at"])
+            existing[key] = answer
+        to_update += to_create
+        if to_update:
+            Answer.objects.bulk_update(to_update, ["subjective_answer", "answered_at"])
+
+        answer_ids = {key: existing[key].pk for key in drafts}
+        current = {}
+        for answer_id, option_id in through.objects.filter(
+            answer_id__in=answer_ids.values()
+        ).values_list("answer_id", "option_id"):
+            current.setdefault(answer_id, set()).add(option_id)
+
+        removed, added = Q(pk__in=[]), []
+        for key, draft in drafts.items():
+            answer_id = answer_ids[key]
+            have, want = current.get(answer_id, set()), set(draft["selected"])
+            if have - want:
+                removed |= Q(answer_id=answer_id, option_id__in=have - want)
+            added += [through(answer_id=answer_id, option_id=option_id) for option_id in want - have]
+        through.objects.filter(removed).delete()
+        if added:
+            through.objects.bulk_create(added, ignore_conflicts=True)
+
+
+def flush(test_status_ids) -> int:
+    """
+    Write everything buffered for these TestStatus ids; returns entries
+    taken from the buffer. Those of attempts no longer live are dropped.
+    """
+    entries = answer_buffer.read(list(test_status_ids))
+    if entries:
+        _apply(entries)
+        answer_buffer.ack(entries)
+    return len(entries)
+
+
+def flush_pending(limit: int = 200) -> int:
+    test_status_ids = answer_buffer.pending(limit)
+    return flush(test_status_ids) if test_status_ids else 0
@@ -0,0 +1,100 @@
+"""
+Bulk MCQ grading.
+
+Grades any set of answers (typically one TestStatus) with a constant
+number of queries: one for the answers and their selections, one for the
+number of correct options per question, and one bulk_update.
+Marks are worked out for all answers at once with NumPy, using the same
+rules Answer.evaluate() always had:
+
+    0 if nothing was selected, else
+    marks * (correct selected / correct options)
+          - wrong selected * section negative marking factor,
+    clamped to [0, marks]
+"""
+
+import numpy as np
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+
+from .models import Answer, Option
+
+BULK_UPDATE_BATCH_SIZE = 500
+
+
+def grade_mcq_answers(answers) -> dict[int, float]:
+    """
+    Grade the MCQ answers in the `answers` queryset and save marks_obtained.
+    Subjective answers in it are left alone. Returns {answer id: marks}.
+    """
+    rows = list(
+        answers.filter(question__section__question_mode="MCQ")
+        .annotate(
+            total_selected=Count("selected_options", distinct=True),
+            selected_correct=Count(
+                "selected_options",
+                filter=Q(selected_options__is_correct=True),
+                distinct=True,
+            ),
+        )
+        .values_list(
+            "id",
+            "question_id",
+            "question__marks",
+            "question__section__negative_marking_factor",
+            "total_selected",
+            "selected_correct",
+        )
+        .order_by()
+    )
+    if not rows:
+        return {}
+
+    question_ids = {row[1] for row in rows}
+    correct_counts = dict(
+        Option.objects.filter(question_id__in=question_ids, is_correct=True)
+        .values("question_id")
+        .annotate(n=Count("id"))
+        .values_list("question_id", "n")
+        .order_by()
+    )
+
+    ids, question, marks, factor, selected, selected_correct = zip(*rows)
+    marks = np.array(marks, dtype=float)
+    factor = np.array(factor, dtype=float)
+    selected = np.array(selected, dtype=float)
+    selected_correct = np.array(selected_correct, dtype=float)
+    correct = np.array([correct_counts.get(q, 0) for q in question], dtype=float)
+
+    # A question with no correct option gives no positive marks
+    share = np.divide(selected_correct, correct, out=np.zeros_like(correct), where=correct > 0)
+    obtained = marks * share - (selected - selected_correct) * factor
+    obtained = np.clip(obtained, 0.0, marks)
+    obtained = np.where(selected > 0, obtained, 0.0)
+
+    graded = dict(zip(ids, obtained.tolist()))
+    Answer.objects.bulk_update(
+        [Answer(id=answer_id, marks_obtained=value) for answer_id, value in graded.items()],
+        ["marks_obtained"],
+        batch_size=BULK_UPDATE_BATCH_SIZE,
+    )
+    return graded
+
+
+def grade_test_status(test_status_id: int) -> dict[int, float]:
+    return grade_mcq_answers(Answer.objects.filter(test_status_id=test_status_id))
+
+
+def answer_totals(test_status_ids) -> dict[int, tuple[float, float]]:
+    """{test_status id: (total marks, obtained marks)} over the answers given."""
+    totals = (
+        Answer.objects.filter(test_status_id__in=test_status_ids)
+        .values("test_status_id")
+        .annotate(
+            total=Coalesce(Sum("question__marks"), 0.0),
+            obtained=Coalesce(Sum("marks_obtained"), 0.0),
+        )
+        .values_list("test_status_id", "total", "obtained")
+        .order_by()
+    )
+    return {ts_id: (total, obtained) for ts_id, total, obtained in totals}
@@ -0,0 +1,220 @@
+"""
+DB-backed queue for subjective (LLM) grading.
+
+The result endpoint grades MCQs on the spot and enqueues an EvaluationJob
+for the subjective part instead of calling the LLM inside the request.
+`manage.py run_evaluation_worker` processes jobs: it claims a handful at a
+time (SELECT ... FOR UPDATE SKIP LOCKED, so any number of workers can run),
+packs answers from several students into one LLM call, and writes each
+attempt's marks and Evaluation in its own short transaction. Failed calls
+are retried with exponential backoff; after EXAM_EVAL_MAX_ATTEMPTS the
+Evaluation is flagged is_error_evaluating and the student can resubmit.
+A job left running past EXAM_EVAL_LOCK_TIMEOUT is claimed again; its first
+worker can then no longer finish, fail or requeue it.
+"""
+
+import json
+import logging
+import os
+import random
+import socket
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .grading import answer_totals
+from .models import Answer, Evaluation, EvaluationJob
+from .results import materialize_reports
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = getattr(settings, "EXAM_EVAL_BATCH_SIZE", 25)  # answers per LLM call
+MAX_ATTEMPTS = getattr(settings, "EXAM_EVAL_MAX_ATTEMPTS", 5)
+RETRY_DELAY = getattr(settings, "EXAM_EVAL_RETRY_DELAY", 30)  # seconds, doubled per attempt
+LOCK_TIMEOUT = getattr(settings, "EXAM_EVAL_LOCK_TIMEOUT", 600)  # seconds before a running job is reclaimed
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue_evaluation(test_status) -> EvaluationJob:
+    """The queued/running job for this attempt, creating one if there is none."""
+    job = EvaluationJob.objects.filter(test_status=test_status, status__in=ACTIVE_STATUSES).first()
+    if job:
+        return job
+    try:
+        with transaction.atomic():
+            return EvaluationJob.objects.create(test_status=test_status)
+    except IntegrityError:
+        # A concurrent request enqueued it first
+        return EvaluationJob.objects.get(test_status=test_status, status__in=ACTIVE_STATUSES)
+
+
+def job_progress(job: EvaluationJob) -> dict:
+    progress = {
+        "status": "success",
+        "job_id": job.id,
+        "job_status": job.status,
+        "attempts": job.attempts,
+        "test_id": job.test_status.test_id,
+    }
+    if job.status == "queued":
+        progress["queued_ahead"] = EvaluationJob.objects.filter(
+            status="queued", run_after__lte=timezone.now(), created_at__lt=job.created_at
+        ).count()
+    if job.status == "failed":
+        progress["message"] = "Subjective evaluation failed, submit the test for evaluation again"
+    return progress
+
+
+# ---------------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------------
+
+def claim_jobs(limit: int, worker: str) -> list[EvaluationJob]:
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            EvaluationJob.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status="queued", run_after__lte=now)
+                # Its worker died mid-job
+                | Q(status="running", locked_at__lt=now - timedelta(seconds=LOCK_TIMEOUT))
+            )
+            .order_by("run_after", "id")
+            .values_list("id", flat=True)[:limit]
+        )
+        EvaluationJob.objects.filter(id__in=ids).update(
+            status="running", locked_by=worker, locked_at=now, attempts=F("attempts") + 1
+        )
+    return list(EvaluationJob.objects.filter(id__in=ids).select_related("test_status"))
+
+
+def _batches(answers_by_job: dict) -> list[list[EvaluationJob]]:
+    """Pack whole jobs into LLM calls of about BATCH_SIZE answers."""
+    batches, current, size = [], [], 0
+    for job, answers in answers_by_job.items():
+        if current and size + len(answers) > BATCH_SIZE:
+            batches.append(current)
+            current, size = [], 0
+        current.append(job)
+        size += len(answers)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _grade_with_llm(answers: list[Answer]) -> dict[int, float]:
+    from .utils import get_subjective_eval_chain, subjective_eval_parser
+    from .views import safe_jsonify_llm_output
+
+    data_for_ai = [
+        {
+            "qs_id": ans.id,
+            "qs": ans.question.question,
+            "qs_answer": ans.subjective_answer or "",
+            "qs_max_marks": ans.question.marks,
+        }
+        for ans in answers
+    ]
+    raw_ai_output = get_subjective_eval_chain().invoke({
+        "subjective_data_json": json.dumps(data_for_ai),
+        "format_instructions": subjective_eval_parser.get_format_instructions(),
+    })
+
+    marks_map = {}
+    for item in safe_jsonify_llm_output(raw_ai_output):
+        try:
+            marks_map[int(item.get("qs_id") or item.get("id"))] = float(item.get("marks") or item.get("score"))
+        except Exception:
+            logger.warning("Invalid item in eval output: %s", item)
+    return marks_map
+
+
+def _claimed(job: EvaluationJob):
+    """The job, only while it is still this worker's claim (not reclaimed after LOCK_TIMEOUT)."""
+    return EvaluationJob.objects.filter(
+        id=job.id, status="running", locked_by=job.locked_by, locked_at=job.locked_at
+    )
+
+
+def _finish_job(job: EvaluationJob, answers: list[Answer], marks_map: dict[int, float]) -> bool:
+    """Write the marks and Evaluation; False if the job was reclaimed meanwhile."""
+    for ans in answers:
+        ans.marks_obtained = min(max(marks_map.get(ans.id, 0.0), 0), ans.question.marks)
+
+    with transaction.atomic():
+        # Locks the job row until commit, so a reclaiming worker can't finish it too
+        if not _claimed(job).update(status="done", finished_at=timezone.now(), last_error="", locked_by=""):
+            logger.warning("Evaluation job %s was reclaimed by another worker, dropping its result", job.id)
+            return False
+        Answer.objects.bulk_update(answers, ["marks_obtained"])
+        total_marks, obtained_marks = answer_totals([job.test_status_id]).get(job.test_status_id, (0, 0))
+        Evaluation.objects.update_or_create(
+            test_status_id=job.test_status_id,
+            defaults={
+                "total_marks": total_marks,
+                "obtained_marks": obtained_marks,
+                "is_error_evaluating": False,
+            },
+        )
+        materialize_reports([job.test_status_id])
+    return True
+
+
+def _retry_or_fail(job: EvaluationJob, error: str):
+    if job.attempts >= MAX_ATTEMPTS:
+        with transaction.atomic():
+            if not _claimed(job).update(
+                status="failed", finished_at=timezone.now(), last_error=error, locked_by=""
+            ):
+                logger.warning("Evaluation job %s was reclaimed by another worker", job.id)
+                return
+            evaluation, _ = Evaluation.objects.get_or_create(test_status_id=job.test_status_id)
+            evaluation.is_error_evaluating = True
+            evaluation.save(update_fields=["is_error_evaluating"])
+        logger.error("Evaluation job %s failed after %s attempts", job.id, job.attempts)
+        return
+
+    delay = RETRY_DELAY * 2 ** (job.attempts - 1)
+    delay *= random.uniform(0.8, 1.2)  # so a batch that failed together doesn't retry together
+    if not _claimed(job).update(
+        status="queued",
+        run_after=timezone.now() + timedelta(seconds=delay),
+        last_error=error,
+        locked_by="",
+    ):
+        logger.warning("Evaluation job %s was reclaimed by another worker", job.id)
+
+
+def process_jobs(jobs: list[EvaluationJob]) -> int:
+    """Grade the subjective answers of the claimed jobs; returns how many finished."""
+    answers_by_job = {job: [] for job in jobs}
+    job_by_status = {job.test_status_id: job for job in jobs}
+    for ans in (
+        Answer.objects.filter(
+            test_status_id__in=job_by_status, question__section__question_mode="SUB"
+        ).select_related("question")
+    ):
+        answers_by_job[job_by_status[ans.test_status_id]].append(ans)
+
+    finished = 0
+    for batch in _batches(answers_by_job):
+        answers = [ans for job in batch for ans in answers_by_job[job]]
+        try:
+            marks_map = _grade_with_llm(answers) if answers else {}
+        except Exception as e:
+            logger.exception("LLM subjective eval failed for jobs %s", [job.id for job in batch])
+            for job in batch:
+                _retry_or_fail(job, str(e))
+            continue
+
+        for job in batch:
+            finished += _finish_job(job, answers_by_job[job], marks_map)
+    return finished
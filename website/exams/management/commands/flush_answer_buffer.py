@@ -0,0 +1,35 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from exams.autosave import flush_pending
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Write buffered exam autosaves into Answer rows in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch", type=int, default=200, help="Test attempts to flush per round")
+        parser.add_argument("--interval", type=float, default=2.0, help="Seconds between rounds when idle")
+        parser.add_argument("--once", action="store_true", help="Flush one round and exit")
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            try:
+                written = flush_pending(options["batch"])
+            except Exception:
+                # Nothing is dropped from the buffer unless it was written
+                logger.exception("Autosave flush failed")
+                written = 0
+            if written:
+                self.stdout.write(f"Flushed {written} answers")
+
+            if options["once"]:
+                return
+            if not written:
+                time.sleep(options["interval"])
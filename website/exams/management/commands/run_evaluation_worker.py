@@ -0,0 +1,40 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from exams.jobs import claim_jobs, process_jobs, worker_name
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Process queued subjective-grading jobs. Run as many workers as needed."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--jobs", type=int, default=10, help="Jobs to claim per round")
+        parser.add_argument("--poll-interval", type=float, default=2.0, help="Seconds to sleep when idle")
+        parser.add_argument("--once", action="store_true", help="Process one round and exit")
+
+    def handle(self, *args, **options):
+        worker = worker_name()
+        self.stdout.write(f"Evaluation worker {worker} started")
+        while True:
+            close_old_connections()
+            try:
+                jobs = claim_jobs(options["jobs"], worker)
+                if jobs:
+                    finished = process_jobs(jobs)
+                    self.stdout.write(f"Claimed {len(jobs)} jobs, finished {finished}")
+            except KeyboardInterrupt:
+                raise
+            except Exception:
+                # Claimed jobs are picked up again once their lock expires
+                logger.exception("Evaluation worker round failed")
+                jobs = []
+
+            if options["once"]:
+                return
+            if not jobs:
+                time.sleep(options["poll_interval"])
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-18 17:26
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0006_evaluationjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnswerDraft',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payload', models.JSONField()),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='exams.question')),
+                ('test_status', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answer_drafts', to='exams.teststatus')),
+            ],
+            options={
+                'unique_together': {('test_status', 'question')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 17:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0007_answerdraft'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='evaluation',
+            name='report',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
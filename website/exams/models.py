@@ -229,32 +229,26 @@ class Answer(models.Model):
 
     def evaluate(self):
         """Evaluate answer based on section-level negative marking."""
-        section = self.question.section
-
-        if self.question.question_type == "MCQ":
-            correct_options = self.question.options.filter(is_correct=True)
-            selected_correct = self.selected_options.filter(is_correct=True).count()
-            total_correct = correct_options.count()
-            total_selected = self.selected_options.count()
-
-            if total_selected == 0:
-                self.marks_obtained = 0
-            else:
-                self.marks_obtained = self.question.marks * (selected_correct / total_correct)
-
-                # Negative marking for wrong options
-                wrong_selected = total_selected - selected_correct
-                if wrong_selected > 0 and section.negative_marking_factor > 0:
-                    negative = wrong_selected * section.negative_marking_factor
-                    self.marks_obtained -= negative
-                    if self.marks_obtained < 0:
-                        self.marks_obtained = 0
+        from .grading import grade_mcq_answers
 
         # Subjective marks are to be entered manually by teacher
-        self.save()
+        graded = grade_mcq_answers(Answer.objects.filter(pk=self.pk))
+        if self.pk in graded:
+            self.marks_obtained = graded[self.pk]
         return self.marks_obtained
 
 
+# Autosave staging rows, flushed into Answer (see exams/autosave.py)
+class AnswerDraft(models.Model):
+    test_status = models.ForeignKey(TestStatus, on_delete=models.CASCADE, related_name="answer_drafts")
+    question = models.ForeignKey(Question, on_delete=models.CASCADE)
+    payload = models.JSONField()  # {"selected": [...], "subjective": ..., "at": ...}
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ("test_status", "question")
+
+
 # ----------------------------
 # Evaluation model
 # ----------------------------
@@ -267,20 +261,58 @@ class Evaluation(models.Model):
     remarks = models.TextField(blank=True, null=True)
     evaluated_by = models.ForeignKey(Employee, on_delete=models.SET_NULL, null=True, related_name="evaluations")
     is_error_evaluating = models.BooleanField(default=False)
+    # Materialized report, see exams/results.py
+    report = models.JSONField(null=True, blank=True)
 
     def __str__(self):
         return f"{self.test_status.student} - {self.test_status.test.title} Evaluation"
 
     def calculate_totals(self):
-        """Evaluate all answesrs and compute total marks."""
-        total_marks = 0
-        obtained_marks = 0
+        """Evaluate all answers and compute total marks."""
+        from .grading import answer_totals, grade_test_status
+        from .results import materialize_reports
+
+        grade_test_status(self.test_status_id)
+        self.total_marks, self.obtained_marks = answer_totals([self.test_status_id]).get(
+            self.test_status_id, (0, 0)
+        )
+        self.save()
+        materialize_reports([self.test_status_id])
+        return self.total_marks, self.obtained_marks
 
-        for answer in self.test_status.answers.all():
-            total_marks += answer.question.marks
-            obtained_marks += answer.evaluate()
 
-        self.total_marks = total_marks
-        self.obtained_marks = obtained_marks
-        self.save()
-        return self.total_marks, self.obtained_marks
\ No newline at end of file
+# ----------------------------
+# Subjective grading job queue (see exams/jobs.py)
+# ----------------------------
+class EvaluationJob(models.Model):
+    STATUS_CHOICES = [
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ]
+
+    test_status = models.ForeignKey(TestStatus, on_delete=models.CASCADE, related_name="evaluation_jobs")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="queued")
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now, help_text="Not picked up before this time (retry backoff)")
+    locked_by = models.CharField(max_length=255, blank=True, default="")
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["created_at"]
+        indexes = [models.Index(fields=["status", "run_after"], name="idx_evaljob_status_run_after")]
+        constraints = [
+            # At most one pending job per attempt
+            models.UniqueConstraint(
+                fields=["test_status"],
+                condition=models.Q(status__in=["queued", "running"]),
+                name="uniq_active_evaluation_job",
+            )
+        ]
+
+    def __str__(self):
+        return f"Evaluation job {self.id} for {self.test_status_id} ({self.status})"
@@ -0,0 +1,88 @@
+"""
+Cached, read-only snapshot of a test's questions ("the paper").
+
+Saving an answer only needs to know which questions belong to the test,
+their type, whether they take a single answer and which option ids they
+have. That never changes while students sit the test, so it is built once
+(when a student starts or resumes it) and kept in the Django cache, which
+is the shared Redis + in-process tier when REDIS_URL is set.
+
+Keys carry a per-test version that exams.signals bumps whenever the test,
+a section, question or option is edited; the old snapshot is never read
+again.
+"""
+
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from website.shared_cache import get_or_compute
+
+from .models import Option, Question
+
+PAPER_CACHE_TTL = getattr(settings, "EXAM_PAPER_CACHE_TTL", 6 * 60 * 60)
+
+
+class PaperQuestion(NamedTuple):
+    section_id: int
+    question_type: str  # TestSection.question_mode, "MCQ" or "SUB"
+    is_single_answer: bool
+    marks: float
+    option_ids: frozenset
+
+
+class TestPaper(NamedTuple):
+    test_id: int
+    version: int
+    questions: dict  # question id -> PaperQuestion
+
+
+def _version_key(test_id: int) -> str:
+    return f"exam_paper:{test_id}:version"
+
+
+def paper_version(test_id: int) -> int:
+    version = cache.get(_version_key(test_id))
+    if version is None:
+        cache.add(_version_key(test_id), 1, None)
+        version = cache.get(_version_key(test_id), 1)
+    return version
+
+
+def invalidate_paper(test_id: int):
+    try:
+        cache.incr(_version_key(test_id))
+    except ValueError:
+        cache.add(_version_key(test_id), 1, None)
+
+
+def build_paper(test_id: int, version: int) -> TestPaper:
+    option_ids = {}
+    for option_id, question_id in Option.objects.filter(
+        question__section__test_id=test_id
+    ).values_list("id", "question_id"):
+        option_ids.setdefault(question_id, set()).add(option_id)
+
+    questions = {
+        question_id: PaperQuestion(
+            section_id=section_id,
+            question_type=question_mode,
+            is_single_answer=is_single_answer,
+            marks=marks,
+            option_ids=frozenset(option_ids.get(question_id, ())),
+        )
+        for question_id, section_id, question_mode, is_single_answer, marks in Question.objects.filter(
+            section__test_id=test_id
+        ).values_list("id", "section_id", "section__question_mode", "is_single_answer", "marks")
+    }
+    return TestPaper(test_id=test_id, version=version, questions=questions)
+
+
+def get_paper(test_id: int) -> TestPaper:
+    version = paper_version(test_id)
+    return get_or_compute(
+        f"exam_paper:{test_id}:v{version}",
+        lambda: build_paper(test_id, version),
+        PAPER_CACHE_TTL,
+    )
@@ -0,0 +1,250 @@
+"""
+Materialized exam results.
+
+When an attempt is graded its full report (per section and per question,
+with the options the student picked) is stored on Evaluation.report, so
+the report and summary endpoints are a single read. Reports for any number
+of attempts are built with a fixed number of queries.
+
+If an answer's marks change later (an employee re-marking in the admin),
+the exams.signals receiver patches just that question and the totals in
+the stored report instead of rebuilding it.
+
+cohort_stats() is the employee view across every graded attempt at a
+test: score distribution and per-question difficulty, computed in SQL.
+"""
+
+from django.db import connection, transaction
+
+from .models import Answer, Evaluation, Option, Question, TestStatus
+
+
+def _question_entry(answer, question, options, selected):
+    entry = {
+        "qs_no": question["id"],
+        "qs": question["question"],
+        "full_marks": question["marks"],
+        "obtained_marks": answer["marks_obtained"] or 0.0,
+    }
+    if question["mode"] == "MCQ":
+        entry["options"] = [
+            {
+                "option": option_name,
+                "is_correct": is_correct,
+                "is_selected": option_id in selected,
+            }
+            for option_id, option_name, is_correct in options
+        ]
+    else:
+        entry.update({
+            "answer": answer["subjective_answer"] or "",
+            "remarks": answer["remarks"] or "",
+        })
+    return entry
+
+
+def _totals(report: dict):
+    for section in report["sections"]:
+        section["total_marks"] = sum(q["full_marks"] for q in section["questions"])
+        section["obtained_marks"] = sum(q["obtained_marks"] for q in section["questions"])
+    report["total_marks"] = sum(s["total_marks"] for s in report["sections"])
+    report["obtained_marks"] = sum(s["obtained_marks"] for s in report["sections"])
+
+
+def build_reports(test_status_ids) -> dict[int, dict]:
+    """{test_status id: report} from the current Answer rows."""
+    test_status_ids = list(test_status_ids)
+    statuses = {
+        ts["id"]: ts
+        for ts in TestStatus.objects.filter(id__in=test_status_ids).values(
+            "id", "test_id", "test__title", "completed_at"
+        )
+    }
+    answers = list(
+        Answer.objects.filter(test_status_id__in=test_status_ids)
+        .values(
+            "id",
+            "test_status_id",
+            "marks_obtained",
+            "subjective_answer",
+            "remarks",
+            "question_id",
+        )
+        .order_by("question__section__order", "question__section_id", "question__order", "question_id")
+    )
+    question_ids = {a["question_id"] for a in answers}
+
+    questions, sections = {}, {}
+    for q in Question.objects.filter(id__in=question_ids).values(
+        "id", "question", "marks", "section_id", "section__title", "section__question_mode"
+    ):
+        questions[q["id"]] = {
+            "id": q["id"],
+            "question": q["question"],
+            "marks": q["marks"],
+            "mode": q["section__question_mode"],
+            "section_id": q["section_id"],
+        }
+        sections[q["section_id"]] = (q["section__title"], q["section__question_mode"])
+
+    options = {}
+    for option_id, question_id, option_name, is_correct in Option.objects.filter(
+        question_id__in=question_ids
+    ).values_list("id", "question_id", "option_name", "is_correct").order_by("id"):
+        options.setdefault(question_id, []).append((option_id, option_name, is_correct))
+
+    selected = {}
+    for answer_id, option_id in Answer.selected_options.through.objects.filter(
+        answer__test_status_id__in=test_status_ids
+    ).values_list("answer_id", "option_id"):
+        selected.setdefault(answer_id, set()).add(option_id)
+
+    reports = {}
+    for ts_id, ts in statuses.items():
+        reports[ts_id] = {
+            "test_id": ts["test_id"],
+            "test_title": ts["test__title"],
+            "attempt_time": (
+                ts["completed_at"].strftime("%Y-%m-%d %H:%M:%S") if ts["completed_at"] else None
+            ),
+            "sections": [],
+        }
+    section_entries = {}
+    for answer in answers:
+        question = questions[answer["question_id"]]
+        key = (answer["test_status_id"], question["section_id"])
+        if key not in section_entries:
+            title, mode = sections[question["section_id"]]
+            section_entries[key] = {"section": title, "question_mode": mode, "questions": []}
+            reports[answer["test_status_id"]]["sections"].append(section_entries[key])
+        section_entries[key]["questions"].append(
+            _question_entry(answer, question, options.get(question["id"], []), selected.get(answer["id"], set()))
+        )
+
+    for report in reports.values():
+        _totals(report)
+    return reports
+
+
+def materialize_reports(test_status_ids):
+    """Build and store Evaluation.report for these (graded) attempts."""
+    reports = build_reports(test_status_ids)
+    evaluations = list(Evaluation.objects.filter(test_status_id__in=reports))
+    for evaluation in evaluations:
+        evaluation.report = reports[evaluation.test_status_id]
+    Evaluation.objects.bulk_update(evaluations, ["report"])
+
+
+def refresh_answer(answer: Answer):
+    """Patch one question's marks (and subjective remarks) in a stored report."""
+    with transaction.atomic():
+        evaluation = (
+            Evaluation.objects.select_for_update()
+            .filter(test_status_id=answer.test_status_id, report__isnull=False)
+            .first()
+        )
+        if evaluation is None:
+            return
+        report = evaluation.report
+        for section in report["sections"]:
+            for question in section["questions"]:
+                if question["qs_no"] == answer.question_id:
+                    question["obtained_marks"] = answer.marks_obtained or 0.0
+                    if "remarks" in question:
+                        question["remarks"] = answer.remarks or ""
+        _totals(report)
+        evaluation.obtained_marks = report["obtained_marks"]
+        evaluation.save(update_fields=["report", "obtained_marks", "updated_at"])
+
+
+def report_summary(report: dict) -> dict:
+    """The per-section totals only (what build_section_marks_summary returns)."""
+    return {
+        "test_id": report["test_id"],
+        "test_title": report["test_title"],
+        "total_marks": report["total_marks"],
+        "obtained_marks": report["obtained_marks"],
+        "sections": [
+            {
+                "section": s["section"],
+                "question_mode": s["question_mode"],
+                "total_marks": s["total_marks"],
+                "obtained_marks": s["obtained_marks"],
+            }
+            for s in report["sections"]
+        ],
+    }
+
+
+def cohort_stats(test_id: int) -> dict:
+    """Score distribution and per-question difficulty over graded attempts."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT COUNT(*),
+                   AVG(e.obtained_marks),
+                   MIN(e.obtained_marks),
+                   MAX(e.obtained_marks),
+                   STDDEV_POP(e.obtained_marks),
+                   percentile_cont(ARRAY[0.25, 0.5, 0.75, 0.9])
+                       WITHIN GROUP (ORDER BY e.obtained_marks)
+            FROM exams_evaluation e
+            JOIN exams_teststatus ts ON ts.id = e.test_status_id
+            WHERE ts.test_id = %s AND NOT e.is_error_evaluating
+            """,
+            [test_id],
+        )
+        attempts, mean, low, high, stddev, percentiles = cursor.fetchone()
+
+        cursor.execute(
+            """
+            WITH graded AS (
+                SELECT e.test_status_id
+                FROM exams_evaluation e
+                JOIN exams_teststatus ts ON ts.id = e.test_status_id
+                WHERE ts.test_id = %s AND NOT e.is_error_evaluating
+            )
+            SELECT q.id, s.title, q.question, q.marks,
+                   COUNT(a.id),
+                   AVG(COALESCE(a.marks_obtained, 0)),
+                   SUM(CASE WHEN a.marks_obtained >= q.marks THEN 1 ELSE 0 END)
+            FROM exams_question q
+            JOIN exams_testsection s ON s.id = q.section_id
+            LEFT JOIN exams_answer a
+                   ON a.question_id = q.id
+                  AND a.test_status_id IN (SELECT test_status_id FROM graded)
+            WHERE s.test_id = %s
+            GROUP BY q.id, s.id
+            ORDER BY s."order", s.id, q."order", q.id
+            """,
+            [test_id, test_id],
+        )
+        questions = [
+            {
+                "qs_no": qs_id,
+                "section": section,
+                "qs": text,
+                "full_marks": marks,
+                "answered": answered,
+                "mean_marks": mean_marks,
+                "full_marks_count": full_count or 0,
+                # Share of the marks students did NOT get: 0 easy .. 1 hard
+                "difficulty": (
+                    round(1 - mean_marks / marks, 4) if answered and marks else None
+                ),
+            }
+            for qs_id, section, text, marks, answered, mean_marks, full_count in cursor.fetchall()
+        ]
+
+    p25, median, p75, p90 = percentiles or (None, None, None, None)
+    return {
+        "status": "success",
+        "test_id": test_id,
+        "attempts": attempts,
+        "mean": mean,
+        "min": low,
+        "max": high,
+        "stddev": stddev,
+        "percentiles": {"p25": p25, "p50": median, "p75": p75, "p90": p90},
+        "questions": questions,
+    }
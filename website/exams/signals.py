@@ -0,0 +1,52 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Answer, Option, Question, Test, TestSection
+from .paper import invalidate_paper
+from .results import refresh_answer
+
+
+def _invalidate(test_id):
+    if test_id is None:
+        return
+    # Again after commit, so a paper built from the pre-commit rows in the
+    # meantime isn't kept under the new version
+    invalidate_paper(test_id)
+    transaction.on_commit(lambda: invalidate_paper(test_id))
+
+
+@receiver(post_save, sender=Test)
+@receiver(post_delete, sender=Test)
+def test_changed(sender, instance, **kwargs):
+    _invalidate(instance.pk)
+
+
+@receiver(post_save, sender=TestSection)
+@receiver(post_delete, sender=TestSection)
+def section_changed(sender, instance, **kwargs):
+    _invalidate(instance.test_id)
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def question_changed(sender, instance, **kwargs):
+    test_id = TestSection.objects.filter(pk=instance.section_id).values_list("test_id", flat=True).first()
+    _invalidate(test_id)
+
+
+@receiver(post_save, sender=Option)
+@receiver(post_delete, sender=Option)
+def option_changed(sender, instance, **kwargs):
+    test_id = Question.objects.filter(pk=instance.question_id).values_list("section__test_id", flat=True).first()
+    _invalidate(test_id)
+
+
+@receiver(post_save, sender=Answer)
+def answer_marked(sender, instance, created, update_fields=None, **kwargs):
+    # New answers come in while the test is running, long before any report
+    if created:
+        return
+    if update_fields is not None and not {"marks_obtained", "remarks"} & set(update_fields):
+        return
+    refresh_answer(instance)
@@ -1,3 +1,143 @@
+import json
+from datetime import datetime, timedelta
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+
+from student.models import Student
+
+from .autosave import _apply, _status_key, answer_buffer, flush_pending
+from .jobs import LOCK_TIMEOUT, _retry_or_fail, claim_jobs, process_jobs
+from .models import Answer, Evaluation, EvaluationJob, Option, Question, Test, TestSection, TestStatus
+
+
+class AutosaveSubmitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.student = Student.objects.create(phone_number="9000000001", is_otp_verified=True, full_name="Asha")
+        self.test = Test.objects.create(title="Mock IELTS")
+        section = TestSection.objects.create(test=self.test, title="Reading", question_mode="MCQ")
+        self.question = Question.objects.create(section=section, question="2 + 2?")
+        self.right = Option.objects.create(question=self.question, option_name="4", is_correct=True)
+        self.wrong = Option.objects.create(question=self.question, option_name="5")
+        self.status = TestStatus.objects.create(
+            student=self.student,
+            test=self.test,
+            deadline=timezone.now() + timedelta(days=1),
+            status="ongoing",
+            started_at=timezone.now(),
+            valid_till=timezone.now() + timedelta(hours=1),
+        )
+
+    def post(self, url, payload):
+        return self.client.post(
+            url, json.dumps(payload), content_type="application/json", HTTP_AUTHORIZATION=str(self.student.authToken)
+        )
+
+    def autosave(self, option):
+        return self.post(
+            "/exams/student/autosave_answer/",
+            {"test_id": self.test.id, "question_id": self.question.id, "selected_option_ids": [option.id]},
+        )
+
+    def submit(self):
+        return self.post("/exams/student/submit_test/", {"test_id": self.test.id})
+
+    def selected(self):
+        answer = Answer.objects.get(test_status=self.status, question=self.question)
+        return set(answer.selected_options.values_list("id", flat=True))
+
+    def test_submit_flushes_autosaves(self):
+        self.assertEqual(self.autosave(self.wrong).status_code, 200)
+        self.assertEqual(self.autosave(self.right).status_code, 200)
+        self.assertFalse(Answer.objects.exists())
+
+        self.assertEqual(self.submit().status_code, 200)
+
+        self.status.refresh_from_db()
+        self.assertEqual(self.status.status, "completed")
+        self.assertEqual(self.selected(), {self.right.id})
+        self.assertEqual(answer_buffer.pending(10), [])
+
+    def test_autosave_after_submit_is_discarded(self):
+        self.autosave(self.right)
+        self.submit()
+
+        # Another worker still has the attempt cached as live
+        cache.set(_status_key(self.student.id, self.test.id), (self.status.id, self.status.valid_till), 60)
+        self.assertEqual(self.autosave(self.wrong).status_code, 200)
+        flush_pending()
+
+        self.assertEqual(self.selected(), {self.right.id})
+        self.assertEqual(answer_buffer.pending(10), [])
+
+    def test_autosave_rejected_once_submit_clears_live_status(self):
+        self.submit()
+        response = self.autosave(self.right)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Answer.objects.exists())
+
+    def test_flush_skips_expired_attempts(self):
+        answer_buffer.put(self.status.id, self.question.id, {self.wrong.id}, None)
+        TestStatus.objects.filter(pk=self.status.pk).update(status="expired")
+        flush_pending()
+        self.assertFalse(Answer.objects.exists())
+        self.assertEqual(answer_buffer.pending(10), [])
+
+    def test_explicit_save_during_flush_wins(self):
+        self.autosave(self.wrong)
+        # The flush has read the drafts when save_answer comes in
+        entries = answer_buffer.read([self.status.id])
+        response = self.post(
+            "/exams/student/save_answer/",
+            {"test_id": self.test.id, "question_id": self.question.id, "selected_option_ids": [self.right.id]},
+        )
+        self.assertEqual(response.status_code, 200)
+        _apply(entries)
+        self.assertEqual(self.selected(), {self.right.id})
+
+    def test_drafted_answer_keeps_its_draft_time(self):
+        self.autosave(self.right)
+        drafted_at = datetime.fromisoformat(answer_buffer.read([self.status.id])[0][2]["at"])
+        flush_pending()
+        answer = Answer.objects.get(test_status=self.status, question=self.question)
+        self.assertEqual(answer.answered_at, drafted_at)
+
+
+class EvaluationJobReclaimTests(TestCase):
+    def setUp(self):
+        student = Student.objects.create(phone_number="9000000001", is_otp_verified=True, full_name="Asha")
+        status = TestStatus.objects.create(
+            student=student,
+            test=Test.objects.create(title="Mock IELTS"),
+            deadline=timezone.now() + timedelta(days=1),
+            status="completed",
+        )
+        self.job = EvaluationJob.objects.create(test_status=status)
+
+    def reclaim(self):
+        """Claimed by a worker that then stalls past LOCK_TIMEOUT, and claimed again."""
+        (stale,) = claim_jobs(1, "slow-worker")
+        EvaluationJob.objects.filter(pk=stale.pk).update(
+            locked_at=timezone.now() - timedelta(seconds=LOCK_TIMEOUT + 1)
+        )
+        (current,) = claim_jobs(1, "other-worker")
+        return stale, current
+
+    def test_stale_worker_cannot_finish_the_job(self):
+        stale, current = self.reclaim()
+        with self.assertLogs("exams.jobs", "WARNING"):
+            self.assertEqual(process_jobs([stale]), 0)
+        self.assertFalse(Evaluation.objects.exists())
+
+        self.assertEqual(process_jobs([current]), 1)
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, "done")
 
-# Create your tests here.
+    def test_stale_worker_cannot_requeue_the_job(self):
+        stale, _ = self.reclaim()
+        with self.assertLogs("exams.jobs", "WARNING"):
+            _retry_or_fail(stale, "LLM timed out")
+        self.job.refresh_from_db()
+        self.assertEqual((self.job.status, self.job.locked_by), ("running", "other-worker"))
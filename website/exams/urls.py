@@ -13,7 +13,11 @@ urlpatterns = [
     path("student/get_test_details/", get_test_rules_view ),
     path("student/start_test/",start_or_resume_test_view),
     path("student/save_answer/", save_student_answer_view),
+    path("student/autosave_answer/", autosave_answer_view),
     path("student/confirm_submit/", confirm_before_submit_view),
     path("student/submit_test/", submit_test_view),
     path("result/", evaluate_subjective_answers),
+    path("result/status/", evaluation_job_status_view),
+    path("result/report/", test_report_view),
+    path("result/cohort/", test_cohort_results_view),
 ]
\ No newline at end of file
@@ -6,6 +6,8 @@ from website.utils import token_required, user_token_required
 from django.db import connection, transaction
 from django.utils import timezone
 from exams.models import TestStatus, Question, Option, Answer
+from exams.paper import get_paper
+from exams.autosave import answer_buffer, flush as flush_autosaves, forget_test_status, live_test_status
 
 # @csrf_exempt
 # @token_required
@@ -405,6 +407,9 @@ def start_or_resume_test_view(request):
 
     # ✅ Step 4: Call your existing SQL function to start/resume the test
     try:
+        # Build the paper now so saving answers only does cached lookups
+        get_paper(int(test_id))
+
         with connection.cursor() as cursor:
             cursor.execute("SELECT start_or_resume_test(%s, %s)", [student_id, test_id])
             result = cursor.fetchone()[0]
@@ -424,6 +429,44 @@ def start_or_resume_test_view(request):
 
 
 
+def _check_selection(question, selected_option_ids):
+    """Error message if the selection doesn't fit the (paper) question."""
+    if question.question_type == "MCQ":
+        # Validate option IDs
+        if any(opt_id not in question.option_ids for opt_id in selected_option_ids):
+            return "One or more selected options are invalid"
+
+        # Check single-answer constraint
+        if question.is_single_answer and len(selected_option_ids) > 1:
+            return "This question allows only a single answer"
+    return None
+
+
+def _normalize_subjective(subjective_answer):
+    if subjective_answer is not None:
+        subjective_answer = subjective_answer.strip()
+        if subjective_answer == "":
+            subjective_answer = None
+    return subjective_answer
+
+
+def _write_selected_options(answer, selected: set, created: bool):
+    """Insert/delete only the selection rows that changed."""
+    through = Answer.selected_options.through
+    current = set() if created else set(
+        through.objects.filter(answer_id=answer.pk).values_list("option_id", flat=True)
+    )
+    removed = current - selected
+    added = selected - current
+    if removed:
+        through.objects.filter(answer_id=answer.pk, option_id__in=removed).delete()
+    if added:
+        through.objects.bulk_create(
+            [through(answer_id=answer.pk, option_id=option_id) for option_id in added],
+            ignore_conflicts=True,
+        )
+
+
 @csrf_exempt
 @user_token_required
 def save_student_answer_view(request):
@@ -456,52 +499,45 @@ def save_student_answer_view(request):
                 test_status.save()
             return JsonResponse({"status": "error", "message": "Test time has expired"}, status=400)
 
-        # Fetch question
+        # Validate against the cached paper (exams/paper.py), no queries
         try:
-            question = Question.objects.get(id=question_id, section__test_id=test_id)
-        except Question.DoesNotExist:
+            question_id = int(question_id)
+        except (TypeError, ValueError):
+            return JsonResponse({"status": "error", "message": "Invalid question_id"}, status=400)
+        question = get_paper(test_status.test_id).questions.get(question_id)
+        if question is None:
             return JsonResponse({"status": "error", "message": "Question does not belong to this test"}, status=400)
 
-        # Handle MCQ
-        if question.question_type == "MCQ":
-            # Validate option IDs
-            valid_option_ids = set(Option.objects.filter(question=question).values_list('id', flat=True))
-            if any(opt_id not in valid_option_ids for opt_id in selected_option_ids):
-                return JsonResponse({"status": "error", "message": "One or more selected options are invalid"}, status=400)
-
-            # Check single-answer constraint
-            if question.is_single_answer and len(selected_option_ids) > 1:
-                return JsonResponse({"status": "error", "message": "This question allows only a single answer"}, status=400)
-
-        # Normalize subjective answer
-        if subjective_answer is not None:
-            subjective_answer = subjective_answer.strip()
-            if subjective_answer == "":
-                subjective_answer = None
-
-        # Fetch or create Answer
-        answer, created = Answer.objects.get_or_create(
-            test_status=test_status,
-            question=question,
-            defaults={
-                "subjective_answer": subjective_answer,
-                "marks_obtained": 0
-            }
-        )
+        error = _check_selection(question, selected_option_ids)
+        if error:
+            return JsonResponse({"status": "error", "message": error}, status=400)
 
-        # Update answer if exists
-        if not created:
-            answer.subjective_answer = subjective_answer
-            answer.selected_options.clear()
+        subjective_answer = _normalize_subjective(subjective_answer)
 
-        # Set selected options for MCQ
-        if question.question_type == "MCQ":
-            if selected_option_ids:
-                options = Option.objects.filter(id__in=selected_option_ids)
-                answer.selected_options.add(*options)
+        # An older autosave must not overwrite this once flushed
+        answer_buffer.discard(test_status.id, question_id)
 
-        answer.answered_at = timezone.now()
-        answer.save()
+        with transaction.atomic():
+            # Fetch or create Answer
+            answer, created = Answer.objects.get_or_create(
+                test_status=test_status,
+                question_id=question_id,
+                defaults={
+                    "subjective_answer": subjective_answer,
+                    "marks_obtained": 0
+                }
+            )
+
+            # Update answer if exists
+            if not created:
+                Answer.objects.filter(pk=answer.pk).update(
+                    subjective_answer=subjective_answer,
+                    answered_at=timezone.now(),
+                )
+
+            # Set selected options for MCQ (subjective answers have none)
+            selected = set(selected_option_ids) if question.question_type == "MCQ" else set()
+            _write_selected_options(answer, selected, created)
 
         return JsonResponse({"status": "success", "message": "Answer saved successfully"}, status=200)
 
@@ -511,6 +547,58 @@ def save_student_answer_view(request):
         return JsonResponse({"status": "error", "message": str(e)}, status=500)
 
 
+@csrf_exempt
+@user_token_required
+def autosave_answer_view(request):
+    """
+    Like save_answer, but the answer only goes into the autosave buffer
+    (exams/autosave.py); it reaches Answer on the next flush or on submit.
+    """
+    if request.method != "POST":
+        return JsonResponse({"status": "error", "message": "Invalid request method"}, status=405)
+
+    try:
+        payload = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({"status": "error", "message": "Invalid JSON payload"}, status=400)
+
+    test_id = payload.get("test_id")
+    question_id = payload.get("question_id")
+    selected_option_ids = payload.get("selected_option_ids") or []
+    if not test_id or not question_id:
+        return JsonResponse({"status": "error", "message": "Missing test_id or question_id"}, status=400)
+    try:
+        test_id, question_id = int(test_id), int(question_id)
+    except (TypeError, ValueError):
+        return JsonResponse({"status": "error", "message": "Invalid test_id or question_id"}, status=400)
+
+    live = live_test_status(request.user.id, test_id)
+    if live is None:
+        return JsonResponse({"status": "error", "message": "Test is not in progress"}, status=400)
+    test_status_id, valid_till = live
+    if valid_till and valid_till < timezone.now():
+        return JsonResponse({"status": "error", "message": "Test time has expired"}, status=400)
+
+    question = get_paper(test_id).questions.get(question_id)
+    if question is None:
+        return JsonResponse({"status": "error", "message": "Question does not belong to this test"}, status=400)
+    error = _check_selection(question, selected_option_ids)
+    if error:
+        return JsonResponse({"status": "error", "message": error}, status=400)
+
+    selected = set(selected_option_ids) if question.question_type == "MCQ" else set()
+    answer_buffer.put(test_status_id, question_id, selected, _normalize_subjective(payload.get("subjective_answer")))
+    return JsonResponse({"status": "success", "message": "Answer saved"}, status=200)
+
+
+def _flush_autosaves(student_id, test_id):
+    test_status_id = TestStatus.objects.filter(student_id=student_id, test_id=test_id).values_list(
+        "id", flat=True
+    ).first()
+    if test_status_id:
+        flush_autosaves([test_status_id])
+
+
 @csrf_exempt
 @user_token_required
 def confirm_before_submit_view(request):
@@ -529,6 +617,9 @@ def confirm_before_submit_view(request):
         return JsonResponse({"status": "error", "message": "test_id is required"}, status=400)
 
     try:
+        # Count what was autosaved too
+        _flush_autosaves(student_id, test_id)
+
         with connection.cursor() as cursor:
             cursor.execute(
                 "SELECT confirm_before_submit(%s, %s)",
@@ -561,16 +652,27 @@ def submit_test_view(request):
 
         now = timezone.now()
 
-        with connection.cursor() as cursor:
-            cursor.execute("""
-                UPDATE exams_teststatus
-                SET status = 'completed',
-                    completed_at = %s
-                WHERE student_id = %s AND test_id = %s
-                  AND status = 'ongoing'
-                RETURNING id
-            """, [now, student_id, test_id])
-            updated = cursor.fetchone()
+        with transaction.atomic():
+            # Autosave flushes wait on this lock, then find the attempt completed
+            test_status_id = TestStatus.objects.select_for_update().filter(
+                student_id=student_id, test_id=test_id, status="ongoing"
+            ).values_list("id", flat=True).first()
+
+            # Every autosaved answer is in Answer before the attempt closes
+            if test_status_id:
+                flush_autosaves([test_status_id])
+
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                    UPDATE exams_teststatus
+                    SET status = 'completed',
+                        completed_at = %s
+                    WHERE student_id = %s AND test_id = %s
+                      AND status = 'ongoing'
+                    RETURNING id
+                """, [now, student_id, test_id])
+                updated = cursor.fetchone()
+        forget_test_status(student_id, test_id)
 
         if updated:
             return JsonResponse({"status": "success", "message": "Test marked as completed", "completed_at": now})
@@ -595,7 +697,10 @@ from django.utils import timezone
 from .models import TestStatus, Answer, Evaluation, Test
 from exams.models import TestStatus, Answer, Evaluation
 from website.utils import user_token_required
-from .utils import get_subjective_eval_chain, subjective_eval_parser
+from .grading import answer_totals, grade_test_status
+from .jobs import ACTIVE_STATUSES, enqueue_evaluation, job_progress
+from .results import build_reports, cohort_stats, materialize_reports, report_summary
+from .models import EvaluationJob
 
 logger = logging.getLogger(__name__)
 
@@ -659,97 +764,20 @@ from django.utils import timezone
 
 def build_test_report(test_status, evaluation):
     """
-    Build structured report of evaluated test with per-question marks,
-    properly handling multiple selected options and negative marking.
+    Structured report of an evaluated test with per-question marks and the
+    options picked. Served from the report materialized at grading time
+    (exams/results.py); built on the fly for evaluations from before that.
     """
-    answers = (
-        Answer.objects.filter(test_status=test_status)
-        .select_related("question", "question__section")
-        .prefetch_related("selected_options", "question__options")
-    )
-
-    report = {
-        "status": "success",
-        "test_id": test_status.test.id,
-        "test_title": test_status.test.title,
-        "attempt_time": (
-            test_status.completed_at.strftime("%Y-%m-%d %H:%M:%S")
-            if test_status.completed_at
-            else None
-        ),
-        "total_marks": evaluation.total_marks,
-        "obtained_marks": evaluation.obtained_marks,
-        "sections": [],
-    }
-
-    sections = {}
-    for ans in answers:
-        section = ans.question.section
-        section_name = section.title
-
-        if section_name not in sections:
-            sections[section_name] = {
-                "section": section_name,
-                "question_mode": section.question_mode,
-                "questions": []
-            }
-
-        q_data = {
-            "qs_no": ans.question.id,
-            "qs": ans.question.question,
-            "full_marks": ans.question.marks,
-        }
-
-        if section.question_mode == "MCQ":
-            # Prepare selected and correct options
-            selected_ids = set(ans.selected_options.values_list("id", flat=True))
-            options = []
-            correct_count = 0
-            selected_correct_count = 0
-            total_selected = len(selected_ids)
-
-            for opt in ans.question.options.all():
-                is_correct = opt.is_correct
-                is_selected = opt.id in selected_ids
-                options.append({
-                    "option": opt.option_name,
-                    "is_correct": is_correct,
-                    "is_selected": is_selected
-                })
-                if is_correct:
-                    correct_count += 1
-                    if is_selected:
-                        selected_correct_count += 1
-
-            # Calculate marks including negative marking
-            marks_obtained = 0.0
-            if total_selected > 0 and correct_count > 0:
-                # Positive marks proportion
-                marks_obtained = ans.question.marks * (selected_correct_count / correct_count)
-                # Negative marks for wrong options
-                wrong_selected = total_selected - selected_correct_count
-                if wrong_selected > 0 and section.negative_marking_factor > 0:
-                    negative = wrong_selected * section.negative_marking_factor
-                    marks_obtained -= negative
-                    if marks_obtained < 0:
-                        marks_obtained = 0.0
-            q_data["obtained_marks"] = marks_obtained
-            q_data["options"] = options
-
-        else:  # Subjective
-            q_data.update({
-                "obtained_marks": ans.marks_obtained or 0.0,
-                "answer": ans.subjective_answer or "",
-                "remarks": ans.remarks or "",
-            })
-
-        sections[section_name]["questions"].append(q_data)
-
-    report["sections"] = list(sections.values())
-    return report
+    report = evaluation.report if evaluation and evaluation.report else None
+    if report is None:
+        report = build_reports([test_status.id])[test_status.id]
+    return {"status": "success", **report}
 
 
 def build_section_marks_summary(test_status, evaluation=None):
+    if evaluation is not None and evaluation.report:
+        return {"status": "success", **report_summary(evaluation.report)}
+
     answers = (
         Answer.objects.filter(test_status=test_status)
         .select_related("question", "question__section")
@@ -828,88 +856,93 @@ def evaluate_subjective_answers(request):
         # Already evaluated → build report & return immediately
         return JsonResponse(build_section_marks_summary(test_status, evaluation), status=200)
 
-    # Step 4: Evaluate MCQs
-    mcq_answers = Answer.objects.filter(
-        test_status=test_status,
-        question__section__question_mode="MCQ"
-    ).select_related("question", "question__section").prefetch_related("selected_options", "selected_options__question")
+    job = EvaluationJob.objects.filter(test_status=test_status, status__in=ACTIVE_STATUSES).first()
+    if job:
+        return JsonResponse(job_progress(job), status=202)
 
-    for ans in mcq_answers:
-        try:
-            ans.evaluate()
-            if ans.marks_obtained is None or ans.marks_obtained < 0:
-                ans.marks_obtained = 0
-            if ans.marks_obtained > ans.question.marks:
-                ans.marks_obtained = ans.question.marks
-            ans.save(update_fields=["marks_obtained"])
-        except Exception:
-            logger.exception("Error evaluating MCQ id=%s for test_status id=%s", ans.id, test_status.id)
-            return JsonResponse({"status": "error", "message": "MCQ evaluation failed"}, status=500)
-
-    # Step 5: Subjective evaluation
-    subjective_answers_qs = Answer.objects.filter(
-        test_status=test_status,
-        question__section__question_mode="SUB"
-    ).select_related("question")
-
-    if subjective_answers_qs.exists():
-        data_for_ai = [
-            {
-                "qs_id": ans.id,
-                "qs": ans.question.question,
-                "qs_answer": ans.subjective_answer or "",
-                "qs_max_marks": ans.question.marks,
-            }
-            for ans in subjective_answers_qs
-        ]
+    # Step 4: Evaluate MCQs (constant number of queries, see exams/grading.py)
+    try:
+        grade_test_status(test_status.id)
+    except Exception:
+        logger.exception("Error evaluating MCQs for test_status id=%s", test_status.id)
+        return JsonResponse({"status": "error", "message": "MCQ evaluation failed"}, status=500)
 
-        try:
-            chain = get_subjective_eval_chain()
-            format_instructions = subjective_eval_parser.get_format_instructions()
-            raw_ai_output = chain.invoke({
-                "subjective_data_json": json.dumps(data_for_ai),
-                "format_instructions": format_instructions
-            })
-            evaluations_output = safe_jsonify_llm_output(raw_ai_output)
-        except Exception:
-            logger.exception("LLM subjective eval failed")
-            evaluation, _ = Evaluation.objects.get_or_create(test_status=test_status)
-            evaluation.is_error_evaluating = True
-            evaluation.save(update_fields=["is_error_evaluating"])
-            return JsonResponse({"status": "error", "message": "Subjective evaluation failed"}, status=500)
-
-        # Map marks
-        marks_map = {}
-        for item in evaluations_output:
-            try:
-                qs_id = int(item.get("qs_id") or item.get("id"))
-                marks = float(item.get("marks") or item.get("score"))
-                marks_map[qs_id] = marks
-            except Exception:
-                logger.warning("Invalid item in eval output: %s", item)
-
-        # Apply marks
-        for ans in subjective_answers_qs:
-            val = marks_map.get(ans.id, 0.0)
-            if val < 0:
-                val = 0
-            if val > ans.question.marks:
-                val = ans.question.marks
-            ans.marks_obtained = val
-            ans.save(update_fields=["marks_obtained"])
+    # Step 5: Subjective evaluation runs on the evaluation workers (exams/jobs.py);
+    # poll result/status/ with the job id
+    if Answer.objects.filter(test_status=test_status, question__section__question_mode="SUB").exists():
+        job = enqueue_evaluation(test_status)
+        return JsonResponse(job_progress(job), status=202)
 
     # Step 6: Finalize totals
-    total_marks = 0
-    obtained_marks = 0
-    for ans in Answer.objects.filter(test_status=test_status).select_related("question"):
-        total_marks += ans.question.marks
-        obtained_marks += ans.marks_obtained or 0
+    total_marks, obtained_marks = answer_totals([test_status.id]).get(test_status.id, (0, 0))
 
     evaluation, _ = Evaluation.objects.get_or_create(test_status=test_status)
     evaluation.total_marks = total_marks
     evaluation.obtained_marks = obtained_marks
     evaluation.is_error_evaluating = False
     evaluation.save()
+    materialize_reports([test_status.id])
+    evaluation.refresh_from_db(fields=["report"])
 
     # Step 7: Return structured report
-    return JsonResponse(build_section_marks_summary(test_status, evaluation), status=200)
\ No newline at end of file
+    return JsonResponse(build_section_marks_summary(test_status, evaluation), status=200)
+
+
+@csrf_exempt
+@user_token_required
+def evaluation_job_status_view(request):
+    if request.method != "GET":
+        return JsonResponse({"status": "error", "message": "Invalid request method"}, status=405)
+
+    job_id = request.GET.get("job_id")
+    if not job_id:
+        return JsonResponse({"status": "error", "message": "job_id is required"}, status=400)
+
+    try:
+        job = EvaluationJob.objects.select_related("test_status", "test_status__test").get(
+            id=job_id, test_status__student_id=request.user.id
+        )
+    except (EvaluationJob.DoesNotExist, ValueError):
+        return JsonResponse({"status": "error", "message": "Job not found"}, status=404)
+
+    progress = job_progress(job)
+    if job.status == "done":
+        evaluation = Evaluation.objects.filter(test_status=job.test_status).first()
+        progress["result"] = build_section_marks_summary(job.test_status, evaluation)
+    return JsonResponse(progress, status=200)
+
+
+@csrf_exempt
+@user_token_required
+def test_report_view(request):
+    if request.method != "GET":
+        return JsonResponse({"status": "error", "message": "Invalid request method"}, status=405)
+
+    test_id = request.GET.get("test_id")
+    if not test_id:
+        return JsonResponse({"status": "error", "message": "test_id is required"}, status=400)
+
+    evaluation = (
+        Evaluation.objects.select_related("test_status")
+        .filter(test_status__student_id=request.user.id, test_status__test_id=test_id, is_error_evaluating=False)
+        .first()
+    )
+    if evaluation is None:
+        return JsonResponse({"status": "error", "message": "Test not evaluated yet"}, status=404)
+    return JsonResponse(build_test_report(evaluation.test_status, evaluation), status=200)
+
+
+@csrf_exempt
+@token_required
+def test_cohort_results_view(request):
+    if request.method != "GET":
+        return JsonResponse({"status": "error", "message": "Invalid request method"}, status=405)
+
+    try:
+        test_id = int(request.GET.get("test_id", ""))
+    except ValueError:
+        return JsonResponse({"status": "error", "message": "test_id is required"}, status=400)
+    if not Test.objects.filter(id=test_id).exists():
+        return JsonResponse({"status": "error", "message": "Test not found"}, status=404)
+
+    return JsonResponse(cohort_stats(test_id), status=200)
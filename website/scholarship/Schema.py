@@ -5,9 +5,12 @@ from typing import List, Optional, Annotated
 
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import transaction
-from django.db.models import Q
 from graphql import GraphQLError
 from authentication.Utils import SchemaMixin
+from strawberry import Info
+from website.fuzzy_search import fuzzy_query
+from website.loaders import get_loaders
+from authentication.permissions import permission_resolver
 from scholarship.models import Scholarship, ExpenseType, ScholarshipExpenseCoverage, FAQ
 from university.models import Country, university
 
@@ -26,11 +29,9 @@ class ExpenseTypeSchema(SchemaMixin):
         if not emp:
             raise GraphQLError("Unauthorized")
         if not emp.is_superuser:
-            has_permission = emp.job_roles.filter(
-                Q(permissions__name="scholarship_add") |
-                Q(permissions__name="scholarship_update") |
-                Q(permissions__name="scholarship_view")
-            ).exists()
+            has_permission = permission_resolver.has_any_perm(
+                emp, ["scholarship_add", "scholarship_update", "scholarship_view"]
+            )
             if not has_permission:
                 raise GraphQLError("Insufficient Permissions")
 
@@ -65,11 +66,9 @@ class CountryNameSchema(SchemaMixin):
                 raise GraphQLError("Unauthorized")
 
             if not emp.is_superuser:
-                has_permission = emp.job_roles.filter(
-                    Q(permissions__name="scholarship_add") |
-                    Q(permissions__name="scholarship_update") |
-                    Q(permissions__name="scholarship_view")
-                ).exists()
+                has_permission = permission_resolver.has_any_perm(
+                    emp, ["scholarship_add", "scholarship_update", "scholarship_view"]
+                )
                 if not has_permission:
                     raise GraphQLError("Insufficient Permissions")
 
@@ -186,11 +185,64 @@ class ScholarshipSchema(SchemaMixin):
     type_of_scholarship: str = strawberry.field(description="Scholarship category")
     brochure: Optional[str] = strawberry.field(default=None, description="Brochure URL")
 
-    university: List[UniSchema] = strawberry.field(description="Associated universities")
-    eligible_nationalities: List[CountryNameSchema] = strawberry.field(description="Eligible countries")
-
-    scholarship_expense: List[ScholarshipExpenseCoverageSchema] = strawberry.field(description="Expense coverage details")
-    faqs: List[FAQSchema] = strawberry.field(description="Frequently asked questions")
+    # Built up front by add/edit; the list view names them in `deferred`
+    # and they are batch loaded only if the client selects them.
+    university: strawberry.Private[Optional[List[UniSchema]]] = None
+    eligible_nationalities: strawberry.Private[Optional[List[CountryNameSchema]]] = None
+    scholarship_expense: strawberry.Private[Optional[List[ScholarshipExpenseCoverageSchema]]] = None
+    faqs: strawberry.Private[Optional[List[FAQSchema]]] = None
+    deferred: strawberry.Private[frozenset] = frozenset()
+
+    NESTED_FIELDS = frozenset({"university", "eligible_nationalities", "scholarship_expense", "faqs"})
+
+    @strawberry.field(name="university", description="Associated universities")
+    def resolve_university(self, info: Info) -> List[UniSchema]:
+        if "university" not in self.deferred:
+            return self.university
+        loaders = get_loaders(info)
+        universities = loaders.universities.load_many(
+            loaders.university_ids_by_scholarship.load(self.id)
+        )
+        return [UniSchema(id=u.id, name=u.name) for u in universities if u]
+
+    @strawberry.field(name="eligibleNationalities", description="Eligible countries")
+    def resolve_eligible_nationalities(self, info: Info) -> List[CountryNameSchema]:
+        if "eligible_nationalities" not in self.deferred:
+            return self.eligible_nationalities
+        loaders = get_loaders(info)
+        countries = loaders.countries.load_many(
+            loaders.nationality_ids_by_scholarship.load(self.id)
+        )
+        return [CountryNameSchema(id=c.id, name=c.name) for c in countries if c]
+
+    @strawberry.field(name="scholarshipExpense", description="Expense coverage details")
+    def resolve_scholarship_expense(self, info: Info) -> List[ScholarshipExpenseCoverageSchema]:
+        if "scholarship_expense" not in self.deferred:
+            return self.scholarship_expense
+        return [
+            ScholarshipExpenseCoverageSchema(
+                id=exp.id,
+                expense_type=ExpenseTypeSchema(
+                    id=exp.expense_type.id,
+                    name=exp.expense_type.name
+                ),
+                is_covered=exp.is_covered
+            )
+            for exp in get_loaders(info).expense_coverages_by_scholarship.load(self.id)
+        ]
+
+    @strawberry.field(name="faqs", description="Frequently asked questions")
+    def resolve_faqs(self, info: Info) -> List[FAQSchema]:
+        if "faqs" not in self.deferred:
+            return self.faqs
+        return [
+            FAQSchema(
+                id=faq.id,
+                question=faq.question,
+                answer=faq.answer
+            )
+            for faq in get_loaders(info).faqs_by_scholarship.load(self.id)
+        ]
 
     @classmethod
     def add_scholarship(
@@ -209,9 +261,7 @@ class ScholarshipSchema(SchemaMixin):
             raise GraphQLError("Invalid or expired token")
 
         if not emp.is_superuser:
-            if not emp.job_roles.filter(
-                    permissions__name="scholarship_add"
-            ).exists():
+            if not permission_resolver.has_perms(emp, ["scholarship_add"]):
                 raise GraphQLError("You do not have permission to add scholarships")
 
         if not scholarship:
@@ -369,9 +419,7 @@ class ScholarshipSchema(SchemaMixin):
         if not emp:
             raise GraphQLError("Unauthorized")
         if not emp.is_superuser:
-            has_permission = emp.job_roles.filter(
-                permissions__name="scholarship_update"
-            ).exists()
+            has_permission = permission_resolver.has_perms(emp, ["scholarship_update"])
             if not has_permission:
                 raise GraphQLError("Insufficient Permissions")
 
@@ -581,6 +629,7 @@ class ScholarshipListSchema(SchemaMixin):
 
     @classmethod
     def scholarships(cls,
+                     info: Info,
                      auth_token: Annotated[str, strawberry.field(description="Authorization token")],
                      page: int,
                      limit: int,
@@ -596,9 +645,7 @@ class ScholarshipListSchema(SchemaMixin):
         if not emp:
             raise GraphQLError("Unauthorized")
         if not emp.is_superuser:
-            has_permission = emp.job_roles.filter(
-                permissions__name="scholarship_view"
-            ).exists()
+            has_permission = permission_resolver.has_perms(emp, ["scholarship_view"])
             if not has_permission:
                 raise GraphQLError("Insufficient Permissions")
 
@@ -610,21 +657,18 @@ class ScholarshipListSchema(SchemaMixin):
         offset = (page - 1) * limit
 
         try:
-            qs = Scholarship.objects.select_related("country").prefetch_related(
-                "university",
-                "eligible_nationalities",
-                "expense_coverages__expense_type",
-                "faqs"
-            )
+            qs = Scholarship.objects.select_related("country")
             if scholarship_id:
                 qs = qs.filter(id=scholarship_id)
             if country_id:
                 qs = qs.filter(country_id=country_id)
-            if query:
-                qs = qs.filter(
-                    Q(name__icontains=query) |
-                    Q(course__icontains=query) |
-                    Q(awarded_by__icontains=query)
+            search = fuzzy_query(query)
+            if search:
+                search_fields = ("name", "course", "awarded_by")
+                qs = (
+                    qs.filter(search.q(*search_fields))
+                    .annotate(rank=search.rank_expression(*search_fields))
+                    .order_by("-rank", "name")
                 )
 
             total = qs.count()
@@ -632,39 +676,6 @@ class ScholarshipListSchema(SchemaMixin):
             results = []
 
             for sch in qs:
-                universities = [
-                    UniSchema(
-                        id=uni.id,
-                        name=uni.name
-                    )
-                    for uni in sch.university.all()
-                ]
-                countries = [
-                    CountryNameSchema(
-                        id=country.id,
-                        name=country.name
-                    )
-                    for country in sch.eligible_nationalities.all()
-                ]
-                expenses = [
-                    ScholarshipExpenseCoverageSchema(
-                        id=exp.id,
-                        expense_type=ExpenseTypeSchema(
-                            id=exp.expense_type.id,
-                            name=exp.expense_type.name
-                        ),
-                        is_covered=exp.is_covered
-                    )
-                    for exp in sch.expense_coverages.all()
-                ]
-                faqs = [
-                    FAQSchema(
-                        id=faq.id,
-                        question=faq.question,
-                        answer=faq.answer
-                    )
-                    for faq in sch.faqs.all()
-                ]
                 scholarship_obj = ScholarshipSchema(
                     id=sch.id,
                     name=sch.name,
@@ -680,14 +691,17 @@ class ScholarshipListSchema(SchemaMixin):
                     no_of_students=sch.no_of_students,
                     type_of_scholarship=sch.type_of_scholarship,
                     brochure=sch.brochure,
-
-                    university=universities,
-                    eligible_nationalities=countries,
-                    scholarship_expense=expenses,
-                    faqs=faqs,
+                    deferred=ScholarshipSchema.NESTED_FIELDS,
                 )
                 results.append(scholarship_obj)
 
+            scholarship_ids = [sch.id for sch in results]
+            loaders = get_loaders(info)
+            loaders.university_ids_by_scholarship.prime(scholarship_ids)
+            loaders.nationality_ids_by_scholarship.prime(scholarship_ids)
+            loaders.expense_coverages_by_scholarship.prime(scholarship_ids)
+            loaders.faqs_by_scholarship.prime(scholarship_ids)
+
             return cls(
                 scholarship=results,
                 page=page,
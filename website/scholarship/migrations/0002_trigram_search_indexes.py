@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-18 17:33
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scholarship', '0001_initial'),
+        ('university', '0021_trigram_search_indexes'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='scholarship',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='idx_scholarship_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='scholarship',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['course'], name='idx_scholarship_course_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='scholarship',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['awarded_by'], name='idx_scholarship_awarded_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 from university.models import Country, university  # Ensure 'University' is the correct model name
 
@@ -40,6 +41,12 @@ class Scholarship(models.Model):
         verbose_name = "Scholarship"
         verbose_name_plural = "Scholarships"
         ordering = ['name']
+        indexes = [
+            # Fuzzy admin search, see website/fuzzy_search.py
+            GinIndex(fields=["name"], name="idx_scholarship_name_trgm", opclasses=["gin_trgm_ops"]),
+            GinIndex(fields=["course"], name="idx_scholarship_course_trgm", opclasses=["gin_trgm_ops"]),
+            GinIndex(fields=["awarded_by"], name="idx_scholarship_awarded_trgm", opclasses=["gin_trgm_ops"]),
+        ]
 
     def __str__(self):
         return self.name
@@ -7,10 +7,18 @@ from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 import json
 from student.utils import create_student_log
+from website.result_cache import cached_json_response, catalog_cache
+
 @csrf_exempt
 @api_key_required
 @require_http_methods(["GET"])
 def scholarship_details(request):
+    result = catalog_cache.get_or_compute("scholarship_details", [], _scholarship_details)
+    create_student_log(request, "Opened Scholarship Page") 
+    return cached_json_response(request, result)
+
+
+def _scholarship_details():
     with connection.cursor() as cursor:
         # Single query to fetch scholarships and all related data
         cursor.execute("""
@@ -120,9 +128,8 @@ def scholarship_details(request):
         
         # Convert scholarships dict to list
         scholarships_list = list(scholarships.values())
-    create_student_log(request, "Opened Scholarship Page") 
-    return JsonResponse({
+    return {
         'status': 'success',
         'count': len(scholarships_list),
         'data': scholarships_list
-    }, safe=False)
+    }
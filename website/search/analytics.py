@@ -0,0 +1,39 @@
+"""
+Search analytics ingestion.
+
+Smart-search requests call search_analytics.record(query), which only puts
+the query on a bounded in-process queue (see website.batching). The writer
+thread adds up the counts of each batch, gathered over at most
+SEARCH_ANALYTICS_FLUSH_INTERVAL seconds, and writes them to
+unsanitized_searches with a single INSERT ... ON CONFLICT DO UPDATE.
+"""
+
+from collections import Counter
+
+from django.conf import settings
+
+from website.batching import BackgroundBatcher
+
+from .utils import increment_unsanitized_counts
+
+MAX_QUERY_LENGTH = 500
+
+
+class SearchAnalytics(BackgroundBatcher):
+    name = "search-analytics"
+
+    def record(self, query: str):
+        """Count one search; never blocks or touches the database."""
+        query = query.strip()[:MAX_QUERY_LENGTH]
+        if query:
+            self.submit(query)
+
+    def write(self, items: list):
+        increment_unsanitized_counts(Counter(items))
+
+
+search_analytics = SearchAnalytics(
+    flush_interval=getattr(settings, "SEARCH_ANALYTICS_FLUSH_INTERVAL", 5),
+    queue_size=getattr(settings, "SEARCH_ANALYTICS_QUEUE_SIZE", 10000),
+    max_batch=getattr(settings, "SEARCH_ANALYTICS_MAX_BATCH", 500),
+)
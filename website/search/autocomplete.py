@@ -0,0 +1,266 @@
+"""
+In-process autocomplete for the search box.
+
+The suggestion terms are what students search for (SanitizedSearch counts)
+plus the catalog: published university names, program names and
+countries. Every term is indexed once per word it contains ("university of
+toronto" is found by "univ" and by "toro"). The keys live in one sorted
+array, so a prefix is a bisect over it, and the top suggestions for every
+short prefix (where ranges are large) are worked out at build time.
+Answers are also kept in a small per-prefix LRU.
+
+The index is rebuilt in a background thread when it is older than
+AUTOCOMPLETE_REFRESH_INTERVAL or the catalog version moves (any write to
+university/course/scholarship, see university.signals). Searches saved in
+this process are merged in right away by search.signals. Until the first
+build finishes, suggest() returns None and the view falls back to the
+fetch_search_suggestions DB function.
+"""
+
+import heapq
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+
+from cachetools import LRUCache
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count
+
+logger = logging.getLogger(__name__)
+
+SUGGESTION_LIMIT = getattr(settings, "AUTOCOMPLETE_LIMIT", 10)
+REFRESH_INTERVAL = getattr(settings, "AUTOCOMPLETE_REFRESH_INTERVAL", 300)  # seconds
+CACHE_SIZE = getattr(settings, "AUTOCOMPLETE_CACHE_SIZE", 5000)
+MIN_PREFIX = 3
+
+# Top suggestions are precomputed for prefixes up to this long; longer
+# prefixes match few enough keys to rank on the fly
+_PRECOMPUTED_DEPTH = 5
+# How often (seconds) suggest() looks at the catalog version
+_VERSION_CHECK_INTERVAL = 5
+# Locally merged searches before a rebuild is asked for instead
+_MAX_OVERLAY = 1000
+
+# Catalog terms have no search count; these put them on the same scale
+COUNTRY_SCORE = 100
+UNIVERSITY_SCORE = 20
+PROGRAM_SCORE = 5  # per course offering that program
+
+_STOP_WORDS = frozenset("of the and in at for a an de".split())
+_WORD_RE = re.compile(r"[a-z0-9]+(?:['&.+][a-z0-9]+)*")
+
+
+def normalize(text: str) -> str:
+    return " ".join(_WORD_RE.findall(text.lower()))
+
+
+def _word_starts(normalized: str):
+    """Every suffix of the term starting at a meaningful word."""
+    words = normalized.split(" ")
+    for i, word in enumerate(words):
+        if i == 0 or word not in _STOP_WORDS:
+            yield " ".join(words[i:])
+
+
+class AutocompleteIndex:
+    """An immutable snapshot; AutocompleteEngine swaps in a new one on refresh."""
+
+    def __init__(self, terms: dict[str, tuple[str, float]], version: int):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.normalized = list(terms)
+        self.display = [terms[t][0] for t in self.normalized]
+        self.scores = [terms[t][1] for t in self.normalized]
+
+        pairs = sorted(
+            (key, term_id) for term_id, term in enumerate(self.normalized) for key in _word_starts(term)
+        )
+        self.keys = [key for key, _ in pairs]
+        self.term_ids = [term_id for _, term_id in pairs]
+
+        candidates = {}
+        for key, term_id in pairs:
+            for depth in range(MIN_PREFIX, min(len(key), _PRECOMPUTED_DEPTH) + 1):
+                candidates.setdefault(key[:depth], set()).add(term_id)
+        self.top = {
+            prefix: tuple(heapq.nlargest(SUGGESTION_LIMIT, ids, key=self._rank_key))
+            for prefix, ids in candidates.items()
+        }
+
+    def _rank_key(self, term_id: int):
+        # Higher score first, then shorter (closer) terms
+        return self.scores[term_id], -len(self.normalized[term_id])
+
+    def __len__(self) -> int:
+        return len(self.normalized)
+
+    def lookup(self, prefix: str, limit: int) -> list[tuple[str, str, float]]:
+        """[(normalized, display, score)] best first for a normalized prefix."""
+        if len(prefix) <= _PRECOMPUTED_DEPTH:
+            ids = self.top.get(prefix, ())[:limit]
+        else:
+            lo = bisect_left(self.keys, prefix)
+            hi = bisect_left(self.keys, prefix + "\uffff", lo)
+            ids = heapq.nlargest(limit, set(self.term_ids[lo:hi]), key=self._rank_key)
+        return [(self.normalized[i], self.display[i], self.scores[i]) for i in ids]
+
+
+def load_terms() -> dict[str, tuple[str, float]]:
+    """{normalized term: (display text, score)} from searches and the catalog."""
+    from course.models import Course
+    from university.models import Country, university
+
+    from .models import SanitizedSearch
+
+    terms = {}
+
+    def add(text, score):
+        key = normalize(text or "")
+        if len(key) < MIN_PREFIX:
+            return
+        display, current = terms.get(key, (text.strip(), 0))
+        terms[key] = (display, current + score)
+
+    # Catalog names first, so their spelling wins over however it was typed
+    for name in Country.objects.values_list("name", flat=True):
+        add(name, COUNTRY_SCORE)
+    for name in university.objects.filter(status="PUBLISH").values_list("name", flat=True):
+        add(name, UNIVERSITY_SCORE)
+    for name, offered in (
+        Course.objects.filter(university__status="PUBLISH")
+        .values_list("program_name")
+        .annotate(offered=Count("id"))
+        .order_by()
+    ):
+        add(name, PROGRAM_SCORE * offered)
+    for query, count in SanitizedSearch.objects.filter(count__gt=0).values_list("query", "count").order_by():
+        add(query, count)
+    return terms
+
+
+class AutocompleteEngine:
+    def __init__(self, limit: int, refresh_interval: int, cache_size: int):
+        self.limit = limit
+        self.refresh_interval = refresh_interval
+        self._index = None
+        # normalized -> (display, score), merged since the last build. Replaced,
+        # never changed in place, so suggest() can read it outside the lock
+        self._overlay = {}
+        self._cache = LRUCache(maxsize=cache_size)
+        self._generation = 0  # bumped whenever _cache is cleared
+        self._lock = threading.Lock()
+        self._building = False
+        self._stale = False
+        self._version_checked_at = 0.0
+
+    # Refresh -----------------------------------------------------------------
+
+    def _catalog_version(self) -> int:
+        from website.result_cache import catalog_cache
+
+        return catalog_cache.version()
+
+    def rebuild(self) -> AutocompleteIndex:
+        """Build and swap in a fresh index (blocking)."""
+        version = self._catalog_version()
+        index = AutocompleteIndex(load_terms(), version)
+        with self._lock:
+            self._index = index
+            self._overlay = {}
+            self._stale = False
+            self._cache.clear()
+            self._generation += 1
+        return index
+
+    def _rebuild_in_background(self):
+        def run():
+            try:
+                self.rebuild()
+            except Exception:
+                logger.exception("Rebuilding the autocomplete index failed")
+            finally:
+                connection.close()
+                with self._lock:
+                    self._building = False
+
+        with self._lock:
+            if self._building:
+                return
+            self._building = True
+        threading.Thread(target=run, name="autocomplete-rebuild", daemon=True).start()
+
+    def _needs_rebuild(self, index) -> bool:
+        if index is None or self._stale:
+            return True
+        now = time.monotonic()
+        if now - index.built_at > self.refresh_interval:
+            return True
+        if now - self._version_checked_at > _VERSION_CHECK_INTERVAL:
+            self._version_checked_at = now
+            return self._catalog_version() != index.version
+        return False
+
+    def mark_stale(self):
+        self._stale = True
+
+    def add_search(self, query: str, count: int):
+        """Merge a saved SanitizedSearch into the live index."""
+        key = normalize(query)
+        if len(key) < MIN_PREFIX:
+            return
+        with self._lock:
+            if len(self._overlay) >= _MAX_OVERLAY:
+                self._stale = True
+                return
+            self._overlay = {**self._overlay, key: (query.strip(), count)}
+            self._cache.clear()
+            self._generation += 1
+
+    # Lookup ------------------------------------------------------------------
+
+    def suggest(self, query: str) -> list[str] | None:
+        """
+        Up to `limit` suggestions for what has been typed so far, or None
+        if there is no index yet (the caller should use the DB instead).
+        """
+        index = self._index
+        if self._needs_rebuild(index):
+            self._rebuild_in_background()
+        if index is None:
+            return None
+
+        prefix = normalize(query)
+        if len(prefix) < MIN_PREFIX:
+            return []
+
+        with self._lock:
+            cached = self._cache.get(prefix)
+            index, overlay, generation = self._index, self._overlay, self._generation
+        if cached is not None:
+            return cached
+
+        matches = {normalized: (display, score) for normalized, display, score in index.lookup(prefix, self.limit)}
+        for normalized, (display, count) in overlay.items():
+            if any(key.startswith(prefix) for key in _word_starts(normalized)):
+                if normalized in matches:
+                    # The overlay has the latest count of a search already in the index
+                    display, count = matches[normalized][0], max(count, matches[normalized][1])
+                matches[normalized] = (display, count)
+
+        ranked = sorted(matches.items(), key=lambda item: (-item[1][1], len(item[0])))
+        results = [display for _, (display, _) in ranked[: self.limit]]
+        with self._lock:
+            # Not if the index or overlay changed while we worked
+            if self._generation == generation:
+                self._cache[prefix] = results
+        return results
+
+
+autocomplete = AutocompleteEngine(
+    limit=SUGGESTION_LIMIT,
+    refresh_interval=REFRESH_INTERVAL,
+    cache_size=CACHE_SIZE,
+)
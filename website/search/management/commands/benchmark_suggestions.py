@@ -0,0 +1,72 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from search.autocomplete import MIN_PREFIX, autocomplete, normalize
+from search.models import SanitizedSearch
+from search.views import fetch_suggestions_from_db
+
+
+def _us(samples: list[float]) -> str:
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return (
+        f"mean {statistics.mean(samples) * 1e6:.1f}us, p50 {statistics.median(samples) * 1e6:.1f}us, "
+        f"p95 {p95 * 1e6:.1f}us"
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Time search suggestions from the in-process autocomplete index against the "
+        "fetch_search_suggestions DB function, replaying keystrokes of the top searches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=200, help="Searches to replay, most frequent first")
+        parser.add_argument("--skip-db", action="store_true", help="Don't time the DB function")
+        parser.add_argument("--show", type=int, default=5, help="Print suggestions for this many prefixes")
+
+    def handle(self, *args, **options):
+        queries = list(
+            SanitizedSearch.objects.order_by("-count").values_list("query", flat=True)[: options["top"]]
+        )
+        # Every keystroke from MIN_PREFIX characters on, as the search box sends them
+        prefixes = [query[:n] for query in queries for n in range(MIN_PREFIX, len(query) + 1)]
+        prefixes = [p for p in prefixes if len(normalize(p)) >= MIN_PREFIX]
+        if not prefixes:
+            self.stdout.write("No searches to replay; the index is still timed on its build")
+
+        start = time.perf_counter()
+        index = autocomplete.rebuild()
+        self.stdout.write(
+            f"Index: {len(index)} terms, {len(index.keys)} keys, {len(index.top)} precomputed prefixes, "
+            f"built in {(time.perf_counter() - start) * 1000:.0f}ms"
+        )
+        if not prefixes:
+            return
+
+        cold, warm = [], []
+        for prefix in prefixes:
+            start = time.perf_counter()
+            autocomplete.suggest(prefix)
+            cold.append(time.perf_counter() - start)
+        for prefix in prefixes:
+            start = time.perf_counter()
+            autocomplete.suggest(prefix)
+            warm.append(time.perf_counter() - start)
+        self.stdout.write(f"{len(prefixes)} keystrokes")
+        self.stdout.write(f"  index, uncached  {_us(cold)}")
+        self.stdout.write(f"  index, cached    {_us(warm)}")
+
+        if not options["skip_db"]:
+            db = []
+            for prefix in prefixes:
+                start = time.perf_counter()
+                fetch_suggestions_from_db(prefix)
+                db.append(time.perf_counter() - start)
+            self.stdout.write(f"  DB function      {_us(db)}")
+
+        for prefix in prefixes[: options["show"]]:
+            self.stdout.write(f"  {prefix!r}: {autocomplete.suggest(prefix)}")
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from course.FilterAi import get_chain, parser
+from search.models import ParsedSearch, UnsanitizedSearch
+from search.parse_cache import parse_cache
+
+
+class Command(BaseCommand):
+    help = "Parse the most frequent search queries ahead of time and store them in the parse cache."
+
+    def add_arguments(self, parser_):
+        parser_.add_argument("--top", type=int, default=200, help="How many of the most frequent queries to warm")
+        parser_.add_argument("--reset", action="store_true", help="Delete every stored parse first")
+
+    def handle(self, *args, **options):
+        if options["reset"]:
+            deleted, _ = ParsedSearch.objects.all().delete()
+            self.stdout.write(f"Deleted {deleted} stored parses")
+
+        chain = get_chain()
+        warmed = skipped = failed = 0
+        queries = UnsanitizedSearch.objects.order_by("-count").values_list("query", flat=True)
+        for query in queries[: options["top"]]:
+            if parse_cache.get(query) is not None:
+                skipped += 1
+                continue
+            try:
+                params = chain.invoke(
+                    {"query": query, "format_instructions": parser.get_format_instructions()}
+                )
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"Could not parse {query!r}: {e}")
+                continue
+            parse_cache.set(query, params.model_dump(mode="json"))
+            warmed += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Warmed {warmed}, already cached {skipped}, failed {failed}"))
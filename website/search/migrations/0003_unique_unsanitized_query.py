@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-18 17:37
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_queries(apps, schema_editor):
+    """The old UPDATE-then-INSERT logging raced and left duplicate rows."""
+    UnsanitizedSearch = apps.get_model("search", "UnsanitizedSearch")
+    duplicates = (
+        UnsanitizedSearch.objects.values("query")
+        .annotate(rows=Count("id"), keep=Min("id"), total=Sum("count"))
+        .filter(rows__gt=1)
+        .order_by()
+    )
+    for row in duplicates:
+        UnsanitizedSearch.objects.filter(id=row["keep"]).update(count=row["total"])
+        UnsanitizedSearch.objects.filter(query=row["query"]).exclude(id=row["keep"]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0002_parsedsearch'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_queries, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='unsanitizedsearch',
+            name='query',
+            field=models.TextField(unique=True),
+        ),
+    ]
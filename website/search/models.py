@@ -2,7 +2,8 @@ from django.db import models
 
 
 class UnsanitizedSearch(models.Model):
-    query = models.TextField(db_index=True)
+    # Unique so search.analytics can upsert counts, see search.utils
+    query = models.TextField(unique=True)
     count = models.PositiveIntegerField(default=0)
 
     class Meta:
@@ -27,3 +28,20 @@ class SanitizedSearch(models.Model):
 
     def __str__(self):
         return f"{self.query} ({self.count})"
+
+
+class ParsedSearch(models.Model):
+    """LLM parse of a search query (SearchParams JSON), see search.parse_cache."""
+
+    key = models.CharField(max_length=64, unique=True)
+    query = models.TextField()
+    params = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "parsed_searches"
+        verbose_name = "Parsed Search"
+        verbose_name_plural = "Parsed Searches"
+
+    def __str__(self):
+        return self.query
@@ -0,0 +1,88 @@
+import hashlib
+import re
+import threading
+
+from cachetools import LRUCache
+from django.conf import settings
+from django.db import IntegrityError
+
+from .models import ParsedSearch
+
+_TOKEN_RE = re.compile(r"[a-z0-9$]+(?:[.'][a-z0-9]+)*")
+
+# Part of every key; bumped when normalize_query changes what it folds, so
+# entries stored under the old normalization are never read back
+KEY_FORMAT = 2
+
+
+def normalize_query(query: str) -> str:
+    """
+    Fold case, whitespace and punctuation only. Word order and every word
+    are kept: "ielts 6 and gpa 7" and "ielts 7 and gpa 6" must not share a
+    parse.
+    """
+    return " ".join(_TOKEN_RE.findall(query.lower()))
+
+
+class ParseCache:
+    """
+    Natural-language query -> parsed search params (a JSON dict).
+
+    Two tiers: a per-process LRU and the parsed_searches table shared by
+    all workers. Keys are the normalized query plus PARSE_CACHE_VERSION, so
+    bumping the version after a prompt/model change retires every entry.
+    """
+
+    def __init__(self, maxsize: int, version: str):
+        self.version = version
+        self._lru = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+
+    def key(self, query: str) -> tuple[str, str]:
+        normalized = normalize_query(query)
+        digest = hashlib.sha256(f"{KEY_FORMAT}:{self.version}:{normalized}".encode()).hexdigest()
+        return digest, normalized
+
+    def get_local(self, query: str):
+        digest, _ = self.key(query)
+        with self._lock:
+            return self._lru.get(digest)
+
+    def get(self, query: str):
+        digest, normalized = self.key(query)
+        if not normalized:
+            return None
+        with self._lock:
+            params = self._lru.get(digest)
+        if params is not None:
+            return params
+
+        params = ParsedSearch.objects.filter(key=digest).values_list("params", flat=True).first()
+        if params is not None:
+            with self._lock:
+                self._lru[digest] = params
+        return params
+
+    def set(self, query: str, params: dict):
+        digest, normalized = self.key(query)
+        if not normalized:
+            return
+        with self._lock:
+            self._lru[digest] = params
+        try:
+            ParsedSearch.objects.update_or_create(
+                key=digest, defaults={"query": normalized, "params": params}
+            )
+        except IntegrityError:
+            # Another worker stored the same query first, theirs is as good
+            pass
+
+    def clear_local(self):
+        with self._lock:
+            self._lru.clear()
+
+
+parse_cache = ParseCache(
+    maxsize=getattr(settings, "PARSE_CACHE_SIZE", 5000),
+    version=getattr(settings, "PARSE_CACHE_VERSION", "1"),
+)
@@ -0,0 +1,15 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .autocomplete import autocomplete
+from .models import SanitizedSearch
+
+
+@receiver(post_save, sender=SanitizedSearch)
+def search_saved(sender, instance, **kwargs):
+    autocomplete.add_search(instance.query, instance.count)
+
+
+@receiver(post_delete, sender=SanitizedSearch)
+def search_deleted(sender, instance, **kwargs):
+    autocomplete.mark_stale()
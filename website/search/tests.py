@@ -1,3 +1,84 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase
+
+from . import autocomplete as autocomplete_module
+from .autocomplete import AutocompleteEngine, AutocompleteIndex
+from .models import ParsedSearch
+from .parse_cache import ParseCache, normalize_query
+
+
+class NormalizeQueryTests(SimpleTestCase):
+    def test_folds_case_whitespace_and_punctuation(self):
+        self.assertEqual(normalize_query("  Masters in GERMANY,  for CS! "), "masters in germany for cs")
+        self.assertEqual(normalize_query("MS in U.K."), normalize_query("ms in u.k"))
+
+    def test_keeps_numbers_with_their_words(self):
+        self.assertNotEqual(
+            normalize_query("masters with ielts 6 and gpa 7"),
+            normalize_query("masters with ielts 7 and gpa 6"),
+        )
+        self.assertEqual(normalize_query("GPA 3.5, budget $20000"), "gpa 3.5 budget $20000")
+
+    def test_keeps_every_word(self):
+        self.assertNotEqual(normalize_query("mba in uk"), normalize_query("mba uk"))
+        self.assertNotEqual(normalize_query("cs masters germany"), normalize_query("germany masters cs"))
+
+
+class ParseCacheTests(TestCase):
+    def setUp(self):
+        self.cache = ParseCache(maxsize=10, version="test")
+
+    def test_distinct_queries_get_their_own_parse(self):
+        self.cache.set("masters with ielts 6 and gpa 7", {"ielts": 6, "gpa": 7})
+        self.cache.set("masters with ielts 7 and gpa 6", {"ielts": 7, "gpa": 6})
+
+        self.assertEqual(self.cache.get("Masters with IELTS 6 and GPA 7"), {"ielts": 6, "gpa": 7})
+        self.assertEqual(self.cache.get("masters with ielts 7 and gpa 6"), {"ielts": 7, "gpa": 6})
+
+    def test_shared_tier_is_read_after_local_is_dropped(self):
+        self.cache.set("bachelors in canada", {"level": "bachelors"})
+        self.cache.clear_local()
+        self.assertIsNone(self.cache.get_local("bachelors in canada"))
+
+        self.assertEqual(self.cache.get("Bachelors in Canada"), {"level": "bachelors"})
+        self.assertEqual(ParsedSearch.objects.get().query, "bachelors in canada")
+
+    def test_version_retires_entries(self):
+        self.cache.set("phd in usa", {"level": "phd"})
+        self.assertIsNone(ParseCache(maxsize=10, version="next").get("phd in usa"))
+
+
+class AutocompleteEngineTests(SimpleTestCase):
+    def setUp(self):
+        self.engine = AutocompleteEngine(limit=10, refresh_interval=300, cache_size=100)
+        self.engine._index = AutocompleteIndex({"university of toronto": ("University of Toronto", 20)}, 0)
+        no_rebuild = mock.patch.object(self.engine, "_needs_rebuild", return_value=False)
+        no_rebuild.start()
+        self.addCleanup(no_rebuild.stop)
+
+    def test_search_saved_while_suggesting(self):
+        self.engine.add_search("toronto masters", 3)
+        word_starts = autocomplete_module._word_starts
+
+        def save_another(normalized):
+            self.engine.add_search(f"toronto {len(self.engine._overlay)}", 1)
+            return word_starts(normalized)
+
+        with mock.patch.object(autocomplete_module, "_word_starts", save_another):
+            self.assertEqual(self.engine.suggest("toro"), ["University of Toronto", "toronto masters"])
+        self.assertIn("toronto 1", self.engine.suggest("toro"))
+
+    def test_result_from_before_a_rebuild_is_not_cached(self):
+        lookup = AutocompleteIndex.lookup
+
+        def rebuilt_meanwhile(index, prefix, limit):
+            terms = {"toronto metropolitan university": ("Toronto Metropolitan University", 20)}
+            with mock.patch.object(autocomplete_module, "load_terms", return_value=terms), \
+                    mock.patch.object(self.engine, "_catalog_version", return_value=1):
+                self.engine.rebuild()
+            return lookup(index, prefix, limit)
+
+        with mock.patch.object(AutocompleteIndex, "lookup", rebuilt_meanwhile):
+            self.assertEqual(self.engine.suggest("toro"), ["University of Toronto"])
+        self.assertEqual(self.engine.suggest("toro"), ["Toronto Metropolitan University"])
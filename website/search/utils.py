@@ -3,29 +3,23 @@ from django.db import connection
 
 logger = logging.getLogger(__name__)
 
-def save_unsanitized_query(query: str):
-    """Background function to log query into unsanitized_searches table."""
-    try:
-        with connection.cursor() as cursor:
-            cursor.execute(
-                """
-                UPDATE unsanitized_searches
-                SET count = count + 1
-                WHERE query = %s
-                RETURNING id
-                """,
-                [query],
-            )
-            row = cursor.fetchone()
-            if not row:
-                cursor.execute(
-                    """
-                    INSERT INTO unsanitized_searches (query, count)
-                    VALUES (%s, 1)
-                    RETURNING id
-                    """,
-                    [query],
-                )
-                cursor.fetchone()
-    except Exception as e:
-        logger.exception("Failed to log unsanitized search: %s", e)
+def increment_unsanitized_counts(counts: dict):
+    """
+    Add {query: n} to unsanitized_searches in one statement. Queries are
+    written in sorted order so concurrent flushes lock rows in the same order.
+    """
+    queries = sorted(counts)
+    if not queries:
+        return
+    values_sql = ", ".join(["(%s, %s)"] * len(queries))
+    params = [value for query in queries for value in (query, counts[query])]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO unsanitized_searches (query, count)
+            VALUES {values_sql}
+            ON CONFLICT (query) DO UPDATE
+            SET count = unsanitized_searches.count + EXCLUDED.count
+            """,
+            params,
+        )
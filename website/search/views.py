@@ -6,6 +6,9 @@ from django.db import connection
 from django.views import View
 from django.http import JsonResponse
 from django.db import connection, transaction
+
+from .autocomplete import autocomplete
+
 # Create your views here.
 
 
@@ -17,14 +20,20 @@ class SearchSuggestionsView(View):
         if len(user_query) < 3:
             return JsonResponse([], safe=False)
 
-        with connection.cursor() as cursor:
-            cursor.execute("SELECT * FROM fetch_search_suggestions(%s)", [user_query])
-            rows = cursor.fetchall()
-
-        results = [row[0] for row in rows]
+        results = autocomplete.suggest(user_query)
+        if results is None:
+            results = fetch_suggestions_from_db(user_query)
         return JsonResponse(results, safe=False)
 
 
+def fetch_suggestions_from_db(user_query):
+    """The DB function; only used until the autocomplete index is built."""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT * FROM fetch_search_suggestions(%s)", [user_query])
+        rows = cursor.fetchall()
+    return [row[0] for row in rows]
+
+
 # class SaveUnsanitizedSearchView(View):
 #     def get(self, request):
 #         query = request.GET.get("q", "").strip()
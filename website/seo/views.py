@@ -4,6 +4,7 @@ from django.views.decorators.csrf import csrf_exempt
 import json
 import yake
 from website.utils import api_key_required, token_required
+from website.result_cache import cached_json_response, catalog_cache
 from django.http import JsonResponse
 from .models import InstaEmbed
 from django.views.decorators.http import require_http_methods
@@ -95,13 +96,14 @@ def get_active_instagram_embeds(request):
 @csrf_exempt
 @api_key_required
 def get_seo_sitemap_data(request):
-    try:
+    def compute():
         with connection.cursor() as cursor:
             cursor.execute("select public.get_universities_with_courses_for_seo();")
             row = cursor.fetchone()
-            if row and row[0]:
-                return JsonResponse({"data": row[0]}, safe=False, status=200)
-            else:
-                return JsonResponse({"data": []}, safe=False, status=200)
+        return {"data": row[0] if row and row[0] else []}
+
+    try:
+        result = catalog_cache.get_or_compute("get_universities_with_courses_for_seo", [], compute)
+        return cached_json_response(request, result)
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
@@ -3,27 +3,36 @@ import json
 from dataclasses import dataclass
 
 import strawberry
-from typing import List, Optional, Annotated
+from typing import AsyncGenerator, List, Optional, Annotated, Callable, Union
+from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import connection, transaction
 from graphql import GraphQLError
 from django.core.paginator import Paginator
-from django.db.models import Q, Prefetch
+from django.db.models import Exists, OuterRef, Q, Prefetch
 from strawberry import Info
 from authentication.models import Employee
 from student.models import Student, AssignedCounsellor, Bucket, Email, StudentDetails, EducationDetails, TestScores, \
     Preference, ExperienceDetails, AppliedUniversity, StudentLogs, CallRequest, StudentSubMilestone, StudentMilestone, \
     StudentDocumentRequirement, DocumentType, Document
 from authentication.Utils import SchemaMixin
+from authentication.permissions import permission_resolver
 from university.AllSchemas import DocumentRequirementUpdateInput, MilestoneUpdateInput
 from .AllSchema import *
 import re
-from website.utils import upload_file_to_drive_private, delete_from_google_drive
+from asgiref.sync import sync_to_async
+from strawberry.scalars import JSON
+from website.event_bus import APPLICATION_EVENTS, STUDENT_EVENTS, event_bus
+from website.fuzzy_search import fuzzy_query
+from website.loaders import get_loaders
+from website.pagination import PageInfo, cached_queryset_count, decode_cursor, keyset_page
+from website.storage import asset_meta, asset_ref, delete_asset, drive_file_id, save_asset
 
 PHONE_REGEX = re.compile(r"^[6-9]\d{9}$")
 EMAIL_REGEX = re.compile(
     r"^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$"
 )
+DOCUMENT_MAX_UPLOAD_SIZE = getattr(settings, "DOCUMENT_MAX_UPLOAD_SIZE", 25 * 1024 * 1024)
 
 
 @strawberry.type
@@ -232,9 +241,73 @@ class StudentSchema(SchemaMixin):
     student_logs: Optional[list[StudentLogsSchema]] = None
     shortlisted_university: Optional[list[ShortlistedUniversitySchema]] = None
     shortlisted_course: Optional[list[ShortlistedCourseSchema]] = None
-    call_request: Optional[list[CallRequestSchema]] = None
-    assigned_counsellor: Optional[list[AssignedCounsellorSchema]] = None
-    applied_university: Optional[list[AppliedUniversitySchema]] = None
+    # Built up front by the profile view; the list view names them in
+    # `deferred` and they are batch loaded only if the client selects them.
+    call_request: strawberry.Private[Optional[list[CallRequestSchema]]] = None
+    assigned_counsellor: strawberry.Private[Optional[list[AssignedCounsellorSchema]]] = None
+    applied_university: strawberry.Private[Optional[list[AppliedUniversitySchema]]] = None
+    deferred: strawberry.Private[frozenset] = frozenset()
+
+    @strawberry.field(name="callRequest")
+    def resolve_call_request(self, info: Info) -> Optional[list[CallRequestSchema]]:
+        if "call_request" not in self.deferred:
+            return self.call_request
+        loaders = get_loaders(info)
+        call_requests = []
+        for call in loaders.call_requests_by_student.load(self.id):
+            employee = loaders.employees.load(call.employee_id)
+            call_requests.append(
+                CallRequestSchema(
+                    student_id=call.student_id,
+                    student_name=self.full_name,
+                    employee_id=call.employee_id,
+                    employee_name=employee.name if employee else None,
+                    requested_on=call.requested_on,
+                )
+            )
+        return call_requests
+
+    @strawberry.field(name="assignedCounsellor")
+    def resolve_assigned_counsellor(self, info: Info) -> Optional[list[AssignedCounsellorSchema]]:
+        if "assigned_counsellor" not in self.deferred:
+            return self.assigned_counsellor
+        loaders = get_loaders(info)
+        assignments = loaders.assigned_counsellors_by_student.load(self.id)
+        if not assignments:
+            return None
+        # Latest assignment only, same as the old prefetch + first()
+        assignment = assignments[0]
+        employee = loaders.employees.load(assignment.employee_id)
+        if not employee:
+            return None
+        return [
+            AssignedCounsellorSchema(
+                student_id=self.id,
+                student_name=self.full_name,
+                employee_id=employee.id,
+                employee_name=employee.name,
+                assigned_on=str(assignment.assigned_on),
+            )
+        ]
+
+    @strawberry.field(name="appliedUniversity")
+    def resolve_applied_university(self, info: Info) -> Optional[list[AppliedUniversitySchema]]:
+        if "applied_university" not in self.deferred:
+            return self.applied_university
+        loaders = get_loaders(info)
+        applied_university = []
+        for application in loaders.applied_universities_by_student.load(self.id):
+            course = loaders.courses.load(application.course_id)
+            applied_university.append(
+                AppliedUniversitySchema(
+                    id=application.id,
+                    course_id=application.course_id,
+                    course_name=course.program_name if course else None,
+                    applied_at=application.applied_at,
+                    application_number=application.application_number,
+                )
+            )
+        return applied_university
 
     @classmethod
     def student_schema_builder(cls, data: dict, logs: Optional[dict] = None) -> "StudentSchema":
@@ -477,9 +550,7 @@ class StudentSchema(SchemaMixin):
         if not emp:
             raise GraphQLError("Unauthorized")
 
-        has_permission = emp.job_roles.filter(
-            permissions__name="student_add"
-        ).exists()
+        has_permission = permission_resolver.has_perms(emp, ["student_add"])
 
         if not (emp.is_superuser or has_permission):
             raise GraphQLError("You do not have permission to add a student")
@@ -959,16 +1030,26 @@ class StudentListSchema(SchemaMixin):
     student_list: Annotated[List[StudentSchema], strawberry.argument(description="List of students with student details,assigned counsellor(for superusers), applied universities, call request, and other fields would be null.")]
     limit: int
     current_page: int
-    total: int
+    # An int in page mode; in cursor mode a callable so the count only runs
+    # when the client selects `total`
+    total: strawberry.Private[Union[int, Callable[[], int]]]
+    page_info: Optional[PageInfo] = None
+
+    @strawberry.field(name="total")
+    def resolve_total(self) -> int:
+        return self.total() if callable(self.total) else self.total
 
     @classmethod
     def student_list(
             cls,
+            info: Info,
             auth_token: str,
-            page: int,
+            page: Optional[int] = 1,
             assigned_to_me_only: Optional[bool] = False,
             limit: Optional[int] = 50,
             query: Optional[str] = None,
+            cursor_pagination: Annotated[Optional[bool], strawberry.argument(description="Page by `after` cursor instead of page number; `total` is then cached and only counted if selected.")] = False,
+            after: Optional[str] = None,
     ) -> "StudentListSchema":
 
         emp = cls.get_employee(auth_token)
@@ -976,13 +1057,26 @@ class StudentListSchema(SchemaMixin):
         if not emp:
             raise GraphQLError("Unauthorized")
 
+        cursor_pagination = cursor_pagination or after is not None
+        page = page or 1
+
         if page < 1:
             raise GraphQLError("Page must be greater than 0")
 
         limit = min(limit or 50, 100)
 
+        search = fuzzy_query(query)
+
+        # A search is ordered best match first, (rank, id) is then the cursor
+        last_key = None
+        if after:
+            try:
+                last_key = decode_cursor(after, float, int) if search else decode_cursor(after, int)
+            except ValueError:
+                raise GraphQLError("Invalid cursor")
+
         try:
-            # Main optimized queryset
+            # Nested lists are batch loaded on demand, see StudentSchema.deferred
             student_qs = (
                 Student.objects
                 .select_related(
@@ -991,35 +1085,47 @@ class StudentListSchema(SchemaMixin):
                     "category",
                     "profile_picture",
                 )
-                .prefetch_related(
-                    "assigned_counsellors__employee",
-                    "applied_universities__course",
-                    Prefetch(
-                        "call_requests",
-                        queryset=CallRequest.objects.select_related("student", "employee")
-                    )
-                )
             )
 
             if not emp.is_superuser or assigned_to_me_only:
+                # EXISTS rather than a join so no DISTINCT is needed
                 student_qs = student_qs.filter(
-                    assigned_counsellors__employee=emp
+                    Exists(AssignedCounsellor.objects.filter(student=OuterRef("pk"), employee=emp))
                 )
 
-            if query:
-                student_qs = student_qs.filter(
-                    Q(full_name__icontains=query) |
-                    Q(phone_number__icontains=query) |
-                    Q(email__email__icontains=query)
+            order_by, key = ["id"], lambda s: (s.id,)
+            if search:
+                search_fields = ("full_name", "phone_number", "email__email")
+                student_qs = (
+                    student_qs
+                    .filter(search.q(*search_fields))
+                    .annotate(rank=search.rank_expression(*search_fields))
                 )
+                order_by, key = ["-rank", "id"], lambda s: (s.rank, s.id)
+
+            page_info = None
+            if cursor_pagination:
+                count_qs = student_qs
+                total = lambda: cached_queryset_count(count_qs)
+                if last_key and search:
+                    last_rank, last_id = last_key
+                    student_qs = student_qs.filter(Q(rank__lt=last_rank) | Q(rank=last_rank, id__gt=last_id))
+                elif last_key:
+                    student_qs = student_qs.filter(id__gt=last_key[0])
+                students_qs, page_info = keyset_page(
+                    list(student_qs.order_by(*order_by)[:limit + 1]), limit, key=key
+                )
+            else:
+                paginator = Paginator(student_qs.order_by(*order_by), limit)
+                page_obj = paginator.get_page(page)
 
-            student_qs = student_qs.distinct()
-
-            paginator = Paginator(student_qs, limit)
-            page_obj = paginator.get_page(page)
+                students_qs = page_obj.object_list
+                total = paginator.count
 
-            students_qs = page_obj.object_list
-            total = paginator.count
+            deferred = {"applied_university", "call_request"}
+            if emp.is_superuser:
+                deferred.add("assigned_counsellor")
+            deferred = frozenset(deferred)
 
             students = []
 
@@ -1042,52 +1148,6 @@ class StudentListSchema(SchemaMixin):
                         country=d.country,
                     )
 
-                applied_university = []
-
-                ap = s.applied_universities.all()
-
-                for application in ap:
-                    applied_university.append(
-                        AppliedUniversitySchema(
-                            id=application.id,
-                            course_id=application.course_id,
-                            course_name=application.course.program_name if application.course else None,
-                            applied_at=application.applied_at,
-                            application_number=application.application_number,
-                        )
-                    )
-
-                call_request = []
-                cr = s.call_requests.all()
-                for call in cr:
-                    call_request.append(
-                        CallRequestSchema(
-                            student_id=call.student_id,
-                            student_name=call.student.full_name,
-                            employee_id=call.employee.id,
-                            employee_name=call.employee.name,
-                            requested_on=call.requested_on,
-                        )
-                    )
-
-                assigned_counsellor = None
-
-                if emp.is_superuser:
-                    assignment = s.assigned_counsellors.first()
-
-                    if assignment and assignment.employee:
-                        employee = assignment.employee
-
-                        assigned_counsellor = [
-                            AssignedCounsellorSchema(
-                                student_id=s.id,
-                                student_name=s.full_name,
-                                employee_id=employee.id,
-                                employee_name=getattr(employee, "name", str(employee)),
-                                assigned_on=str(assignment.assigned_on),
-                            )
-                        ]
-
                 profile = getattr(s, "profile_picture", None)
 
                 students.append(
@@ -1099,17 +1159,23 @@ class StudentListSchema(SchemaMixin):
                         email=getattr(getattr(s, "email", None), "email", None),
                         image_id=profile.google_file_id if profile else None,
                         student_details=details,
-                        assigned_counsellor=assigned_counsellor,
-                        applied_university=applied_university,
-                        call_request=call_request,
+                        deferred=deferred,
                     )
                 )
 
+            student_ids = [st.id for st in students]
+            loaders = get_loaders(info)
+            loaders.applied_universities_by_student.prime(student_ids)
+            loaders.call_requests_by_student.prime(student_ids)
+            if emp.is_superuser:
+                loaders.assigned_counsellors_by_student.prime(student_ids)
+
             return cls(
                 student_list=students,
                 limit=limit,
                 current_page=page,
                 total=total,
+                page_info=page_info,
             )
 
         except Exception as e:
@@ -1164,7 +1230,26 @@ class ApplicationSchema(SchemaMixin):
     status: str
     application_number: str = strawberry.field(description="Application Number for the application")
     documents: ApplicationDocumentsSchema
-    milestones: Optional[List[MilestoneSchema]] = strawberry.field(description="Milestone for the application")
+
+    @strawberry.field(description="Milestone for the application")
+    def milestones(self, info: Info) -> Optional[List[MilestoneSchema]]:
+        return [
+            MilestoneSchema(
+                name=m.name,
+                order=m.order,
+                steps=[
+                    SubMilestoneSchema(
+                        id=s.id,
+                        name=s.name,
+                        status=s.status,
+                        order=s.order,
+                        counsellor_comment=s.counsellor_comment,
+                    )
+                    for s in m.steps.all()
+                ],
+            )
+            for m in get_loaders(info).milestones_by_application.load(self.application_id)
+        ]
 
     @classmethod
     def applications(
@@ -1206,19 +1291,6 @@ class ApplicationSchema(SchemaMixin):
             app = (
                 AppliedUniversity.objects
                 .filter(id=application_id, student_id=student_id)
-                .prefetch_related(
-                    Prefetch(
-                        "student_milestones",
-                        queryset=StudentMilestone.objects
-                        .order_by("order")
-                        .prefetch_related(
-                            Prefetch(
-                                "steps",
-                                queryset=StudentSubMilestone.objects.order_by("order")
-                            )
-                        ),
-                    )
-                )
                 .first()
             )
 
@@ -1276,25 +1348,6 @@ class ApplicationSchema(SchemaMixin):
                     )
                 )
 
-            milestones: List[MilestoneSchema] = []
-            for m in app.student_milestones.all():
-                milestones.append(
-                    MilestoneSchema(
-                        name=m.name,
-                        order=m.order,
-                        steps=[
-                            SubMilestoneSchema(
-                                id=s.id,
-                                name=s.name,
-                                status=s.status,
-                                order=s.order,
-                                counsellor_comment=s.counsellor_comment,
-                            )
-                            for s in m.steps.all()
-                        ],
-                    )
-                )
-
             return cls(
                 application_id=app.id,
                 course_id=app.course_id,
@@ -1305,7 +1358,6 @@ class ApplicationSchema(SchemaMixin):
                     basic=basic_docs,
                     university_specific=university_docs,
                 ),
-                milestones=milestones,
             )
 
         except GraphQLError:
@@ -1406,29 +1458,31 @@ class ApplicationSchema(SchemaMixin):
 
                         if obj.document:
                             file_obj = obj.document
-                            MAX_FILE_SIZE = 1 * 1024 * 1024
-
-                            if file_obj.size > MAX_FILE_SIZE:
-                                raise GraphQLError("File should be under 1 MB")
+                            if file_obj.size > DOCUMENT_MAX_UPLOAD_SIZE:
+                                raise GraphQLError(
+                                    f"File should be under {DOCUMENT_MAX_UPLOAD_SIZE // (1024 * 1024)} MB"
+                                )
 
                             try:
-                                file_id, file_uuid = upload_file_to_drive_private(file_obj)
+                                meta = asset_meta("documents", file_obj)
+                                ref, file_uuid = save_asset("documents", file_obj)
                             except Exception:
                                 raise GraphQLError("Error uploading document")
 
-                            if uploaded_doc and uploaded_doc.file_id:
-                                try:
-                                    delete_from_google_drive(uploaded_doc.file_id)
-                                except Exception:
-                                    pass
+                            if uploaded_doc:
+                                delete_asset(asset_ref(uploaded_doc.storage_key, uploaded_doc.file_id))
 
                             Document.objects.update_or_create(
                                 required_document=req,
                                 defaults={
                                     "submitted_document": req.document_type.name,
                                     "counsellor_status": final_status,
-                                    "file_id": file_id,
+                                    "file_id": drive_file_id(ref) or "",
+                                    "storage_key": ref,
                                     "file_uuid": file_uuid,
+                                    "content_type": meta.content_type,
+                                    "size": meta.size,
+                                    "etag": meta.etag,
                                 },
                             )
 
@@ -1480,15 +1534,16 @@ class ApplicationSchema(SchemaMixin):
                         if obj.document:
                             file_obj = obj.document
 
-                            MAX_FILE_SIZE = 1 * 1024 * 1024  # 1MB
-
-                            if file_obj.size > MAX_FILE_SIZE:
-                                raise GraphQLError("File should be under 1 MB")
+                            if file_obj.size > DOCUMENT_MAX_UPLOAD_SIZE:
+                                raise GraphQLError(
+                                    f"File should be under {DOCUMENT_MAX_UPLOAD_SIZE // (1024 * 1024)} MB"
+                                )
 
                             document_name = required_document.document_type.name
 
                             try:
-                                file_id, file_uuid = upload_file_to_drive_private(file_obj)
+                                meta = asset_meta("documents", file_obj)
+                                ref, file_uuid = save_asset("documents", file_obj)
                             except Exception:
                                 raise GraphQLError("Error uploading document")
 
@@ -1497,8 +1552,12 @@ class ApplicationSchema(SchemaMixin):
                                 defaults={
                                     "submitted_document": document_name,
                                     "counsellor_status": "uploaded",
-                                    "file_id": file_id,
+                                    "file_id": drive_file_id(ref) or "",
+                                    "storage_key": ref,
                                     "file_uuid": file_uuid,
+                                    "content_type": meta.content_type,
+                                    "size": meta.size,
+                                    "etag": meta.etag,
                                 },
                             )
                 #Fix this piece of shit
@@ -1612,4 +1671,33 @@ class StudentMutation:
 
     edit_application: ApplicationSchema = strawberry.field(
         resolver=ApplicationSchema.edit_student_application
-    )
\ No newline at end of file
+    )
+
+async def _student_events(auth_token: str, topic: str):
+    emp = await SchemaMixin.aget_employee(auth_token)
+    if not emp:
+        raise GraphQLError("Unauthorized")
+
+    # Same visibility as studentsList: non-superusers only see their students
+    is_assigned = sync_to_async(
+        lambda student_id: AssignedCounsellor.objects.filter(student_id=student_id, employee=emp).exists()
+    )
+
+    async for event in event_bus.subscribe(topic):
+        student_id = event.get("student_id", event["id"])
+        if emp.is_superuser or await is_assigned(student_id):
+            yield event
+
+
+@strawberry.type
+class StudentSubscription:
+
+    @strawberry.subscription(description='Student changes as {"action": "created" | "updated" | "deleted", "id": ...}')
+    async def student(self, auth_token: str) -> AsyncGenerator[JSON, None]:
+        async for event in _student_events(auth_token, STUDENT_EVENTS):
+            yield event
+
+    @strawberry.subscription(description='Applied university changes as {"action": ..., "id": ..., "student_id": ...}')
+    async def application(self, auth_token: str) -> AsyncGenerator[JSON, None]:
+        async for event in _student_events(auth_token, APPLICATION_EVENTS):
+            yield event
@@ -0,0 +1,47 @@
+"""
+Write-behind student activity log.
+
+create_student_log() used to look the student up and insert one
+StudentLogs row inside the request. Now it only queues (token, text, time)
+(see website.batching); the writer thread resolves tokens through the
+shared auth token cache and inserts each batch with one bulk_create, so
+browsing the public pages adds no database writes to the request.
+"""
+
+from django.conf import settings
+from django.utils import timezone
+
+from website.batching import BackgroundBatcher
+from website.token_cache import student_tokens
+
+from .models import StudentLogs
+
+
+class ActivityLog(BackgroundBatcher):
+    name = "student-activity-log"
+
+    def log(self, auth_token: str, text: str) -> bool:
+        return self.submit((auth_token, text, timezone.now()))
+
+    def write(self, items: list):
+        student_ids = {}
+        for token in {token for token, _, _ in items}:
+            student = student_tokens.resolve(token)
+            if student is not None:
+                student_ids[token] = student.pk
+
+        StudentLogs.objects.bulk_create(
+            [
+                StudentLogs(student_id=student_ids[token], logs=text, added_on=added_on)
+                for token, text, added_on in items
+                if token in student_ids
+            ],
+            batch_size=500,
+        )
+
+
+activity_log = ActivityLog(
+    flush_interval=getattr(settings, "STUDENT_LOG_FLUSH_INTERVAL", 2),
+    queue_size=getattr(settings, "STUDENT_LOG_QUEUE_SIZE", 20000),
+    max_batch=getattr(settings, "STUDENT_LOG_MAX_BATCH", 1000),
+)
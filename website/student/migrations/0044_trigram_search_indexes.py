@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-18 17:33
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student', '0043_remove_callrequest_unique_student_employee_request_and_more'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='email',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['email'], name='idx_student_email_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['full_name'], name='idx_student_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['phone_number'], name='idx_student_phone_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
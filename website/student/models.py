@@ -1,5 +1,6 @@
 from uuid import uuid4
 
+from django.contrib.postgres.indexes import GinIndex
 from django.db.models import F
 
 from authentication.models import Employee
@@ -49,6 +50,11 @@ class Student(models.Model):
     class Meta:
         verbose_name = "Student"
         verbose_name_plural = "Students"
+        indexes = [
+            # Fuzzy counsellor search, see website/fuzzy_search.py
+            GinIndex(fields=["full_name"], name="idx_student_name_trgm", opclasses=["gin_trgm_ops"]),
+            GinIndex(fields=["phone_number"], name="idx_student_phone_trgm", opclasses=["gin_trgm_ops"]),
+        ]
 
     def __str__(self):
         return self.full_name
@@ -64,6 +70,9 @@ class Email(models.Model):
         verbose_name = "Email"
         verbose_name_plural = "Emails"
         ordering = ["email"]
+        indexes = [
+            GinIndex(fields=["email"], name="idx_student_email_trgm", opclasses=["gin_trgm_ops"]),
+        ]
 
     def __str__(self):
         return self.student.full_name
@@ -96,6 +105,7 @@ class StudentProfilePicture(models.Model):
     )
     image_uuid = models.UUIDField(editable=False, unique=True, null=True, blank=True)
     google_file_id = models.CharField(max_length=255, blank=True, default="", null=True)
+    storage_key = models.CharField(max_length=255, blank=True, default="", editable=False)  # website/storage.py reference
 
     def __str__(self):
         return f"{self.student.full_name}'s Profile Picture"
@@ -503,8 +513,13 @@ class Document(models.Model):
     )
     counsellor_comments = models.CharField(max_length=2000, null=True, blank=True)
 
-    file_id = models.CharField(max_length=255)
+    file_id = models.CharField(max_length=255, blank=True, default="")  # Drive file id, legacy
+    storage_key = models.CharField(max_length=255, blank=True, default="", editable=False)  # website/storage.py reference
     file_uuid = models.UUIDField(default=uuid4, editable=False, unique=True)
+    # Cached at upload so downloads needn't ask the storage backend first
+    content_type = models.CharField(max_length=100, blank=True, default="", editable=False)
+    size = models.PositiveBigIntegerField(null=True, blank=True, editable=False)
+    etag = models.CharField(max_length=64, blank=True, default="", editable=False)
 
     uploaded_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
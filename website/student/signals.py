@@ -0,0 +1,34 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from website.event_bus import APPLICATION_EVENTS, STUDENT_EVENTS, event_bus
+from .models import AppliedUniversity, Student
+
+
+@receiver(post_save, sender=Student)
+def student_saved(sender, instance, created, **kwargs):
+    event = {"action": "created" if created else "updated", "id": instance.id}
+    transaction.on_commit(lambda: event_bus.emit(STUDENT_EVENTS, event))
+
+
+@receiver(post_delete, sender=Student)
+def student_deleted(sender, instance, **kwargs):
+    event = {"action": "deleted", "id": instance.id}
+    transaction.on_commit(lambda: event_bus.emit(STUDENT_EVENTS, event))
+
+
+@receiver(post_save, sender=AppliedUniversity)
+def application_saved(sender, instance, created, **kwargs):
+    event = {
+        "action": "created" if created else "updated",
+        "id": instance.id,
+        "student_id": instance.student_id,
+    }
+    transaction.on_commit(lambda: event_bus.emit(APPLICATION_EVENTS, event))
+
+
+@receiver(post_delete, sender=AppliedUniversity)
+def application_deleted(sender, instance, **kwargs):
+    event = {"action": "deleted", "id": instance.id, "student_id": instance.student_id}
+    transaction.on_commit(lambda: event_bus.emit(APPLICATION_EVENTS, event))
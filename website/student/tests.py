@@ -1,3 +1,282 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
+from uuid import uuid4
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+
+from authentication.models import Employee
+from website import storage
+from website.GlobalSchema import schema
+from website.uploads import upload_sessions
+
+from .models import AssignedCounsellor, Document, DocumentType, Student, StudentDocumentRequirement
+
+STUDENTS_LIST = """
+query ($authToken: String!, $after: String, $limit: Int, $mine: Boolean) {
+  student {
+    studentsList(authToken: $authToken, cursorPagination: true, after: $after, limit: $limit,
+                 assignedToMeOnly: $mine) {
+      studentList { id }
+      pageInfo { hasNextPage endCursor }
+      total
+    }
+  }
+}
+"""
+
+
+class StudentListCursorTests(TestCase):
+    def setUp(self):
+        self.admin = Employee.objects.create(
+            username="admin", password="x", name="Admin", phone_number="9000000000",
+            email="admin@example.com", is_superuser=True,
+        )
+        self.counsellor = Employee.objects.create(
+            username="counsellor", password="x", name="Counsellor", phone_number="9000000001",
+            email="counsellor@example.com",
+        )
+        self.ids = [
+            Student.objects.create(phone_number=f"98000000{i:02}", full_name=f"Student {i}", is_otp_verified=True).id
+            for i in range(7)
+        ]
+        for student_id in self.ids[::2]:
+            AssignedCounsellor.objects.create(student_id=student_id, employee=self.counsellor)
+
+    def all_pages(self, employee, limit=3, mine=False):
+        ids, after = [], None
+        for _ in range(len(self.ids) + 1):
+            result = schema.execute_sync(
+                STUDENTS_LIST,
+                variable_values={"authToken": str(employee.authToken), "after": after, "limit": limit, "mine": mine},
+                context_value={},
+            )
+            self.assertIsNone(result.errors)
+            data = result.data["student"]["studentsList"]
+            ids += [student["id"] for student in data["studentList"]]
+            if not data["pageInfo"]["hasNextPage"]:
+                return ids, data["total"]
+            after = data["pageInfo"]["endCursor"]
+        self.fail(f"Paging did not finish: {ids}")
+
+    def test_pages_cover_every_student_once(self):
+        for limit in (1, 3, 7):
+            with self.subTest(limit=limit):
+                self.assertEqual(self.all_pages(self.admin, limit=limit), (self.ids, len(self.ids)))
+
+    def test_counsellors_only_page_through_their_students(self):
+        assigned = self.ids[::2]
+        self.assertEqual(self.all_pages(self.counsellor, limit=2), (assigned, len(assigned)))
+        self.assertEqual(self.all_pages(self.admin, limit=2, mine=True), ([], 0))
+
+
+PDF = b"%PDF-1.4\n" + bytes(range(256)) * 40
+
+
+class DocumentStorageTestCase(TestCase):
+    """A student with one document requirement, and local storage in a temporary directory."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        settings_override = override_settings(
+            ASSET_STORAGE_BACKEND="local", ASSET_STORAGE_ROOT=os.path.join(self.root, "assets")
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        storage._backends.clear()
+        self.addCleanup(storage._backends.clear)
+        staging_root = mock.patch.object(upload_sessions, "root", os.path.join(self.root, "staging"))
+        staging_root.start()
+        self.addCleanup(staging_root.stop)
+
+        self.student = Student.objects.create(phone_number="9800000000", full_name="Asha Rao", is_otp_verified=True)
+        self.other_student = Student.objects.create(
+            phone_number="9800000001", full_name="Vikram Das", is_otp_verified=True
+        )
+        self.requirement = StudentDocumentRequirement.objects.create(
+            student=self.student, document_type=DocumentType.objects.create(name="Passport", doc_type="Passport")
+        )
+
+
+class DocumentUploadTests(DocumentStorageTestCase):
+    def start(self, size=len(PDF), student=None, **body):
+        student = student or self.student
+        return self.client.post(
+            "/user/document_uploads/",
+            {"required_document_id": self.requirement.id, "size": size, "filename": "passport.pdf", **body},
+            content_type="application/json",
+            HTTP_AUTHORIZATION=str(student.authToken),
+        )
+
+    def put(self, token, offset, piece, student=None):
+        return self.client.put(
+            f"/user/document_uploads/{token}/",
+            piece,
+            content_type="application/offset+octet-stream",
+            HTTP_UPLOAD_OFFSET=str(offset),
+            HTTP_AUTHORIZATION=str((student or self.student).authToken),
+        )
+
+    def progress(self, token, student=None):
+        return self.client.get(
+            f"/user/document_uploads/{token}/", HTTP_AUTHORIZATION=str((student or self.student).authToken)
+        )
+
+    def test_pieces_become_the_document(self):
+        response = self.start()
+        self.assertEqual(response.status_code, 201)
+        token = response.json()["upload_token"]
+
+        pieces = [PDF[:4000], PDF[4000:8000], PDF[8000:]]
+        offset = 0
+        for piece in pieces[:-1]:
+            response = self.put(token, offset, piece)
+            self.assertEqual(response.status_code, 200)
+            offset += len(piece)
+            self.assertEqual(response.json()["offset"], offset)
+        self.assertEqual(self.progress(token).json(), {"offset": offset, "size": len(PDF)})
+
+        response = self.put(token, offset, pieces[-1])
+        self.assertEqual(response.status_code, 201)
+        document = Document.objects.get(required_document=self.requirement)
+        self.assertTrue(document.storage_key.startswith("local:documents/"))
+        self.assertEqual((document.content_type, document.size), ("application/pdf", len(PDF)))
+        self.assertEqual(storage.read_asset(document.storage_key)[0], PDF)
+        # The staged copy is gone once stored
+        self.assertEqual(self.progress(token).status_code, 404)
+
+    def test_wrong_offset_reports_where_to_resume(self):
+        token = self.start().json()["upload_token"]
+        self.put(token, 0, PDF[:1000])
+
+        response = self.put(token, 500, PDF[500:1500])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["offset"], 1000)
+        self.assertEqual(self.progress(token).json()["offset"], 1000)
+
+    def test_piece_past_the_declared_size_is_rejected(self):
+        token = self.start(size=1000).json()["upload_token"]
+        self.assertEqual(self.put(token, 0, PDF[:1001]).status_code, 413)
+        with mock.patch("student.views.UPLOAD_MAX_CHUNK_SIZE", 100):
+            self.assertEqual(self.put(token, 0, PDF[:101]).status_code, 413)
+        self.assertEqual(self.progress(token).json()["offset"], 0)
+
+    def test_sessions_belong_to_their_student(self):
+        token = self.start().json()["upload_token"]
+        self.assertEqual(self.progress(token, student=self.other_student).status_code, 404)
+        self.assertEqual(self.put(token, 0, PDF, student=self.other_student).status_code, 404)
+        self.assertEqual(self.progress("not-a-token").status_code, 404)
+        # Nor can they upload against someone else's requirement
+        self.assertEqual(self.start(student=self.other_student).status_code, 404)
+
+    def test_bad_size(self):
+        for size in (0, -1, "100", 10**12):
+            with self.subTest(size=size):
+                self.assertEqual(self.start(size=size).status_code, 400)
+
+    def test_disallowed_file_type_is_not_stored(self):
+        data = b"#!/bin/sh\necho hi\n"
+        token = self.start(size=len(data)).json()["upload_token"]
+        self.assertEqual(self.put(token, 0, data).status_code, 400)
+        self.assertFalse(Document.objects.exists())
+        self.assertEqual(self.progress(token).status_code, 404)
+
+
+class DocumentDownloadTests(DocumentStorageTestCase):
+    def setUp(self):
+        super().setUp()
+        ref, file_uuid = storage.save_asset("documents", io.BytesIO(PDF))
+        meta = storage.stat_asset(ref)
+        self.document = Document.objects.create(
+            required_document=self.requirement, storage_key=ref, file_uuid=file_uuid,
+            content_type=meta.content_type, size=meta.size, etag=meta.etag,
+        )
+        self.counsellor = Employee.objects.create(
+            username="counsellor", password="x", name="Counsellor", phone_number="9000000001",
+            email="counsellor@example.com",
+        )
+
+    def download(self, principal=None, **headers):
+        principal = principal or self.student
+        return self.client.get(
+            "/user/download_document/",
+            {"required_document_id": self.requirement.id},
+            HTTP_AUTHORIZATION=str(principal.authToken),
+            **headers,
+        )
+
+    def signed_url(self, principal=None):
+        response = self.client.get(
+            "/user/document_download_link/",
+            {"required_document_id": self.requirement.id},
+            HTTP_AUTHORIZATION=str((principal or self.student).authToken),
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()["url"]
+
+    def test_full_download(self):
+        response = self.download()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), PDF)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(response["ETag"], f'"{self.document.etag}"')
+
+    def test_range(self):
+        response = self.download(HTTP_RANGE="bytes=100-199")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes 100-199/{len(PDF)}")
+        self.assertEqual(response["Content-Length"], "100")
+        self.assertEqual(b"".join(response.streaming_content), PDF[100:200])
+
+        response = self.download(HTTP_RANGE="bytes=-10")
+        self.assertEqual(b"".join(response.streaming_content), PDF[-10:])
+
+    def test_unsatisfiable_range(self):
+        response = self.download(HTTP_RANGE=f"bytes={len(PDF)}-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], f"bytes */{len(PDF)}")
+
+    def test_conditional_requests(self):
+        etag = self.download()["ETag"]
+        self.assertEqual(self.download(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.download(HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE=etag).status_code, 206)
+        # The file changed since the client's partial copy: start over
+        self.assertEqual(self.download(HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"stale"').status_code, 200)
+
+    def test_metadata_is_filled_in_on_first_download(self):
+        Document.objects.filter(pk=self.document.pk).update(content_type="", size=None, etag="")
+        response = self.download(HTTP_RANGE="bytes=0-9")
+        self.assertEqual(response.status_code, 206)
+        refreshed = Document.objects.get(pk=self.document.pk)
+        self.assertEqual(
+            (refreshed.content_type, refreshed.size, refreshed.etag),
+            (self.document.content_type, self.document.size, self.document.etag),
+        )
+
+    def test_counsellor_access(self):
+        self.assertEqual(self.download(self.counsellor).status_code, 403)
+        AssignedCounsellor.objects.create(student=self.student, employee=self.counsellor)
+        self.assertEqual(self.download(self.counsellor).status_code, 200)
+        self.assertEqual(self.download(self.other_student).status_code, 403)
+
+    def test_signed_link_needs_no_authorization(self):
+        url = self.signed_url()
+        response = self.client.get(url, HTTP_RANGE="bytes=0-9")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b"".join(response.streaming_content), PDF[:10])
+
+        AssignedCounsellor.objects.create(student=self.student, employee=self.counsellor)
+        self.assertEqual(self.client.get(self.signed_url(self.counsellor)).status_code, 200)
+
+    def test_bad_signed_links(self):
+        url = self.signed_url()
+        self.assertEqual(self.client.get(url[:-2] + "x/").status_code, 403)
+        with mock.patch("student.views.DOWNLOAD_URL_TTL", -1):
+            self.assertEqual(self.client.get(url).status_code, 410)
+
+        # Re-uploaded since the link was made
+        Document.objects.filter(pk=self.document.pk).update(file_uuid=uuid4())
+        self.assertEqual(self.client.get(url).status_code, 404)
@@ -19,10 +19,14 @@ urlpatterns = [
     path("choices_in_db/", get_all_choices),
     path("update/", update_student_profile),
     path("upload_document/", upload_document),
+    path("document_uploads/", start_document_upload),
+    path("document_uploads/<str:upload_token>/", document_upload_chunk),
     path("get_user_documents_list/", get_student_documents_list),
     path(
         "download_document/", download_document
     ),  # this is valid both for student and employee
+    path("document_download_link/", document_download_link),  # student and employee too
+    path("documents/<str:signed>/", download_signed_document),
     path("student_dashboard/", student_dashboard_view),
     path("apply_to_course/", apply_to_university_view),
     path("student_applications/", student_applied_view),
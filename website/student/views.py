@@ -12,6 +12,7 @@ import requests
 from course.models import *
 from django.conf import settings
 from django.contrib.auth.hashers import check_password, make_password
+from django.core import signing
 from django.core.exceptions import ValidationError
 from django.core.validators import validate_email
 from django.db import DatabaseError, connection, transaction
@@ -27,17 +28,28 @@ from website.utils import (
     api_key_required,
     has_perms,
     token_required,
-    upload_file_to_drive_private,
     user_token_required,
 )
 
 from .models import *
 from .models import Document, StudentLogs
-from .utils import create_student_log, stream_private_drive_file
-from website.utils import upload_profile_picture, delete_from_google_drive
+from .utils import create_student_log
+from website.image_cache import image_cache
+from website.storage import (
+    AssetMeta,
+    AssetNotFound,
+    asset_meta,
+    asset_ref,
+    delete_asset,
+    drive_file_id,
+    save_asset,
+    serve_asset,
+    stat_asset,
+)
+from website.token_cache import resolve_principal
+from website.uploads import UploadConflict, upload_sessions
 from .models import StudentProfilePicture
 from django.http import HttpResponse
-from .utils import stream_google_drive_image
 
 WHATSAPP_TOKEN = settings.WHATSAPP_TOKEN
 WHATSAPP_PHONE_NUMBER_ID = settings.WHATSAPP_PHONE_NUMBER_ID
@@ -810,7 +822,48 @@ def get_all_choices(request):
     return JsonResponse(choices, status=200)
 
 
-MAX_FILE_SIZE = 1 * 1024 * 1024  # 1 MB
+MAX_FILE_SIZE = getattr(settings, "DOCUMENT_MAX_UPLOAD_SIZE", 25 * 1024 * 1024)
+UPLOAD_MAX_CHUNK_SIZE = getattr(settings, "UPLOAD_MAX_CHUNK_SIZE", 8 * 1024 * 1024)
+DOWNLOAD_URL_TTL = getattr(settings, "DOCUMENT_DOWNLOAD_URL_TTL", 300)  # seconds
+DOWNLOAD_URL_SALT = "student.document-download"
+
+
+def _attach_document(required_document, file_obj, submitted_document):
+    """Store an uploaded file as the requirement's document, replacing any earlier one."""
+    meta = asset_meta("documents", file_obj)
+    ref, file_uuid = save_asset("documents", file_obj)
+
+    existing_document = getattr(required_document, "file", None)
+    if existing_document:
+        delete_asset(asset_ref(existing_document.storage_key, existing_document.file_id))
+
+    document, created = Document.objects.update_or_create(
+        required_document=required_document,
+        defaults={
+            "submitted_document": submitted_document,
+            "counsellor_status": "uploaded",
+            "file_id": drive_file_id(ref) or "",
+            "storage_key": ref,
+            "file_uuid": file_uuid,
+            "content_type": meta.content_type,
+            "size": meta.size,
+            "etag": meta.etag,
+        },
+    )
+    return document
+
+
+def _document_uploaded(document, required_document, submitted_document):
+    return JsonResponse(
+        {
+            "message": "Document uploaded successfully.",
+            "document_id": document.id,
+            "required_document_id": required_document.id,
+            "document_name": required_document.document_type.name,
+            "submitted_document": submitted_document,
+        },
+        status=201,
+    )
 
 
 @csrf_exempt
@@ -836,7 +889,9 @@ def upload_document(request):
             )
 
         if file_obj.size > MAX_FILE_SIZE:
-            return JsonResponse({"error": "File size exceeds 1 MB."}, status=400)
+            return JsonResponse(
+                {"error": f"File size exceeds {MAX_FILE_SIZE // (1024 * 1024)} MB."}, status=400
+            )
 
         try:
             required_document = StudentDocumentRequirement.objects.get(
@@ -847,40 +902,14 @@ def upload_document(request):
                 {"error": "Invalid required_document_id or access denied."}, status=404
             )
 
-        document_name = required_document.document_type.name
-
-        existing_document = getattr(required_document, "file", None)
-        if existing_document and existing_document.file_id:
-            try:
-                delete_from_google_drive(existing_document.file_id)
-            except Exception:
-                pass
-
         try:
-            file_id, file_uuid = upload_file_to_drive_private(file_obj)
+            document = _attach_document(required_document, file_obj, submitted_document)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
         except Exception as e:
             return JsonResponse({"error": f"Upload failed: {e}"}, status=500)
 
-        document, created = Document.objects.update_or_create(
-            required_document=required_document,
-            defaults={
-                "submitted_document": submitted_document,
-                "counsellor_status": "uploaded",
-                "file_id": file_id,
-                "file_uuid": file_uuid,
-            },
-        )
-
-        return JsonResponse(
-            {
-                "message": "Document uploaded successfully.",
-                "document_id": document.id,
-                "required_document_id": required_document.id,
-                "document_name": document_name,
-                "submitted_document": submitted_document,
-            },
-            status=201,
-        )
+        return _document_uploaded(document, required_document, submitted_document)
 
     except Exception as e:
         return JsonResponse(
@@ -891,86 +920,134 @@ def upload_document(request):
             status=500,
         )
 
+
 @csrf_exempt
-def download_document(request):
+@require_http_methods(["POST"])
+@user_token_required
+def start_document_upload(request):
     """
-    Download a document by required_document_id.
-    Accessible by:
-      - The student who uploaded it
-      - Any counsellor (Employee) assigned to that student
-    Filename is taken from DocumentType.name
+    Start a resumable upload of a document (website/uploads.py).
+    Body: {"required_document_id", "size", "filename", "submitted_document_name"}
+    Then PUT the file in pieces to document_uploads/<upload_token>/.
     """
-    auth_header = request.headers.get("Authorization")
-    if not auth_header:
-        return JsonResponse({"error": "Authorization header missing"}, status=401)
+    student = request.user
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON body."}, status=400)
+
+    required_document_id = data.get("required_document_id")
+    size = data.get("size")
+
+    if not required_document_id:
+        return JsonResponse({"error": "required_document_id is required."}, status=400)
+
+    if not isinstance(size, int) or size <= 0:
+        return JsonResponse({"error": "size must be a positive number of bytes."}, status=400)
+
+    if size > MAX_FILE_SIZE:
+        return JsonResponse(
+            {"error": f"File size exceeds {MAX_FILE_SIZE // (1024 * 1024)} MB."}, status=400
+        )
+
+    if not StudentDocumentRequirement.objects.filter(id=required_document_id, student=student).exists():
+        return JsonResponse(
+            {"error": "Invalid required_document_id or access denied."}, status=404
+        )
 
-    token_str = auth_header.strip()
+    upload_token = upload_sessions.start(
+        f"student:{student.id}",
+        size,
+        str(data.get("filename") or "document")[:255],
+        required_document_id=required_document_id,
+        submitted_document=str(data.get("submitted_document_name") or ""),
+    )
+    return JsonResponse(
+        {"upload_token": upload_token, "offset": 0, "size": size, "max_chunk_size": UPLOAD_MAX_CHUNK_SIZE},
+        status=201,
+    )
+
+
+@csrf_exempt
+@require_http_methods(["GET", "PUT"])
+@user_token_required
+def document_upload_chunk(request, upload_token):
+    """
+    GET: how much of the upload has arrived, to resume from.
+    PUT: the next piece as the raw body, starting at byte Upload-Offset.
+    The piece that completes the file stores it as the document; a PUT
+    of zero bytes at the end retries that step.
+    """
+    student = request.user
+    session = upload_sessions.get(upload_token, f"student:{student.id}")
+    if session is None:
+        return JsonResponse({"error": "Upload not found."}, status=404)
+
+    if request.method == "GET":
+        return JsonResponse({"offset": session["offset"], "size": session["size"]})
 
     try:
-        token = UUID(token_str)
+        offset = int(request.headers.get("Upload-Offset", ""))
+        length = int(request.META.get("CONTENT_LENGTH") or 0)
     except ValueError:
-        return JsonResponse({"error": "Invalid auth token format"}, status=400)
+        return JsonResponse({"error": "Upload-Offset header is required."}, status=400)
 
-    user = None
-    user_type = None
-    user_id = None
+    if length > UPLOAD_MAX_CHUNK_SIZE or offset + length > session["size"]:
+        return JsonResponse({"error": "Piece too large.", "offset": session["offset"]}, status=413)
 
     try:
-        employee = Employee.objects.get(authToken=token)
-        user = employee
-        user_type = "employee"
-        user_id = employee.id
-    except Employee.DoesNotExist:
-        try:
-            student = Student.objects.get(authToken=token)
-            user = student
-            user_type = "student"
-            user_id = student.id
-        except Student.DoesNotExist:
-            return JsonResponse({"error": "Invalid token"}, status=401)
+        offset = upload_sessions.append(upload_token, offset, request, length)
+    except UploadConflict as e:
+        return JsonResponse({"error": "Upload-Offset does not match.", "offset": e.offset}, status=409)
 
-    required_document_id = request.GET.get("required_document_id")
-    if not required_document_id:
-        return JsonResponse({"error": "required_document_id is required."}, status=400)
+    if offset < session["size"]:
+        return JsonResponse({"offset": offset, "size": session["size"]})
 
+    meta = session["meta"]
     try:
-        # Fetch the Document and its related requirement
-        document = get_object_or_404(
-            Document,
-            required_document__id=required_document_id
+        required_document = StudentDocumentRequirement.objects.get(
+            id=meta["required_document_id"], student=student
+        )
+    except StudentDocumentRequirement.DoesNotExist:
+        upload_sessions.discard(upload_token)
+        return JsonResponse(
+            {"error": "Invalid required_document_id or access denied."}, status=404
         )
 
-        student = document.required_document.student
+    try:
+        with upload_sessions.open(upload_token, session["filename"]) as file_obj:
+            document = _attach_document(required_document, file_obj, meta["submitted_document"])
+    except ValueError as e:
+        upload_sessions.discard(upload_token)
+        return JsonResponse({"error": str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({"error": f"Upload failed: {e}", "offset": offset}, status=500)
 
-        if user_type == "student":
-            # Student can only download their own documents
-            if student.id != user_id:
-                return JsonResponse({"error": "Document not found."}, status=403)
+    upload_sessions.discard(upload_token)
+    return _document_uploaded(document, required_document, meta["submitted_document"])
 
-        elif user_type == "employee":
-            # Employee (counsellor) can download if assigned to the student
-            is_assigned = AssignedCounsellor.objects.filter(
-                student=student,
-                employee=user
-            ).exists()
 
-            if not is_assigned:
-                return JsonResponse(
-                    {"error": "Access denied: You are not assigned to this student."},
-                    status=403
-                )
-            
-        filename = document.required_document.document_type.name
+def _document_meta(document) -> AssetMeta:
+    """The document's cached download metadata, filled in from storage for older rows."""
+    if document.size is not None:
+        return AssetMeta(document.content_type, document.size, document.etag)
+    meta = stat_asset(asset_ref(document.storage_key, document.file_id))
+    # Unless it was re-uploaded meanwhile
+    Document.objects.filter(pk=document.pk, file_uuid=document.file_uuid).update(
+        content_type=meta.content_type, size=meta.size, etag=meta.etag
+    )
+    return meta
 
-        # Stream the file from Google Drive
-        response = stream_private_drive_file(document.file_id, filename=filename)
 
-        if isinstance(response, JsonResponse):
-            return response
-
-        return response
-
-    except Document.DoesNotExist:
+def _serve_document(request, document):
+    try:
+        return serve_asset(
+            request,
+            asset_ref(document.storage_key, document.file_id),
+            filename=document.required_document.document_type.name,
+            meta=_document_meta(document),
+        )
+    except AssetNotFound:
         return JsonResponse({"error": "Document not found."}, status=404)
     except Exception as e:
         return JsonResponse(
@@ -978,6 +1055,116 @@ def download_document(request):
             status=500,
         )
 
+
+def _signed_download_url(document_id, file_uuid) -> str:
+    """
+    A link to the document that works without an Authorization header
+    for DOCUMENT_DOWNLOAD_URL_TTL seconds, so players and download
+    managers can resume with plain Range requests. It stops working
+    once the document is re-uploaded.
+    """
+    signed = signing.dumps([document_id, str(file_uuid)], salt=DOWNLOAD_URL_SALT)
+    return f"/user/documents/{signed}/"
+
+
+def _authorized_document(request):
+    """
+    (document, None) for the required_document_id in the query string if
+    the Authorization token may read it, else (None, error response).
+    Accessible by:
+      - The student who uploaded it
+      - Any counsellor (Employee) assigned to that student
+    """
+    auth_header = request.headers.get("Authorization")
+    if not auth_header:
+        return None, JsonResponse({"error": "Authorization header missing"}, status=401)
+
+    try:
+        token = UUID(auth_header.strip())
+    except ValueError:
+        return None, JsonResponse({"error": "Invalid auth token format"}, status=400)
+
+    user, user_type = resolve_principal(token)
+    if user is None:
+        return None, JsonResponse({"error": "Invalid token"}, status=401)
+
+    required_document_id = request.GET.get("required_document_id")
+    if not required_document_id:
+        return None, JsonResponse({"error": "required_document_id is required."}, status=400)
+
+    document = (
+        Document.objects.select_related("required_document__document_type")
+        .filter(required_document__id=required_document_id)
+        .first()
+    )
+    if document is None:
+        return None, JsonResponse({"error": "Document not found."}, status=404)
+
+    student_id = document.required_document.student_id
+    if user_type == "student":
+        # Student can only download their own documents
+        if student_id != user.id:
+            return None, JsonResponse({"error": "Document not found."}, status=403)
+
+    elif user_type == "employee":
+        # Employee (counsellor) can download if assigned to the student
+        is_assigned = AssignedCounsellor.objects.filter(
+            student_id=student_id,
+            employee=user
+        ).exists()
+
+        if not is_assigned:
+            return None, JsonResponse(
+                {"error": "Access denied: You are not assigned to this student."},
+                status=403
+            )
+
+    return document, None
+
+
+@csrf_exempt
+def download_document(request):
+    """
+    Download a document by required_document_id.
+    Filename is taken from DocumentType.name
+    """
+    document, error = _authorized_document(request)
+    if error is not None:
+        return error
+    return _serve_document(request, document)
+
+
+@require_http_methods(["GET"])
+def document_download_link(request):
+    """
+    A short-lived signed link to a document by required_document_id,
+    for the same users as download_document.
+    """
+    document, error = _authorized_document(request)
+    if error is not None:
+        return error
+    return JsonResponse({"url": _signed_download_url(document.pk, document.file_uuid), "expires_in": DOWNLOAD_URL_TTL})
+
+
+@require_http_methods(["GET"])
+def download_signed_document(request, signed):
+    """Download through a link from _signed_download_url; the signature is the authorization."""
+    try:
+        document_id, file_uuid = signing.loads(signed, salt=DOWNLOAD_URL_SALT, max_age=DOWNLOAD_URL_TTL)
+    except signing.SignatureExpired:
+        return JsonResponse({"error": "Download link has expired."}, status=410)
+    except (signing.BadSignature, ValueError):
+        return JsonResponse({"error": "Invalid download link."}, status=403)
+
+    document = (
+        Document.objects.select_related("required_document__document_type")
+        .filter(pk=document_id, file_uuid=file_uuid)
+        .first()
+    )
+    if document is None:
+        return JsonResponse({"error": "Document not found."}, status=404)
+    return _serve_document(request, document)
+
 @require_http_methods(["GET"])
 @user_token_required
 def get_student_documents_list(request):
@@ -999,7 +1186,8 @@ def get_student_documents_list(request):
                     d.id AS document_id,
                     d.counsellor_comments,
                     d.submitted_document,
-                    d.updated_at
+                    d.updated_at,
+                    d.file_uuid
                 FROM student_studentdocumentrequirement sdr
                 INNER JOIN student_documenttype dt
                     ON sdr.document_type_id = dt.id
@@ -1024,13 +1212,10 @@ def get_student_documents_list(request):
                 counsellor_comments,
                 submitted_document,
                 updated_at,
+                file_uuid,
             ) = row
 
-            download_link = (
-                f"/user/download_document/?document_id={required_doc_id}"
-                if required_doc_id
-                else None
-            )
+            download_link = _signed_download_url(doc_id, file_uuid) if doc_id else None
 
             documents.append(
                 {
@@ -1356,26 +1541,24 @@ def upload_image_to_drive(request):
 
     try:
         existing_pic = StudentProfilePicture.objects.filter(student=student).first()
-        old_google_file_id = existing_pic.google_file_id if existing_pic else None
+        old_ref = asset_ref(existing_pic.storage_key, existing_pic.google_file_id) if existing_pic else None
 
-        drive_file_id, generated_uuid = upload_profile_picture(upload_file)
+        ref, generated_uuid = save_asset("profile", upload_file)
         featured_image_url = (
-            f"https://admin.gradglobe.org/profile/images?id={drive_file_id}"
+            f"https://admin.gradglobe.org/profile/images?id={drive_file_id(ref) or ref}"
         )
 
         StudentProfilePicture.objects.update_or_create(
             student=student,
             defaults={
-                "google_file_id": drive_file_id,
+                "google_file_id": drive_file_id(ref) or "",
+                "storage_key": ref,
                 "image_uuid": generated_uuid,
             },
         )
 
-        if old_google_file_id:
-            try:
-                delete_from_google_drive(old_google_file_id)
-            except Exception:
-                pass
+        if old_ref:
+            delete_asset(old_ref)
 
         return JsonResponse(
             {
@@ -1401,12 +1584,13 @@ def get_profile_pic(request):
 
     try:
         profile_pic = StudentProfilePicture.objects.get(student=student)
-        file_id = profile_pic.google_file_id
+        ref = asset_ref(profile_pic.storage_key, profile_pic.google_file_id)
 
-        if not file_id:
+        if not ref:
             return HttpResponse("Profile image not found", status=404)
 
-        return stream_google_drive_image(file_id, width, height)
+        # Same URL for every picture a student uploads: revalidate by ETag
+        return image_cache.serve(request, ref, width, height, cache_control="private, no-cache")
 
     except StudentProfilePicture.DoesNotExist:
         return HttpResponse("Profile image not found", status=404)
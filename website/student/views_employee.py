@@ -13,7 +13,8 @@ from website.utils import api_key_required, has_perms, token_required
 from .models import *
 
 from django.http import HttpResponse
-from .utils import stream_google_drive_image
+from website.image_cache import image_cache
+from website.storage import asset_ref
 
 
 @require_http_methods(["GET"])
@@ -811,12 +812,13 @@ def get_student_profile_pic(request):
 
     try:
         profile_pic = StudentProfilePicture.objects.get(student_id=student_id)
-        file_id = profile_pic.google_file_id
+        ref = asset_ref(profile_pic.storage_key, profile_pic.google_file_id)
 
-        if not file_id:
+        if not ref:
             return HttpResponse("Profile image not found", status=404)
 
-        return stream_google_drive_image(file_id, width, height)
+        # Same URL for every picture a student uploads: revalidate by ETag
+        return image_cache.serve(request, ref, width, height, cache_control="private, no-cache")
 
     except StudentProfilePicture.DoesNotExist:
         return HttpResponse("Profile image not found", status=404)
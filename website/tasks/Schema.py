@@ -1,5 +1,5 @@
 import strawberry
-from typing import Optional, Annotated, List, Any, Awaitable
+from typing import Optional, Annotated, List, Any, Awaitable, AsyncGenerator
 from datetime import datetime
 from authentication.models import Employee
 from student.models import Student
@@ -7,6 +7,11 @@ from tasks.models import Task, TaskAssignment
 from strawberry.exceptions import GraphQLError
 import uuid
 from django.db import transaction
+from django.db.models import Q
+from asgiref.sync import sync_to_async
+from strawberry.scalars import JSON
+from authentication.Utils import SchemaMixin
+from website.event_bus import TASK_EVENTS, event_bus
 
 
 @strawberry.type
@@ -55,7 +60,7 @@ class TaskSchema:
         tasks = (
             (assigned_tasks | created_tasks)
             .distinct()
-            .prefetch_related("assignments__employee")
+            .prefetch_related("assignments__employee", "assignments__student")
         )
 
         result: list[TaskSchema] = []
@@ -355,4 +360,24 @@ class TaskMutation:
 
     delete_task: TaskSchema = strawberry.field(
         resolver=TaskSchema.delete_task
-    )
\ No newline at end of file
+    )
+
+@strawberry.type
+class TaskSubscription:
+
+    @strawberry.subscription(description='Changes to tasks you created or are assigned to, as {"action": "created" | "updated" | "deleted", "id": ...}')
+    async def task(self, auth_token: str) -> AsyncGenerator[JSON, None]:
+        user = await SchemaMixin.aget_employee(auth_token)
+        if not user:
+            raise GraphQLError("Invalid auth token")
+
+        is_visible = sync_to_async(
+            lambda task_id: Task.objects.filter(
+                Q(creator_employee=user) | Q(assignments__employee=user), id=task_id
+            ).exists()
+        )
+
+        async for event in event_bus.subscribe(TASK_EVENTS):
+            # A deleted task can't be looked up anymore; its id alone is harmless
+            if user.is_superuser or event["action"] == "deleted" or await is_visible(event["id"]):
+                yield event
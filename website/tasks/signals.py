@@ -0,0 +1,28 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from website.event_bus import TASK_EVENTS, event_bus
+from .models import Task, TaskAssignment
+
+
+@receiver(post_save, sender=Task)
+def task_saved(sender, instance, created, **kwargs):
+    event = {"action": "created" if created else "updated", "id": str(instance.id)}
+    transaction.on_commit(lambda: event_bus.emit(TASK_EVENTS, event))
+
+
+@receiver(post_delete, sender=Task)
+def task_deleted(sender, instance, **kwargs):
+    # Also deferred, so it goes out after the "updated" events of the
+    # assignments that cascade with it
+    event = {"action": "deleted", "id": str(instance.id)}
+    transaction.on_commit(lambda: event_bus.emit(TASK_EVENTS, event))
+
+
+@receiver(post_save, sender=TaskAssignment)
+@receiver(post_delete, sender=TaskAssignment)
+def task_assignment_changed(sender, instance, **kwargs):
+    # Assignee changes and per-assignee status are updates of the task
+    event = {"action": "updated", "id": str(instance.task_id)}
+    transaction.on_commit(lambda: event_bus.emit(TASK_EVENTS, event))
@@ -11,6 +11,7 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from student.models import Student
 
+from website.token_cache import resolve_principal
 from website.utils import token_required
 
 from .models import Task, TaskAssignment
@@ -34,17 +35,9 @@ def my_tasks(request):
     except ValueError:
         return JsonResponse({"error": "Invalid auth token format"}, status=400)
 
-    user = None
-    user_type = None
-    try:
-        user = Employee.objects.get(authToken=token)
-        user_type = "employee"
-    except Employee.DoesNotExist:
-        try:
-            user = Student.objects.get(authToken=token)
-            user_type = "student"
-        except Student.DoesNotExist:
-            return JsonResponse({"error": "Invalid token"}, status=401)
+    user, user_type = resolve_principal(token)
+    if user is None:
+        return JsonResponse({"error": "Invalid token"}, status=401)
 
     if user_type == "employee":
         assigned_tasks = Task.objects.filter(assignments__employee=user)
@@ -2,14 +2,20 @@ import math
 import uuid
 
 import strawberry
+from typing import Annotated, Callable, Union
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import connection, transaction, IntegrityError
 from authentication.Utils import SchemaMixin
+from authentication.permissions import permission_resolver
 from authentication.models import Employee
 from strawberry.exceptions import GraphQLError
 from university.models import *
 from .AllSchemas import *
 from django.db.models import Q
+from strawberry import Info
+from website.loaders import get_loaders
+from website.fuzzy_search import fuzzy_query
+from website.pagination import PageInfo, cached_count, decode_cursor, keyset_page
 from website.utils import EmployeeAuthorization
 
 
@@ -29,13 +35,125 @@ class UniversitySchema(SchemaMixin):
 
     location: Optional[LocationSchema] = None
 
-    admission_stats: Optional[List[AdmissionStatsSchema]] = None
-    work_opportunities: Optional[List[WorkOpportunitySchema]] = None
-    contacts: Optional[List[UniversityContactSchema]] = None
-    statistics: Optional[List[UniversityStatsSchema]] = None
-    video_links: Optional[List[UniversityVideoLinkSchema]] = None
-    rankings: Optional[List[UniversityRankingSchema]] = None
-    faqs: Optional[List[UniversityFAQSchema]] = None
+    # Nested lists are either built up front (detail view) or, when named in
+    # `deferred`, resolved lazily through the request's batch loaders.
+    admission_stats: strawberry.Private[Optional[List[AdmissionStatsSchema]]] = None
+    work_opportunities: strawberry.Private[Optional[List[WorkOpportunitySchema]]] = None
+    contacts: strawberry.Private[Optional[List[UniversityContactSchema]]] = None
+    statistics: strawberry.Private[Optional[List[UniversityStatsSchema]]] = None
+    video_links: strawberry.Private[Optional[List[UniversityVideoLinkSchema]]] = None
+    rankings: strawberry.Private[Optional[List[UniversityRankingSchema]]] = None
+    faqs: strawberry.Private[Optional[List[UniversityFAQSchema]]] = None
+    deferred: strawberry.Private[frozenset] = frozenset()
+
+    NESTED_FIELDS = frozenset({
+        "admission_stats", "work_opportunities", "contacts", "statistics",
+        "video_links", "rankings", "faqs",
+    })
+
+    @classmethod
+    def prime_nested(cls, info: Info, university_ids: list[int]):
+        loaders = get_loaders(info)
+        for loader in (
+            loaders.admission_stats_by_university,
+            loaders.work_opportunities_by_university,
+            loaders.contacts_by_university,
+            loaders.statistics_by_university,
+            loaders.video_links_by_university,
+            loaders.rankings_by_university,
+            loaders.faqs_by_university,
+        ):
+            loader.prime(university_ids)
+
+    @strawberry.field(name="admissionStats")
+    def resolve_admission_stats(self, info: Info) -> Optional[List[AdmissionStatsSchema]]:
+        if "admission_stats" not in self.deferred:
+            return self.admission_stats
+        return [
+            AdmissionStatsSchema(
+                id=a.id,
+                application_fee=a.application_fee,
+                admission_type=a.admission_type,
+                gpa_min=a.GPA_min,
+                gpa_max=a.GPA_max,
+                sat_min=a.SAT_min,
+                sat_max=a.SAT_max,
+                act_min=a.ACT_min,
+                act_max=a.ACT_max,
+                ielts_min=a.IELTS_min,
+                ielts_max=a.IELTS_max,
+            )
+            for a in get_loaders(info).admission_stats_by_university.load(self.id)
+        ]
+
+    @strawberry.field(name="workOpportunities")
+    def resolve_work_opportunities(self, info: Info) -> Optional[List[WorkOpportunitySchema]]:
+        if "work_opportunities" not in self.deferred:
+            return self.work_opportunities
+        return [
+            WorkOpportunitySchema(id=w.id, name=w.name)
+            for w in get_loaders(info).work_opportunities_by_university.load(self.id)
+        ]
+
+    @strawberry.field(name="contacts")
+    def resolve_contacts(self, info: Info) -> Optional[List[UniversityContactSchema]]:
+        if "contacts" not in self.deferred:
+            return self.contacts
+        return [
+            UniversityContactSchema(
+                id=c.id,
+                name=c.name,
+                designation=c.designation,
+                email=c.email,
+                phone=c.phone,
+            )
+            for c in get_loaders(info).contacts_by_university.load(self.id)
+        ]
+
+    @strawberry.field(name="statistics")
+    def resolve_statistics(self, info: Info) -> Optional[List[UniversityStatsSchema]]:
+        if "statistics" not in self.deferred:
+            return self.statistics
+        return [
+            UniversityStatsSchema(id=st.id, name=st.name, value=st.value)
+            for st in get_loaders(info).statistics_by_university.load(self.id)
+        ]
+
+    @strawberry.field(name="videoLinks")
+    def resolve_video_links(self, info: Info) -> Optional[List[UniversityVideoLinkSchema]]:
+        if "video_links" not in self.deferred:
+            return self.video_links
+        return [
+            UniversityVideoLinkSchema(id=v.id, url=v.url)
+            for v in get_loaders(info).video_links_by_university.load(self.id)
+        ]
+
+    @strawberry.field(name="rankings")
+    def resolve_rankings(self, info: Info) -> Optional[List[UniversityRankingSchema]]:
+        if "rankings" not in self.deferred:
+            return self.rankings
+        return [
+            UniversityRankingSchema(
+                id=r.id,
+                rank=r.rank,
+                ranking_agency=RankingSchema(
+                    id=r.ranking_agency.id,
+                    name=r.ranking_agency.name,
+                    description=r.ranking_agency.description,
+                    logo=r.ranking_agency.logo,
+                ),
+            )
+            for r in get_loaders(info).rankings_by_university.load(self.id)
+        ]
+
+    @strawberry.field(name="faqs")
+    def resolve_faqs(self, info: Info) -> Optional[List[UniversityFAQSchema]]:
+        if "faqs" not in self.deferred:
+            return self.faqs
+        return [
+            UniversityFAQSchema(id=f.id, question=f.question, answer=f.answer)
+            for f in get_loaders(info).faqs_by_university.load(self.id)
+        ]
 
     @classmethod
     def university_schema_builder(cls,data: dict) -> "UniversitySchema":
@@ -151,9 +269,7 @@ class UniversitySchema(SchemaMixin):
         if not emp:
             raise GraphQLError("Unauthorized")
 
-        has_permission = emp.job_roles.filter(
-            permissions__name="university_view"
-        ).exists()
+        has_permission = permission_resolver.has_perms(emp, ["university_view"])
 
         if not has_permission and not emp.is_superuser:
             raise GraphQLError("You do not have permission to view university")
@@ -196,9 +312,7 @@ class UniversitySchema(SchemaMixin):
         if not emp:
             raise GraphQLError("Unauthorized")
 
-        has_permission = emp.job_roles.filter(
-            permissions__name="university_create"
-        ).exists()
+        has_permission = permission_resolver.has_perms(emp, ["university_create"])
 
         if not has_permission and not emp.is_superuser:
             raise GraphQLError("You do not have permission to create university")
@@ -368,9 +482,7 @@ class UniversitySchema(SchemaMixin):
         if not emp:
             raise GraphQLError("Unauthorized")
 
-        has_permission = emp.job_roles.filter(
-            permissions__name="university_update"
-        ).exists()
+        has_permission = permission_resolver.has_perms(emp, ["university_update"])
 
         if not has_permission and not emp.is_superuser:
             raise GraphQLError("You do not have permission to update university")
@@ -579,9 +691,9 @@ class UniversitySchema(SchemaMixin):
         if not emp:
             raise GraphQLError("Unauthorized")
 
-        has_permission = emp.job_roles.filter(
-            permissions__name__in=["university_update", "university_add"]
-        ).exists()
+        has_permission = permission_resolver.has_any_perm(
+            emp, ["university_update", "university_add"]
+        )
 
         if not has_permission and not emp.is_superuser:
             raise GraphQLError("You do not have permission to view ranking agencies")
@@ -609,18 +721,28 @@ class UniversitySchema(SchemaMixin):
 class UniversityOutputSchema(EmployeeAuthorization, SchemaMixin):
     limit : int
     current_page: int
-    total_count: int
+    # An int in page mode; in cursor mode a callable so the count only runs
+    # when the client selects `totalCount`
+    total_count: strawberry.Private[Union[int, Callable[[], int]]]
     universities: List[UniversitySchema]
+    page_info: Optional[PageInfo] = None
+
+    @strawberry.field(name="totalCount")
+    def resolve_total_count(self) -> int:
+        return self.total_count() if callable(self.total_count) else self.total_count
 
     @classmethod
     def get_universities(
             cls,
+            info: Info,
             auth_token: str,
             country: Optional[str] = None,
             query: Optional[str] = None,
             sort_by_id_asc: Optional[bool] = False,
             page: int = 1,
             limit: Optional[int] = 50,
+            cursor_pagination: Annotated[Optional[bool], strawberry.argument(description="Page by `after` cursor instead of page number; `totalCount` is then cached and only counted if selected.")] = False,
+            after: Optional[str] = None,
     ) -> "UniversityOutputSchema":
 
         emp = cls.get_employee(auth_token)
@@ -628,9 +750,7 @@ class UniversityOutputSchema(EmployeeAuthorization, SchemaMixin):
         if not emp:
             raise GraphQLError("Unauthorized")
 
-        has_permission = emp.job_roles.filter(
-            permissions__name="university_view"
-        ).exists()
+        has_permission = permission_resolver.has_perms(emp, ["university_view"])
 
         if not has_permission and not emp.is_superuser:
             raise GraphQLError("You do not have permission to view university")
@@ -638,56 +758,124 @@ class UniversityOutputSchema(EmployeeAuthorization, SchemaMixin):
         if page < 1:
             raise GraphQLError("Page must be greater than 0")
 
+        cursor_pagination = cursor_pagination or after is not None
         limit = min(limit or 50, 100)
         offset = (page - 1) * limit
         country = country.strip() if country else None
-        query = query.strip() if query else None
+        search = fuzzy_query(query)
+        query = search.text if search else None
+
+        # A search is ordered best match first, (rank, id) is then the cursor
+        last_key = None
+        if after:
+            try:
+                last_key = decode_cursor(after, float, int) if search else decode_cursor(after, int)
+            except ValueError:
+                raise GraphQLError("Invalid cursor")
+
         university_table = university._meta.db_table
         location_table = location._meta.db_table
-        order_by = "u.id ASC" if sort_by_id_asc else "u.id DESC"
-        sql = f"""
-        SELECT
-            u.id              AS university_id,
-            u.cover_url,
-            u.name,
-            u.type,
-            u.establish_year,
-            u.status,
-            u.about,
-            u.review_rating,
-            u.avg_acceptance_rate,
-            u.avg_tution_fee,
-            u.location_map_link,
-
-            l.id              AS location_id,
-            l.city,
-            l.state,
-            l.country,
-
-            COUNT(*) OVER()   AS total_count
+        search_sql, search_params = search.where("u.name") if search else ("TRUE", [])
+        rank_sql, rank_params = search.rank("u.name") if search else ("0", [])
+        if search:
+            order_by = "rank DESC, u.id DESC"
+        else:
+            order_by = "u.id ASC" if sort_by_id_asc else "u.id DESC"
+        from_where = f"""
         FROM {university_table} u
         JOIN {location_table} l ON u.location_id = l.id
         WHERE
             (%s IS NULL OR LOWER(l.country) = LOWER(%s))
-            AND (%s IS NULL OR LOWER(u.name) LIKE LOWER(%s))
-        ORDER BY {order_by}
-        LIMIT %s OFFSET %s;
+            AND {search_sql}
         """
-        params = [
+        filter_params = [
             country,
             country,
-            query,
-            f"%{query}%" if query else None,
-            limit,
-            offset,
+            *search_params,
         ]
 
+        if cursor_pagination:
+            # Keyset page: no window count and no OFFSET, see website.pagination
+            if search:
+                keyset = f"({rank_sql}, u.id) < (%s, %s)"
+                keyset_params = rank_params + list(last_key) if last_key else []
+            else:
+                keyset = "u.id > %s" if sort_by_id_asc else "u.id < %s"
+                keyset_params = list(last_key) if last_key else []
+            sql = f"""
+            SELECT
+                u.id              AS university_id,
+                u.cover_url,
+                u.name,
+                u.type,
+                u.establish_year,
+                u.status,
+                u.about,
+                u.review_rating,
+                u.avg_acceptance_rate,
+                u.avg_tution_fee,
+                u.location_map_link,
+
+                l.id              AS location_id,
+                l.city,
+                l.state,
+                l.country,
+
+                {rank_sql}        AS rank
+            {from_where}
+                {"AND " + keyset if last_key else ""}
+            ORDER BY {order_by}
+            LIMIT %s;
+            """
+            params = rank_params + filter_params + keyset_params + [limit + 1]
+        else:
+            sql = f"""
+            SELECT
+                u.id              AS university_id,
+                u.cover_url,
+                u.name,
+                u.type,
+                u.establish_year,
+                u.status,
+                u.about,
+                u.review_rating,
+                u.avg_acceptance_rate,
+                u.avg_tution_fee,
+                u.location_map_link,
+
+                l.id              AS location_id,
+                l.city,
+                l.state,
+                l.country,
+
+                {rank_sql}        AS rank,
+                COUNT(*) OVER()   AS total_count
+            {from_where}
+            ORDER BY {order_by}
+            LIMIT %s OFFSET %s;
+            """
+            params = rank_params + filter_params + [limit, offset]
+
         with connection.cursor() as cursor:
             cursor.execute(sql, params)
             columns = [col[0] for col in cursor.description]
             rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
 
-        total_count = rows[0]["total_count"] if rows else 0
+        page_info = None
+        if cursor_pagination:
+            if search:
+                rows, page_info = keyset_page(rows, limit, key=lambda row: (row["rank"], row["university_id"]))
+            else:
+                rows, page_info = keyset_page(rows, limit, key=lambda row: (row["university_id"],))
+
+            def total_count():
+                def count():
+                    with connection.cursor() as cursor:
+                        cursor.execute(f"SELECT COUNT(*) {from_where}", filter_params)
+                        return cursor.fetchone()[0]
+                return cached_count(f"universities:{country}:{query}", count)
+        else:
+            total_count = rows[0]["total_count"] if rows else 0
 
         universities = [
             UniversitySchema(
@@ -710,22 +898,18 @@ class UniversityOutputSchema(EmployeeAuthorization, SchemaMixin):
                     country=row["country"],
                 ),
 
-                admission_stats=None,
-                work_opportunities=None,
-                contacts=None,
-                statistics=None,
-                video_links=None,
-                rankings=None,
-                faqs=None,
+                deferred=UniversitySchema.NESTED_FIELDS,
             )
             for row in rows
         ]
+        UniversitySchema.prime_nested(info, [u.id for u in universities])
 
         return cls(
             limit=limit,
             current_page=page,
             total_count=total_count,
             universities=universities,
+            page_info=page_info,
         )
 
 @strawberry.type
@@ -756,9 +940,7 @@ class CountrySchema(SchemaMixin):
         if not emp:
             raise GraphQLError("Unauthorized")
 
-        has_permission = emp.job_roles.filter(
-            permissions__name="university_view"
-        ).exists()
+        has_permission = permission_resolver.has_perms(emp, ["university_view"])
 
         if not has_permission and not emp.is_superuser:
             raise GraphQLError("You do not have permission to view university(location)")
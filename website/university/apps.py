@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class UniversityConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'university'
-    verbose_name = 'universities'
\ No newline at end of file
+    verbose_name = 'universities'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.1 on 2026-10-18 17:33
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('university', '0020_alter_admissionstats_admission_type'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='university',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='idx_university_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
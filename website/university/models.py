@@ -1,3 +1,4 @@
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 from django.core.validators import MaxValueValidator, MinValueValidator
 
@@ -158,6 +159,10 @@ class university(models.Model):
     class Meta:
         verbose_name = "University"
         verbose_name_plural = "Universities"
+        indexes = [
+            # Fuzzy admin search, see website/fuzzy_search.py
+            GinIndex(fields=["name"], name="idx_university_name_trgm", opclasses=["gin_trgm_ops"]),
+        ]
 
     def __str__(self):
         return self.name
@@ -0,0 +1,30 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from website.result_cache import catalog_cache
+
+# Everything the catalog stored functions read from: universities and their
+# details, countries/locations, courses and scholarships
+CATALOG_APPS = frozenset({"university", "course", "scholarship"})
+
+
+def _invalidate_catalog():
+    # Once now, and again after commit so a concurrent request can't cache
+    # the pre-commit result under the new version
+    catalog_cache.invalidate()
+    transaction.on_commit(catalog_cache.invalidate)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def catalog_row_changed(sender, **kwargs):
+    if sender._meta.app_label in CATALOG_APPS:
+        _invalidate_catalog()
+
+
+@receiver(m2m_changed)
+def catalog_relation_changed(sender, action, **kwargs):
+    # e.g. Scholarship.university / eligible_nationalities
+    if action.startswith("post_") and sender._meta.app_label in CATALOG_APPS:
+        _invalidate_catalog()
@@ -1,3 +1,71 @@
 from django.test import TestCase
 
-# Create your tests here.
+from authentication.models import Employee
+from website.GlobalSchema import schema
+
+from .models import location, university
+
+UNIVERSITY_LIST = """
+query ($authToken: String!, $after: String, $limit: Int, $asc: Boolean) {
+  university {
+    getUniversityList(authToken: $authToken, cursorPagination: true, after: $after, limit: $limit, sortByIdAsc: $asc) {
+      universities { id }
+      pageInfo { hasNextPage endCursor }
+      totalCount
+    }
+  }
+}
+"""
+
+
+class UniversityListCursorTests(TestCase):
+    def setUp(self):
+        self.employee = Employee.objects.create(
+            username="admin", password="x", name="Admin", phone_number="9000000000",
+            email="admin@example.com", is_superuser=True,
+        )
+        place = location.objects.create(city="Berlin", state="Berlin", country="Germany")
+        self.ids = [
+            university.objects.create(
+                cover_url=f"https://example.com/{i}.jpg", name=f"University {i}", type="PUBLIC",
+                establish_year=1900 + i, location=place, about="", admission_requirements="",
+                location_map_link=f"https://maps.example.com/{i}", review_rating=4,
+                avg_acceptance_rate=50, avg_tution_fee=1000,
+            ).id
+            for i in range(7)
+        ]
+
+    def page(self, after=None, limit=3, asc=False):
+        result = schema.execute_sync(
+            UNIVERSITY_LIST,
+            variable_values={"authToken": str(self.employee.authToken), "after": after, "limit": limit, "asc": asc},
+            context_value={},
+        )
+        self.assertIsNone(result.errors)
+        return result.data["university"]["getUniversityList"]
+
+    def all_pages(self, **kwargs):
+        ids, after = [], None
+        for _ in range(len(self.ids) + 1):
+            data = self.page(after=after, **kwargs)
+            ids += [int(u["id"]) for u in data["universities"]]
+            if not data["pageInfo"]["hasNextPage"]:
+                return ids
+            after = data["pageInfo"]["endCursor"]
+        self.fail(f"Paging did not finish: {ids}")
+
+    def test_pages_cover_every_university_once(self):
+        self.assertEqual(self.all_pages(), sorted(self.ids, reverse=True))
+        self.assertEqual(self.all_pages(asc=True, limit=2), sorted(self.ids))
+
+    def test_total_is_counted_on_request(self):
+        self.assertEqual(self.page()["totalCount"], len(self.ids))
+
+    def test_invalid_cursor(self):
+        with self.assertLogs("strawberry.execution", "ERROR"):
+            result = schema.execute_sync(
+                UNIVERSITY_LIST,
+                variable_values={"authToken": str(self.employee.authToken), "after": "not-a-cursor"},
+                context_value={},
+            )
+        self.assertEqual(result.errors[0].message, "Invalid cursor")
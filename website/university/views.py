@@ -12,6 +12,7 @@ from scholarship.models import Scholarship
 from django.db.models import Avg, Count, Min
 from psycopg2.extras import RealDictCursor
 from student.utils import create_student_log
+from website.result_cache import cached_json_response, catalog_cache
 
 
 @csrf_exempt
@@ -75,16 +76,19 @@ def paginated_universities(request):
     cities = [c.strip() for c in city_param.split(",")] if city_param else []
     states = [s.strip() for s in state_param.split(",")] if state_param else []
 
-    with connection.cursor() as cursor:
-        cursor.execute(
-            """
-            SELECT * FROM paginated_universities_fn(%s, %s, %s);
-            """,
-            [page, cities, states],
-        )
-        results = dictfetchall(cursor)
+    def compute():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT * FROM paginated_universities_fn(%s, %s, %s);
+                """,
+                [page, cities, states],
+            )
+            results = dictfetchall(cursor)
+        return {"results": results, "page": page, "count": len(results)}
 
-    return JsonResponse({"results": results, "page": page, "count": len(results)})
+    result = catalog_cache.get_or_compute("paginated_universities_fn", [page, cities, states], compute)
+    return cached_json_response(request, result)
 
 
 # Invoked by a supabase Function 'get_university_with_courses'
@@ -97,14 +101,18 @@ def get_university_by_name(request):
     if not university_name:
         return JsonResponse({"error": "Missing 'name' query parameter"}, status=400)
 
-    with connection.cursor() as cursor:
-        cursor.execute("SELECT get_university_with_courses(%s);", [university_name])
-        row = cursor.fetchone()
+    def compute():
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT get_university_with_courses(%s);", [university_name])
+            row = cursor.fetchone()
+        return row[0] if row and row[0] else None
+
+    result = catalog_cache.get_or_compute("get_university_with_courses", [university_name], compute)
 
-    if not row or not row[0]:
+    if result is None:
         return JsonResponse({"error": "University not found"}, status=404)
     create_student_log(request, f"Oppened University Page for '{university_name}'")
-    return JsonResponse(row[0], safe=False, status=200)
+    return cached_json_response(request, result)
 
 
 @csrf_exempt
@@ -119,13 +127,18 @@ def destination_page(request):
         return JsonResponse({"error": "Country parameter is required"}, status=400)
 
     # Execute the get_destination_page function using a cursor
-    try:
+    def compute():
         with connection.cursor() as cursor:
             cursor.execute("SELECT get_destination_page(%s)", [country_name])
-            result = cursor.fetchone()[0]  # Fetch the JSON result
+            return cursor.fetchone()[0]  # Fetch the JSON result
+
+    try:
+        result = catalog_cache.get_or_compute("get_destination_page", [country_name], compute)
 
         create_student_log(request, f"Oppened Destination Page for '{country_name}'")
-        # Return the JSON response directly
-        return JsonResponse(result)
+        if result is None:
+            return JsonResponse({"error": "Destination not found"}, status=404)
+        # Return the cached JSON directly
+        return cached_json_response(request, result)
     except Exception as e:
         return JsonResponse({"error": f"Database error: {str(e)}"}, status=500)
@@ -3,10 +3,10 @@ from strawberry.extensions import QueryDepthLimiter, MaxAliasesLimiter, MaxToken
 from strawberry.schema.config import StrawberryConfig
 from authentication.Schema import EmployeeQuery, EmployeeMutation, EmployeeSubscription
 from blogs.Schema import BlogQuery, BlogMutation
-from tasks.Schema import TaskQuery, TaskMutation
+from tasks.Schema import TaskQuery, TaskMutation, TaskSubscription
 from university.Schema import UniversityQuery, UniversityMutation
 from course.Schema import CourseQuery, CourseMutation
-from student.Schema import StudentsQuery, StudentMutation
+from student.Schema import StudentsQuery, StudentMutation, StudentSubscription
 from scholarship.Schema import ScholarshipQuery, ScholarshipMutation
 
 @strawberry.type
@@ -74,6 +74,8 @@ class Mutation:
 @strawberry.type
 class Subscription(
     EmployeeSubscription,
+    StudentSubscription,
+    TaskSubscription,
 ):
     pass
 
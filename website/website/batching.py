@@ -0,0 +1,138 @@
+"""
+Write-behind batching for fire-and-forget writes made from request handlers.
+
+A BackgroundBatcher owns a bounded in-process queue and one writer thread
+per process. submit() never blocks and never touches the database: when
+the queue is full the item is dropped and counted (the request is worth
+more than its log line). The writer takes up to max_batch items, waiting
+at most flush_interval seconds for them, and hands them to write() in one
+go. If the write fails because the database is unreachable
+(transient_errors), the batch is retried with the next one, up to a bound.
+Any other failure is about the items themselves (an IntegrityError, say):
+the batch is then written one item at a time and only the items that
+still fail are dropped. Whatever is still queued is written at
+interpreter exit.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from django.db import InterfaceError, OperationalError, close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundBatcher:
+    name = "batcher"
+    # Failures of the backend rather than of the items: retry the batch later
+    transient_errors = (OperationalError, InterfaceError)
+
+    def __init__(self, flush_interval: float, queue_size: int, max_batch: int):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._unwritten = []
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def write(self, items: list):
+        """Persist a batch; runs on the writer thread."""
+        raise NotImplementedError
+
+    def submit(self, item) -> bool:
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                logger.warning("%s queue is full, %s items dropped so far", self.name, self.dropped)
+            return False
+
+    def _ensure_writer(self):
+        # Forked workers inherit the object but not the thread
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread.is_alive():
+                return
+            if self._pid is None:
+                atexit.register(self.drain)
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _collect(self) -> list:
+        items = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(items) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                items.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return items
+
+    def _flush(self, items: list):
+        items = self._unwritten + items
+        self._unwritten = []
+        if not items:
+            return
+        close_old_connections()
+        try:
+            self.write(items)
+        except self.transient_errors:
+            logger.exception("%s failed to write %s items", self.name, len(items))
+            self._retry_later(items)
+        except Exception:
+            logger.warning("%s failed to write a batch, writing it item by item", self.name, exc_info=True)
+            self._write_each(items)
+
+    def _write_each(self, items: list):
+        rejected = 0
+        for i, item in enumerate(items):
+            try:
+                self.write([item])
+            except self.transient_errors:
+                logger.exception("%s failed to write %s items", self.name, len(items) - i)
+                self._retry_later(items[i:])
+                break
+            except Exception:
+                rejected += 1
+                logger.debug("%s rejected %r", self.name, item, exc_info=True)
+        if rejected:
+            self.dropped += rejected
+            logger.error("%s dropped %s items it could not write", self.name, rejected)
+
+    def _retry_later(self, items: list):
+        if len(items) <= self.max_batch * 10:
+            self._unwritten = items
+        else:
+            self.dropped += len(items)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._flush(self._collect())
+
+    def drain(self):
+        """Stop the writer and write everything still buffered."""
+        self._stopping.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(self.flush_interval + 5)
+        items = []
+        while True:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        self._flush(items)
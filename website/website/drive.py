@@ -0,0 +1,139 @@
+"""
+Shared Google Drive clients.
+
+Building a Drive client used to cost a token refresh against
+oauth2.googleapis.com plus a parse of the Drive discovery document on
+every upload, download and delete. Instead:
+
+- one OAuth Credentials object per process, refreshed under a lock once
+  the access token is within DRIVE_TOKEN_REFRESH_MARGIN seconds of expiry
+- the discovery document is loaded once
+- built services are kept in a small pool. A googleapiclient service
+  (its httplib2.Http) must not be used by two threads at once, so each
+  caller checks one out for the duration of its calls:
+
+    with drive_service() as service:
+        service.files().get(fileId=file_id).execute()
+
+GOOGLE_TOKEN_URI and DRIVE_API_ENDPOINT (e.g. http://127.0.0.1:8001/) can
+point at a fake Drive server,
+see `manage.py benchmark_drive`.
+"""
+
+import json
+import queue
+import threading
+import urllib.parse
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import google_auth_httplib2
+import httplib2
+from django.conf import settings
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+
+DEFAULT_SCOPES = ["https://www.googleapis.com/auth/drive.file"]
+DEFAULT_TOKEN_URI = "https://oauth2.googleapis.com/token"
+
+POOL_SIZE = getattr(settings, "DRIVE_POOL_SIZE", 8)
+TOKEN_REFRESH_MARGIN = getattr(settings, "DRIVE_TOKEN_REFRESH_MARGIN", 300)  # seconds
+HTTP_TIMEOUT = getattr(settings, "DRIVE_HTTP_TIMEOUT", 60)  # seconds
+# Resumable upload chunk, a multiple of 256 KB; also the largest single-request upload
+UPLOAD_CHUNK_SIZE = getattr(settings, "DRIVE_UPLOAD_CHUNK_SIZE", 8 * 1024 * 1024)
+# Size of each ranged read when streaming a download through to a client
+DOWNLOAD_CHUNK_SIZE = getattr(settings, "DRIVE_DOWNLOAD_CHUNK_SIZE", 1024 * 1024)
+
+
+def new_credentials() -> Credentials:
+    return Credentials(
+        token=None,
+        refresh_token=getattr(settings, "GOOGLE_REFRESH_TOKEN"),
+        token_uri=getattr(settings, "GOOGLE_TOKEN_URI", DEFAULT_TOKEN_URI),
+        client_id=getattr(settings, "GOOGLE_CLIENT_ID"),
+        client_secret=getattr(settings, "GOOGLE_CLIENT_SECRET"),
+        scopes=getattr(settings, "GOOGLE_SCOPES", DEFAULT_SCOPES),
+    )
+
+
+def discovery_document() -> dict:
+    """The bundled Drive v3 discovery document, pointed at DRIVE_API_ENDPOINT if set."""
+    document = json.loads(get_static_doc("drive", "v3"))
+    endpoint = getattr(settings, "DRIVE_API_ENDPOINT", None)
+    if endpoint:
+        # rootUrl also makes up the media upload URLs, scheme included
+        root = urllib.parse.urlsplit(endpoint)
+        document["rootUrl"] = f"{root.scheme}://{root.netloc}/"
+    return document
+
+
+class DriveClientPool:
+    def __init__(self, size: int, refresh_margin: int):
+        self.refresh_margin = timedelta(seconds=refresh_margin)
+        self._services = queue.LifoQueue(maxsize=size)
+        self._credentials = None
+        self._credentials_lock = threading.Lock()
+        self._discovery = None
+
+    def credentials(self) -> Credentials:
+        """The shared credentials, with a token valid for at least refresh_margin."""
+        with self._credentials_lock:
+            if self._credentials is None:
+                self._credentials = new_credentials()
+            creds = self._credentials
+            # google-auth keeps expiry as naive UTC
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+            if not creds.token or (creds.expiry and creds.expiry - now < self.refresh_margin):
+                creds.refresh(Request())
+            return creds
+
+    def _discovery_document(self) -> dict:
+        if self._discovery is None:
+            self._discovery = discovery_document()
+        return self._discovery
+
+    def _build(self):
+        http = google_auth_httplib2.AuthorizedHttp(
+            self.credentials(), http=httplib2.Http(timeout=HTTP_TIMEOUT)
+        )
+        return build_from_document(self._discovery_document(), http=http)
+
+    def acquire(self):
+        try:
+            service = self._services.get_nowait()
+        except queue.Empty:
+            return self._build()
+        # Refreshes the shared token first if it is about to expire
+        self.credentials()
+        return service
+
+    def release(self, service):
+        try:
+            self._services.put_nowait(service)
+        except queue.Full:
+            pass
+
+    def reset(self):
+        """Drop pooled services and credentials (settings changed, tests)."""
+        with self._credentials_lock:
+            self._credentials = None
+            self._discovery = None
+        while True:
+            try:
+                self._services.get_nowait()
+            except queue.Empty:
+                break
+
+
+drive_pool = DriveClientPool(POOL_SIZE, TOKEN_REFRESH_MARGIN)
+
+
+@contextmanager
+def drive_service():
+    service = drive_pool.acquire()
+    try:
+        yield service
+    finally:
+        drive_pool.release(service)
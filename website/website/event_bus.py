@@ -1,35 +1,256 @@
+"""
+Event bus behind the GraphQL subscriptions.
+
+emit(topic, payload) is called from sync code (signals, on_commit hooks) in
+any process; subscribe(topic) is an async generator used by subscription
+resolvers on the ASGI workers. The backend decides how far an event goes:
+
+- memory:   this process only (dev / runserver)
+- redis:    Redis pub/sub, every ASGI worker on every node. emit() only
+            queues the event; a background thread publishes it, so a
+            slow or unreachable Redis never holds up a request.
+- postgres: LISTEN/NOTIFY on the database we already run
+
+Each subscriber gets a bounded buffer. A slow client never holds up the
+others: an event identical to one still waiting in its buffer is coalesced,
+and once the buffer is full the oldest pending event is dropped.
+"""
+
 import asyncio
-from collections import defaultdict
+import json
+import logging
+import select
+import threading
+from collections import defaultdict, deque
 from typing import Any, AsyncGenerator
 
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .batching import BackgroundBatcher
+
+logger = logging.getLogger(__name__)
+
+EMPLOYEE_EVENTS = "employee.events"
+STUDENT_EVENTS = "student.events"
+APPLICATION_EVENTS = "application.events"
+TASK_EVENTS = "task.events"
+
+
+class _Subscriber:
+    def __init__(self, loop, maxsize: int):
+        self.loop = loop
+        self.maxsize = maxsize
+        self.pending = deque()
+        self.ready = asyncio.Event()
+        self.dropped = 0
+
+    def offer(self, payload):
+        # Runs on self.loop
+        if payload in self.pending:
+            return
+        if len(self.pending) >= self.maxsize:
+            self.pending.popleft()
+            self.dropped += 1
+        self.pending.append(payload)
+        self.ready.set()
+
+    async def get(self):
+        while not self.pending:
+            self.ready.clear()
+            await self.ready.wait()
+        return self.pending.popleft()
+
 
 class InMemoryEventBus:
-    def __init__(self):
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
         self.topics = defaultdict(list)
-        self.loop = None
+        self._lock = threading.Lock()
 
     async def subscribe(self, topic: str) -> AsyncGenerator[Any, None]:
-        # Capture the ASGI loop when the first person subscribes
-        self.loop = asyncio.get_running_loop()
-
-        queue = asyncio.Queue()
-        self.topics[topic].append(queue)
+        subscriber = _Subscriber(asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self.topics[topic].append(subscriber)
+        self._on_subscribe(subscriber.loop)
         try:
             while True:
-                yield await queue.get()
+                yield await subscriber.get()
         finally:
-            self.topics[topic].remove(queue)
+            with self._lock:
+                self.topics[topic].remove(subscriber)
+            if subscriber.dropped:
+                logger.info("Subscriber on %s dropped %s events", topic, subscriber.dropped)
 
     def emit(self, topic: str, payload: Any):
-        if not self.loop:
-            return  # No active subscribers
+        self._deliver(topic, payload)
+
+    def _on_subscribe(self, loop):
+        pass
+
+    def _deliver(self, topic: str, payload: Any):
+        # Safe from any thread: each subscriber is fed on its own loop
+        with self._lock:
+            subscribers = list(self.topics.get(topic, ()))
+        for subscriber in subscribers:
+            subscriber.loop.call_soon_threadsafe(subscriber.offer, payload)
+
+    def _encode(self, topic: str, payload: Any) -> str:
+        return json.dumps({"topic": topic, "payload": payload}, cls=DjangoJSONEncoder)
+
+    def _deliver_raw(self, raw):
+        try:
+            message = json.loads(raw)
+            topic, payload = message["topic"], message["payload"]
+        except (TypeError, ValueError, KeyError):
+            logger.warning("Ignoring malformed event %r", raw)
+            return
+        self._deliver(topic, payload)
+
+
+class _RedisPublisher(BackgroundBatcher):
+    """Publishes queued events on the writer thread, a pipeline per batch."""
+
+    name = "event-bus-publisher"
+
+    def __init__(self, url: str, channel: str, timeout: float, queue_size: int):
+        import redis
+
+        super().__init__(flush_interval=0.05, queue_size=queue_size, max_batch=100)
+        self.transient_errors = (redis.RedisError,)
+        self.url = url
+        self.channel = channel
+        self.timeout = timeout
+        self._client = None
+
+    def write(self, messages: list):
+        import redis
+
+        if self._client is None:
+            self._client = redis.Redis.from_url(
+                self.url, socket_timeout=self.timeout, socket_connect_timeout=self.timeout
+            )
+        pipeline = self._client.pipeline(transaction=False)
+        for message in messages:
+            pipeline.publish(self.channel, message)
+        pipeline.execute()
+
+
+class RedisEventBus(InMemoryEventBus):
+    """
+    Events are published on one Redis channel; each process with
+    subscribers runs a single listener task that fans them out locally.
+    """
+
+    def __init__(self, url: str, channel: str, queue_size: int = 100, publish_timeout: float = 2.0,
+                 publish_queue_size: int = 1000):
+        super().__init__(queue_size)
+        self.url = url
+        self.channel = channel
+        self._listener = None
+        self._publisher = _RedisPublisher(url, channel, publish_timeout, publish_queue_size)
+
+    def emit(self, topic: str, payload: Any):
+        self._publisher.submit(self._encode(topic, payload))
+
+    def _on_subscribe(self, loop):
+        if self._listener is None or self._listener.done():
+            self._listener = loop.create_task(self._listen())
+
+    async def _listen(self):
+        import redis.asyncio as aioredis
+
+        delay = 1
+        while True:
+            client = aioredis.Redis.from_url(self.url)
+            try:
+                async with client.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    delay = 1
+                    async for message in pubsub.listen():
+                        if message.get("type") == "message":
+                            self._deliver_raw(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Event bus listener lost Redis, retrying in %ss", delay, exc_info=True)
+            finally:
+                await client.aclose()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30)
+
+
+class PostgresEventBus(InMemoryEventBus):
+    """
+    NOTIFY on the Django connection, so an event emitted inside a
+    transaction is only delivered if and when it commits. Each process with
+    subscribers keeps one extra connection LISTENing in a background thread.
+    Payloads are limited to ~8000 bytes by Postgres; keep events small.
+    """
+
+    def __init__(self, channel: str, queue_size: int = 100):
+        super().__init__(queue_size)
+        self.channel = channel
+        self._listener = None
+
+    def emit(self, topic: str, payload: Any):
+        from django.db import DatabaseError, connection
+
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_notify(%s, %s)", [self.channel, self._encode(topic, payload)])
+        except DatabaseError:
+            logger.warning("Could not notify %s event", topic, exc_info=True)
+
+    def _on_subscribe(self, loop):
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name="event-bus-listener", daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        import psycopg2
+        from django.db import connections
+
+        delay = 1
+        while True:
+            conn = None
+            try:
+                conn = psycopg2.connect(**connections["default"].get_connection_params())
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f'LISTEN "{self.channel}"')
+                delay = 1
+                while True:
+                    if select.select([conn], [], [], 30) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self._deliver_raw(conn.notifies.pop(0).payload)
+            except Exception:
+                logger.warning("Event bus listener lost Postgres, retrying in %ss", delay, exc_info=True)
+            finally:
+                if conn is not None:
+                    conn.close()
+            threading.Event().wait(delay)
+            delay = min(delay * 2, 30)
 
-        # This is the bridge that makes 'runserver' work with signals
-        self.loop.call_soon_threadsafe(self._put_in_queues, topic, payload)
 
-    def _put_in_queues(self, topic, payload):
-        for queue in self.topics[topic]:
-            queue.put_nowait(payload)
+def _build_event_bus():
+    backend = getattr(settings, "EVENT_BUS_BACKEND", "memory")
+    queue_size = getattr(settings, "EVENT_BUS_QUEUE_SIZE", 100)
+    channel = getattr(settings, "EVENT_BUS_CHANNEL", "event_bus")
+    if backend == "redis":
+        return RedisEventBus(
+            settings.REDIS_URL,
+            channel,
+            queue_size,
+            publish_timeout=getattr(settings, "EVENT_BUS_PUBLISH_TIMEOUT", 2.0),
+            publish_queue_size=getattr(settings, "EVENT_BUS_PUBLISH_QUEUE_SIZE", 1000),
+        )
+    if backend == "postgres":
+        return PostgresEventBus(channel, queue_size)
+    return InMemoryEventBus(queue_size)
 
 
-event_bus = InMemoryEventBus()
+event_bus = _build_event_bus()
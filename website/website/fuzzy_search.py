@@ -0,0 +1,106 @@
+"""
+Typo-tolerant admin search on pg_trgm.
+
+The searched columns carry GIN trigram indexes (gin_trgm_ops), which serve
+three kinds of match:
+
+- substring, ILIKE '%q%' (or ~* for the ORM, see below), case-insensitive
+- fuzzy, q <% column: some run of words in the column is trigram-similar
+  to q (pg_trgm.word_similarity_threshold, 0.6 by default), so "harvrd" finds
+  "Harvard University"
+- prefix, only used for ranking: a column starting with q scores highest
+
+Results are ranked by prefix match, then word_similarity, best first.
+Queries shorter than three characters have no trigrams; they still match
+by substring, but without help from the index.
+
+Raw SQL resolvers use FuzzyQuery.where()/rank(), which return fragments
+and their params. ORM resolvers use FuzzyQuery.q()/rank_expression().
+Django's icontains compiles to UPPER(col) LIKE ..., which no trigram index
+on the plain column can serve, so the ORM side matches with iregex instead.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db.models import Case, ExpressionWrapper, FloatField, Q, Value, When
+from django.db.models.functions import Coalesce, Greatest
+
+# Scored on top of word_similarity (0..1), so any prefix hit outranks fuzzy ones
+PREFIX_BOOST = 1.0
+
+_LIKE_SPECIAL = str.maketrans({"\\": "\\\\", "%": "\\%", "_": "\\_"})
+_REGEX_SPECIAL = set(".^$*+?()[]{}|\\")
+
+
+def _regex_escape(text: str) -> str:
+    return "".join("\\" + ch if ch in _REGEX_SPECIAL else ch for ch in text)
+
+
+@dataclass(frozen=True)
+class FuzzyQuery:
+    text: str
+
+    @property
+    def contains_pattern(self) -> str:
+        return f"%{self.text.translate(_LIKE_SPECIAL)}%"
+
+    @property
+    def prefix_pattern(self) -> str:
+        return f"{self.text.translate(_LIKE_SPECIAL)}%"
+
+    # Raw SQL ---------------------------------------------------------------
+
+    def where(self, *columns: str) -> tuple[str, list]:
+        """`(... OR ...)` matching any of the columns, and its params."""
+        clauses, params = [], []
+        for column in columns:
+            clauses.append(f"{column} ILIKE %s OR %s <%% {column}")
+            params += [self.contains_pattern, self.text]
+        return "(" + " OR ".join(clauses) + ")", params
+
+    def rank(self, *columns: str) -> tuple[str, list]:
+        """A float8 score (higher is better) over the columns, and its params."""
+        scores, params = [], []
+        for column in columns:
+            scores.append(
+                f"COALESCE(CASE WHEN {column} ILIKE %s THEN {PREFIX_BOOST} ELSE 0 END"
+                f" + word_similarity(%s, {column}), 0)"
+            )
+            params += [self.prefix_pattern, self.text]
+        sql = scores[0] if len(scores) == 1 else "GREATEST(" + ", ".join(scores) + ")"
+        return f"({sql})::float8", params
+
+    # ORM ---------------------------------------------------------------------
+
+    def q(self, *fields: str) -> Q:
+        condition = Q()
+        pattern = _regex_escape(self.text)
+        for field in fields:
+            condition |= Q(**{f"{field}__iregex": pattern}) | Q(**{f"{field}__trigram_word_similar": self.text})
+        return condition
+
+    def rank_expression(self, *fields: str):
+        prefix = "^" + _regex_escape(self.text)
+        scores = [
+            Coalesce(
+                ExpressionWrapper(
+                    Case(
+                        When(**{f"{field}__iregex": prefix}, then=Value(PREFIX_BOOST)),
+                        default=Value(0.0),
+                    )
+                    + TrigramWordSimilarity(self.text, field),
+                    output_field=FloatField(),
+                ),
+                Value(0.0),
+            )
+            for field in fields
+        ]
+        return scores[0] if len(scores) == 1 else Greatest(*scores)
+
+
+def fuzzy_query(text: Optional[str]) -> Optional[FuzzyQuery]:
+    """A FuzzyQuery for a search box value, or None if it is blank."""
+    text = " ".join((text or "").split())
+    return FuzzyQuery(text) if text else None
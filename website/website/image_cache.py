@@ -0,0 +1,286 @@
+"""
+Resized blog and profile images, cached on local disk.
+
+stream_post_image and the profile picture views used to proxy Drive's
+thumbnail endpoint on every view. image_cache.serve() instead keeps, under
+IMAGE_CACHE_ROOT:
+
+- originals/  each source image once, named by the sha256 of its bytes
+- derived/    Pillow renders of an original: width/height rounded up to a
+              size bucket, encoded as AVIF or WebP when the client's
+              Accept allows it
+- refs/       storage reference -> (sha256, content type) of its original
+
+so files are content-addressed: two references to the same bytes share
+their renders, and a render's ETag never changes. Hits are a stat() and a
+FileResponse (or an X-Accel-Redirect to nginx when IMAGE_CACHE_ACCEL_PREFIX
+is set). Concurrent misses for the same image in a process wait on one
+fetch/render. Once the cache outgrows IMAGE_CACHE_MAX_BYTES, the least
+recently used files are removed.
+
+Drive images are fetched from their public link, as before, so only files
+shared with anyone can be reached through these public endpoints.
+"""
+
+import hashlib
+import io
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+
+import requests
+from cachetools import LRUCache
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+from .storage import AssetNotFound, drive_file_id, read_asset
+
+logger = logging.getLogger(__name__)
+
+# Bump when rendering changes, so old renders are not served under new ETags
+RENDER_VERSION = 1
+SIZE_BUCKETS = (64, 128, 200, 320, 480, 640, 800, 1024, 1280, 1600, 1920)
+QUALITY = {"avif": 60, "webp": 80, "jpeg": 85}
+CONTENT_TYPES = {"avif": "image/avif", "webp": "image/webp", "jpeg": "image/jpeg", "png": "image/png"}
+# Touch a hit file's mtime (the LRU clock) at most this often
+TOUCH_INTERVAL = 3600  # seconds
+FLIGHT_TIMEOUT = 30  # seconds
+
+PUBLIC_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def _bucket(size: int | None) -> int | None:
+    if not size or size <= 0:
+        return None
+    for bucket in SIZE_BUCKETS:
+        if size <= bucket:
+            return bucket
+    return SIZE_BUCKETS[-1]
+
+
+def _shard(root: str, area: str, name: str) -> str:
+    return os.path.join(root, area, name[:2], name)
+
+
+def _write_atomic(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class ImageCache:
+    def __init__(self, root, max_bytes: int, formats=("avif", "webp"), accel_prefix: str | None = None):
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self.formats = [fmt for fmt in formats if features.check(fmt)]
+        self.accel_prefix = accel_prefix
+        self._refs = LRUCache(maxsize=10000)
+        self._lock = threading.Lock()  # guards _refs (cachetools isn't thread-safe) and _inflight
+        self._inflight = {}
+        self._written = 0
+        self._evicting = False
+
+    # Single-flight
+
+    def _once(self, key: str, produce):
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = Future()
+        if not leader:
+            return flight.result(FLIGHT_TIMEOUT)
+        try:
+            result = produce()
+        except Exception as e:
+            flight.set_exception(e)
+            raise
+        else:
+            flight.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    # Originals
+
+    def _fetch(self, ref: str) -> tuple[bytes, str]:
+        file_id = drive_file_id(ref)
+        if file_id:
+            resp = requests.get(
+                f"https://drive.google.com/uc?id={file_id}", headers={"User-Agent": "Mozilla/5.0"}, timeout=10
+            )
+            if resp.status_code == 404:
+                raise AssetNotFound(ref)
+            resp.raise_for_status()
+            data, content_type = resp.content, resp.headers.get("Content-Type", "image/jpeg")
+        else:
+            data, content_type = read_asset(ref)
+        # Files that aren't shared come back as an HTML sign-in page
+        if not content_type.startswith("image/"):
+            raise AssetNotFound(ref)
+        return data, content_type
+
+    def _original(self, ref: str) -> tuple[str, str]:
+        """(sha256, content type) of the original behind `ref`, fetched if not on disk."""
+        ref_hash = hashlib.sha256(ref.encode()).hexdigest()
+        with self._lock:
+            known = self._refs.get(ref_hash)
+        if known is None:
+            try:
+                with open(_shard(self.root, "refs", ref_hash)) as f:
+                    known = tuple(f.read().split("\n", 1))
+            except (FileNotFoundError, ValueError):
+                pass
+        if known is not None and os.path.exists(_shard(self.root, "originals", known[0])):
+            with self._lock:
+                self._refs[ref_hash] = known
+            return known
+
+        def fetch():
+            data, content_type = self._fetch(ref)
+            sha = hashlib.sha256(data).hexdigest()
+            self._store(_shard(self.root, "originals", sha), data)
+            _write_atomic(_shard(self.root, "refs", ref_hash), f"{sha}\n{content_type}".encode())
+            return sha, content_type
+
+        known = self._once(f"ref:{ref_hash}", fetch)
+        with self._lock:
+            self._refs[ref_hash] = known
+        return known
+
+    # Renders
+
+    def _render(self, sha: str, width, height, fmt: str) -> bytes:
+        with open(_shard(self.root, "originals", sha), "rb") as f:
+            image = Image.open(io.BytesIO(f.read()))
+        image = ImageOps.exif_transpose(image)
+        if width or height:
+            image.thumbnail((width or image.width, height or image.height), Image.Resampling.LANCZOS)
+        if fmt == "jpeg" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        out = io.BytesIO()
+        image.save(out, fmt.upper(), quality=QUALITY.get(fmt, 85))
+        return out.getvalue()
+
+    def _negotiate(self, accept: str) -> str | None:
+        """Output format for this client, None to keep the original's."""
+        for fmt in self.formats:
+            if CONTENT_TYPES[fmt] in accept:
+                return fmt
+        return None
+
+    def resolve(self, ref: str, width=None, height=None, accept: str = "") -> tuple[str, str, str]:
+        """(path, content type, etag) of the cached image to send."""
+        sha, content_type = self._original(ref)
+        width, height = _bucket(width), _bucket(height)
+        fmt = self._negotiate(accept)
+        original = _shard(self.root, "originals", sha)
+
+        if fmt is None:
+            if not (width or height):
+                return original, content_type, f'"{sha}"'
+            fmt = {"image/png": "png", "image/webp": "webp"}.get(content_type, "jpeg")
+
+        name = f"{sha}-{width or 0}x{height or 0}-v{RENDER_VERSION}.{fmt}"
+        path = _shard(self.root, "derived", name)
+        if not os.path.exists(path):
+            try:
+                self._once(name, lambda: self._store(path, self._render(sha, width, height, fmt)))
+            except (UnidentifiedImageError, OSError, ValueError):
+                # Not something Pillow can render: send it as it is
+                logger.warning("Could not render %s, serving the original", ref, exc_info=True)
+                return original, content_type, f'"{sha}"'
+        return path, CONTENT_TYPES[fmt], f'"{name}"'
+
+    def serve(self, request, ref: str, width=None, height=None, cache_control: str = PUBLIC_CACHE_CONTROL):
+        try:
+            path, content_type, etag = self.resolve(ref, width, height, request.headers.get("Accept", ""))
+        except AssetNotFound:
+            return HttpResponse("Image not found", status=404)
+        except Exception:
+            logger.exception("Error fetching image %s", ref)
+            return HttpResponse("Error fetching image", status=500)
+
+        self._touch(path)
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            response = HttpResponseNotModified()
+        elif self.accel_prefix:
+            response = HttpResponse(content_type=content_type)
+            response["X-Accel-Redirect"] = f"{self.accel_prefix.rstrip('/')}/{os.path.relpath(path, self.root)}"
+        else:
+            try:
+                response = FileResponse(open(path, "rb"), content_type=content_type)
+            except FileNotFoundError:
+                # Evicted between resolve() and here
+                return self.serve(request, ref, width, height, cache_control)
+        response["ETag"] = etag
+        response["Cache-Control"] = cache_control
+        response["Vary"] = "Accept"
+        return response
+
+    # Size bound
+
+    def _store(self, path: str, data: bytes):
+        _write_atomic(path, data)
+        with self._lock:
+            self._written += len(data)
+            start = not self._evicting and self._written > self.max_bytes // 10
+            if start:
+                self._evicting = True
+                self._written = 0
+        if start:
+            threading.Thread(target=self.evict, name="image-cache-evict", daemon=True).start()
+
+    def _touch(self, path: str):
+        try:
+            if time.time() - os.stat(path).st_mtime > TOUCH_INTERVAL:
+                os.utime(path)
+        except OSError:
+            pass
+
+    def evict(self):
+        """Remove least recently used files until the cache is under 90% of max_bytes."""
+        try:
+            files = []
+            total = 0
+            for area in ("originals", "derived"):
+                for dirpath, _, names in os.walk(os.path.join(self.root, area)):
+                    for name in names:
+                        path = os.path.join(dirpath, name)
+                        try:
+                            st = os.stat(path)
+                        except FileNotFoundError:
+                            continue
+                        files.append((st.st_mtime, st.st_size, path))
+                        total += st.st_size
+            if total <= self.max_bytes:
+                return
+            files.sort()
+            target = self.max_bytes * 9 // 10
+            for _, size, path in files:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+        finally:
+            with self._lock:
+                self._evicting = False
+
+
+image_cache = ImageCache(
+    getattr(settings, "IMAGE_CACHE_ROOT", os.path.join(settings.BASE_DIR, "image_cache")),
+    getattr(settings, "IMAGE_CACHE_MAX_BYTES", 1024 * 1024 * 1024),
+    formats=getattr(settings, "IMAGE_CACHE_FORMATS", ("avif", "webp")),
+    accel_prefix=getattr(settings, "IMAGE_CACHE_ACCEL_PREFIX", None),
+)
@@ -0,0 +1,233 @@
+"""
+Request scoped batch loaders for nested GraphQL fields.
+
+Our GraphQLView executes synchronously, so this is a sync take on the
+DataLoader pattern: a list resolver primes the keys of every parent it
+returns, and the first nested resolver that actually needs one of them
+fetches all primed keys with a single IN (...) query. Nothing is fetched
+for fields the client didn't select.
+"""
+
+from collections import defaultdict
+from functools import cached_property
+
+from django.db.models import Prefetch
+
+from authentication.models import Employee
+from course.models import Course
+from scholarship.models import FAQ as ScholarshipFAQ
+from scholarship.models import Scholarship, ScholarshipExpenseCoverage
+from student.models import (AppliedUniversity, AssignedCounsellor, CallRequest,
+                            StudentMilestone, StudentSubMilestone)
+from university.models import (AdmissionStats, Country, Uni_contact,
+                               WorkOpportunity)
+from university.models import faqs as UniversityFAQ
+from university.models import stats as UniversityStat
+from university.models import university as University
+from university.models import university_ranking as UniversityRanking
+from university.models import videos_links as UniversityVideoLink
+
+
+class BatchLoader:
+    def __init__(self, batch_fn, default=None, on_batch=None):
+        # batch_fn(keys) -> {key: value}; keys missing from the result get default()
+        self._batch_fn = batch_fn
+        self._default = default or (lambda: None)
+        self._on_batch = on_batch
+        self._cache = {}
+        self._queue = set()
+
+    def prime(self, keys):
+        """Queue keys for the next batch without hitting the DB."""
+        self._queue.update(k for k in keys if k not in self._cache)
+
+    def load(self, key):
+        if key not in self._cache:
+            self._queue.add(key)
+            self._dispatch()
+        return self._cache[key]
+
+    def load_many(self, keys):
+        keys = list(keys)
+        missing = [k for k in keys if k not in self._cache]
+        if missing:
+            self._queue.update(missing)
+            self._dispatch()
+        return [self._cache[k] for k in keys]
+
+    def _dispatch(self):
+        keys = [k for k in self._queue if k not in self._cache]
+        self._queue.clear()
+        if not keys:
+            return
+        found = self._batch_fn(keys)
+        for key in keys:
+            self._cache[key] = found[key] if key in found else self._default()
+        if self._on_batch:
+            self._on_batch([self._cache[key] for key in keys])
+
+
+def by_id(queryset):
+    def batch(keys):
+        return {obj.pk: obj for obj in queryset.filter(pk__in=keys)}
+    return batch
+
+
+def grouped_by(queryset, fk: str):
+    """Rows of queryset grouped under their `fk` value, e.g. fk="student_id"."""
+    def batch(keys):
+        grouped = defaultdict(list)
+        for obj in queryset.filter(**{f"{fk}__in": keys}):
+            grouped[getattr(obj, fk)].append(obj)
+        return grouped
+    return batch
+
+
+def m2m_ids(through, source: str, target: str):
+    """Target ids per source id from an m2m through table."""
+    def batch(keys):
+        grouped = defaultdict(list)
+        rows = (
+            through.objects
+            .filter(**{f"{source}__in": keys})
+            .order_by("id")
+            .values_list(source, target)
+        )
+        for source_id, target_id in rows:
+            grouped[source_id].append(target_id)
+        return grouped
+    return batch
+
+
+def _flatten(groups):
+    return (obj for group in groups for obj in group)
+
+
+class LoaderRegistry:
+    """One instance per GraphQL request, see get_loaders()."""
+
+    # ---------------- By primary key ----------------
+    @cached_property
+    def courses(self):
+        return BatchLoader(by_id(Course.objects.only("id", "program_name", "university_id")))
+
+    @cached_property
+    def universities(self):
+        return BatchLoader(by_id(University.objects.only("id", "name", "location_id")))
+
+    @cached_property
+    def employees(self):
+        return BatchLoader(by_id(Employee.objects.only("id", "name", "username")))
+
+    @cached_property
+    def countries(self):
+        return BatchLoader(by_id(Country.objects.only("id", "name")))
+
+    # ---------------- Student ----------------
+    @cached_property
+    def applied_universities_by_student(self):
+        return BatchLoader(
+            grouped_by(AppliedUniversity.objects.all(), "student_id"),
+            default=list,
+            on_batch=lambda groups: self.courses.prime(a.course_id for a in _flatten(groups)),
+        )
+
+    @cached_property
+    def call_requests_by_student(self):
+        return BatchLoader(
+            grouped_by(CallRequest.objects.order_by("id"), "student_id"),
+            default=list,
+            on_batch=lambda groups: self.employees.prime(c.employee_id for c in _flatten(groups)),
+        )
+
+    @cached_property
+    def assigned_counsellors_by_student(self):
+        return BatchLoader(
+            grouped_by(AssignedCounsellor.objects.all(), "student_id"),
+            default=list,
+            on_batch=lambda groups: self.employees.prime(a.employee_id for a in _flatten(groups)),
+        )
+
+    @cached_property
+    def milestones_by_application(self):
+        return BatchLoader(
+            grouped_by(
+                StudentMilestone.objects.order_by("order").prefetch_related(
+                    Prefetch("steps", queryset=StudentSubMilestone.objects.order_by("order"))
+                ),
+                "application_id",
+            ),
+            default=list,
+        )
+
+    # ---------------- University ----------------
+    @cached_property
+    def admission_stats_by_university(self):
+        return BatchLoader(grouped_by(AdmissionStats.objects.order_by("id"), "university_id"), default=list)
+
+    @cached_property
+    def work_opportunities_by_university(self):
+        return BatchLoader(grouped_by(WorkOpportunity.objects.order_by("id"), "university_id"), default=list)
+
+    @cached_property
+    def contacts_by_university(self):
+        return BatchLoader(grouped_by(Uni_contact.objects.order_by("id"), "university_id"), default=list)
+
+    @cached_property
+    def statistics_by_university(self):
+        return BatchLoader(grouped_by(UniversityStat.objects.order_by("id"), "university_id"), default=list)
+
+    @cached_property
+    def video_links_by_university(self):
+        return BatchLoader(grouped_by(UniversityVideoLink.objects.order_by("id"), "university_id"), default=list)
+
+    @cached_property
+    def rankings_by_university(self):
+        return BatchLoader(
+            grouped_by(UniversityRanking.objects.select_related("ranking_agency").order_by("id"), "university_id"),
+            default=list,
+        )
+
+    @cached_property
+    def faqs_by_university(self):
+        return BatchLoader(grouped_by(UniversityFAQ.objects.order_by("id"), "university_id"), default=list)
+
+    # ---------------- Scholarship ----------------
+    @cached_property
+    def university_ids_by_scholarship(self):
+        return BatchLoader(
+            m2m_ids(Scholarship.university.through, "scholarship_id", "university_id"),
+            default=list,
+            on_batch=lambda groups: self.universities.prime(_flatten(groups)),
+        )
+
+    @cached_property
+    def nationality_ids_by_scholarship(self):
+        return BatchLoader(
+            m2m_ids(Scholarship.eligible_nationalities.through, "scholarship_id", "country_id"),
+            default=list,
+            on_batch=lambda groups: self.countries.prime(_flatten(groups)),
+        )
+
+    @cached_property
+    def expense_coverages_by_scholarship(self):
+        return BatchLoader(
+            grouped_by(ScholarshipExpenseCoverage.objects.select_related("expense_type"), "scholarship_id"),
+            default=list,
+        )
+
+    @cached_property
+    def faqs_by_scholarship(self):
+        return BatchLoader(grouped_by(ScholarshipFAQ.objects.all(), "scholarship_id"), default=list)
+
+
+def get_loaders(info) -> LoaderRegistry:
+    """The LoaderRegistry for the current request, created on first use."""
+    context = info.context
+    if isinstance(context, dict):
+        return context.setdefault("loaders", LoaderRegistry())
+    loaders = getattr(context, "loaders", None)
+    if loaders is None:
+        loaders = LoaderRegistry()
+        context.loaders = loaders
+    return loaders
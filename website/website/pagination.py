@@ -0,0 +1,76 @@
+"""
+Keyset (cursor) pagination helpers.
+
+List fields accept an opaque `after` cursor that encodes the (sort_key, id)
+of the last row the client saw; the next page is then a plain
+WHERE (sort_key, id) < (...) ORDER BY sort_key DESC, id DESC LIMIT n (or the
+ascending mirror of it), which costs the same at page 500 as at page 1. Totals are not part of a page:
+they are computed only when asked for and cached for a short while.
+"""
+
+import base64
+import hashlib
+import json
+from datetime import datetime
+from typing import Optional
+
+import strawberry
+from django.conf import settings
+
+from .shared_cache import get_or_compute
+
+
+@strawberry.type
+class PageInfo:
+    has_next_page: bool
+    end_cursor: Optional[str] = None
+
+
+def encode_cursor(*values) -> str:
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *parsers) -> tuple:
+    """
+    Decode a cursor made by encode_cursor(); each value is passed through the
+    matching parser, e.g. decode_cursor(after, datetime.fromisoformat, int).
+    Raises ValueError for anything that isn't a cursor we issued.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+    if not isinstance(values, list) or len(values) != len(parsers):
+        raise ValueError("Invalid cursor")
+    try:
+        return tuple(parse(value) for parse, value in zip(parsers, values))
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def keyset_page(rows: list, limit: int, key) -> tuple[list, PageInfo]:
+    """
+    Trim a page fetched with LIMIT limit + 1 and describe it. `key(row)`
+    returns the (sort_key, id) values the next cursor should carry.
+    """
+    has_next = len(rows) > limit
+    rows = rows[:limit]
+    end_cursor = encode_cursor(*key(rows[-1])) if rows else None
+    return rows, PageInfo(has_next_page=has_next, end_cursor=end_cursor)
+
+
+def cached_count(key: str, count_fn, ttl: int | None = None) -> int:
+    """count_fn() cached under key; totals for cursor pages may lag by ttl."""
+    if ttl is None:
+        ttl = getattr(settings, "PAGINATION_COUNT_CACHE_TTL", 60)
+    cache_key = "count:" + hashlib.sha1(key.encode()).hexdigest()
+    return get_or_compute(cache_key, count_fn, ttl)
+
+
+def cached_queryset_count(queryset, ttl: int | None = None) -> int:
+    return cached_count(str(queryset.query), queryset.count, ttl)
+
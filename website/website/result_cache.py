@@ -0,0 +1,90 @@
+import hashlib
+import json
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags, quote_etag
+
+from .shared_cache import get_or_compute
+
+
+class CachedJSON(NamedTuple):
+    body: bytes
+    etag: str
+
+
+class CatalogCache:
+    """
+    Serialized results of the catalog stored functions (university, course,
+    scholarship, destination pages), keyed by function name + arguments.
+
+    Every key embeds a catalog version number. A write to any catalog model
+    bumps the version (university.signals), which orphans all older entries
+    at once instead of having to know which pages a row appears on; the TTL
+    cleans them up and bounds staleness on caches that aren't shared.
+    """
+
+    def __init__(self, prefix: str, ttl: int):
+        self.prefix = prefix
+        self.ttl = ttl
+        self._version_key = f"{prefix}:version"
+
+    def version(self) -> int:
+        version = cache.get(self._version_key)
+        if version is None:
+            cache.add(self._version_key, 1, None)
+            version = cache.get(self._version_key, 1)
+        return version
+
+    def invalidate(self):
+        try:
+            cache.incr(self._version_key)
+        except ValueError:
+            # Not set yet (or evicted); anything cached was under another version
+            cache.add(self._version_key, 1, None)
+
+    def key(self, fn_name: str, args) -> str:
+        digest = hashlib.sha1(
+            json.dumps(args, sort_keys=True, cls=DjangoJSONEncoder).encode()
+        ).hexdigest()
+        return f"{self.prefix}:v{self.version()}:{fn_name}:{digest}"
+
+    def get_or_compute(self, fn_name: str, args, compute) -> CachedJSON | None:
+        """
+        Cached result of compute() for (fn_name, args). compute() returns the
+        JSON-able result; None means "nothing found" and is not cached.
+        """
+        def serialize():
+            data = compute()
+            if data is None:
+                return None
+            body = json.dumps(data, cls=DjangoJSONEncoder).encode()
+            return CachedJSON(body=body, etag=hashlib.sha1(body).hexdigest())
+
+        # Single-flight, so an expired hot page is rebuilt by one worker only
+        return get_or_compute(self.key(fn_name, args), serialize, self.ttl)
+
+
+catalog_cache = CatalogCache(
+    prefix="catalog",
+    ttl=getattr(settings, "CATALOG_CACHE_TTL", 600),
+)
+
+
+def cached_json_response(request, result: CachedJSON, status: int = 200) -> HttpResponse:
+    """Serve a CachedJSON, or a 304 if the client already has this version."""
+    etag = quote_etag(result.etag)
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match:
+        etags = parse_etags(if_none_match)
+        if "*" in etags or etag in etags or f"W/{etag}" in etags:
+            response = HttpResponseNotModified()
+            response["ETag"] = etag
+            return response
+
+    response = HttpResponse(result.body, status=status, content_type="application/json")
+    response["ETag"] = etag
+    return response
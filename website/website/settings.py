@@ -22,6 +22,56 @@ GOOGLE_DRIVE_FOLDER_ID_PRIVATE = os.getenv("GOOGLE_DRIVE_FOLDER_ID_PRIVATE")
 GOOGLE_DRIVE_FOLDER_ID_PROFILE = os.getenv("GOOGLE_DRIVE_FOLDER_ID_PROFILE")
 GOOGLE_SCOPES = ["https://www.googleapis.com/auth/drive.file"]
 
+# Shared Drive clients (website/drive.py): pooled services per process, and
+# how long before access-token expiry the shared credentials are refreshed.
+# GOOGLE_TOKEN_URI / DRIVE_API_ENDPOINT are only set to point at a fake Drive.
+DRIVE_POOL_SIZE = int(os.getenv("DRIVE_POOL_SIZE", "8"))
+DRIVE_TOKEN_REFRESH_MARGIN = int(os.getenv("DRIVE_TOKEN_REFRESH_MARGIN", "300"))  # seconds
+DRIVE_HTTP_TIMEOUT = int(os.getenv("DRIVE_HTTP_TIMEOUT", "60"))  # seconds
+DRIVE_UPLOAD_CHUNK_SIZE = int(os.getenv("DRIVE_UPLOAD_CHUNK_SIZE", str(8 * 1024 * 1024)))  # multiple of 256 KB
+DRIVE_DOWNLOAD_CHUNK_SIZE = int(os.getenv("DRIVE_DOWNLOAD_CHUNK_SIZE", str(1024 * 1024)))
+GOOGLE_TOKEN_URI = os.getenv("GOOGLE_TOKEN_URI", "https://oauth2.googleapis.com/token")
+DRIVE_API_ENDPOINT = os.getenv("DRIVE_API_ENDPOINT")
+
+# Uploaded assets (website/storage.py): "drive", "local" or "s3" for new
+# uploads; `manage.py migrate_drive_assets` moves existing ones off Drive.
+# With ASSET_STORAGE_ACCEL_PREFIX set, local files are handed to nginx
+# (an internal location aliased to ASSET_STORAGE_ROOT) via X-Accel-Redirect.
+ASSET_STORAGE_BACKEND = os.getenv("ASSET_STORAGE_BACKEND", "drive")
+ASSET_STORAGE_ROOT = os.getenv("ASSET_STORAGE_ROOT", str(BASE_DIR / "assets"))
+ASSET_STORAGE_ACCEL_PREFIX = os.getenv("ASSET_STORAGE_ACCEL_PREFIX")
+S3_STORAGE_BUCKET = os.getenv("S3_STORAGE_BUCKET")
+S3_STORAGE_ENDPOINT_URL = os.getenv("S3_STORAGE_ENDPOINT_URL")  # e.g. MinIO; unset for AWS
+S3_STORAGE_REGION = os.getenv("S3_STORAGE_REGION")
+S3_STORAGE_ACCESS_KEY = os.getenv("S3_STORAGE_ACCESS_KEY")
+S3_STORAGE_SECRET_KEY = os.getenv("S3_STORAGE_SECRET_KEY")
+# Redirect downloads to presigned bucket URLs instead of streaming through
+S3_STORAGE_REDIRECT = os.getenv("S3_STORAGE_REDIRECT", "False").lower() == "true"
+S3_STORAGE_URL_EXPIRY = int(os.getenv("S3_STORAGE_URL_EXPIRY", "300"))  # seconds
+
+# Blog / profile image cache (website/image_cache.py): originals and resized
+# renders on local disk, least recently used removed beyond MAX_BYTES.
+# FORMATS are offered in order to clients whose Accept lists them.
+IMAGE_CACHE_ROOT = os.getenv("IMAGE_CACHE_ROOT", str(BASE_DIR / "image_cache"))
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+IMAGE_CACHE_FORMATS = tuple(f for f in os.getenv("IMAGE_CACHE_FORMATS", "avif,webp").split(",") if f)
+IMAGE_CACHE_ACCEL_PREFIX = os.getenv("IMAGE_CACHE_ACCEL_PREFIX")
+
+# Upload limits. Uploads are streamed to storage, so these bound storage and
+# upload time, not memory. Documents can also be sent in resumable pieces of
+# up to UPLOAD_MAX_CHUNK_SIZE (website/uploads.py), staged under
+# UPLOAD_STAGING_ROOT (a shared volume when running more than one server)
+# and dropped after UPLOAD_SESSION_TTL seconds without progress.
+DOCUMENT_MAX_UPLOAD_SIZE = int(os.getenv("DOCUMENT_MAX_UPLOAD_SIZE", str(25 * 1024 * 1024)))
+BLOG_IMAGE_MAX_UPLOAD_MB = int(os.getenv("BLOG_IMAGE_MAX_UPLOAD_MB", "10"))
+UPLOAD_MAX_CHUNK_SIZE = int(os.getenv("UPLOAD_MAX_CHUNK_SIZE", str(8 * 1024 * 1024)))
+UPLOAD_STAGING_ROOT = os.getenv("UPLOAD_STAGING_ROOT", str(BASE_DIR / "upload_staging"))
+UPLOAD_SESSION_TTL = int(os.getenv("UPLOAD_SESSION_TTL", str(24 * 3600)))
+
+# Student document downloads (student/views.py) can go through signed links
+# that stay valid for DOCUMENT_DOWNLOAD_URL_TTL seconds without a token.
+DOCUMENT_DOWNLOAD_URL_TTL = int(os.getenv("DOCUMENT_DOWNLOAD_URL_TTL", "300"))
+
 # WhatsApp secrets
 WHATSAPP_TOKEN = os.getenv("WHATSAPP_TOKEN")
 WHATSAPP_PHONE_NUMBER_ID = os.getenv("WHATSAPP_PHONE_NUMBER_ID")
@@ -60,6 +110,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",  # trigram lookups, see website/fuzzy_search.py
 ]
 
 MIDDLEWARE = [
@@ -182,12 +233,98 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
-CACHES = {
-    "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-        "LOCATION": "unique-snowflake",  # just needs to be unique per project
+REDIS_URL = os.getenv("REDIS_URL")
+
+if REDIS_URL:
+    # Shared across workers/nodes, with a short-lived in-process L1 in front
+    # (website/shared_cache.py)
+    CACHES = {
+        "default": {
+            "BACKEND": "website.shared_cache.TieredCache",
+            "LOCATION": REDIS_URL,
+            "KEY_PREFIX": os.getenv("CACHE_KEY_PREFIX", "gradglobe"),
+            "OPTIONS": {
+                "L1_MAXSIZE": int(os.getenv("CACHE_L1_MAXSIZE", "1000")),
+                "L1_TIMEOUT": float(os.getenv("CACHE_L1_TIMEOUT", "5")),  # seconds
+            },
+        }
     }
-}
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "unique-snowflake",  # just needs to be unique per project
+        }
+    }
+
+# GraphQL subscription fan-out (website/event_bus.py): "memory" (this process
+# only), "redis" (pub/sub on REDIS_URL) or "postgres" (LISTEN/NOTIFY)
+EVENT_BUS_BACKEND = os.getenv("EVENT_BUS_BACKEND", "redis" if REDIS_URL else "memory")
+EVENT_BUS_CHANNEL = os.getenv("EVENT_BUS_CHANNEL", "event_bus")
+EVENT_BUS_QUEUE_SIZE = int(os.getenv("EVENT_BUS_QUEUE_SIZE", "100"))  # pending events per subscriber
+# Redis publishing happens on a background thread: events queued per process,
+# and the socket timeout for each publish
+EVENT_BUS_PUBLISH_QUEUE_SIZE = int(os.getenv("EVENT_BUS_PUBLISH_QUEUE_SIZE", "1000"))
+EVENT_BUS_PUBLISH_TIMEOUT = float(os.getenv("EVENT_BUS_PUBLISH_TIMEOUT", "2"))  # seconds
+
+# NL search parsing (course/FilterAi.py): concurrent LLM calls per process and
+# per-call timeout; beyond either, a keyword fallback parse is used
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "8"))  # seconds
+
+# Parsed NL search queries (search/parse_cache.py): per-process LRU size, and a
+# version to bump whenever the parse prompt or model changes
+PARSE_CACHE_SIZE = int(os.getenv("PARSE_CACHE_SIZE", "5000"))
+PARSE_CACHE_VERSION = os.getenv("PARSE_CACHE_VERSION", "1")
+
+# Smart-search analytics (search/analytics.py): searches are counted in memory
+# and upserted into unsanitized_searches every FLUSH_INTERVAL seconds
+SEARCH_ANALYTICS_FLUSH_INTERVAL = float(os.getenv("SEARCH_ANALYTICS_FLUSH_INTERVAL", "5"))
+SEARCH_ANALYTICS_QUEUE_SIZE = int(os.getenv("SEARCH_ANALYTICS_QUEUE_SIZE", "10000"))
+SEARCH_ANALYTICS_MAX_BATCH = int(os.getenv("SEARCH_ANALYTICS_MAX_BATCH", "500"))  # distinct queries per write
+
+# Student activity log (student/activity_log.py): StudentLogs rows are queued
+# and bulk-inserted every FLUSH_INTERVAL seconds or MAX_BATCH rows
+STUDENT_LOG_FLUSH_INTERVAL = float(os.getenv("STUDENT_LOG_FLUSH_INTERVAL", "2"))
+STUDENT_LOG_QUEUE_SIZE = int(os.getenv("STUDENT_LOG_QUEUE_SIZE", "20000"))
+STUDENT_LOG_MAX_BATCH = int(os.getenv("STUDENT_LOG_MAX_BATCH", "1000"))
+
+# Search box suggestions (search/autocomplete.py): how many to return, how
+# often (seconds) each process rebuilds its index, per-prefix answer LRU size
+AUTOCOMPLETE_LIMIT = int(os.getenv("AUTOCOMPLETE_LIMIT", "10"))
+AUTOCOMPLETE_REFRESH_INTERVAL = int(os.getenv("AUTOCOMPLETE_REFRESH_INTERVAL", "300"))
+AUTOCOMPLETE_CACHE_SIZE = int(os.getenv("AUTOCOMPLETE_CACHE_SIZE", "5000"))
+
+# Smart-search queries the local rule parser (course/RuleParser.py) understands
+# at least this well (0..1) skip the LLM
+RULE_PARSE_MIN_CONFIDENCE = float(os.getenv("RULE_PARSE_MIN_CONFIDENCE", "0.8"))
+
+# Subjective grading queue (exams/jobs.py, manage.py run_evaluation_worker):
+# answers per LLM call, attempts before giving up, base retry delay, and how
+# long a running job may go without finishing before another worker takes it
+EXAM_EVAL_BATCH_SIZE = int(os.getenv("EXAM_EVAL_BATCH_SIZE", "25"))
+EXAM_EVAL_MAX_ATTEMPTS = int(os.getenv("EXAM_EVAL_MAX_ATTEMPTS", "5"))
+EXAM_EVAL_RETRY_DELAY = int(os.getenv("EXAM_EVAL_RETRY_DELAY", "30"))  # seconds
+EXAM_EVAL_LOCK_TIMEOUT = int(os.getenv("EXAM_EVAL_LOCK_TIMEOUT", "600"))  # seconds
+
+# Exam autosave buffer (exams/autosave.py, manage.py flush_answer_buffer):
+# "redis" (a hash per attempt on REDIS_URL) or "table" (exams_answerdraft)
+EXAM_AUTOSAVE_BACKEND = os.getenv("EXAM_AUTOSAVE_BACKEND", "redis" if REDIS_URL else "table")
+
+# In-process authToken -> Employee/Student cache (website/token_cache.py)
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+AUTH_TOKEN_CACHE_TTL = int(os.getenv("AUTH_TOKEN_CACHE_TTL", "60"))  # seconds
+
+# Effective permission sets per employee (authentication/permissions.py)
+PERMISSION_CACHE_SIZE = int(os.getenv("PERMISSION_CACHE_SIZE", "10000"))
+PERMISSION_CACHE_TTL = int(os.getenv("PERMISSION_CACHE_TTL", "60"))  # seconds
+
+# Totals returned alongside cursor-paginated lists (website/pagination.py)
+PAGINATION_COUNT_CACHE_TTL = int(os.getenv("PAGINATION_COUNT_CACHE_TTL", "60"))  # seconds
+
+# Catalog stored-function results (website/result_cache.py); writes to
+# university/course/scholarship models invalidate them immediately
+CATALOG_CACHE_TTL = int(os.getenv("CATALOG_CACHE_TTL", "600"))  # seconds
 
 # Cors Settings
 CORS_ALLOW_HEADERS = ["*"]
@@ -0,0 +1,322 @@
+"""
+Shared cache tier.
+
+TieredCache is a Django cache backend: Redis (shared by every worker and
+node) with a small in-process L1 in front of it, so hot keys don't cost a
+network round trip on every request. Configured from REDIS_URL in settings;
+without it the app keeps using the per-process LocMemCache.
+
+get_or_compute() is the single-flight helper for expensive values (catalog
+pages, sitemap, counts): when a hot key expires only one worker recomputes
+it while the others wait for the result instead of all hitting Postgres.
+
+Hit/miss/latency metrics go to prometheus_client's default registry.
+"""
+
+import logging
+import threading
+import time
+
+from cachetools import LRUCache
+from django.core.cache import cache as default_cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.redis import RedisCache
+from prometheus_client import Counter, Histogram
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+CACHE_REQUESTS = Counter(
+    "app_cache_requests_total",
+    "Cache lookups by tier and result",
+    ["tier", "result"],
+)
+CACHE_ERRORS = Counter(
+    "app_cache_errors_total",
+    "Failed operations against the shared cache",
+    ["op"],
+)
+CACHE_LATENCY = Histogram(
+    "app_cache_op_seconds",
+    "Latency of shared cache (L2) operations",
+    ["op"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+COMPUTE_LATENCY = Histogram(
+    "app_cache_compute_seconds",
+    "Time spent recomputing a missing value in get_or_compute()",
+)
+STAMPEDE_WAITS = Counter(
+    "app_cache_stampede_waits_total",
+    "get_or_compute() calls that waited for another worker's result",
+    ["outcome"],
+)
+
+_MISSING = object()
+
+
+class TieredCache(RedisCache):
+    """
+    RedisCache with a per-process LRU in front of it.
+
+    L1 entries live for at most L1_TIMEOUT seconds (and never longer than
+    the timeout they were set with), so a write on another worker is seen
+    here within L1_TIMEOUT. Writes, deletes and incr on this worker drop
+    the L1 entry right away. Values are shared between threads of a worker,
+    treat what you get back as read-only.
+
+    Redis errors are logged and treated as misses / no-ops, so an outage
+    degrades to recomputing rather than failing requests.
+
+    OPTIONS: L1_MAXSIZE (default 1000), L1_TIMEOUT (default 5 seconds);
+    anything else is passed on to the redis client as usual.
+    """
+
+    def __init__(self, server, params):
+        params = dict(params)
+        options = dict(params.get("OPTIONS") or {})
+        self._l1_timeout = float(options.pop("L1_TIMEOUT", 5))
+        self._l1 = LRUCache(maxsize=int(options.pop("L1_MAXSIZE", 1000)))
+        self._l1_lock = threading.Lock()
+        params["OPTIONS"] = options
+        super().__init__(server, params)
+
+    # ---------------- L1 ----------------
+    def _l1_get(self, key):
+        with self._l1_lock:
+            entry = self._l1.get(key)
+            if entry is None:
+                return _MISSING
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._l1[key]
+                return _MISSING
+            return value
+
+    def _l1_set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        ttl = self._l1_timeout
+        backend_timeout = self.get_backend_timeout(timeout)
+        if backend_timeout is not None:
+            ttl = min(ttl, backend_timeout)
+        with self._l1_lock:
+            if ttl <= 0:
+                self._l1.pop(key, None)
+            else:
+                self._l1[key] = (value, time.monotonic() + ttl)
+
+    def _l1_drop(self, *keys):
+        with self._l1_lock:
+            for key in keys:
+                self._l1.pop(key, None)
+
+    def _l2(self, op, fn, fallback):
+        start = time.perf_counter()
+        try:
+            return fn()
+        except RedisError:
+            CACHE_ERRORS.labels(op=op).inc()
+            logger.warning("Shared cache %s failed", op, exc_info=True)
+            return fallback
+        finally:
+            CACHE_LATENCY.labels(op=op).observe(time.perf_counter() - start)
+
+    # ---------------- Cache API ----------------
+    def get(self, key, default=None, version=None):
+        made_key = self.make_and_validate_key(key, version=version)
+        value = self._l1_get(made_key)
+        if value is not _MISSING:
+            CACHE_REQUESTS.labels(tier="l1", result="hit").inc()
+            return value
+        CACHE_REQUESTS.labels(tier="l1", result="miss").inc()
+
+        value = self._l2("get", lambda: self._cache.get(made_key, _MISSING), _MISSING)
+        if value is _MISSING:
+            CACHE_REQUESTS.labels(tier="l2", result="miss").inc()
+            return default
+        CACHE_REQUESTS.labels(tier="l2", result="hit").inc()
+        self._l1_set(made_key, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        found = {}
+        remote = {}
+        for key in keys:
+            made_key = self.make_and_validate_key(key, version=version)
+            value = self._l1_get(made_key)
+            if value is _MISSING:
+                remote[made_key] = key
+            else:
+                found[key] = value
+        CACHE_REQUESTS.labels(tier="l1", result="hit").inc(len(found))
+        if remote:
+            CACHE_REQUESTS.labels(tier="l1", result="miss").inc(len(remote))
+            fetched = self._l2("get_many", lambda: self._cache.get_many(remote.keys()), {})
+            CACHE_REQUESTS.labels(tier="l2", result="hit").inc(len(fetched))
+            CACHE_REQUESTS.labels(tier="l2", result="miss").inc(len(remote) - len(fetched))
+            for made_key, value in fetched.items():
+                self._l1_set(made_key, value)
+                found[remote[made_key]] = value
+        return found
+
+    def has_key(self, key, version=None):
+        made_key = self.make_and_validate_key(key, version=version)
+        if self._l1_get(made_key) is not _MISSING:
+            return True
+        return self._l2("has_key", lambda: self._cache.has_key(made_key), False)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        made_key = self.make_and_validate_key(key, version=version)
+        self._l1_drop(made_key)
+        backend_timeout = self.get_backend_timeout(timeout)
+        self._l2("set", lambda: self._cache.set(made_key, value, backend_timeout), None)
+        self._l1_set(made_key, value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        made_key = self.make_and_validate_key(key, version=version)
+        backend_timeout = self.get_backend_timeout(timeout)
+        added = self._l2("add", lambda: self._cache.add(made_key, value, backend_timeout), False)
+        if added:
+            self._l1_set(made_key, value, timeout)
+        return added
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        if not data:
+            return []
+        safe_data = {self.make_and_validate_key(key, version=version): value for key, value in data.items()}
+        self._l1_drop(*safe_data)
+        backend_timeout = self.get_backend_timeout(timeout)
+        self._l2("set_many", lambda: self._cache.set_many(safe_data, backend_timeout), None)
+        for made_key, value in safe_data.items():
+            self._l1_set(made_key, value, timeout)
+        return []
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        made_key = self.make_and_validate_key(key, version=version)
+        self._l1_drop(made_key)
+        backend_timeout = self.get_backend_timeout(timeout)
+        return self._l2("touch", lambda: self._cache.touch(made_key, backend_timeout), False)
+
+    def delete(self, key, version=None):
+        made_key = self.make_and_validate_key(key, version=version)
+        self._l1_drop(made_key)
+        return self._l2("delete", lambda: self._cache.delete(made_key), False)
+
+    def delete_many(self, keys, version=None):
+        if not keys:
+            return
+        safe_keys = [self.make_and_validate_key(key, version=version) for key in keys]
+        self._l1_drop(*safe_keys)
+        self._l2("delete_many", lambda: self._cache.delete_many(safe_keys), None)
+
+    def incr(self, key, delta=1, version=None):
+        """
+        A missing key raises ValueError, like every other backend. A Redis
+        outage is not that: it is logged and returns None, so callers bumping
+        a version number (CatalogCache.invalidate, invalidate_paper) don't
+        fail the write they were called from. The bump is lost, so once
+        Redis is back, entries cached under the old version are served until
+        their TTL runs out.
+        """
+        made_key = self.make_and_validate_key(key, version=version)
+        self._l1_drop(made_key)
+        return self._l2("incr", lambda: self._cache.incr(made_key, delta), None)
+
+    def clear(self):
+        with self._l1_lock:
+            self._l1.clear()
+        return self._l2("clear", lambda: self._cache.clear(), False)
+
+
+class _Flight:
+    """A get_or_compute() in progress, for other threads of this worker to wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = _MISSING
+
+
+# Key -> the one thread of this worker taking part in the cross-worker race
+# for it. Threads asking for the same key wait on its Event; other keys are
+# never held up, and no lock is held while computing or polling.
+_flights: dict[str, _Flight] = {}
+_flights_lock = threading.Lock()
+
+
+def get_or_compute(key: str, compute, timeout=DEFAULT_TIMEOUT, *, cache=None,
+                   lock_timeout: int = 30, wait: float = 10.0):
+    """
+    cache.get(key), or compute() and cache it, with at most one worker
+    computing a given key at a time.
+
+    The winner of cache.add(key + ":lock") computes; everyone else polls
+    for the result for up to `wait` seconds and then gives up and computes
+    it themselves, so a crashed winner only delays them. Within a worker,
+    threads asking for a key that is already being fetched wait for that
+    fetch (again for up to `wait` seconds) rather than racing for it. A
+    compute() result of None is returned but not cached.
+    """
+    cache = cache or default_cache
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+
+    if not leader:
+        if flight.done.wait(wait) and flight.value is not _MISSING:
+            STAMPEDE_WAITS.labels(outcome="served").inc()
+            return flight.value
+        # Timed out, or the other thread's compute() raised
+        STAMPEDE_WAITS.labels(outcome="gave_up").inc()
+        return _compute_and_set(cache, key, compute, timeout)
+
+    try:
+        flight.value = _get_or_compute_shared(cache, key, compute, timeout, lock_timeout, wait)
+        return flight.value
+    finally:
+        with _flights_lock:
+            del _flights[key]
+        flight.done.set()
+
+
+def _get_or_compute_shared(cache, key, compute, timeout, lock_timeout, wait):
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+
+    lock_key = f"{key}:lock"
+    if cache.add(lock_key, 1, lock_timeout):
+        try:
+            return _compute_and_set(cache, key, compute, timeout)
+        finally:
+            cache.delete(lock_key)
+
+    deadline = time.monotonic() + wait
+    delay = 0.01
+    while time.monotonic() < deadline:
+        time.sleep(delay)
+        delay = min(delay * 2, 0.25)
+        value = cache.get(key, _MISSING)
+        if value is not _MISSING:
+            STAMPEDE_WAITS.labels(outcome="served").inc()
+            return value
+        if not cache.has_key(lock_key):
+            # The winner finished without caching anything (None or an error)
+            break
+    STAMPEDE_WAITS.labels(outcome="gave_up").inc()
+    return _compute_and_set(cache, key, compute, timeout)
+
+
+def _compute_and_set(cache, key, compute, timeout):
+    start = time.perf_counter()
+    try:
+        value = compute()
+    finally:
+        COMPUTE_LATENCY.observe(time.perf_counter() - start)
+    if value is not None:
+        cache.set(key, value, timeout)
+    return value
@@ -0,0 +1,598 @@
+"""
+Storage for uploaded binary assets: blog images, profile pictures and
+student documents.
+
+Every asset used to live on Google Drive, so every image view and document
+download was a proxied fetch from Drive. Assets are now addressed by a
+storage reference "<backend>:<key>" (kept in the models' storage_key
+column) and can live in one of:
+
+- drive: Google Drive, the key is the Drive file id (what google_file_id
+  and Document.file_id have always held)
+- local: files under ASSET_STORAGE_ROOT, served with FileResponse so
+  gunicorn can sendfile() them, or handed to nginx via X-Accel-Redirect
+  when ASSET_STORAGE_ACCEL_PREFIX is set
+- s3:    any S3-compatible bucket (AWS, MinIO, R2), streamed through with
+  the client's Range passed on, or redirected to a presigned URL when
+  S3_STORAGE_REDIRECT is set
+
+Downloads are streamed from every backend and honour Range, If-Range and
+If-None-Match. Callers that keep an AssetMeta (content type, size, etag)
+for an asset, as Document does, pass it to serve_asset() so a 304 or a
+range needs no metadata round-trip to the backend first.
+
+ASSET_STORAGE_BACKEND decides where new uploads go. Existing references
+keep pointing wherever they were written; `manage.py migrate_drive_assets`
+copies Drive-held assets to the configured backend.
+"""
+
+import hashlib
+import itertools
+import logging
+import os
+import posixpath
+import re
+import shutil
+import threading
+import uuid
+from typing import NamedTuple
+
+import filetype
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import parse_etags
+
+from .drive import DOWNLOAD_CHUNK_SIZE, drive_service
+from .utils import (
+    MIME_TYPES,
+    PRIVATE_ALLOWED_EXTENSIONS,
+    PRIVATE_DOC_ALLOWED_EXTENSIONS,
+    PUBLIC_ALLOWED_EXTENSIONS,
+    upload_to_drive,
+)
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+# filetype needs at most this much of the head of a file
+SNIFF_BYTES = 261
+
+# area -> (allowed extensions, Drive folder setting, readable by anyone with the link)
+AREAS = {
+    "blog": (PUBLIC_ALLOWED_EXTENSIONS, "GOOGLE_DRIVE_FOLDER_ID_PUBLIC", True),
+    "profile": (PRIVATE_ALLOWED_EXTENSIONS, "GOOGLE_DRIVE_FOLDER_ID_PROFILE", True),
+    "documents": (PRIVATE_DOC_ALLOWED_EXTENSIONS, "GOOGLE_DRIVE_FOLDER_ID_PRIVATE", False),
+}
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class AssetNotFound(Exception):
+    pass
+
+
+class AssetMeta(NamedTuple):
+    content_type: str
+    size: int
+    etag: str  # unquoted
+
+
+def asset_meta(area: str, file_obj) -> AssetMeta:
+    """
+    Sniffed content type, size and sha256 of an upload, read CHUNK_SIZE
+    at a time. Raises ValueError like sniff_type(). Leaves the file at its
+    start.
+    """
+    allowed, _, _ = AREAS[area]
+    _, content_type = sniff_type(file_obj, allowed)
+    digest = hashlib.sha256()
+    size = 0
+    while chunk := file_obj.read(CHUNK_SIZE):
+        digest.update(chunk)
+        size += len(chunk)
+    file_obj.seek(0)
+    return AssetMeta(content_type, size, digest.hexdigest())
+
+
+def sniff_type(file_obj, allowed) -> tuple[str, str]:
+    """
+    (extension, content type) of an upload from its magic bytes, whatever
+    its name says. Raises ValueError if it isn't one of `allowed`.
+    Leaves the file at its start.
+    """
+    file_obj.seek(0)
+    kind = filetype.guess(file_obj.read(SNIFF_BYTES))
+    file_obj.seek(0)
+    if kind is None or kind.extension not in allowed:
+        raise ValueError(f"Unsupported file type: {kind.mime if kind else 'unknown'}")
+    return kind.extension, kind.mime
+
+
+def content_type_for(key: str) -> str:
+    return MIME_TYPES.get(key.rsplit(".", 1)[-1].lower(), "application/octet-stream")
+
+
+def parse_range(header: str | None, size: int):
+    """
+    (start, end) inclusive for a single "bytes=" range, None to send the
+    whole file (no header, or one we don't support: multiple ranges), or
+    False when the range can't be satisfied.
+    """
+    match = _RANGE_RE.match((header or "").strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end
+
+
+def not_modified(request, etag: str | None) -> bool:
+    return bool(etag) and f'"{etag}"' in parse_etags(request.headers.get("If-None-Match", ""))
+
+
+def requested_range(request, etag: str | None) -> str | None:
+    """The Range header to honour; dropped when If-Range names another version."""
+    if_range = request.headers.get("If-Range")
+    if if_range and if_range.strip() != f'"{etag}"':
+        return None
+    return request.headers.get("Range")
+
+
+def _download_headers(response, meta: AssetMeta | None, filename=None):
+    response["Accept-Ranges"] = "bytes"
+    if meta and meta.etag:
+        response["ETag"] = f'"{meta.etag}"'
+    if filename:
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+def range_not_satisfiable(size: int) -> HttpResponse:
+    response = HttpResponse(status=416)
+    response["Content-Range"] = f"bytes */{size}"
+    return response
+
+
+class _FileRange:
+    """
+    A file object positioned at a range start that reads no further than
+    its end. fileno() is kept so gunicorn still sendfile()s it, sending
+    Content-Length bytes from the current offset.
+    """
+
+    def __init__(self, file, length: int):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size: int = -1) -> bytes:
+        if self.remaining <= 0:
+            return b""
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+class DriveStorage:
+    name = "drive"
+
+    def save(self, area: str, name: str, file, content_type: str) -> str:
+        _, folder_setting, public = AREAS[area]
+        return upload_to_drive(file, name, getattr(settings, folder_setting), content_type, public=public)
+
+    def read(self, key: str) -> tuple[bytes, str]:
+        from googleapiclient.errors import HttpError
+
+        try:
+            with drive_service() as service:
+                meta = service.files().get(fileId=key, fields="mimeType").execute()
+                data = service.files().get_media(fileId=key).execute()
+        except HttpError as e:
+            if e.resp.status == 404:
+                raise AssetNotFound(key) from e
+            raise
+        return data, meta.get("mimeType", "application/octet-stream")
+
+    def stat(self, key: str) -> AssetMeta:
+        from googleapiclient.errors import HttpError
+
+        try:
+            with drive_service() as service:
+                meta = service.files().get(fileId=key, fields="mimeType,size,md5Checksum").execute()
+        except HttpError as e:
+            if e.resp.status == 404:
+                raise AssetNotFound(key) from e
+            raise
+        return AssetMeta(
+            meta.get("mimeType", "application/octet-stream"), int(meta.get("size", 0)), meta.get("md5Checksum", "")
+        )
+
+    def _read_range(self, key: str, start: int, end: int) -> bytes:
+        from googleapiclient.errors import HttpError
+
+        # A pooled client per piece, so a slow reader doesn't hold one for the whole download
+        with drive_service() as service:
+            media = service.files().get_media(fileId=key)
+            resp, content = media.http.request(media.uri, headers={"Range": f"bytes={start}-{end}"})
+        if resp.status == 404:
+            raise AssetNotFound(key)
+        if resp.status == 200:
+            # Range ignored: the whole file came back
+            return content[start:end + 1]
+        if resp.status != 206:
+            raise HttpError(resp, content, uri=media.uri)
+        return content
+
+    def delete(self, key: str):
+        with drive_service() as service:
+            service.files().delete(fileId=key).execute()
+
+    def serve(self, request, key: str, filename=None, meta: AssetMeta | None = None) -> HttpResponse:
+        # Drive can't be handed off to the web server; proxy it DOWNLOAD_CHUNK_SIZE at a time
+        meta = meta or self.stat(key)
+        if not_modified(request, meta.etag):
+            return _download_headers(HttpResponseNotModified(), meta)
+        byte_range = parse_range(requested_range(request, meta.etag), meta.size)
+        if byte_range is False:
+            return range_not_satisfiable(meta.size)
+        start, end = byte_range or (0, meta.size - 1)
+
+        def pieces(start):
+            while start <= end:
+                yield self._read_range(key, start, min(start + DOWNLOAD_CHUNK_SIZE, end + 1) - 1)
+                start = min(start + DOWNLOAD_CHUNK_SIZE, end + 1)
+
+        chunks = pieces(start)
+        # Fetch the first piece now, so a missing file is a 404 rather than a broken stream
+        first = next(chunks, b"")
+        response = StreamingHttpResponse(
+            itertools.chain([first], chunks),
+            status=206 if byte_range else 200,
+            content_type=meta.content_type,
+        )
+        response["Content-Length"] = str(end - start + 1)
+        if byte_range:
+            response["Content-Range"] = f"bytes {start}-{end}/{meta.size}"
+        return _download_headers(response, meta, filename)
+
+
+class LocalStorage:
+    name = "local"
+
+    def __init__(self, root, accel_prefix: str | None = None):
+        self.root = os.path.abspath(root)
+        self.accel_prefix = accel_prefix
+
+    def path(self, key: str) -> str:
+        # "blog/../documents/x" would otherwise pass for a blog key
+        if not _is_normal_key(key):
+            raise AssetNotFound(key)
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise AssetNotFound(key)
+        return path
+
+    def save(self, area: str, name: str, file, content_type: str) -> str:
+        key = f"{area}/{name}"
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write-then-rename, so readers never see half a file
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "wb") as f:
+            shutil.copyfileobj(file, f, CHUNK_SIZE)
+        os.replace(tmp, path)
+        return key
+
+    def read(self, key: str) -> tuple[bytes, str]:
+        try:
+            with open(self.path(key), "rb") as f:
+                return f.read(), content_type_for(key)
+        except FileNotFoundError as e:
+            raise AssetNotFound(key) from e
+
+    def delete(self, key: str):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def _meta(key: str, st: os.stat_result) -> AssetMeta:
+        # Same shape as nginx's ETag: mtime and size
+        return AssetMeta(content_type_for(key), st.st_size, f"{st.st_mtime_ns:x}-{st.st_size:x}")
+
+    def stat(self, key: str) -> AssetMeta:
+        try:
+            return self._meta(key, os.stat(self.path(key)))
+        except FileNotFoundError as e:
+            raise AssetNotFound(key) from e
+
+    def serve(self, request, key: str, filename=None, meta: AssetMeta | None = None) -> HttpResponse:
+        path = self.path(key)
+
+        if self.accel_prefix:
+            if not os.path.exists(path):
+                raise AssetNotFound(key)
+            # nginx serves the file itself, ranges included
+            response = HttpResponse(content_type=meta.content_type if meta else content_type_for(key))
+            response["X-Accel-Redirect"] = f"{self.accel_prefix.rstrip('/')}/{key}"
+            if filename:
+                response["Content-Disposition"] = f'attachment; filename="{filename}"'
+            return response
+
+        try:
+            file = open(path, "rb")
+        except FileNotFoundError as e:
+            raise AssetNotFound(key) from e
+        meta = meta or self._meta(key, os.fstat(file.fileno()))
+        if not_modified(request, meta.etag):
+            file.close()
+            return _download_headers(HttpResponseNotModified(), meta)
+        size = os.fstat(file.fileno()).st_size
+        byte_range = parse_range(requested_range(request, meta.etag), size)
+
+        if byte_range is False:
+            file.close()
+            return range_not_satisfiable(size)
+        if byte_range is None:
+            response = FileResponse(file, content_type=meta.content_type)
+        else:
+            start, end = byte_range
+            file.seek(start)
+            response = FileResponse(_FileRange(file, end - start + 1), status=206, content_type=meta.content_type)
+            response["Content-Range"] = f"bytes {start}-{end}/{size}"
+            response["Content-Length"] = str(end - start + 1)
+        return _download_headers(response, meta, filename)
+
+
+class S3Storage:
+    name = "s3"
+
+    def __init__(
+        self,
+        bucket: str,
+        endpoint_url: str | None = None,
+        region: str | None = None,
+        access_key: str | None = None,
+        secret_key: str | None = None,
+        redirect: bool = False,
+        url_expiry: int = 300,
+    ):
+        self.bucket = bucket
+        self.endpoint_url = endpoint_url
+        self.region = region
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.redirect = redirect
+        self.url_expiry = url_expiry
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        # boto3 clients are thread-safe; one per process
+        if self._client is None:
+            import boto3
+
+            with self._lock:
+                if self._client is None:
+                    self._client = boto3.client(
+                        "s3",
+                        endpoint_url=self.endpoint_url,
+                        region_name=self.region,
+                        aws_access_key_id=self.access_key,
+                        aws_secret_access_key=self.secret_key,
+                    )
+        return self._client
+
+    def _get(self, key: str, **kwargs) -> dict:
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=key, **kwargs)
+        except self.client.exceptions.NoSuchKey as e:
+            raise AssetNotFound(key) from e
+
+    def save(self, area: str, name: str, file, content_type: str) -> str:
+        key = f"{area}/{name}"
+        # Multipart above boto3's 8 MB threshold, a part at a time
+        self.client.upload_fileobj(file, self.bucket, key, ExtraArgs={"ContentType": content_type})
+        return key
+
+    def read(self, key: str) -> tuple[bytes, str]:
+        obj = self._get(key)
+        return obj["Body"].read(), obj.get("ContentType") or content_type_for(key)
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def stat(self, key: str) -> AssetMeta:
+        from botocore.exceptions import ClientError
+
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                raise AssetNotFound(key) from e
+            raise
+        return AssetMeta(
+            head.get("ContentType") or content_type_for(key), head["ContentLength"], head["ETag"].strip('"')
+        )
+
+    def serve(self, request, key: str, filename=None, meta: AssetMeta | None = None) -> HttpResponse:
+        from botocore.exceptions import ClientError
+
+        if self.redirect:
+            params = {"Bucket": self.bucket, "Key": key}
+            if filename:
+                params["ResponseContentDisposition"] = f'attachment; filename="{filename}"'
+            url = self.client.generate_presigned_url("get_object", Params=params, ExpiresIn=self.url_expiry)
+            response = HttpResponse(status=302)
+            response["Location"] = url
+            return response
+
+        if meta and not_modified(request, meta.etag):
+            return _download_headers(HttpResponseNotModified(), meta)
+        range_header = (requested_range(request, meta.etag if meta else None) or "").strip()
+        kwargs = {"Range": range_header} if _RANGE_RE.match(range_header) else {}
+        try:
+            obj = self._get(key, **kwargs)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") != "InvalidRange":
+                raise
+            head = self.client.head_object(Bucket=self.bucket, Key=key)
+            return range_not_satisfiable(head["ContentLength"])
+
+        body = obj["Body"]
+
+        def stream_chunks():
+            try:
+                yield from body.iter_chunks(CHUNK_SIZE)
+            finally:
+                body.close()
+
+        response = StreamingHttpResponse(
+            stream_chunks(),
+            status=206 if obj.get("ContentRange") else 200,
+            content_type=obj.get("ContentType") or content_type_for(key),
+        )
+        response["Content-Length"] = str(obj["ContentLength"])
+        if obj.get("ContentRange"):
+            response["Content-Range"] = obj["ContentRange"]
+        return _download_headers(response, meta, filename)
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def _build_backend(name: str):
+    if name == "drive":
+        return DriveStorage()
+    if name == "local":
+        return LocalStorage(
+            getattr(settings, "ASSET_STORAGE_ROOT", os.path.join(settings.BASE_DIR, "assets")),
+            getattr(settings, "ASSET_STORAGE_ACCEL_PREFIX", None),
+        )
+    if name == "s3":
+        return S3Storage(
+            settings.S3_STORAGE_BUCKET,
+            endpoint_url=getattr(settings, "S3_STORAGE_ENDPOINT_URL", None),
+            region=getattr(settings, "S3_STORAGE_REGION", None),
+            access_key=getattr(settings, "S3_STORAGE_ACCESS_KEY", None),
+            secret_key=getattr(settings, "S3_STORAGE_SECRET_KEY", None),
+            redirect=getattr(settings, "S3_STORAGE_REDIRECT", False),
+            url_expiry=getattr(settings, "S3_STORAGE_URL_EXPIRY", 300),
+        )
+    raise ValueError(f"Unknown storage backend: {name}")
+
+
+def get_backend(name: str | None = None):
+    name = name or getattr(settings, "ASSET_STORAGE_BACKEND", "drive")
+    if name not in _backends:
+        with _backends_lock:
+            if name not in _backends:
+                _backends[name] = _build_backend(name)
+    return _backends[name]
+
+
+def split_ref(ref: str):
+    """"local:blog/x.png" -> (LocalStorage, "blog/x.png")."""
+    name, sep, key = (ref or "").partition(":")
+    if not sep or not key:
+        raise AssetNotFound(ref)
+    try:
+        return get_backend(name), key
+    except ValueError as e:
+        raise AssetNotFound(ref) from e
+
+
+def _is_normal_key(key: str) -> bool:
+    return bool(key) and posixpath.normpath(key) == key and not key.startswith(("/", "../")) and key != ".."
+
+
+def asset_area(ref: str | None) -> str | None:
+    """The area ("blog", "profile", ...) a local or s3 reference is stored under, None if it isn't in one."""
+    _, _, key = (ref or "").partition(":")
+    if not _is_normal_key(key):
+        return None
+    area = key.split("/", 1)[0]
+    return area if area in AREAS else None
+
+
+def asset_ref(storage_key: str | None, drive_file_id: str | None = None) -> str | None:
+    """The reference for a row, falling back to its legacy Drive id."""
+    if storage_key:
+        return storage_key
+    if drive_file_id:
+        return f"drive:{drive_file_id}"
+    return None
+
+
+def drive_file_id(ref: str | None) -> str | None:
+    """The Drive file id if `ref` points at Drive, for the legacy id columns."""
+    if ref and ref.startswith("drive:"):
+        return ref[len("drive:"):]
+    return None
+
+
+def save_asset(area: str, file_obj, backend: str | None = None) -> tuple[str, str]:
+    """
+    Store an upload in `area`, streamed from `file_obj` (Django keeps
+    large uploads in a temporary file); returns (reference, generated uuid).
+    """
+    allowed, _, _ = AREAS[area]
+    ext, content_type = sniff_type(file_obj, allowed)
+
+    generated_uuid = str(uuid.uuid4())
+    storage = get_backend(backend)
+    key = storage.save(area, f"{generated_uuid}.{ext}", file_obj, content_type)
+    return f"{storage.name}:{key}", generated_uuid
+
+
+def delete_asset(ref: str | None) -> bool:
+    if not ref:
+        return False
+    try:
+        storage, key = split_ref(ref)
+        storage.delete(key)
+        return True
+    except Exception:
+        logger.exception("Failed to delete asset %s", ref)
+        return False
+
+
+def read_asset(ref: str) -> tuple[bytes, str]:
+    storage, key = split_ref(ref)
+    return storage.read(key)
+
+
+def stat_asset(ref: str) -> AssetMeta:
+    storage, key = split_ref(ref)
+    return storage.stat(key)
+
+
+def serve_asset(request, ref: str, filename=None, meta: AssetMeta | None = None) -> HttpResponse:
+    """
+    Streamed response for `ref`, honouring Range and conditional requests.
+    With `meta` the backend isn't asked for the asset's size and type first.
+    """
+    try:
+        storage, key = split_ref(ref)
+        return storage.serve(request, key, filename=filename, meta=meta)
+    except AssetNotFound:
+        return HttpResponse("File not found", status=404)
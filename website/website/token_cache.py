@@ -0,0 +1,96 @@
+import copy
+import threading
+import uuid
+
+from cachetools import TTLCache
+from django.conf import settings
+
+from authentication.models import Employee
+from student.models import Student
+
+
+class PrincipalCache:
+    """
+    Bounded TTL/LRU cache mapping auth tokens to Employee / Student rows.
+
+    Only successful lookups are cached, so a freshly issued token is visible
+    immediately. Entries are dropped by pk from the post_save/post_delete
+    hooks in authentication.signals (rotated tokens, deleted accounts);
+    the TTL bounds staleness for writes done through raw SQL or on other
+    workers.
+    """
+
+    def __init__(self, model, maxsize: int, ttl: int):
+        self.model = model
+        self._by_token = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._tokens_by_pk = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, token):
+        try:
+            token = token if isinstance(token, uuid.UUID) else uuid.UUID(str(token))
+        except (TypeError, ValueError, AttributeError):
+            return None
+
+        with self._lock:
+            principal = self._by_token.get(token)
+        if principal is not None:
+            # Hand out a copy so callers can't mutate the shared instance
+            return copy.copy(principal)
+
+        try:
+            principal = self.model.objects.get(authToken=token)
+        except self.model.DoesNotExist:
+            return None
+
+        with self._lock:
+            self._by_token[token] = principal
+            # Forget tokens the TTL/LRU has already evicted for this principal
+            tokens = {t for t in self._tokens_by_pk.get(principal.pk, ()) if t in self._by_token}
+            tokens.add(token)
+            self._tokens_by_pk[principal.pk] = tokens
+        return copy.copy(principal)
+
+    def invalidate(self, pk):
+        with self._lock:
+            for token in self._tokens_by_pk.pop(pk, ()):
+                self._by_token.pop(token, None)
+
+    def clear(self):
+        with self._lock:
+            self._by_token.clear()
+            self._tokens_by_pk.clear()
+
+
+employee_tokens = PrincipalCache(
+    Employee,
+    maxsize=getattr(settings, "AUTH_TOKEN_CACHE_SIZE", 10_000),
+    ttl=getattr(settings, "AUTH_TOKEN_CACHE_TTL", 60),
+)
+student_tokens = PrincipalCache(
+    Student,
+    maxsize=getattr(settings, "AUTH_TOKEN_CACHE_SIZE", 10_000),
+    ttl=getattr(settings, "AUTH_TOKEN_CACHE_TTL", 60),
+)
+
+
+def resolve_employee(token) -> Employee | None:
+    return employee_tokens.resolve(token)
+
+
+def resolve_student(token) -> Student | None:
+    return student_tokens.resolve(token)
+
+
+def resolve_principal(token):
+    """
+    Resolve a token that may belong to either an employee or a student.
+    Returns (principal, "employee" | "student") or (None, None).
+    """
+    employee = employee_tokens.resolve(token)
+    if employee is not None:
+        return employee, "employee"
+    student = student_tokens.resolve(token)
+    if student is not None:
+        return student, "student"
+    return None, None
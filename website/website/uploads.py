@@ -0,0 +1,130 @@
+"""
+Resumable chunked uploads.
+
+For files too large to send reliably in one request, a client starts an
+upload session, then sends the file as a series of PUTs. Each PUT carries
+the byte offset it starts at in an Upload-Offset header, as in tus. The
+session token doubles as the resume token: after a dropped connection the
+client asks for the session's offset and carries on from there.
+
+Pieces are streamed from the request body onto a staging file under
+UPLOAD_STAGING_ROOT, COPY_BUFFER bytes at a time, so an upload never holds
+more than that in memory whatever the file or chunk size. With more than
+one app server the staging root has to be a shared volume. Sessions left
+unfinished for UPLOAD_SESSION_TTL seconds are removed when the next one
+starts.
+"""
+
+import fcntl
+import json
+import os
+import re
+import secrets
+import time
+
+from django.conf import settings
+from django.core.files import File
+
+COPY_BUFFER = 64 * 1024
+_TOKEN_RE = re.compile(r"^[A-Za-z0-9_-]{32}$")
+
+
+class UploadConflict(Exception):
+    """The piece doesn't start where the staged file ends."""
+
+    def __init__(self, offset: int):
+        super().__init__(f"Upload is at offset {offset}")
+        self.offset = offset
+
+
+class UploadSessions:
+    def __init__(self, root, ttl: int):
+        self.root = os.path.abspath(root)
+        self.ttl = ttl
+
+    def _paths(self, token: str) -> tuple[str, str]:
+        if not _TOKEN_RE.match(token or ""):
+            raise KeyError(token)
+        base = os.path.join(self.root, token)
+        return f"{base}.json", f"{base}.part"
+
+    def start(self, owner: str, size: int, filename: str, **meta) -> str:
+        """Open a session for `size` bytes; returns its token."""
+        os.makedirs(self.root, exist_ok=True)
+        self.purge_expired()
+        token = secrets.token_urlsafe(24)
+        meta_path, part_path = self._paths(token)
+        open(part_path, "xb").close()
+        with open(meta_path, "x") as f:
+            json.dump({"owner": owner, "size": size, "filename": filename, "meta": meta}, f)
+        return token
+
+    def get(self, token: str, owner: str) -> dict | None:
+        """The session with its current offset, or None if unknown or not `owner`'s."""
+        try:
+            meta_path, part_path = self._paths(token)
+            with open(meta_path) as f:
+                session = json.load(f)
+            session["offset"] = os.path.getsize(part_path)
+        except (KeyError, FileNotFoundError, ValueError):
+            return None
+        if session["owner"] != owner:
+            return None
+        return session
+
+    def append(self, token: str, offset: int, stream, length: int) -> int:
+        """
+        Append `length` bytes read from `stream` at `offset`; returns the new
+        offset. A client that drops mid-piece leaves what arrived in place,
+        to be resumed from.
+        """
+        _, part_path = self._paths(token)
+        with open(part_path, "ab") as f:
+            # One writer per session, across workers
+            fcntl.flock(f, fcntl.LOCK_EX)
+            current = os.fstat(f.fileno()).st_size
+            if offset != current:
+                raise UploadConflict(current)
+            remaining = length
+            while remaining > 0:
+                data = stream.read(min(COPY_BUFFER, remaining))
+                if not data:
+                    break
+                f.write(data)
+                remaining -= len(data)
+            f.flush()
+            return os.fstat(f.fileno()).st_size
+
+    def open(self, token: str, filename: str) -> File:
+        _, part_path = self._paths(token)
+        return File(open(part_path, "rb"), name=filename)
+
+    def discard(self, token: str):
+        for path in self._paths(token):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def purge_expired(self):
+        cutoff = time.time() - self.ttl
+        try:
+            names = os.listdir(self.root)
+        except FileNotFoundError:
+            return
+        for name in names:
+            token, ext = os.path.splitext(name)
+            if ext != ".part":
+                continue
+            try:
+                # Appends keep the part file's mtime fresh
+                if os.stat(os.path.join(self.root, name)).st_mtime < cutoff:
+                    self.discard(token)
+            except (FileNotFoundError, KeyError):
+                pass
+
+
+upload_sessions = UploadSessions(
+    getattr(settings, "UPLOAD_STAGING_ROOT", os.path.join(settings.BASE_DIR, "upload_staging")),
+    getattr(settings, "UPLOAD_SESSION_TTL", 24 * 3600),
+)
@@ -2,11 +2,12 @@ import os
 import uuid
 from functools import wraps
 
-from django.core.exceptions import ObjectDoesNotExist
+from asgiref.sync import iscoroutinefunction, sync_to_async
 
-from authentication.models import Employee, Permission
+from authentication.models import Employee
+from authentication.permissions import permission_resolver
 from django.http import JsonResponse
-from student.models import Student
+from website.token_cache import resolve_employee, resolve_student
 
 
 def api_key_required(view_func):
@@ -41,25 +42,7 @@ def api_key_required(view_func):
 
 
 def has_perms(employee_id: int, perms_list: list) -> bool:
-    try:
-        employee = Employee.objects.prefetch_related("job_roles__permissions").get(
-            id=employee_id
-        )
-    except Employee.DoesNotExist:
-        return False
-
-    # Gather all permissions attached to the employee's job roles
-    assigned_perms = set(
-        perm.name
-        for role in employee.job_roles.all()
-        for perm in role.permissions.all()
-    )
-
-    for perm_name in perms_list:
-        if perm_name not in assigned_perms:
-            return False
-
-    return True
+    return permission_resolver.has_perms(employee_id, perms_list)
 
 
 def token_required(view_func):
@@ -72,29 +55,54 @@ def token_required(view_func):
         try:
             # Validate if it's a proper UUID first
             uuid_token = uuid.UUID(auth_token)
-            request.user = Employee.objects.get(authToken=uuid_token)
-        except (ValueError, Employee.DoesNotExist):
+        except ValueError:
             return JsonResponse({"error": "Invalid or expired token"}, status=403)
 
+        employee = resolve_employee(uuid_token)
+        if employee is None:
+            return JsonResponse({"error": "Invalid or expired token"}, status=403)
+        request.user = employee
+
         return view_func(request, *args, **kwargs)
 
     return wrapped
 
 
+def _authenticate_student(request):
+    """Sets request.user from the Authorization header, or returns an error response."""
+    auth_token = request.headers.get("Authorization")
+    if not auth_token:
+        return JsonResponse({"error": "Authorization token missing"}, status=401)
+
+    try:
+        # Validate if it's a proper UUID first
+        uuid_token = uuid.UUID(auth_token)
+    except ValueError:
+        return JsonResponse({"error": "Invalid or expired token"}, status=403)
+
+    student = resolve_student(uuid_token)
+    if student is None:
+        return JsonResponse({"error": "Invalid or expired token"}, status=403)
+    request.user = student
+    return None
+
+
 def user_token_required(view_func):
-    @wraps(view_func)
-    def wrapped(request, *args, **kwargs):
-        auth_token = request.headers.get("Authorization")
-        if not auth_token:
-            return JsonResponse({"error": "Authorization token missing"}, status=401)
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapped(request, *args, **kwargs):
+            error = await sync_to_async(_authenticate_student)(request)
+            if error is not None:
+                return error
+            return await view_func(request, *args, **kwargs)
 
-        try:
-            # Validate if it's a proper UUID first
-            uuid_token = uuid.UUID(auth_token)
-            request.user = Student.objects.get(authToken=uuid_token)
-        except (ValueError, Student.DoesNotExist):
-            return JsonResponse({"error": "Invalid or expired token"}, status=403)
+        return async_wrapped
 
+    @wraps(view_func)
+    def wrapped(request, *args, **kwargs):
+        error = _authenticate_student(request)
+        if error is not None:
+            return error
         return view_func(request, *args, **kwargs)
 
     return wrapped
@@ -106,35 +114,45 @@ import io
 import uuid
 
 from django.conf import settings
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
 from googleapiclient.http import MediaIoBaseUpload
 
-DEFAULT_SCOPES = ["https://www.googleapis.com/auth/drive.file"]
+from .drive import UPLOAD_CHUNK_SIZE, drive_service
 
 
-def get_drive_service():
-    """
-    Build a google drive service using client_id/secret and refresh_token from env.
-    This uses an in-memory Credentials object and refreshes automatically when needed.
-    """
-    creds = Credentials(
-        token=None,
-        refresh_token=getattr(settings, "GOOGLE_REFRESH_TOKEN"),
-        token_uri="https://oauth2.googleapis.com/token",
-        client_id=getattr(settings, "GOOGLE_CLIENT_ID"),
-        client_secret=getattr(settings, "GOOGLE_CLIENT_SECRET"),
-        scopes=getattr(settings, "GOOGLE_SCOPES", DEFAULT_SCOPES),
-    )
+PUBLIC_ALLOWED_EXTENSIONS = {"jpg", "jpeg", "png", "webp"}
 
-    if not creds.valid or creds.expired:
-        creds.refresh(Request())
 
-    return build("drive", "v3", credentials=creds)
+def upload_to_drive(file_obj, filename: str, folder_id: str, mimetype: str, public=False) -> str:
+    """
+    Upload a file object into a Drive folder and return the new file id.
+    Anything over DRIVE_UPLOAD_CHUNK_SIZE goes up as a resumable upload,
+    read and sent a chunk at a time. public=True also makes it readable
+    by anyone with the link.
+    """
+    file_obj.seek(0, io.SEEK_END)
+    resumable = file_obj.tell() > UPLOAD_CHUNK_SIZE
+    file_obj.seek(0)
+    media = MediaIoBaseUpload(file_obj, mimetype=mimetype, chunksize=UPLOAD_CHUNK_SIZE, resumable=resumable)
+
+    with drive_service() as service:
+        request = service.files().create(
+            body={"name": filename, "parents": [folder_id]}, media_body=media, fields="id"
+        )
+        if resumable:
+            uploaded = None
+            while uploaded is None:
+                # Retries a failed chunk from where Drive says it got to
+                _, uploaded = request.next_chunk(num_retries=3)
+        else:
+            uploaded = request.execute()
 
+        if public:
+            service.permissions().create(
+                fileId=uploaded["id"],
+                body={"role": "reader", "type": "anyone"},
+            ).execute()
 
-PUBLIC_ALLOWED_EXTENSIONS = {"jpg", "jpeg", "png", "webp"}
+    return uploaded["id"]
 
 
 def upload_file_to_drive_public(file_obj, ext=None):
@@ -142,7 +160,6 @@ def upload_file_to_drive_public(file_obj, ext=None):
     Upload file to Google Drive (public access).
     Supports: jpg, jpeg, png, webp
     """
-    service = get_drive_service()
     generated_uuid = str(uuid.uuid4())
 
     if not ext:
@@ -151,33 +168,14 @@ def upload_file_to_drive_public(file_obj, ext=None):
     if ext not in PUBLIC_ALLOWED_EXTENSIONS:
         raise ValueError(f"Unsupported file extension: {ext}")
 
-    filename = f"{generated_uuid}.{ext}"
-
-    metadata = {
-        "name": filename,
-        "parents": [getattr(settings, "GOOGLE_DRIVE_FOLDER_ID_PUBLIC")],
-    }
-
-    file_bytes = io.BytesIO(file_obj.read())
-
-    try:
-        media = MediaIoBaseUpload(file_bytes, mimetype=f"image/{ext}", resumable=False)
-        uploaded = (
-            service.files()
-            .create(body=metadata, media_body=media, fields="id")
-            .execute()
-        )
-
-        # Make it public
-        service.permissions().create(
-            fileId=uploaded["id"],
-            body={"role": "reader", "type": "anyone"},
-        ).execute()
-
-        return uploaded["id"], generated_uuid
-
-    finally:
-        file_bytes.close()
+    file_id = upload_to_drive(
+        file_obj,
+        f"{generated_uuid}.{ext}",
+        getattr(settings, "GOOGLE_DRIVE_FOLDER_ID_PUBLIC"),
+        f"image/{ext}",
+        public=True,
+    )
+    return file_id, generated_uuid
 
 
 PRIVATE_DOC_ALLOWED_EXTENSIONS = {"jpg", "jpeg", "webp", "pdf"}
@@ -185,13 +183,13 @@ PRIVATE_DOC_ALLOWED_EXTENSIONS = {"jpg", "jpeg", "webp", "pdf"}
 MIME_TYPES = {
     "jpg": "image/jpeg",
     "jpeg": "image/jpeg",
+    "png": "image/png",
     "webp": "image/webp",
     "pdf": "application/pdf",
 }
 
 
 def upload_file_to_drive_private(file_obj, ext=None):
-    service = get_drive_service()
     generated_uuid = str(uuid.uuid4())
 
     if not ext:
@@ -200,26 +198,13 @@ def upload_file_to_drive_private(file_obj, ext=None):
     if ext not in PRIVATE_DOC_ALLOWED_EXTENSIONS:
         raise ValueError(f"Unsupported file extension: {ext}")
 
-    filename = f"{generated_uuid}.{ext}"
-    metadata = {
-        "name": filename,
-        "parents": [getattr(settings, "GOOGLE_DRIVE_FOLDER_ID_PRIVATE")],
-    }
-
-    file_bytes = io.BytesIO(file_obj.read())
-
-    try:
-        mimetype = MIME_TYPES.get(ext, "application/octet-stream")
-        media = MediaIoBaseUpload(file_bytes, mimetype=mimetype, resumable=False)
-        uploaded = (
-            service.files()
-            .create(body=metadata, media_body=media, fields="id")
-            .execute()
-        )
-
-        return uploaded["id"], generated_uuid
-    finally:
-        file_bytes.close()
+    file_id = upload_to_drive(
+        file_obj,
+        f"{generated_uuid}.{ext}",
+        getattr(settings, "GOOGLE_DRIVE_FOLDER_ID_PRIVATE"),
+        MIME_TYPES.get(ext, "application/octet-stream"),
+    )
+    return file_id, generated_uuid
 
 
 PRIVATE_ALLOWED_EXTENSIONS = {"jpg", "jpeg", "png", "webp"}
@@ -230,7 +215,6 @@ def upload_profile_picture(file_obj, ext=None):
     Upload file to Google Drive (public access).
     Supports: jpg, jpeg, png, webp
     """
-    service = get_drive_service()
     generated_uuid = str(uuid.uuid4())
 
     if not ext:
@@ -239,44 +223,23 @@ def upload_profile_picture(file_obj, ext=None):
     if ext not in PRIVATE_ALLOWED_EXTENSIONS:
         raise ValueError(f"Unsupported file extension: {ext}")
 
-    filename = f"{generated_uuid}.{ext}"
-
-    metadata = {
-        "name": filename,
-        "parents": [getattr(settings, "GOOGLE_DRIVE_FOLDER_ID_PROFILE")],
-    }
-
-    file_bytes = io.BytesIO(file_obj.read())
-
-    try:
-        media = MediaIoBaseUpload(file_bytes, mimetype=f"image/{ext}", resumable=False)
-        uploaded = (
-            service.files()
-            .create(body=metadata, media_body=media, fields="id")
-            .execute()
-        )
-
-        # Make it public
-        service.permissions().create(
-            fileId=uploaded["id"],
-            body={"role": "reader", "type": "anyone"},
-        ).execute()
-
-        return uploaded["id"], generated_uuid
-
-    finally:
-        file_bytes.close()
+    file_id = upload_to_drive(
+        file_obj,
+        f"{generated_uuid}.{ext}",
+        getattr(settings, "GOOGLE_DRIVE_FOLDER_ID_PROFILE"),
+        f"image/{ext}",
+        public=True,
+    )
+    return file_id, generated_uuid
 
 
 def delete_from_google_drive(file_id: str):
     """
     Permanently delete a file from Google Drive.
-    Requires the same authorized service as upload_profile_picture().
     """
-    service = get_drive_service()
-
     try:
-        service.files().delete(fileId=file_id).execute()
+        with drive_service() as service:
+            service.files().delete(fileId=file_id).execute()
         return True
     except Exception as e:
         # Optional: log the error instead of raising
@@ -287,29 +250,8 @@ def delete_from_google_drive(file_id: str):
 class EmployeeAuthorization:
     @classmethod
     def check_employee_token(cls, token:uuid.UUID) -> Employee | None:
-        try:
-            employee = Employee.objects.get(authToken=token)
-        except(ValueError, ObjectDoesNotExist):
-            return None
-        return employee
+        return resolve_employee(token)
 
     @classmethod
     def check_employee_permission(cls, id:int, perms_list: list) -> bool:
-        try:
-            employee = Employee.objects.prefetch_related("job_roles__permissions").get(
-                id=id
-            )
-        except Employee.DoesNotExist:
-            return False
-
-        assigned_perms = set(
-            perm.name
-            for role in employee.job_roles.all()
-            for perm in role.permissions.all()
-        )
-
-        for perm_name in perms_list:
-            if perm_name not in assigned_perms:
-                return False
-
-        return True
\ No newline at end of file
+        return permission_resolver.has_perms(id, perms_list)